@@ -7,8 +7,9 @@ from typing import Any
 import streamlit as st
 
 from app.services.app_bootstrap import get_redirect_uri, initialize_session, setup_app
-from app.services.auth import ensure_authenticated
+from app.services.auth import ensure_authenticated, get_current_user
 from app.services.logging_config import get_logger
+from app.services.session_memory import enforce_session_budget
 from app.services.streamlit_components.cookie_manager import get_cookie_manager
 from app.ui import render_sidebar
 
@@ -71,7 +72,12 @@ def run() -> None:
     if not is_logout_page:
         render_sidebar(cookie_manager)
 
-    pg.run()
+    try:
+        pg.run()
+    finally:
+        # st.rerun()/st.stop() で抜けた場合もセッションのメモリ予算を適用する
+        user = get_current_user()
+        enforce_session_budget(user.id if user else None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""リポジトリ分析の計画（どのリポジトリをどこまで抽出するか）.
+
+プロファイル生成（generate_profile）はフォーク・アーカイブのリポジトリをプロンプトに
+含めない。それらに README・言語・ファイル一覧・ファイル内容の取得を行うのは無駄なため、
+分析前にリポジトリを分類し、プロファイルに使うものだけを完全に抽出する
+（それ以外は取得済みのリポジトリ情報のみのレコードにする）。
+抽出（analyze_selected_repos）と生成（generate_profile）は同じ計画を参照する。
+
+分類ごとにリポジトリ数・GitHubリクエスト数・所要時間を集計し、ログとメトリクスに出す。
+
+    plan = AnalysisPlan()
+    records = analyze_selected_repos(username, names, token, plan=plan)
+    profile = generate_profile(records, plan=plan)
+    plan.log_report()
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Protocol
+
+from app.services.github_scheduler import count_requests
+from app.services.logging_config import log_structured
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class RepoClass(StrEnum):
+    """分析の深さによるリポジトリの分類."""
+
+    # プロファイルに使う（完全に抽出する）
+    ORIGINAL = "original"
+    # フォーク（オリジナル作品を重視するため使わない）
+    FORK = "fork"
+    # アーカイブ済み（現在の技術力を表さないため使わない）
+    ARCHIVED = "archived"
+
+
+class _ClassifiedRepo(Protocol):
+    name: str
+    is_fork: bool
+    is_archived: bool
+
+
+def classify_repo(is_fork: bool, is_archived: bool) -> RepoClass:
+    """リポジトリを分類（フォークかつアーカイブならフォーク）."""
+    if is_fork:
+        return RepoClass.FORK
+    if is_archived:
+        return RepoClass.ARCHIVED
+    return RepoClass.ORIGINAL
+
+
+@dataclass
+class ClassCost:
+    """1分類の分析コスト."""
+
+    repos: int = 0
+    requests: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class AnalysisPlan:
+    """リポジトリ名 → 分類と、分類ごとの分析コスト."""
+
+    classes: dict[str, RepoClass] = field(default_factory=dict)
+    costs: dict[RepoClass, ClassCost] = field(default_factory=dict)
+
+    @classmethod
+    def for_repos(cls, repos: Iterable[_ClassifiedRepo]) -> AnalysisPlan:
+        """分析済みのレコード（キャッシュ等）から計画を作る."""
+        plan = cls()
+        for repo in repos:
+            plan.add(repo.name, repo.is_fork, repo.is_archived)
+        return plan
+
+    def add(self, name: str, is_fork: bool, is_archived: bool) -> RepoClass:
+        """リポジトリを分類して計画に加える."""
+        repo_class = self.classes[name] = classify_repo(is_fork, is_archived)
+        return repo_class
+
+    def is_profiled(self, name: str) -> bool:
+        """プロファイル生成に使う（完全に抽出する）リポジトリか."""
+        return self.classes.get(name) is RepoClass.ORIGINAL
+
+    @contextmanager
+    def measure(self, repo_class: RepoClass) -> Iterator[None]:
+        """ブロック内の分析コストを repo_class に加算する."""
+        started = time.perf_counter()
+        with count_requests() as requests:
+            try:
+                yield
+            finally:
+                elapsed = time.perf_counter() - started
+                cost = self.costs.setdefault(repo_class, ClassCost())
+                cost.repos += 1
+                cost.requests += requests.value
+                cost.seconds += elapsed
+                labels = {"repo_class": repo_class.value}
+                registry.counter("repo_analysis_requests", **labels).inc(requests.value)
+                registry.histogram("repo_analysis_ms", **labels).observe(elapsed * 1000)
+
+    def report(self) -> dict[str, dict[str, float | int]]:
+        """分類ごとのコスト（分析しなかった分類は含まない）."""
+        return {
+            repo_class.value: {
+                "repos": cost.repos,
+                "requests": cost.requests,
+                "seconds": round(cost.seconds, 3),
+            }
+            for repo_class, cost in self.costs.items()
+        }
+
+    def log_report(self) -> None:
+        """分類ごとのコストをログに出す."""
+        if self.costs:
+            log_structured(
+                logger, "Repository analysis cost", level=logging.INFO, **self.report()
+            )
@@ -14,6 +14,7 @@ from app.services.session import delete_session_cookie
 from app.services.session_keys import (
     ACCESS_TOKEN,
     EMPLOYMENT_TYPE,
+    JOB_EXCLUDED_COMPANIES,
     JOB_LOCATION,
     JOB_PREFERENCES,
     JOB_RESULTS,
@@ -21,8 +22,12 @@ from app.services.session_keys import (
     LOGOUT_REQUESTED,
     OTHER_PREFERENCES,
     PROFILE,
+    PROFILE_DEGRADED,
     PROFILE_STATE,
+    QUOTA_PENDING,
+    QUOTA_REFRESH,
     QUOTA_STATUS,
+    QUOTA_SYNCED_AT,
     REGEN_REPO_METADATA_LIST,
     REGEN_SELECTED_REPOS,
     REPO_METADATA_LIST,
@@ -30,6 +35,8 @@ from app.services.session_keys import (
     SELECTED_REPOS,
     SESSION_ID,
     SETTINGS_LOADED,
+    SPILLED_HASHES,
+    SPILLED_KEYS,
     USER,
     USER_SETTINGS,
     WORK_STYLE,
@@ -85,6 +92,7 @@ def _clear_user_session_keys() -> None:
         ACCESS_TOKEN,
         SESSION_ID,
         PROFILE_STATE,
+        PROFILE_DEGRADED,
         REPO_METADATA_LIST,
         SELECTED_REPOS,
         REGEN_REPO_METADATA_LIST,
@@ -97,10 +105,16 @@ def _clear_user_session_keys() -> None:
         EMPLOYMENT_TYPE,
         OTHER_PREFERENCES,
         QUOTA_STATUS,
+        QUOTA_SYNCED_AT,
+        QUOTA_PENDING,
+        QUOTA_REFRESH,
         PROFILE,
         USER_SETTINGS,
         JOB_RESULTS,
         JOB_PREFERENCES,
+        JOB_EXCLUDED_COMPANIES,
+        SPILLED_KEYS,
+        SPILLED_HASHES,
     ]
     for key in keys_to_clear:
         st.session_state.pop(key, None)
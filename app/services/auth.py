@@ -12,6 +12,7 @@ import streamlit as st
 from app.services.const import GITHUB_AUTHORIZE_URL, GITHUB_TOKEN_URL, GITHUB_USER_URL
 from app.services.logging_config import get_logger
 from app.services.models import GitHubUser
+from app.services.repo_prefetch import prefetch_repo_metadata
 from app.services.session import (
     delete_session_cookie,
     delete_user_sessions,
@@ -169,6 +170,8 @@ def _set_authenticated_session(
         st.session_state[SESSION_ID] = session_id
     else:
         st.session_state.pop(SESSION_ID, None)
+    # リポジトリ選択UIを開く前に一覧の取得を始めておく
+    prefetch_repo_metadata(user.login, access_token)
 
 
 def restore_session(cookie_manager: CookieManager) -> bool:
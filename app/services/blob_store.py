@@ -0,0 +1,338 @@
+"""README・ファイル内容のコンテンツアドレス保存（git blob SHAをキーにする）.
+
+フォーク・テンプレート・ボイラープレートでは同じ依存ファイルやREADMEが
+多くのユーザーのリポジトリに現れる。GitHubのContents APIが返すblob SHAを
+キーに内容を1回だけ保存し、ユーザー間で再利用する（GitHubへの再取得も不要になる）。
+
+    store = get_blob_store()
+    data = store.get(sha)
+    if data is None:
+        data = fetch_from_github()
+        store.put(sha, data)
+
+バックエンド（BLOB_STORE_BACKEND）:
+- "memory": プロセス内LRUのみ（再起動で消えるため、キャッシュには内容を直接保存する）
+- "local":  BLOB_STORE_PATH 配下のファイル
+- "gcs":    BLOB_STORE_BUCKET のオブジェクト
+
+いずれもプロセス内LRU（BLOB_CACHE_BYTES）を前段に置く。
+SHAは内容から検証してから保存するため、異なる内容が同じキーで共有されることはない。
+
+reposキャッシュに参照として保存するblobは、保存のたびに touch() で参照時刻を
+更新する（GCSは custom_time。バケットのライフサイクルは最後に参照されてから
+CACHE_TTL_DAYS を超えたものを削除する）。LRUにあってもバックエンドから消えている
+ことがあるため、参照できるかは必ずバックエンドで確かめる。
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Collection
+from datetime import UTC, datetime
+from pathlib import Path
+
+from app.services.const import (
+    BLOB_CACHE_BYTES,
+    BLOB_STORE_BACKEND,
+    BLOB_STORE_BUCKET,
+    BLOB_STORE_PATH,
+)
+from app.services.lazy_import import lazy_module
+from app.services.logging_config import log_structured
+from app.services.metrics import registry
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# google.cloud.storageはimportが重いため初回アクセスまで遅延
+storage = lazy_module("google.cloud.storage")
+gcs_exceptions = lazy_module("google.api_core.exceptions")
+
+# GCSのバッチリクエスト1回に含められる呼び出し数の上限
+_GCS_BATCH_SIZE = 100
+
+
+def git_blob_sha(data: bytes) -> str:
+    """gitのblobオブジェクトとしてのSHA-1（GitHubの `sha` と同じ値）."""
+    return hashlib.sha1(
+        b"blob %d\0" % len(data) + data, usedforsecurity=False
+    ).hexdigest()
+
+
+class BlobBackend(ABC):
+    """永続化先の抽象基底クラス."""
+
+    @abstractmethod
+    def get(self, sha: str) -> bytes | None:
+        """内容を取得（存在しなければNone）."""
+
+    @abstractmethod
+    def put(self, sha: str, data: bytes) -> None:
+        """内容を保存（既に存在すれば何もしない）."""
+
+    @abstractmethod
+    def exists(self, sha: str) -> bool:
+        """保存済みか判定."""
+
+    @abstractmethod
+    def touch(self, shas: Collection[str]) -> set[str]:
+        """参照時刻を現在時刻に更新し、保存済みだったSHAを返す."""
+
+
+class LocalBlobBackend(BlobBackend):
+    """ローカルディスク（root/ab/abcdef...）."""
+
+    def __init__(self, root: Path | str) -> None:
+        self.root = Path(root)
+
+    def _path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha
+
+    def get(self, sha: str) -> bytes | None:
+        try:
+            return self._path(sha).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, sha: str, data: bytes) -> None:
+        path = self._path(sha)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 書きかけのファイルを読まれないよう一時ファイルから置き換える
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def exists(self, sha: str) -> bool:
+        return self._path(sha).exists()
+
+    def touch(self, shas: Collection[str]) -> set[str]:
+        found = set()
+        for sha in shas:
+            try:
+                os.utime(self._path(sha))
+            except FileNotFoundError:
+                continue
+            found.add(sha)
+        return found
+
+
+class GcsBlobBackend(BlobBackend):
+    """Cloud Storage（gs://bucket/blobs/ab/abcdef...）."""
+
+    def __init__(self, bucket: str, prefix: str = "blobs/") -> None:
+        self.bucket_name = bucket
+        self.prefix = prefix
+
+    @functools.cached_property
+    def _bucket(self) -> storage.Bucket:
+        return storage.Client().bucket(self.bucket_name)
+
+    def _blob(self, sha: str) -> storage.Blob:
+        return self._bucket.blob(f"{self.prefix}{sha[:2]}/{sha}")
+
+    @traced("blob_store.gcs_get", dependency="gcs")
+    def get(self, sha: str) -> bytes | None:
+        try:
+            return self._blob(sha).download_as_bytes()
+        except gcs_exceptions.NotFound:
+            return None
+
+    @traced("blob_store.gcs_put", dependency="gcs")
+    def put(self, sha: str, data: bytes) -> None:
+        blob = self._blob(sha)
+        blob.custom_time = datetime.now(UTC)
+        try:
+            # 既存オブジェクトは上書きしない（内容はSHAで一意。参照時刻は touch で更新）
+            blob.upload_from_string(data, if_generation_match=0)
+        except gcs_exceptions.PreconditionFailed:
+            pass
+
+    @traced("blob_store.gcs_exists", dependency="gcs")
+    def exists(self, sha: str) -> bool:
+        return self._blob(sha).exists()
+
+    @traced("blob_store.gcs_touch", dependency="gcs")
+    def touch(self, shas: Collection[str]) -> set[str]:
+        """custom_time をまとめて更新する（_GCS_BATCH_SIZE 件ごとに1リクエスト）."""
+        now = datetime.now(UTC)
+        pending = list(shas)
+        found = set()
+        for start in range(0, len(pending), _GCS_BATCH_SIZE):
+            blobs = {}
+            with self._bucket.client.batch(raise_exception=False):
+                for sha in pending[start : start + _GCS_BATCH_SIZE]:
+                    blob = blobs[sha] = self._blob(sha)
+                    blob.custom_time = now
+                    blob.patch()
+            found.update(sha for sha, blob in blobs.items() if _patched(blob))
+        return found
+
+
+def _patched(blob: storage.Blob) -> bool:
+    """バッチ内の patch が成功したか.
+
+    成功した呼び出しはサーバーの応答（generation を含む）で置き換わり、
+    失敗した呼び出し（404等）は未解決のままで、参照すると KeyError になる。
+    """
+    try:
+        return blob.generation is not None
+    except KeyError:
+        return False
+
+
+class LruBlobCache:
+    """合計バイト数で上限を設けたプロセス内LRU（スレッドセーフ）."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sha: str) -> bytes | None:
+        """取得（ヒットしたエントリを最新にする）."""
+        with self._lock:
+            data = self._entries.get(sha)
+            if data is not None:
+                self._entries.move_to_end(sha)
+            return data
+
+    def put(self, sha: str, data: bytes) -> None:
+        """追加し、上限を超えた分を古い順に捨てる."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if sha in self._entries:
+                self._entries.move_to_end(sha)
+                return
+            self._entries[sha] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __contains__(self, sha: str) -> bool:
+        with self._lock:
+            return sha in self._entries
+
+
+class BlobStore:
+    """LRU + 永続化バックエンド."""
+
+    def __init__(self, backend: BlobBackend | None, cache: LruBlobCache) -> None:
+        self.backend = backend
+        self.cache = cache
+
+    @property
+    def durable(self) -> bool:
+        """プロセス外に永続化されるか（Falseならキャッシュから参照してはいけない）."""
+        return self.backend is not None
+
+    def get(self, sha: str) -> bytes | None:
+        """内容を取得（LRU → バックエンドの順）."""
+        data = self.cache.get(sha)
+        if data is not None:
+            registry.counter("blob_store_requests", outcome="memory_hit").inc()
+            return data
+        if self.backend is not None:
+            try:
+                data = self.backend.get(sha)
+            except Exception:
+                log_structured(
+                    logger,
+                    "Failed to read blob",
+                    level=logging.ERROR,
+                    exc_info=True,
+                    sha=sha,
+                )
+                data = None
+            if data is not None:
+                registry.counter("blob_store_requests", outcome="backend_hit").inc()
+                self.cache.put(sha, data)
+                return data
+        registry.counter("blob_store_requests", outcome="miss").inc()
+        return None
+
+    def put(self, sha: str, data: bytes) -> bool:
+        """SHAを検証して保存し、保存できたかを返す."""
+        if git_blob_sha(data) != sha:
+            log_structured(
+                logger,
+                "Blob SHA mismatch",
+                level=logging.WARNING,
+                sha=sha,
+                size=len(data),
+            )
+            return False
+        if self.backend is not None:
+            try:
+                self.backend.put(sha, data)
+            except Exception:
+                log_structured(
+                    logger,
+                    "Failed to write blob",
+                    level=logging.ERROR,
+                    exc_info=True,
+                    sha=sha,
+                )
+                return False
+        # LRUには永続化できたものだけを置く（exists の判定に使うため）
+        self.cache.put(sha, data)
+        return True
+
+    def exists(self, sha: str) -> bool:
+        """永続化済みか判定（LRUは見ない。ライフサイクルで消えていることがある）."""
+        if self.backend is None:
+            return False
+        try:
+            return self.backend.exists(sha)
+        except Exception:
+            return False
+
+    def touch(self, shas: Collection[str]) -> set[str]:
+        """参照するblobの参照時刻を更新し、バックエンドにあるSHAを返す.
+
+        バックエンドから消えていてもLRUに内容があれば保存し直す。
+        """
+        if self.backend is None or not shas:
+            return set()
+        try:
+            found = self.backend.touch(shas)
+        except Exception:
+            log_structured(
+                logger,
+                "Failed to touch blobs",
+                level=logging.ERROR,
+                exc_info=True,
+                count=len(shas),
+            )
+            return set()
+        for sha in set(shas) - found:
+            data = self.cache.get(sha)
+            if data is not None and self.put(sha, data):
+                registry.counter("blob_store_requests", outcome="reput").inc()
+                found.add(sha)
+        return found
+
+
+@functools.cache
+def get_blob_store() -> BlobStore:
+    """設定に応じたプロセス共有のBlobStoreを取得."""
+    backend: BlobBackend | None = None
+    if BLOB_STORE_BACKEND == "local":
+        backend = LocalBlobBackend(BLOB_STORE_PATH)
+    elif BLOB_STORE_BACKEND == "gcs":
+        if not BLOB_STORE_BUCKET:
+            raise ValueError("BLOB_STORE_BUCKET is required for the gcs backend")
+        backend = GcsBlobBackend(BLOB_STORE_BUCKET)
+    return BlobStore(backend, LruBlobCache(BLOB_CACHE_BYTES))
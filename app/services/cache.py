@@ -1,22 +1,42 @@
 """Firestore cache service for developer profiles and repositories."""
 
+from __future__ import annotations
+
+import functools
 import logging
 import os
+import uuid
 from collections.abc import Callable
-from datetime import UTC, datetime, timedelta
-from typing import Any, TypeVar
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import streamlit as st
-from google.cloud import firestore
-from google.cloud.firestore_v1 import DocumentSnapshot
 
+from app.services.blob_store import get_blob_store
 from app.services.const import CACHE_TTL_DAYS
+from app.services.lazy_import import lazy_module
 from app.services.logging_config import log_structured
-from app.services.models import FileContent, RepoInfo, UserSettings
+from app.services.metrics import observe_call
+from app.services.models import UserSettings
+from app.services.repo_record import (
+    PackedRepo,
+    RepoRecord,
+    decode_repo,
+    pack_repos,
+    unpack_repo,
+)
 from app.services.session_keys import PROFILE, USER_SETTINGS
+from app.services.tracing import traced
+from app.services.ttl import EXPIRES_AT_FIELD, compute_expires_at, is_expired
+
+if TYPE_CHECKING:
+    from google.cloud.firestore_v1 import DocumentSnapshot
 
 logger = logging.getLogger(__name__)
 
+# google.cloud.firestoreはimportが重いため初回アクセスまで遅延
+firestore = lazy_module("google.cloud.firestore")
+
 T = TypeVar("T")
 
 
@@ -36,26 +56,25 @@ def _get_session_cached(
     return value
 
 
-def _is_expired(updated_at: datetime | None, ttl_days: int) -> bool:
-    """Check if cached data has expired."""
-    if not updated_at:
-        return False
-    expiry = updated_at + timedelta(days=ttl_days)
-    return datetime.now(UTC) > expiry
-
-
+@functools.cache
 def get_firestore_client() -> firestore.Client:
-    """Firestoreクライアントを取得."""
+    """Firestoreクライアントを取得.
+
+    gRPCチャネルの確立を毎回行わないよう、プロセス内で1つのクライアントを共有する
+    （Firestoreクライアントはスレッドセーフ）。
+    """
     project_id = os.getenv("GCP_PROJECT_ID")
     return firestore.Client(project=project_id, database="(default)")
 
 
+@traced()
 def _fetch_cached_profile(user_id: int, repo_count: int) -> dict[str, Any] | None:
     """Firestoreからキャッシュされたプロファイルを取得（内部用）."""
     try:
         db = get_firestore_client()
         doc_ref = db.collection("profiles").document(str(user_id))
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        with observe_call("firestore", "profiles.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
 
         if not doc.exists:
             return None
@@ -69,9 +88,8 @@ def _fetch_cached_profile(user_id: int, repo_count: int) -> dict[str, Any] | Non
         if repo_count_cached and repo_count_cached > repo_count:
             return None
 
-        # TTLチェック
-        updated_at = data.get("updated_at")
-        if _is_expired(updated_at, CACHE_TTL_DAYS):
+        # TTLチェック（削除はFirestore TTL / スイーパーに任せる）
+        if is_expired(data, "profiles"):
             return None
 
         return data.get("profile_data")
@@ -108,6 +126,7 @@ def invalidate_profile_session_cache() -> None:
     st.session_state.pop(PROFILE, None)
 
 
+@traced()
 def save_profile_cache(
     user_id: int,
     github_login: str,
@@ -128,24 +147,27 @@ def save_profile_cache(
 
         now = datetime.now(UTC)
 
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        with observe_call("firestore", "profiles.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
         created_at = now
         if doc.exists:
             existing_data = doc.to_dict()
             if existing_data and existing_data.get("created_at"):
                 created_at = existing_data["created_at"]
 
-        doc_ref.set(
-            {
-                "user_id": user_id,
-                "github_login": github_login,
-                "profile_data": profile_data,
-                "repo_count": repo_count,
-                "created_at": created_at,
-                "updated_at": now,
-                "version": 1,
-            }
-        )
+        with observe_call("firestore", "profiles.set"):
+            doc_ref.set(
+                {
+                    "user_id": user_id,
+                    "github_login": github_login,
+                    "profile_data": profile_data,
+                    "repo_count": repo_count,
+                    "created_at": created_at,
+                    "updated_at": now,
+                    EXPIRES_AT_FIELD: compute_expires_at(now, CACHE_TTL_DAYS),
+                    "version": 1,
+                }
+            )
         # session_stateキャッシュを更新
         st.session_state[PROFILE] = profile_data
     except Exception:
@@ -158,12 +180,14 @@ def save_profile_cache(
         )
 
 
+@traced()
 def invalidate_profile_cache(user_id: int) -> None:
     """キャッシュを明示的に無効化（削除）."""
     try:
         db = get_firestore_client()
         doc_ref = db.collection("profiles").document(str(user_id))
-        doc_ref.delete()
+        with observe_call("firestore", "profiles.delete"):
+            doc_ref.delete()
         invalidate_profile_session_cache()
     except Exception:
         log_structured(
@@ -175,20 +199,95 @@ def invalidate_profile_cache(user_id: int) -> None:
         )
 
 
-def get_cached_repos(user_id: int, repo_count: int) -> list[RepoInfo] | None:
+# ============================================
+# Repos Cache
+# ============================================
+# repos/{user_id} にはメタデータと索引のみを置き、リポジトリごとにzstd圧縮した
+# フレームを連結したバイト列を保存する。小さければドキュメント内に、
+# 大きければ repos/{user_id}/repo_chunks/{generation}-{index} に分割して保存し、
+# 必要なチャンクだけを get_all でまとめて読む。
+# BlobStoreに永続化済みのREADME・ファイル内容はSHAの参照のみを保存する。
+REPO_CHUNKS_COLLECTION = "repo_chunks"
+REPOS_CACHE_FORMAT = 2
+# Firestoreの1ドキュメント上限（1MiB）に対して他フィールド分の余裕を残す
+REPOS_INLINE_BYTES = 512 * 1024
+REPOS_CHUNK_BYTES = 900 * 1024
+
+
+def _repos_doc_ref(db: firestore.Client, user_id: int | str) -> Any:
+    return db.collection("repos").document(str(user_id))
+
+
+def _read_packed(
+    db: firestore.Client,
+    doc_ref: Any,
+    data: dict[str, Any],
+    entries: list[PackedRepo],
+) -> list[RepoRecord]:
+    """索引の範囲を含むチャンクだけを読み、リポジトリを復元."""
+    blobs = get_blob_store().get
+    inline = data.get("inline")
+    if inline is not None:
+        return [
+            unpack_repo(inline[e.offset : e.offset + e.length], blobs) for e in entries
+        ]
+
+    generation = data["generation"]
+    # 保存時のチャンクサイズ（設定変更後も既存キャッシュを読めるように）
+    chunk_bytes = data["chunk_bytes"]
+    needed = sorted(
+        {
+            index
+            for e in entries
+            for index in range(
+                e.offset // chunk_bytes,
+                (e.offset + e.length - 1) // chunk_bytes + 1,
+            )
+        }
+    )
+    chunks_ref = doc_ref.collection(REPO_CHUNKS_COLLECTION)
+    refs = [chunks_ref.document(f"{generation}-{index:04d}") for index in needed]
+    with observe_call("firestore", "repo_chunks.get_all"):
+        snapshots = list(db.get_all(refs))
+    chunks: dict[int, bytes] = {}
+    for snapshot in snapshots:
+        chunk = snapshot.to_dict() if snapshot.exists else None
+        if chunk is None:
+            # 読み込み中に別の保存で世代が入れ替わった
+            raise LookupError(f"Missing repos cache chunk: {snapshot.id}")
+        chunks[chunk["index"]] = chunk["data"]
+
+    records = []
+    for e in entries:
+        first = e.offset // chunk_bytes
+        last = (e.offset + e.length - 1) // chunk_bytes
+        joined = b"".join(chunks[index] for index in range(first, last + 1))
+        start = e.offset - first * chunk_bytes
+        records.append(unpack_repo(joined[start : start + e.length], blobs))
+    return records
+
+
+@traced()
+def get_cached_repos(
+    user_id: int,
+    repo_count: int,
+    repo_names: list[str] | None = None,
+) -> list[RepoRecord] | None:
     """キャッシュされたリポジトリ情報を取得.
 
     Args:
         user_id: GitHubUser.id
         repo_count: 取得するリポジトリ数
+        repo_names: 指定したリポジトリのチャンクのみ読み込む（省略時はすべて）
 
     Returns:
-        キャッシュが有効ならRepoInfoリスト、それ以外はNone
+        キャッシュが有効ならRepoRecordリスト、それ以外はNone
     """
     try:
         db = get_firestore_client()
-        doc_ref = db.collection("repos").document(str(user_id))
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        doc_ref = _repos_doc_ref(db, user_id)
+        with observe_call("firestore", "repos.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
 
         if not doc.exists:
             return None
@@ -202,14 +301,33 @@ def get_cached_repos(user_id: int, repo_count: int) -> list[RepoInfo] | None:
         if cached_repo_count and cached_repo_count > repo_count:
             return None
 
-        # TTLチェック
-        updated_at = data.get("updated_at")
-        if _is_expired(updated_at, CACHE_TTL_DAYS):
+        # TTLチェック（削除はFirestore TTL / スイーパーに任せる）
+        if is_expired(data, "repos"):
             return None
 
-        # dictからRepoInfoに復元
-        repos_data = data.get("repos", [])
-        return [_dict_to_repo_info(r) for r in repos_data]
+        if data.get("format") != REPOS_CACHE_FORMAT:
+            # 旧形式: dictのリストをそのまま保存している
+            repos_data = data.get("repos", [])
+            return [
+                decode_repo(r)
+                for r in repos_data
+                if repo_names is None or r["name"] in repo_names
+            ]
+
+        entries = [PackedRepo.from_dict(e) for e in data.get("index", [])]
+        if repo_names is not None:
+            entries = [e for e in entries if e.name in repo_names]
+        return _read_packed(db, doc_ref, data, entries)
+    except LookupError:
+        # 参照先のチャンク・blobが消えている（再生成させる）
+        log_structured(
+            logger,
+            "Repos cache is incomplete",
+            level=logging.WARNING,
+            exc_info=True,
+            user_id=user_id,
+        )
+        return None
     except Exception:
         log_structured(
             logger,
@@ -221,30 +339,82 @@ def get_cached_repos(user_id: int, repo_count: int) -> list[RepoInfo] | None:
         return None
 
 
+def _referenced_blobs(repos: list[RepoRecord]) -> set[str]:
+    """BlobStoreに永続化済みで、参照として保存できるSHA.
+
+    参照するblobの参照時刻をまとめて更新する（キャッシュより先に消えないように）。
+    """
+    store = get_blob_store()
+    if not store.durable:
+        return set()
+    candidates = [r.readme_sha for r in repos if r.readme is not None] + [
+        f.sha for r in repos for f in [*r.dependency_files, *r.main_files]
+    ]
+    return store.touch({sha for sha in candidates if sha is not None})
+
+
+@traced()
 def save_repos_cache(
     user_id: int,
-    repos: list[RepoInfo],
+    repos: list[RepoRecord],
 ) -> None:
     """リポジトリ情報をキャッシュに保存.
 
+    チャンクとメタデータは1バッチで書き込み、旧世代のチャンクも同じバッチで削除する。
+
     Args:
         user_id: GitHubUser.id
-        repos: RepoInfoリスト
+        repos: RepoRecordリスト
     """
     try:
         db = get_firestore_client()
-        doc_ref = db.collection("repos").document(str(user_id))
+        doc_ref = _repos_doc_ref(db, user_id)
+        chunks_ref = doc_ref.collection(REPO_CHUNKS_COLLECTION)
 
         now = datetime.now(UTC)
-
-        doc_ref.set(
+        expires_at = compute_expires_at(now, CACHE_TTL_DAYS)
+        index, payload = pack_repos(repos, _referenced_blobs(repos))
+        generation = uuid.uuid4().hex[:8]
+        inline = len(payload) <= REPOS_INLINE_BYTES
+
+        batch = db.batch()
+        new_chunks = set()
+        if not inline:
+            for number, start in enumerate(range(0, len(payload), REPOS_CHUNK_BYTES)):
+                chunk_ref = chunks_ref.document(f"{generation}-{number:04d}")
+                new_chunks.add(chunk_ref.id)
+                batch.set(
+                    chunk_ref,
+                    {
+                        "user_id": user_id,
+                        "index": number,
+                        "data": payload[start : start + REPOS_CHUNK_BYTES],
+                        "updated_at": now,
+                        EXPIRES_AT_FIELD: expires_at,
+                    },
+                )
+        with observe_call("firestore", "repo_chunks.list"):
+            old_chunks = list(chunks_ref.list_documents())
+        for old in old_chunks:
+            if old.id not in new_chunks:
+                batch.delete(old)
+        batch.set(
+            doc_ref,
             {
                 "user_id": user_id,
-                "repos": [r.model_dump() for r in repos],
+                "format": REPOS_CACHE_FORMAT,
+                "generation": generation,
+                "index": [e.to_dict() for e in index],
+                "inline": payload if inline else None,
+                "stored_bytes": len(payload),
+                "chunk_bytes": REPOS_CHUNK_BYTES,
                 "repo_count": len(repos),
                 "updated_at": now,
-            }
+                EXPIRES_AT_FIELD: expires_at,
+            },
         )
+        with observe_call("firestore", "repos.commit"):
+            batch.commit()
     except Exception:
         log_structured(
             logger,
@@ -255,12 +425,37 @@ def save_repos_cache(
         )
 
 
+def _delete_repos_doc(db: firestore.Client, user_id: int | str) -> None:
+    """reposドキュメントとチャンクを削除."""
+    doc_ref = _repos_doc_ref(db, user_id)
+    chunks_ref = doc_ref.collection(REPO_CHUNKS_COLLECTION)
+    with observe_call("firestore", "repo_chunks.list"):
+        chunk_refs = list(chunks_ref.list_documents())
+    batch = db.batch()
+    for chunk_ref in chunk_refs:
+        batch.delete(chunk_ref)
+    batch.delete(doc_ref)
+    with observe_call("firestore", "repos.commit"):
+        batch.commit()
+
+
+def _delete_spilled_sessions(db: firestore.Client, user_id: int | str) -> None:
+    """ユーザーの全セッション分の退避ドキュメントを削除（セッションごとに1件）."""
+    query = db.collection("session_spill").where("user_id", "==", int(user_id))
+    with observe_call("firestore", "session_spill.query"):
+        docs = list(query.stream())
+    batch = db.batch()
+    for doc in docs:
+        batch.delete(doc.reference)
+    with observe_call("firestore", "session_spill.commit"):
+        batch.commit()
+
+
+@traced()
 def invalidate_repos_cache(user_id: int) -> None:
     """リポジトリキャッシュを無効化."""
     try:
-        db = get_firestore_client()
-        doc_ref = db.collection("repos").document(str(user_id))
-        doc_ref.delete()
+        _delete_repos_doc(get_firestore_client(), user_id)
     except Exception:
         log_structured(
             logger,
@@ -271,41 +466,17 @@ def invalidate_repos_cache(user_id: int) -> None:
         )
 
 
-def _dict_to_repo_info(data: dict[str, Any]) -> RepoInfo:
-    """dictからRepoInfoを復元."""
-    return RepoInfo(
-        name=data["name"],
-        description=data.get("description"),
-        language=data.get("language"),
-        languages=data.get("languages", {}),
-        topics=data.get("topics", []),
-        readme=data.get("readme"),
-        stars=data.get("stars", 0),
-        forks=data.get("forks", 0),
-        updated_at=data.get("updated_at", ""),
-        is_fork=data.get("is_fork", False),
-        file_structure=data.get("file_structure", []),
-        dependency_files=[
-            FileContent(path=f["path"], content=f["content"])
-            for f in data.get("dependency_files", [])
-        ],
-        main_files=[
-            FileContent(path=f["path"], content=f["content"])
-            for f in data.get("main_files", [])
-        ],
-        config_files=data.get("config_files", []),
-    )
-
-
 # ============================================
 # User Settings Cache
 # ============================================
+@traced()
 def _fetch_user_settings(user_id: int) -> UserSettings:
     """Firestoreからユーザー設定を取得（内部用）."""
     try:
         db = get_firestore_client()
         doc_ref = db.collection("settings").document(str(user_id))
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        with observe_call("firestore", "settings.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
 
         if not doc.exists:
             return UserSettings()
@@ -352,6 +523,7 @@ def get_user_settings(user_id: int) -> UserSettings:
     return cached if cached is not None else UserSettings()
 
 
+@traced()
 def save_user_settings(user_id: int, settings: UserSettings) -> None:
     """ユーザー設定を保存.
 
@@ -363,20 +535,21 @@ def save_user_settings(user_id: int, settings: UserSettings) -> None:
         db = get_firestore_client()
         doc_ref = db.collection("settings").document(str(user_id))
 
-        doc_ref.set(
-            {
-                "user_id": user_id,
-                "repo_limit": settings.repo_limit,
-                "job_location": settings.job_location,
-                "salary_range": settings.salary_range,
-                "work_style": settings.work_style,
-                "job_type": settings.job_type,
-                "employment_type": settings.employment_type,
-                "other_preferences": settings.other_preferences,
-                "plan": settings.plan,
-                "updated_at": datetime.now(UTC),
-            }
-        )
+        with observe_call("firestore", "settings.set"):
+            doc_ref.set(
+                {
+                    "user_id": user_id,
+                    "repo_limit": settings.repo_limit,
+                    "job_location": settings.job_location,
+                    "salary_range": settings.salary_range,
+                    "work_style": settings.work_style,
+                    "job_type": settings.job_type,
+                    "employment_type": settings.employment_type,
+                    "other_preferences": settings.other_preferences,
+                    "plan": settings.plan,
+                    "updated_at": datetime.now(UTC),
+                }
+            )
         # session_stateキャッシュを更新
         st.session_state[USER_SETTINGS] = settings
     except Exception:
@@ -389,20 +562,27 @@ def save_user_settings(user_id: int, settings: UserSettings) -> None:
         )
 
 
+@traced()
 def delete_all_user_data(user_id: str) -> None:
     """指定ユーザーのすべてのキャッシュデータを削除.
 
-    ログアウト時に呼び出され、profiles, repos, settingsを削除する。
+    ログアウト時に呼び出され、profiles, repos, settings, session_spillを削除する。
     creditsは維持される（再ログイン時に引き継ぎ可能）。
 
     Args:
         user_id: GitHubUser.id（文字列）
     """
     db = get_firestore_client()
-    collections = ["profiles", "repos", "settings"]
+    collections = ["profiles", "repos", "settings", "session_spill"]
     for collection in collections:
         try:
-            db.collection(collection).document(user_id).delete()
+            if collection == "repos":
+                _delete_repos_doc(db, user_id)
+            elif collection == "session_spill":
+                _delete_spilled_sessions(db, user_id)
+            else:
+                with observe_call("firestore", f"{collection}.delete"):
+                    db.collection(collection).document(user_id).delete()
         except Exception:
             log_structured(
                 logger,
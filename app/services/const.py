@@ -8,20 +8,136 @@ import os
 SESSION_TTL_DAYS = 7
 SESSION_COOKIE_NAME = "job_recommender_session"
 
+# セッションごとのsession_stateの上限（超えると再構築可能なエントリを削除・退避）
+SESSION_MEMORY_BUDGET_BYTES = int(
+    os.getenv("SESSION_MEMORY_BUDGET_BYTES", str(4 * 1024 * 1024))
+)
+# session_stateに保持する求人検索結果のページ数（「もっと見る」1回で1ページ。古いページから削除）
+JOB_RESULTS_MAX_PAGES = int(os.getenv("JOB_RESULTS_MAX_PAGES", "5"))
+# インスタンスのRSSがこれを超えたらセッション予算を1/4に絞る（メモリ上限1Giに対して）
+INSTANCE_MEMORY_SOFT_LIMIT_BYTES = int(
+    os.getenv("INSTANCE_MEMORY_SOFT_LIMIT_BYTES", str(768 * 1024 * 1024))
+)
+
 # =============================================================================
 # Cache
 # =============================================================================
 CACHE_TTL_DAYS = int(os.getenv("PROFILE_CACHE_TTL_DAYS", "7"))
 
+# =============================================================================
+# Blob Store（README・ファイル内容のコンテンツアドレス保存）
+# =============================================================================
+# "memory"（プロセス内LRUのみ）, "local", "gcs"
+BLOB_STORE_BACKEND = os.getenv("BLOB_STORE_BACKEND", "memory")
+BLOB_STORE_PATH = os.getenv("BLOB_STORE_PATH", ".blob_store")
+BLOB_STORE_BUCKET = os.getenv("BLOB_STORE_BUCKET", "")
+# プロセス内LRUの上限
+BLOB_CACHE_BYTES = int(os.getenv("BLOB_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# =============================================================================
+# GitHub API Scheduler（トークンごとのレート制限をセッション間で共有）
+# =============================================================================
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "8"))
+# 補充レートを超えて連続実行できるリクエスト数（1回のプロファイル生成分）
+GITHUB_BURST = int(os.getenv("GITHUB_BURST", "200"))
+GITHUB_MAX_QUEUE = int(os.getenv("GITHUB_MAX_QUEUE", "200"))
+GITHUB_QUEUE_TIMEOUT_SECONDS = float(os.getenv("GITHUB_QUEUE_TIMEOUT_SECONDS", "30"))
+# 残り予算がこれ以下ならBACKGROUND優先度のリクエストを止める
+GITHUB_RATE_RESERVE = int(os.getenv("GITHUB_RATE_RESERVE", "500"))
+# 保持するユーザートークンのクライアント・スケジューラ数
+GITHUB_CLIENT_CACHE_SIZE = int(os.getenv("GITHUB_CLIENT_CACHE_SIZE", "128"))
+
+# =============================================================================
+# Repo Metadata Prefetch（ログイン直後のリポジトリ一覧の先読み）
+# =============================================================================
+# 先読みする件数（1ページで取得できる範囲。選択UIの件数以上にする）
+REPO_PREFETCH_LIMIT = int(os.getenv("REPO_PREFETCH_LIMIT", "30"))
+REPO_PREFETCH_TTL_SECONDS = int(os.getenv("REPO_PREFETCH_TTL_SECONDS", "300"))
+REPO_PREFETCH_WORKERS = int(os.getenv("REPO_PREFETCH_WORKERS", "4"))
+# 選択UIが取得中の先読みを待つ秒数（超えたら通常の取得に切り替える）
+REPO_PREFETCH_WAIT_SECONDS = float(os.getenv("REPO_PREFETCH_WAIT_SECONDS", "5"))
+# 保持するユーザー数
+REPO_PREFETCH_MAX_USERS = int(os.getenv("REPO_PREFETCH_MAX_USERS", "256"))
+
+# =============================================================================
+# Speculative Repo Extraction（リポジトリ選択中の先行分析）
+# =============================================================================
+REPO_SPECULATION_WORKERS = int(os.getenv("REPO_SPECULATION_WORKERS", "4"))
+# 選択が落ち着くまで待つ秒数（この間に外されたリポジトリは取得しない）
+REPO_SPECULATION_DELAY_SECONDS = float(
+    os.getenv("REPO_SPECULATION_DELAY_SECONDS", "1.5")
+)
+# 生成ボタン押下時に実行中の先行分析をまとめて待つ秒数（超えたものは通常の分析に回す）
+REPO_SPECULATION_WAIT_SECONDS = float(os.getenv("REPO_SPECULATION_WAIT_SECONDS", "5"))
+# 結果を保持する秒数
+REPO_SPECULATION_TTL_SECONDS = int(os.getenv("REPO_SPECULATION_TTL_SECONDS", "600"))
+
+# =============================================================================
+# Profile Generation（LLMが遅い・使えない場合は簡易プロファイルで縮退）
+# =============================================================================
+# LLMの応答を待つ秒数（超えたら簡易プロファイルを使う）
+PROFILE_LLM_TIMEOUT_SECONDS = float(os.getenv("PROFILE_LLM_TIMEOUT_SECONDS", "60"))
+PROFILE_LLM_WORKERS = int(os.getenv("PROFILE_LLM_WORKERS", "8"))
+
+# =============================================================================
+# Warm-up（コンテナ起動時の事前初期化）
+# =============================================================================
+# 1ならウォームアップ時にFirestoreへ空読み込みを発行してチャネルを確立する
+WARMUP_FIRESTORE_PING = os.getenv("WARMUP_FIRESTORE_PING", "1") == "1"
+
+# =============================================================================
+# Tracing
+# =============================================================================
+# スパンの出力先（"" で無効, "json", "otel"）
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "")
+
+# =============================================================================
+# Metrics
+# =============================================================================
+# Prometheus形式の /metrics を公開するサイドポート（0で無効）
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# 外部呼び出し1回ごとのレイテンシを構造化ログへ出力する（SLO用のログベース指標）
+METRICS_LOG_CALLS = os.getenv("METRICS_LOG_CALLS", "0") == "1"
+
 # =============================================================================
 # GitHub OAuth
 # =============================================================================
 GITHUB_AUTHORIZE_URL = "https://github.com/login/oauth/authorize"
 GITHUB_TOKEN_URL = "https://github.com/login/oauth/access_token"
 GITHUB_USER_URL = "https://api.github.com/user"
+GITHUB_RAW_URL = "https://raw.githubusercontent.com"
+GITHUB_CODELOAD_URL = "https://codeload.github.com"
+
+# =============================================================================
+# GitHub File Fetching（大きいファイルは先頭だけ取得）
+# =============================================================================
+# これより大きいファイルはContents APIではなくrawエンドポイントから先頭だけ読む
+GITHUB_RANGE_FETCH_BYTES = int(os.getenv("GITHUB_RANGE_FETCH_BYTES", str(32 * 1024)))
+# これより大きいファイルは生成物・バンドルとみなして取得しない
+GITHUB_SKIP_FILE_BYTES = int(os.getenv("GITHUB_SKIP_FILE_BYTES", str(1024 * 1024)))
+# ルート以外（frontend/ や packages/*/ 等）から読む依存ファイルの上限（1件ごとにAPI呼び出し）
+GITHUB_NESTED_MANIFESTS = int(os.getenv("GITHUB_NESTED_MANIFESTS", "5"))
+GITHUB_RAW_TIMEOUT_SECONDS = float(os.getenv("GITHUB_RAW_TIMEOUT_SECONDS", "10"))
+# リポジトリ情報の取得方法（"auto" / "api" / "snapshot"）
+GITHUB_EXTRACTION_MODE = os.getenv("GITHUB_EXTRACTION_MODE", "auto")
+# tarballを使うリポジトリサイズの上限（KB、GitHubの repo.size と同じ単位）
+GITHUB_SNAPSHOT_MAX_KB = int(os.getenv("GITHUB_SNAPSHOT_MAX_KB", str(10 * 1024)))
+# API呼び出し1回と同程度のコストとみなすtarballのサイズ（KB）
+GITHUB_SNAPSHOT_KB_PER_CALL = int(os.getenv("GITHUB_SNAPSHOT_KB_PER_CALL", "256"))
+
+# =============================================================================
+# Dependency Manifests（依存ファイルの解析結果のキャッシュ）
+# =============================================================================
+# キャッシュする解析結果の数（ファイル名 + blob SHA ごと）
+MANIFEST_CACHE_SIZE = int(os.getenv("MANIFEST_CACHE_SIZE", "4096"))
 
 # =============================================================================
 # Freemium（クレジット制）
 # =============================================================================
 FREE_PLAN_INITIAL_CREDITS = 5  # 初期クレジット（共通）
 FREE_PLAN_JOB_LIMIT = 3  # 1回の検索で表示する求人数
+
+# クレジット台帳（シャードカウンタ + 予約）
+CREDIT_SHARD_COUNT = 4  # 書き込み競合を分散するシャード数
+CREDIT_RESERVATION_TTL_MINUTES = 10  # 未確定の予約を自動解放するまでの時間
+QUOTA_MAX_STALENESS_SECONDS = 60  # 表示中のクォータがサーバー値から遅れてよい上限
@@ -1,18 +1,68 @@
 """GitHub API integration for repository analysis."""
 
+from __future__ import annotations
+
+import codecs
+import itertools
 import logging
 import os
-
-from github import Github
-from github.ContentFile import ContentFile
-from github.GithubException import GithubException, UnknownObjectException
-from github.Repository import Repository
-
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Literal, TypeVar
+from urllib.parse import quote
+
+import httpx
+
+from app.services.analysis_plan import AnalysisPlan, RepoClass
+from app.services.blob_store import get_blob_store
+from app.services.const import (
+    GITHUB_CLIENT_CACHE_SIZE,
+    GITHUB_EXTRACTION_MODE,
+    GITHUB_NESTED_MANIFESTS,
+    GITHUB_RANGE_FETCH_BYTES,
+    GITHUB_RAW_TIMEOUT_SECONDS,
+    GITHUB_RAW_URL,
+    GITHUB_SKIP_FILE_BYTES,
+    GITHUB_SNAPSHOT_KB_PER_CALL,
+    GITHUB_SNAPSHOT_MAX_KB,
+)
+from app.services.github_scheduler import (
+    Priority,
+    get_scheduler,
+    github_user,
+    install,
+    token_key,
+)
+from app.services.lazy_import import lazy_attr, lazy_module
 from app.services.logging_config import log_structured
-from app.services.models import FileContent, RepoInfo, RepoMetadata
+from app.services.manifests import PARSERS
+from app.services.metrics import observe_call, registry
+from app.services.models import RepoMetadata
+from app.services.path_index import PathIndex
+from app.services.repo_record import FileRecord, RepoRecord
+from app.services.repo_snapshot import read_snapshot
+from app.services.tracing import span, traced
+
+if TYPE_CHECKING:
+    from github.ContentFile import ContentFile
+    from github.Repository import Repository
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# PyGithubはimportが重いため初回API呼び出しまで遅延
+Github = lazy_attr("github", "Github")
+github_content_file = lazy_module("github.ContentFile")
+github_exceptions = lazy_module("github.GithubException")
+github_paginated_list = lazy_module("github.PaginatedList")
+github_repository = lazy_module("github.Repository")
+
+# 一覧APIの1ページの上限（GitHub側の最大値）
+MAX_PER_PAGE = 100
+
 # 依存ファイルのパターン
 DEPENDENCY_FILES = [
     "package.json",
@@ -26,6 +76,9 @@ DEPENDENCY_FILES = [
     "composer.json",
 ]
 
+# 1階層下の依存ファイル（packages/*/package.json 等）を探すワークスペースのディレクトリ
+WORKSPACE_DIRS = ("packages", "apps", "services", "crates")
+
 # 主要コードファイルのパターン
 MAIN_FILE_PATTERNS = [
     "main.py",
@@ -58,62 +111,169 @@ CONFIG_FILES = [
 ]
 
 
-def get_github_client() -> Github:
-    """Create GitHub client with token from environment."""
+# トークンごとのクライアント（接続を再利用する）
+_clients: OrderedDict[str, Github] = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _client_for_token(token: str) -> Github:
+    with _clients_lock:
+        client = _clients.get(token)
+        if client is None:
+            client = Github(token)
+            _clients[token] = client
+            while len(_clients) > GITHUB_CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(token)
+        return client
+
+
+def discard_github_client(access_token: str) -> None:
+    """ユーザートークンのクライアントを破棄（ログアウト・トークン失効時）."""
+    with _clients_lock:
+        _clients.pop(access_token, None)
+
+
+def get_github_client(access_token: str | None = None) -> Github:
+    """Create GitHub client, preferring the signed-in user's OAuth token.
+
+    ユーザーのトークンは利用者ごとに別のレート制限を持つため、分析のスループットが
+    共有の GITHUB_TOKEN の上限に縛られない。ユーザーのトークンがない、
+    または残り予算が予約分以下なら共有トークンを使う。クライアントはトークンごとにキャッシュする。
+    """
+    # トークンごとのレート制限をセッション間で分け合う
+    install()
+    if access_token and get_scheduler(token_key(access_token)).has_budget():
+        return _client_for_token(access_token)
     token = os.getenv("GITHUB_TOKEN")
     if not token:
         raise ValueError("GITHUB_TOKEN environment variable is required")
-    return Github(token)
+    return _client_for_token(token)
+
+
+def _with_token_fallback(
+    access_token: str | None, fetch: Callable[[str | None], T]
+) -> T:
+    """ユーザーのトークンで取得し、認証エラーなら共有トークンでやり直す."""
+    if not access_token:
+        return fetch(None)
+    try:
+        return fetch(access_token)
+    except github_exceptions.BadCredentialsException:
+        log_structured(
+            logger,
+            "User GitHub token rejected, falling back to shared token",
+            level=logging.WARNING,
+        )
+        discard_github_client(access_token)
+        return fetch(None)
 
 
-def get_user_repos(username: str, limit: int = 10) -> list[Repository]:
-    """Fetch user's public repositories sorted by recent activity."""
-    client = get_github_client()
-    user = client.get_user(username)
-    repos = list(user.get_repos(sort="updated", direction="desc"))
-    return repos[:limit]
+def get_user_repos(
+    username: str,
+    limit: int = 10,
+    access_token: str | None = None,
+    *,
+    repo_type: Literal["all", "owner", "member"] = "owner",
+    include_forks: bool = True,
+    include_archived: bool = True,
+) -> Iterator[Repository]:
+    """Stream user's public repositories sorted by recent activity.
+
+    ページは必要になった時点で取得し、limit 件に達したら以降のページは取得しない。
+    per_page を limit に合わせるため、通常は1ページ（1リクエスト）で済む。
+    GET /users/{username}/repos は type のみサーバー側で絞り込めるため、
+    フォーク・アーカイブの除外は取得しながら行う（その場合は1ページを最大件数にする）。
+
+    Args:
+        username: GitHub username
+        limit: Maximum number of repos to yield
+        access_token: User's OAuth token (falls back to GITHUB_TOKEN)
+        repo_type: Server-side filter ("owner" is GitHub's default)
+        include_forks: Whether to yield forked repositories
+        include_archived: Whether to yield archived repositories
+    """
+    if limit <= 0:
+        return
+    client = get_github_client(access_token)
+    filtered = not (include_forks and include_archived)
+    per_page = MAX_PER_PAGE if filtered else min(limit, MAX_PER_PAGE)
+    # get_user() は /users/{username} を別途取得するため、一覧URLを直接ページングする
+    pages = github_paginated_list.PaginatedList(
+        github_repository.Repository,
+        client.requester,
+        f"/users/{username}/repos",
+        {
+            "type": repo_type,
+            "sort": "updated",
+            "direction": "desc",
+            "per_page": per_page,
+        },
+    )
+    repos = (
+        repo
+        for repo in pages
+        if (include_forks or not repo.fork) and (include_archived or not repo.archived)
+    )
+    yield from itertools.islice(repos, limit)
 
 
-def get_repos_metadata(username: str, limit: int = 30) -> list[RepoMetadata]:
+@traced()
+def get_repos_metadata(
+    username: str, limit: int = 30, access_token: str | None = None
+) -> list[RepoMetadata]:
     """Fetch lightweight metadata for user's repositories.
 
     Args:
         username: GitHub username
         limit: Maximum number of repos to fetch (default: 30)
+        access_token: User's OAuth token (falls back to GITHUB_TOKEN)
 
     Returns:
         List of RepoMetadata for selection UI
     """
-    repos = get_user_repos(username, limit)
-    return [
-        RepoMetadata(
-            name=repo.name,
-            full_name=repo.full_name,
-            description=repo.description,
-            language=repo.language,
-            stars=repo.stargazers_count,
-            is_fork=repo.fork,
+    with github_user(username, Priority.INTERACTIVE):
+        return _with_token_fallback(
+            access_token,
+            lambda token: [
+                RepoMetadata(
+                    name=repo.name,
+                    full_name=repo.full_name,
+                    description=repo.description,
+                    language=repo.language,
+                    stars=repo.stargazers_count,
+                    is_fork=repo.fork,
+                    is_archived=repo.archived,
+                )
+                for repo in get_user_repos(username, limit, token)
+            ],
         )
-        for repo in repos
-    ]
 
 
-def get_repos_by_names(username: str, repo_names: list[str]) -> list[Repository]:
+@traced()
+def get_repos_by_names(
+    username: str, repo_names: list[str], access_token: str | None = None
+) -> list[Repository]:
     """Fetch specific repositories by name.
 
     Args:
         username: GitHub username
         repo_names: List of repository names to fetch
+        access_token: User's OAuth token (falls back to GITHUB_TOKEN)
 
     Returns:
         List of Repository objects
     """
-    client = get_github_client()
+    client = get_github_client(access_token)
     repos = []
     for name in repo_names:
         try:
             repo = client.get_repo(f"{username}/{name}")
             repos.append(repo)
+        except github_exceptions.BadCredentialsException:
+            # トークン自体が無効なら他のリポジトリも取得できない
+            raise
         except Exception:
             log_structured(
                 logger,
@@ -126,19 +286,29 @@ def get_repos_by_names(username: str, repo_names: list[str]) -> list[Repository]
     return repos
 
 
-def get_repo_structure(repo: Repository, max_depth: int = 2) -> list[str]:
+@traced()
+def get_repo_structure(
+    repo: Repository,
+    max_depth: int = 2,
+    shas: dict[str, str] | None = None,
+    sizes: dict[str, int] | None = None,
+    root: list[ContentFile] | None = None,
+) -> list[str]:
     """Get repository file/directory structure up to max_depth.
 
     Args:
         repo: GitHub repository object
         max_depth: Maximum directory depth to traverse (default: 2)
+        shas: Filled with path -> git blob SHA for files when given
+        sizes: Filled with path -> size in bytes for files when given
+        root: Root directory listing already fetched (see list_root)
 
     Returns:
         List of file/directory paths
     """
     files: list[str] = []
     try:
-        contents = repo.get_contents("")
+        contents = root if root is not None else repo.get_contents("")
         if isinstance(contents, list):
             queue: list[tuple[ContentFile, int]] = [(item, 0) for item in contents]
         else:
@@ -146,7 +316,13 @@ def get_repo_structure(repo: Repository, max_depth: int = 2) -> list[str]:
 
         while queue:
             item, depth = queue.pop(0)
-            files.append(item.path)
+            # パスは解析中・キャッシュ復元時に同じ文字列を共有する
+            files.append(sys.intern(item.path))
+            if item.type == "file":
+                if shas is not None:
+                    shas[item.path] = item.sha
+                if sizes is not None:
+                    sizes[item.path] = item.size
 
             if item.type == "dir" and depth < max_depth:
                 try:
@@ -173,6 +349,106 @@ def get_repo_structure(repo: Repository, max_depth: int = 2) -> list[str]:
     return files
 
 
+def list_root(repo: Repository) -> list[ContentFile] | None:
+    """ルートディレクトリの一覧（抽出方法の判断とAPIでの取得で共有する）.
+
+    空のリポジトリ（404）や取得に失敗した場合はNone。
+    """
+    try:
+        contents = repo.get_contents("")
+    except github_exceptions.UnknownObjectException:
+        # 空のリポジトリはコミットがなくContents APIが404を返す
+        log_structured(
+            logger,
+            "Repository root not found",
+            level=logging.INFO,
+            repo=repo.full_name,
+        )
+        return None
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to list repository root",
+            level=logging.ERROR,
+            exc_info=True,
+            repo=repo.full_name,
+        )
+        return None
+    return contents if isinstance(contents, list) else [contents]
+
+
+def choose_extraction_mode(
+    repo: Repository, root: list[ContentFile] | None
+) -> Literal["api", "snapshot"]:
+    """リポジトリ情報をContents APIとtarballのどちらで取得するか.
+
+    APIで必要な呼び出し数をルートの一覧から見積もり（ディレクトリごとの一覧、
+    候補ファイルごとの取得、README・言語）、tarballのサイズ（repo.size）が
+    呼び出し数 × GITHUB_SNAPSHOT_KB_PER_CALL 以下ならtarballを選ぶ。
+    GITHUB_SNAPSHOT_MAX_KB を超えるリポジトリは常にAPIを使う。
+    """
+    if GITHUB_EXTRACTION_MODE == "api" or root is None:
+        return "api"
+    if repo.size > GITHUB_SNAPSHOT_MAX_KB:
+        return "api"
+    if GITHUB_EXTRACTION_MODE == "snapshot":
+        return "snapshot"
+    candidates = set(DEPENDENCY_FILES) | set(MAIN_FILE_PATTERNS)
+    dirs = sum(1 for item in root if item.type == "dir")
+    files = sum(1 for item in root if item.type == "file" and item.path in candidates)
+    expected_calls = dirs + files + 2
+    if repo.size <= expected_calls * GITHUB_SNAPSHOT_KB_PER_CALL:
+        return "snapshot"
+    return "api"
+
+
+# tarballで内容を読むディレクトリ（get_main_files の検索先と同じ）
+_MAIN_FILE_DIRS = ("src", "app", "lib", "cmd")
+
+
+def _snapshot_wanted(path: str) -> int | None:
+    """tarballから内容を読むファイルと保持する文字数."""
+    directory, _, name = path.rpartition("/")
+    if directory and name in PARSERS and _is_nested_manifest_dir(directory):
+        return GITHUB_SKIP_FILE_BYTES
+    if not directory:
+        if name in PARSERS:
+            # 解析できるマニフェストは切り詰めると依存が欠けるため全体を読む
+            return GITHUB_SKIP_FILE_BYTES
+        if name in DEPENDENCY_FILES:
+            return 5000
+        if name.lower() in README_NAMES:
+            return GITHUB_SKIP_FILE_BYTES
+    if name in MAIN_FILE_PATTERNS and (not directory or directory in _MAIN_FILE_DIRS):
+        return 3000
+    return None
+
+
+def _is_nested_manifest_dir(directory: str) -> bool:
+    """依存ファイルを探すルート以外のディレクトリ（frontend/ 等と packages/*/ 等）."""
+    parent, _, rest = directory.partition("/")
+    return not rest or (parent in WORKSPACE_DIRS and "/" not in rest)
+
+
+def _nested_manifests(index: PathIndex) -> list[str]:
+    """ルート以外の依存ファイル（最大 GITHUB_NESTED_MANIFESTS 件）.
+
+    frontend/package.json・backend/requirements.txt のような1階層下のものと、
+    モノレポのワークスペース（packages/*/package.json 等）のものを対象にする。
+    """
+    found: dict[str, None] = {}
+    for name in DEPENDENCY_FILES:
+        found.update(
+            (path, None) for path in index.find_name(name, max_depth=1) if "/" in path
+        )
+        for directory in WORKSPACE_DIRS:
+            found.update(dict.fromkeys(index.glob(f"{directory}/*/{name}")))
+        if len(found) >= GITHUB_NESTED_MANIFESTS:
+            break
+    return list(found)[:GITHUB_NESTED_MANIFESTS]
+
+
+@traced()
 def get_file_content(repo: Repository, path: str) -> str | None:
     """Get content of a specific file.
 
@@ -185,7 +461,7 @@ def get_file_content(repo: Repository, path: str) -> str | None:
     """
     try:
         file = repo.get_contents(path)
-        if isinstance(file, ContentFile):
+        if isinstance(file, github_content_file.ContentFile):
             return file.decoded_content.decode("utf-8")
     except Exception:
         log_structured(
@@ -198,93 +474,258 @@ def get_file_content(repo: Repository, path: str) -> str | None:
     return None
 
 
-def get_dependency_files(repo: Repository, structure: list[str]) -> list[FileContent]:
+@traced()
+def get_file_prefix(repo: Repository, path: str, limit: int) -> str | None:
+    """Read only the first `limit` characters of a file from the raw endpoint.
+
+    Rangeヘッダーで先頭だけを要求し、ストリームを逐次デコードして
+    limit 文字に達した時点で読み込みをやめる（Rangeを無視されても全体は読まない）。
+    rawエンドポイントはAPIのレート制限を消費しない。
+
+    Args:
+        repo: GitHub repository object
+        path: File path in the repository
+        limit: Maximum number of characters to return
+
+    Returns:
+        The beginning of the file, or None if it could not be read
+    """
+    url = (
+        f"{GITHUB_RAW_URL}/{repo.full_name}/{quote(repo.default_branch)}/{quote(path)}"
+    )
+    # UTF-8は1文字最大4バイト
+    headers = {"Range": f"bytes=0-{limit * 4 - 1}"}
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts: list[str] = []
+    chars = 0
+    received = 0
+    try:
+        with (
+            observe_call("github", "raw.get") as call,
+            httpx.stream(
+                "GET", url, headers=headers, timeout=GITHUB_RAW_TIMEOUT_SECONDS
+            ) as response,
+        ):
+            if response.status_code not in (200, 206):
+                if response.status_code >= 500:
+                    call.outcome = "error"
+                log_structured(
+                    logger,
+                    "Failed to read raw file",
+                    level=logging.WARNING,
+                    path=path,
+                    status=response.status_code,
+                )
+                return None
+            for chunk in response.iter_bytes():
+                received += len(chunk)
+                text = decoder.decode(chunk)
+                parts.append(text)
+                chars += len(text)
+                if chars >= limit:
+                    break
+    except httpx.HTTPError:
+        log_structured(
+            logger,
+            "Failed to read raw file",
+            level=logging.WARNING,
+            exc_info=True,
+            path=path,
+        )
+        return None
+    registry.counter("github_file_bytes", mode="range").inc(received)
+    return "".join(parts)[:limit]
+
+
+def get_file_text(
+    repo: Repository,
+    path: str,
+    sha: str | None,
+    size: int | None = None,
+    limit: int | None = None,
+) -> str | None:
+    """Get file content, reusing the BlobStore when the blob SHA is known.
+
+    サイズが分かっていれば、大きいファイルは先頭 limit 文字だけをrawエンドポイントから
+    読み（BlobStoreには保存しない）、GITHUB_SKIP_FILE_BYTES を超えるものは取得しない。
+
+    Args:
+        repo: GitHub repository object
+        path: File path in the repository
+        sha: Git blob SHA from the directory listing (None if unknown)
+        size: File size in bytes from the directory listing (None if unknown)
+        limit: Characters the caller keeps (enables partial reads)
+
+    Returns:
+        File content as string (possibly only its first `limit` characters),
+        or None if not found or skipped
+    """
+    store = get_blob_store()
+    if sha is not None:
+        data = store.get(sha)
+        if data is not None:
+            return data.decode("utf-8")
+
+    if size is not None and size > GITHUB_SKIP_FILE_BYTES:
+        registry.counter("github_file_fetch", mode="skipped").inc()
+        log_structured(
+            logger,
+            "Skipped large file",
+            level=logging.INFO,
+            path=path,
+            size=size,
+        )
+        return None
+    if size is not None and limit is not None and size > GITHUB_RANGE_FETCH_BYTES:
+        registry.counter("github_file_fetch", mode="range").inc()
+        content = get_file_prefix(repo, path, limit)
+        if content is not None:
+            return content
+
+    registry.counter("github_file_fetch", mode="contents").inc()
+    content = get_file_content(repo, path)
+    if content is not None:
+        registry.counter("github_file_bytes", mode="contents").inc(
+            len(content.encode("utf-8"))
+        )
+        if sha is not None:
+            store.put(sha, content.encode("utf-8"))
+    return content
+
+
+def get_dependency_files(
+    repo: Repository,
+    structure: PathIndex | Sequence[str],
+    shas: dict[str, str] | None = None,
+    sizes: dict[str, int] | None = None,
+    contents: Mapping[str, str] | None = None,
+) -> list[FileRecord]:
     """Get dependency files from repository.
 
+    manifests.PARSERS で解析できるマニフェストは全体を取得する（プロンプトに入る量は
+    MAX_DEPENDENCIES と解析できない場合の1000文字で抑えられる）。それ以外は先頭だけ。
+    ルート直下に加えて、frontend/ や packages/*/ 等のものも上限件数まで読む。
+
     Args:
         repo: GitHub repository object
-        structure: List of file paths in the repository
+        structure: File paths in the repository (or their PathIndex)
+        shas: Path -> git blob SHA from get_repo_structure
+        sizes: Path -> size in bytes from get_repo_structure
+        contents: Path -> content already read (e.g. from a snapshot)
 
     Returns:
-        List of FileContent with dependency file contents
+        List of FileRecord with dependency file contents
     """
+    index = PathIndex.of(structure)
     return _collect_file_contents(
         repo,
-        structure,
-        DEPENDENCY_FILES,
+        index,
+        DEPENDENCY_FILES + _nested_manifests(index),
+        shas=shas,
+        sizes=sizes,
+        contents=contents,
         content_limit=5000,
+        full_names=PARSERS.keys(),
     )
 
 
-def get_main_files(repo: Repository, structure: list[str]) -> list[FileContent]:
+def get_main_files(
+    repo: Repository,
+    structure: PathIndex | Sequence[str],
+    shas: dict[str, str] | None = None,
+    sizes: dict[str, int] | None = None,
+    contents: Mapping[str, str] | None = None,
+) -> list[FileRecord]:
     """Get main code files from repository.
 
     Args:
         repo: GitHub repository object
-        structure: List of file paths in the repository
+        structure: File paths in the repository (or their PathIndex)
+        shas: Path -> git blob SHA from get_repo_structure
+        sizes: Path -> size in bytes from get_repo_structure
+        contents: Path -> content already read (e.g. from a snapshot)
 
     Returns:
-        List of FileContent with main file contents
+        List of FileRecord with main file contents
     """
+    index = PathIndex.of(structure)
     # src/やapp/ディレクトリ内も検索
-    search_paths = [""] + [
-        f"{d}/"
-        for d in ["src", "app", "lib", "cmd"]
-        if any(p.startswith(d + "/") for p in structure)
-    ]
+    search_paths = [""] + [f"{d}/" for d in _MAIN_FILE_DIRS if index.has_dir(d)]
     return _collect_file_contents(
         repo,
-        structure,
+        index,
         MAIN_FILE_PATTERNS,
         search_paths=search_paths,
+        shas=shas,
+        sizes=sizes,
+        contents=contents,
         content_limit=3000,
         max_files=3,
     )
 
 
-def get_config_files(structure: list[str]) -> list[str]:
+def get_config_files(structure: PathIndex | Sequence[str]) -> list[str]:
     """Identify config files present in the repository.
 
     Args:
-        structure: List of file paths in the repository
+        structure: File paths in the repository (or their PathIndex)
 
     Returns:
-        List of config file paths found
+        List of config file paths found (the first path at or under each entry)
     """
-    found: list[str] = []
-
-    for config in CONFIG_FILES:
-        for path in structure:
-            if path == config or path.startswith(config + "/"):
-                found.append(path)
-                break
-
-    return found
+    index = PathIndex.of(structure)
+    return [
+        path
+        for config in CONFIG_FILES
+        if (path := index.first_under(config)) is not None
+    ]
 
 
 def _collect_file_contents(
     repo: Repository,
-    structure: list[str],
+    structure: PathIndex | Sequence[str],
     patterns: list[str],
     *,
     search_paths: list[str] | None = None,
+    shas: dict[str, str] | None = None,
+    sizes: dict[str, int] | None = None,
+    contents: Mapping[str, str] | None = None,
     content_limit: int = 5000,
+    full_names: Collection[str] = (),
     max_files: int | None = None,
-) -> list[FileContent]:
-    """ファイルパターンに一致する内容を収集."""
-    results: list[FileContent] = []
+) -> list[FileRecord]:
+    """ファイルパターンに一致する内容を収集（contents があればGitHubを呼ばない）.
+
+    full_names に含まれるファイル名は content_limit で切り詰めずに全体を取得する。
+    """
+    results: list[FileRecord] = []
+    index = PathIndex.of(structure)
     prefixes = search_paths or [""]
+    shas = shas or {}
+    sizes = sizes or {}
 
     for pattern in patterns:
         for prefix in prefixes:
             path = f"{prefix}{pattern}"
-            if path in structure or pattern in structure:
-                actual_path = path if path in structure else pattern
-                content = get_file_content(repo, actual_path)
+            if path in index or pattern in index:
+                actual_path = path if path in index else pattern
+                sha = shas.get(actual_path)
+                name = pattern.rpartition("/")[2]
+                limit = None if name in full_names else content_limit
+                if contents is not None:
+                    content = contents.get(actual_path)
+                else:
+                    content = get_file_text(
+                        repo,
+                        actual_path,
+                        sha,
+                        size=sizes.get(actual_path),
+                        limit=limit,
+                    )
                 if content:
                     # 長すぎる場合は切り詰め
                     results.append(
-                        FileContent(path=actual_path, content=content[:content_limit])
+                        FileRecord(path=actual_path, content=content[:limit], sha=sha)
                     )
                     break
 
@@ -294,21 +735,39 @@ def _collect_file_contents(
     return results
 
 
-def extract_repo_info(repo: Repository) -> RepoInfo:
-    """Extract relevant information from a repository."""
-    # Get README content
-    readme = None
+# ルート直下のREADMEとみなすファイル名（小文字）
+README_NAMES = {"readme.md", "readme", "readme.rst", "readme.txt"}
+
+
+def get_readme(
+    repo: Repository, structure: PathIndex | Sequence[str], shas: dict[str, str]
+) -> tuple[str | None, str | None]:
+    """Get README content and its blob SHA.
+
+    ルート直下のREADMEのSHAが分かっていて BlobStore にあれば GitHub を呼ばない。
+    """
+    store = get_blob_store()
+    for path in PathIndex.of(structure).list_dir():
+        if path.lower() in README_NAMES and path in shas:
+            data = store.get(shas[path])
+            if data is not None:
+                return data.decode("utf-8"), shas[path]
+            break
+
     try:
-        readme_file = repo.get_readme()
+        with span("github.get_readme"):
+            readme_file = repo.get_readme()
         readme = readme_file.decoded_content.decode("utf-8")
-    except UnknownObjectException:
+        store.put(readme_file.sha, readme_file.decoded_content)
+        return readme, readme_file.sha
+    except github_exceptions.UnknownObjectException:
         log_structured(
             logger,
             "README not found",
             level=logging.INFO,
             repo=repo.full_name,
         )
-    except GithubException:
+    except github_exceptions.GithubException:
         log_structured(
             logger,
             "Failed to read README",
@@ -324,49 +783,151 @@ def extract_repo_info(repo: Repository) -> RepoInfo:
             exc_info=True,
             repo=repo.full_name,
         )
+    return None, None
 
-    # Get languages
-    languages = dict(repo.get_languages())
 
-    # Get file structure
-    structure = get_repo_structure(repo)
+@traced()
+def extract_repo_info(repo: Repository) -> RepoRecord:
+    """Extract relevant information from a repository.
+
+    ファイル一覧と内容はContents API（ディレクトリ・ファイルごとに呼び出す）か
+    tarball（1回のダウンロード）から取得する。どちらを使うかは choose_extraction_mode。
+    """
+    root = list_root(repo)
+    snapshot = None
+    if choose_extraction_mode(repo, root) == "snapshot":
+        snapshot = read_snapshot(
+            repo.full_name,
+            repo.default_branch,
+            max_depth=2,
+            wanted=_snapshot_wanted,
+            max_bytes=GITHUB_SNAPSHOT_MAX_KB * 1024,
+            max_file_bytes=GITHUB_RANGE_FETCH_BYTES,
+        )
+
+    contents: dict[str, str] | None = None
+    if snapshot is not None:
+        structure, shas, sizes = snapshot.structure, snapshot.shas, snapshot.sizes
+        contents = snapshot.contents
+        index = PathIndex(structure)
+        store = get_blob_store()
+        for path, sha in shas.items():
+            store.put(sha, contents[path].encode("utf-8"))
+        readme_path = next(
+            (p for p in index.list_dir() if p.lower() in README_NAMES), None
+        )
+        readme = contents.get(readme_path) if readme_path else None
+        readme_sha = shas.get(readme_path) if readme_path else None
+    else:
+        # Get file structure (with blob SHAs for BlobStore lookups)
+        shas = {}
+        sizes = {}
+        # 一覧を取得できなかったリポジトリは空として扱う（同じ呼び出しを繰り返さない）
+        structure = get_repo_structure(
+            repo, shas=shas, sizes=sizes, root=root if root is not None else []
+        )
+        # すべてのファイル探索で共有する索引
+        index = PathIndex(structure)
+
+        # Get README content
+        readme, readme_sha = get_readme(repo, index, shas)
+
+    # Get languages
+    with span("github.get_languages"):
+        languages = dict(repo.get_languages())
 
     # Get dependency files
-    dependency_files = get_dependency_files(repo, structure)
+    dependency_files = get_dependency_files(repo, index, shas, sizes, contents)
 
     # Get main files
-    main_files = get_main_files(repo, structure)
+    main_files = get_main_files(repo, index, shas, sizes, contents)
 
     # Get config files
-    config_files = get_config_files(structure)
+    config_files = get_config_files(index)
 
-    return RepoInfo(
+    return RepoRecord(
         name=repo.name,
         description=repo.description,
         language=repo.language,
         languages=languages,
-        topics=repo.get_topics(),
+        # 一覧APIの応答に含まれる（get_topics() は追加の呼び出しになる）
+        topics=repo.topics,
         readme=readme,
         stars=repo.stargazers_count,
         forks=repo.forks_count,
         updated_at=repo.updated_at.isoformat() if repo.updated_at else "",
         is_fork=repo.fork,
+        is_archived=repo.archived,
         file_structure=structure,
         dependency_files=dependency_files,
         main_files=main_files,
         config_files=config_files,
+        readme_sha=readme_sha,
     )
 
 
-def analyze_selected_repos(username: str, repo_names: list[str]) -> list[RepoInfo]:
+def extract_repo_metadata(repo: Repository) -> RepoRecord:
+    """Build a record from the repository payload only (no further API calls).
+
+    プロファイル生成に使わないリポジトリ（フォーク・アーカイブ）用。
+    """
+    return RepoRecord(
+        name=repo.name,
+        description=repo.description,
+        language=repo.language,
+        languages={},
+        topics=repo.topics,
+        readme=None,
+        stars=repo.stargazers_count,
+        forks=repo.forks_count,
+        updated_at=repo.updated_at.isoformat() if repo.updated_at else "",
+        is_fork=repo.fork,
+        is_archived=repo.archived,
+    )
+
+
+@traced()
+def analyze_selected_repos(
+    username: str,
+    repo_names: list[str],
+    access_token: str | None = None,
+    extracted: Mapping[str, RepoRecord] | None = None,
+    plan: AnalysisPlan | None = None,
+) -> list[RepoRecord]:
     """Analyze selected repositories and return repository information.
 
+    取得したRepositoryは取得時のクライアントを保持するため、
+    以降の呼び出しも同じトークン（通常はユーザー自身のもの）で行われる。
+    plan で分類し、プロファイル生成に使うリポジトリのみ extract_repo_info で抽出する
+    （フォーク・アーカイブはリポジトリ情報のみ）。
+
     Args:
         username: GitHub username
         repo_names: List of repository names to analyze
+        access_token: User's OAuth token (falls back to GITHUB_TOKEN)
+        extracted: Records already extracted ahead of time, keyed by repo name
+            (only the remaining repos are fetched)
+        plan: Filled with each repo's class and the per-class cost
 
     Returns:
-        List of RepoInfo for selected repositories
+        List of RepoRecord for selected repositories (in repo_names order)
     """
-    repos = get_repos_by_names(username, repo_names)
-    return [extract_repo_info(repo) for repo in repos]
+    plan = plan if plan is not None else AnalysisPlan()
+    records = dict(extracted or {})
+    for record in records.values():
+        plan.add(record.name, record.is_fork, record.is_archived)
+    missing = [name for name in repo_names if name not in records]
+    if missing:
+        with github_user(username, Priority.ANALYSIS):
+            repos = _with_token_fallback(
+                access_token,
+                lambda token: get_repos_by_names(username, missing, token),
+            )
+            for repo in repos:
+                repo_class = plan.add(repo.name, repo.fork, repo.archived)
+                with plan.measure(repo_class):
+                    if repo_class is RepoClass.ORIGINAL:
+                        records[repo.name] = extract_repo_info(repo)
+                    else:
+                        records[repo.name] = extract_repo_metadata(repo)
+    return [records[name] for name in repo_names if name in records]
@@ -0,0 +1,471 @@
+"""GitHub APIリクエストのプロセス共有スケジューラ（レート制限・公平性・背圧）.
+
+GitHubのレート制限はトークンごと（5000リクエスト/時）。共有の GITHUB_TOKEN は
+1インスタンスで最大80セッションが同時に使うため、1件の重いプロファイル生成が
+予算を使い切って他のユーザーの呼び出しを止めないよう、PyGithubのHTTPリクエストを
+すべてこのスケジューラ経由にする。スケジューラはトークンごとに1つ持ち
+（Authorizationヘッダーで振り分け）、ユーザー自身のOAuthトークンの予算も個別に追跡する。
+
+- トークンバケット: レスポンスの X-RateLimit-Remaining / Reset から、リセットまでに
+  残りの予算を均等に使える補充レートを計算する（バースト上限 GITHUB_BURST）
+- 公平性: 待ちの中から優先度 → 直近の取得数が少ないユーザー → 到着順で選ぶ
+- 優先度: INTERACTIVE（画面操作）> ANALYSIS（プロファイル生成）> BACKGROUND（先読み）。
+  BACKGROUND は残り予算が GITHUB_RATE_RESERVE 以下になると実行しない
+- 適応的な同時実行数: 成功で加算的に増やし、403/429/5xx・通信エラーで半減（AIMD）
+- 背圧: 待ち行列が GITHUB_MAX_QUEUE を超えるか、GITHUB_QUEUE_TIMEOUT_SECONDS 待っても
+  順番が来なければ GitHubBusyError を送出する
+
+    with github_user("octocat", Priority.INTERACTIVE):
+        repos = list(client.get_user("octocat").get_repos())
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any
+
+from app.services.const import (
+    GITHUB_BURST,
+    GITHUB_CLIENT_CACHE_SIZE,
+    GITHUB_MAX_CONCURRENCY,
+    GITHUB_MAX_QUEUE,
+    GITHUB_QUEUE_TIMEOUT_SECONDS,
+    GITHUB_RATE_RESERVE,
+)
+from app.services.logging_config import log_structured
+from app.services.metrics import observe_call, registry
+
+logger = logging.getLogger(__name__)
+
+# ヘッダーを受け取るまでの想定値（認証済みトークンの上限）
+DEFAULT_RATE_LIMIT = 5000
+RATE_LIMIT_WINDOW_SECONDS = 3600
+# 公平性のための取得数をこの間隔で半減させる（過去の利用を徐々に忘れる）
+FAIRNESS_HALF_LIFE_SECONDS = 60.0
+# 同時実行数を減らす契機になるステータス
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}
+# 共有トークン（GITHUB_TOKEN・未認証）のスケジューラのキー
+SHARED_TOKEN = "shared"
+
+
+class Priority(IntEnum):
+    """リクエストの優先度（小さいほど優先）."""
+
+    INTERACTIVE = 0
+    ANALYSIS = 1
+    BACKGROUND = 2
+
+
+class GitHubBusyError(RuntimeError):
+    """GitHub APIの待ち行列が一杯、または待ち時間の上限を超えた."""
+
+
+_current_user: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "github_user", default=None
+)
+_current_priority: contextvars.ContextVar[Priority | None] = contextvars.ContextVar(
+    "github_priority", default=None
+)
+_request_count: contextvars.ContextVar[RequestCount | None] = contextvars.ContextVar(
+    "github_request_count", default=None
+)
+
+
+@dataclass
+class RequestCount:
+    """count_requests のブロック内で送ったリクエスト数."""
+
+    value: int = 0
+
+
+@contextmanager
+def count_requests() -> Iterator[RequestCount]:
+    """このブロック内でスケジューラを通ったGitHubリクエストを数える（外側にも加算）."""
+    outer = _request_count.get()
+    count = RequestCount()
+    token = _request_count.set(count)
+    try:
+        yield count
+    finally:
+        _request_count.reset(token)
+        if outer is not None:
+            outer.value += count.value
+
+
+@contextmanager
+def github_user(user: str, priority: Priority = Priority.ANALYSIS) -> Iterator[None]:
+    """このブロック内のGitHubリクエストを user・priority として扱う.
+
+    外側で低い優先度（BACKGROUND等）が指定されていればそちらを維持する。
+    """
+    outer = _current_priority.get()
+    user_token = _current_user.set(user)
+    priority_token = _current_priority.set(
+        priority if outer is None else max(priority, outer)
+    )
+    try:
+        yield
+    finally:
+        _current_priority.reset(priority_token)
+        _current_user.reset(user_token)
+
+
+@dataclass
+class _Waiter:
+    priority: Priority
+    user: str
+    seq: int
+
+
+@dataclass
+class RateLimitState:
+    """直近のレスポンスで観測したレート制限."""
+
+    limit: int = DEFAULT_RATE_LIMIT
+    remaining: int | None = None
+    reset_at: float | None = None  # エポック秒
+
+
+@dataclass
+class GitHubScheduler:
+    """トークンバケット + ユーザー間の公平な待ち行列 + AIMDの同時実行数制御.
+
+    1インスタンスが1トークンの予算を表す。token はメトリクスのラベル（"shared" / "user"）。
+    """
+
+    token: str = SHARED_TOKEN
+    max_concurrency: int = GITHUB_MAX_CONCURRENCY
+    burst: int = GITHUB_BURST
+    max_queue: int = GITHUB_MAX_QUEUE
+    queue_timeout: float = GITHUB_QUEUE_TIMEOUT_SECONDS
+    reserve: int = GITHUB_RATE_RESERVE
+    clock: Callable[[], float] = time.monotonic
+    wall_clock: Callable[[], float] = time.time
+    state: RateLimitState = field(default_factory=RateLimitState)
+
+    def __post_init__(self) -> None:
+        self._cond = threading.Condition()
+        self._waiters: list[_Waiter] = []
+        self._served: dict[str, float] = defaultdict(float)
+        self._seq = 0
+        self._inflight = 0
+        self._limit = float(self.max_concurrency)
+        self._tokens = float(self.burst)
+        self._rate = DEFAULT_RATE_LIMIT / RATE_LIMIT_WINDOW_SECONDS
+        self._refilled_at = self.clock()
+        self._decayed_at = self._refilled_at
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    def run(self, send: Callable[[], Any]) -> Any:
+        """順番を待ってリクエストを送り、レスポンスのヘッダーを反映する.
+
+        Args:
+            send: リクエストを送信し、status_code と headers を持つレスポンスを返す関数
+        """
+        user = _current_user.get() or "anonymous"
+        priority = _current_priority.get()
+        if priority is None:
+            priority = Priority.ANALYSIS
+        self._acquire(user, priority)
+        count = _request_count.get()
+        if count is not None:
+            count.value += 1
+        throttled = True
+        try:
+            response = send()
+            throttled = self.observe(response.status_code, response.headers)
+            return response
+        finally:
+            self._release(throttled)
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> bool:
+        """X-RateLimit-* ヘッダーから予算と補充レートを更新し、抑制すべきかを返す."""
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        with self._cond:
+            if remaining is not None and reset is not None:
+                self.state.limit = int(
+                    headers.get("x-ratelimit-limit", self.state.limit)
+                )
+                self.state.remaining = int(remaining)
+                self.state.reset_at = float(reset)
+                self._refill()
+                seconds = max(self.state.reset_at - self.wall_clock(), 1.0)
+                self._rate = self.state.remaining / seconds
+                self._tokens = min(self._tokens, float(self.state.remaining))
+                registry.gauge("github_rate_limit_remaining", token=self.token).set(
+                    self.state.remaining
+                )
+                registry.gauge("github_rate_limit_reset_seconds", token=self.token).set(
+                    seconds
+                )
+            self._cond.notify_all()
+        return status in THROTTLE_STATUSES
+
+    def has_budget(self) -> bool:
+        """予約分（GITHUB_RATE_RESERVE）を超える残り予算があるか."""
+        with self._cond:
+            self._refill()
+            remaining = self.state.remaining
+            return remaining is None or remaining > self.reserve
+
+    def snapshot(self) -> dict[str, float | int | None]:
+        """現在の状態（ログ・ベンチマーク用）."""
+        with self._cond:
+            self._refill()
+            return self._snapshot()
+
+    # ------------------------------------------------------------------
+    # 内部処理（self._cond を保持して呼ぶ）
+    # ------------------------------------------------------------------
+    def _refill(self) -> None:
+        now = self.clock()
+        reset_at = self.state.reset_at
+        if reset_at is not None and self.wall_clock() >= reset_at:
+            # リセット時刻を過ぎたら上限まで回復したとみなす（次のレスポンスで補正）
+            self.state.remaining = self.state.limit
+            self.state.reset_at = None
+            self._rate = self.state.limit / RATE_LIMIT_WINDOW_SECONDS
+            self._tokens = float(self.burst)
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled_at) * self._rate
+        )
+        self._refilled_at = now
+
+        elapsed = now - self._decayed_at
+        if elapsed >= FAIRNESS_HALF_LIFE_SECONDS:
+            factor = 0.5 ** (elapsed / FAIRNESS_HALF_LIFE_SECONDS)
+            for user in list(self._served):
+                self._served[user] *= factor
+                if self._served[user] < 0.01:
+                    del self._served[user]
+            self._decayed_at = now
+
+    def _next(self) -> _Waiter:
+        return min(
+            self._waiters, key=lambda w: (w.priority, self._served[w.user], w.seq)
+        )
+
+    def _reserved(self, priority: Priority) -> bool:
+        remaining = self.state.remaining
+        return (
+            priority == Priority.BACKGROUND
+            and remaining is not None
+            and remaining <= self.reserve
+        )
+
+    def _wait_seconds(self, deadline: float) -> float:
+        wait = deadline - self.clock()
+        if self._tokens < 1:
+            if self._rate > 0:
+                wait = min(wait, (1 - self._tokens) / self._rate)
+            elif self.state.reset_at is not None:
+                wait = min(wait, self.state.reset_at - self.wall_clock())
+        return max(wait, 0.0)
+
+    def _reject(self, user: str, priority: Priority, reason: str) -> None:
+        registry.counter(
+            "github_scheduler_rejected", token=self.token, reason=reason
+        ).inc()
+        log_structured(
+            logger,
+            "GitHub request rejected",
+            level=logging.WARNING,
+            token=self.token,
+            user=user,
+            priority=priority.name,
+            reason=reason,
+            **self._snapshot(),
+        )
+        raise GitHubBusyError(f"GitHub API is busy ({reason})")
+
+    def _snapshot(self) -> dict[str, float | int | None]:
+        return {
+            "remaining": self.state.remaining,
+            "tokens": round(self._tokens, 2),
+            "rate_per_second": round(self._rate, 3),
+            "concurrency_limit": round(self._limit, 2),
+            "inflight": self._inflight,
+            "queued": len(self._waiters),
+        }
+
+    def _acquire(self, user: str, priority: Priority) -> None:
+        started = self.clock()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            if len(self._waiters) >= self.max_queue:
+                self._reject(user, priority, "queue_full")
+            self._seq += 1
+            waiter = _Waiter(priority=priority, user=user, seq=self._seq)
+            self._waiters.append(waiter)
+            registry.gauge("github_scheduler_queue_depth", token=self.token).set(
+                len(self._waiters)
+            )
+            try:
+                while True:
+                    self._refill()
+                    if (
+                        self._next() is waiter
+                        and self._inflight < int(self._limit)
+                        and self._tokens >= 1
+                        and not self._reserved(priority)
+                    ):
+                        break
+                    if self.clock() >= deadline:
+                        self._reject(user, priority, "timeout")
+                    self._cond.wait(self._wait_seconds(deadline))
+            finally:
+                self._waiters.remove(waiter)
+                registry.gauge("github_scheduler_queue_depth", token=self.token).set(
+                    len(self._waiters)
+                )
+                # 先頭が入れ替わったので他の待ちを起こす
+                self._cond.notify_all()
+
+            self._tokens -= 1
+            self._inflight += 1
+            self._served[user] += 1
+            registry.gauge("github_scheduler_tokens", token=self.token).set(
+                self._tokens
+            )
+        registry.histogram(
+            "github_scheduler_wait_ms", token=self.token, priority=priority.name
+        ).observe((self.clock() - started) * 1000)
+
+    def _release(self, throttled: bool) -> None:
+        with self._cond:
+            self._inflight -= 1
+            if throttled:
+                self._limit = max(1.0, self._limit / 2)
+            else:
+                self._limit = min(
+                    float(self.max_concurrency), self._limit + 1 / self._limit
+                )
+            registry.gauge("github_scheduler_concurrency_limit", token=self.token).set(
+                self._limit
+            )
+            self._cond.notify_all()
+
+
+def token_key(token: str | None) -> str:
+    """トークンを識別するキー（トークン自体はキー・ログに残さない）."""
+    if not token or token == os.getenv("GITHUB_TOKEN"):
+        return SHARED_TOKEN
+    return "user:" + hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+@functools.cache
+def _shared_scheduler() -> GitHubScheduler:
+    return GitHubScheduler()
+
+
+_user_schedulers: OrderedDict[str, GitHubScheduler] = OrderedDict()
+_user_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(key: str = SHARED_TOKEN) -> GitHubScheduler:
+    """トークンごとのプロセス共有スケジューラ.
+
+    ユーザートークンのものは直近 GITHUB_CLIENT_CACHE_SIZE 件のみ保持する。
+    """
+    if key == SHARED_TOKEN:
+        return _shared_scheduler()
+    with _user_schedulers_lock:
+        scheduler = _user_schedulers.get(key)
+        if scheduler is None:
+            scheduler = GitHubScheduler(token="user")
+            _user_schedulers[key] = scheduler
+            while len(_user_schedulers) > GITHUB_CLIENT_CACHE_SIZE:
+                _user_schedulers.popitem(last=False)
+        else:
+            _user_schedulers.move_to_end(key)
+        return scheduler
+
+
+def has_budget(access_token: str | None) -> bool:
+    """ユーザーまたは共有のトークンに予約分を超える予算があるか（先読みの判断用）."""
+    if access_token and get_scheduler(token_key(access_token)).has_budget():
+        return True
+    return get_scheduler().has_budget()
+
+
+def _request_token(request: Any) -> str | None:
+    """Authorization ヘッダー（"token xxx" / "Bearer xxx"）からトークンを取り出す."""
+    authorization = request.headers.get("Authorization")
+    return authorization.split()[-1] if authorization else None
+
+
+def _operation(request: Any) -> str:
+    """メトリクス用の操作名（"GET repos.contents" 等。owner・repo名は含めない）."""
+    path = request.path_url.split("?", 1)[0].strip("/").split("/")
+    if path[0] == "repos":
+        # /repos/{owner}/{repo}/{resource}/...
+        path = [path[0], *path[3:4]]
+    elif path[0] in ("users", "orgs"):
+        # /users/{login}/{resource}
+        path = [path[0], *path[2:3]]
+    return f"{request.method} {'.'.join(path[:2])}"
+
+
+def _send_observed(send: Callable[[], Any], operation: str) -> Any:
+    """HTTPリクエスト1回分のレイテンシと成否を記録して送る（待ち時間は含めない）."""
+    with observe_call("github", operation) as call:
+        response = send()
+        if response.status_code >= 500:
+            call.outcome = "error"
+        return response
+
+
+@functools.cache
+def install() -> None:
+    """PyGithubのHTTPSリクエストをスケジューラ経由にする（1回のみ）.
+
+    Requester.injectConnectionClasses() は接続の再利用を無効にするため、
+    接続クラスのみを差し替える。
+    """
+    import requests.adapters
+    from github import Requester
+
+    class ScheduledHTTPAdapter(requests.adapters.HTTPAdapter):
+        def send(self, request: Any, *args: Any, **kwargs: Any) -> Any:
+            parent = super().send
+            scheduler = get_scheduler(token_key(_request_token(request)))
+            return scheduler.run(
+                lambda: _send_observed(
+                    lambda: parent(request, *args, **kwargs), _operation(request)
+                )
+            )
+
+    class ScheduledHTTPSConnection(Requester.HTTPSRequestsConnectionClass):
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            super().__init__(*args, **kwargs)
+            self.adapter = ScheduledHTTPAdapter(
+                max_retries=self.retry,
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size,
+            )
+            self.session.mount("https://", self.adapter)
+
+    attribute = "_Requester__httpsConnectionClass"
+    if not hasattr(Requester.Requester, attribute):
+        log_structured(
+            logger,
+            "GitHub scheduler not installed",
+            level=logging.WARNING,
+            reason="unsupported PyGithub version",
+        )
+        return
+    setattr(Requester.Requester, attribute, ScheduledHTTPSConnection)
@@ -0,0 +1,100 @@
+"""重いSDKを初回利用時まで読み込まない遅延importヘルパー.
+
+vertexai / perplexity / PyGithub / google.cloud.firestore は
+import だけで数百ms〜数秒かかるため、モジュール読み込み時ではなく
+機能を最初に使った時点で import する。
+
+    firestore = lazy_module("google.cloud.firestore")
+    Github = lazy_attr("github", "Github")
+
+`lazy_attr` はクラス・関数の代わりに呼び出せるプロキシを返す。
+`except` 節や `isinstance` には実際のクラスが必要なため、
+例外クラス等は `lazy_module(...).SomeError` の形で参照する。
+"""
+
+from __future__ import annotations
+
+import importlib
+import time
+from types import ModuleType
+from typing import Any
+
+# 登録済みの遅延モジュール名（ウォームアップ時の一括読み込み用）
+_registered: set[str] = set()
+
+
+class LazyModule:
+    """属性に最初にアクセスした時点で import されるモジュールプロキシ."""
+
+    __slots__ = ("_name", "_module")
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: ModuleType | None = None
+        _registered.add(name)
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+class LazyAttr:
+    """モジュール属性（クラス・関数）の遅延プロキシ."""
+
+    __slots__ = ("_module", "_attr", "_target")
+
+    def __init__(self, module: LazyModule, attr: str) -> None:
+        self._module = module
+        self._attr = attr
+        self._target: Any = None
+
+    def _load(self) -> Any:
+        if self._target is None:
+            self._target = getattr(self._module, self._attr)
+        return self._target
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._load()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyAttr {self._module._name}.{self._attr}>"
+
+
+def lazy_module(name: str) -> Any:
+    """モジュールの遅延プロキシを返す."""
+    return LazyModule(name)
+
+
+def lazy_attr(module_name: str, attr: str) -> Any:
+    """`from module_name import attr` の遅延版."""
+    return LazyAttr(LazyModule(module_name), attr)
+
+
+def registered_modules() -> list[str]:
+    """遅延登録されたモジュール名一覧."""
+    return sorted(_registered)
+
+
+def preload(names: list[str] | None = None) -> dict[str, float]:
+    """遅延モジュールを先に読み込み、モジュールごとの所要秒数を返す.
+
+    Args:
+        names: 読み込むモジュール名（省略時は登録済みすべて）
+    """
+    timings: dict[str, float] = {}
+    for name in names or registered_modules():
+        started = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = time.perf_counter() - started
+    return timings
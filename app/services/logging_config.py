@@ -8,11 +8,6 @@ import os
 from collections.abc import MutableMapping
 from typing import Any
 
-try:
-    from google.cloud import logging as cloud_logging
-except ModuleNotFoundError:
-    cloud_logging = None
-
 # グローバル変数でロギング初期化状態を管理
 _logging_initialized = False
 
@@ -31,6 +26,12 @@ def setup_logging() -> None:
         return
 
     if is_cloud_run():
+        # google.cloud.loggingはimportが重いためCloud Run上でのみ読み込む
+        try:
+            from google.cloud import logging as cloud_logging
+        except ModuleNotFoundError:
+            cloud_logging = None
+
         if cloud_logging is None:
             logging.basicConfig(
                 level=logging.INFO,
@@ -9,7 +9,10 @@ import streamlit as st
 
 from app.services.auth import get_oauth_config
 from app.services.cache import delete_all_user_data
+from app.services.github import discard_github_client
 from app.services.logging_config import log_structured
+from app.services.repo_prefetch import discard_prefetched
+from app.services.repo_speculation import discard_speculation
 from app.services.session import (
     get_session_id,
     invalidate_session,
@@ -65,7 +68,11 @@ def logout(cookie_manager=None) -> None:
     access_token = st.session_state.get(ACCESS_TOKEN)
     if access_token:
         revoke_github_token(access_token)
+        discard_github_client(access_token)
         logger.info("GitHub token revoked: user_id=%s", user_id)
+    if user:
+        discard_prefetched(user.login)
+        discard_speculation(user.login)
 
     # 永続化セッションの削除
     session_id = get_session_id(cookie_manager)
@@ -0,0 +1,297 @@
+"""依存ファイル（マニフェスト）の解析.
+
+プロファイル生成のプロンプトには依存ファイルの内容をそのまま（1000文字で切り詰めて）
+渡していたため、切り詰めで依存が欠け、バージョン指定や書式の分だけトークンを使っていた。
+github.DEPENDENCY_FILES の各形式をローカルで解析し、エコシステムごとの
+正規化・重複除去したパッケージ名の一覧にする。
+
+- 正規化: PyPIはPEP 503（小文字・区切りを "-"）、npm・Composerは小文字、
+  Mavenは "groupId:artifactId"、Go・Cargo・RubyGemsはそのまま
+- 解析結果はファイル名とblob SHAでキャッシュする（同じ内容は再解析しない）
+- 内容は取得時に切り詰められている場合がある。JSON・TOMLとして読めなければ、
+  読める範囲（JSONは依存セクションの走査、TOMLは完結しているテーブルまで）から取り出す
+- 解析できない（対象外の形式・依存が1件もない）ファイルは None
+
+    dependencies = repo_dependencies(repo.dependency_files)
+    # {"npm": ["react", "vite"], "pypi": ["fastapi"]}
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import tomllib
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from app.services.const import MANIFEST_CACHE_SIZE
+
+# 1エコシステムあたりプロンプトに含める依存の上限
+MAX_DEPENDENCIES = 100
+
+_PEP503_SEPARATORS = re.compile(r"[-_.]+")
+# PEP 508 の先頭（パッケージ名）
+_PEP508_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_EGG_NAME = re.compile(r"#egg=([A-Za-z0-9][A-Za-z0-9._-]*)")
+_GO_REQUIRE = re.compile(r"^\s*(?:require\s+)?([^\s()]+)\s+v\S+(.*)$")
+_GEM = re.compile(r"""^\s*gem\s*\(?\s*["']([^"']+)["']""", re.MULTILINE)
+_POM_DEPENDENCY = re.compile(r"<dependency>(.*?)</dependency>", re.DOTALL)
+_POM_GROUP = re.compile(r"<groupId>\s*([^<\s]+)\s*</groupId>")
+_POM_ARTIFACT = re.compile(r"<artifactId>\s*([^<\s]+)\s*</artifactId>")
+_GRADLE_DEPENDENCY = re.compile(
+    r"""\b(?:implementation|api|compile|compileOnly|runtimeOnly|testImplementation|
+    testCompileOnly|testRuntimeOnly|annotationProcessor|kapt|ksp|classpath)
+    \s*\(?\s*["']([\w.-]+):([\w.-]+)(?::[^"']*)?["']""",
+    re.VERBOSE,
+)
+_GRADLE_MAP = re.compile(
+    r"""group\s*:\s*["']([\w.-]+)["']\s*,\s*name\s*:\s*["']([\w.-]+)["']"""
+)
+
+NPM_SECTIONS = (
+    "dependencies",
+    "devDependencies",
+    "peerDependencies",
+    "optionalDependencies",
+)
+COMPOSER_SECTIONS = ("require", "require-dev")
+CARGO_SECTIONS = ("dependencies", "dev-dependencies", "build-dependencies")
+
+
+class _DependencyFile(Protocol):
+    path: str
+    content: str
+    sha: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class Manifest:
+    """1ファイル分の解析結果."""
+
+    ecosystem: str
+    dependencies: tuple[str, ...]
+
+
+def normalize_pypi(name: str) -> str:
+    """PEP 503 の正規化."""
+    return _PEP503_SEPARATORS.sub("-", name).lower()
+
+
+def _dedupe(names: Iterable[str]) -> tuple[str, ...]:
+    """出現順を保って重複を除く."""
+    return tuple(dict.fromkeys(name for name in names if name))
+
+
+def _json_sections(text: str, sections: Iterable[str]) -> Iterator[str]:
+    """JSONの依存セクションのキー（切り詰められていれば読める範囲を走査）."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    if isinstance(data, dict):
+        for section in sections:
+            value = data.get(section)
+            if isinstance(value, dict):
+                yield from value
+        return
+    for section in sections:
+        for match in re.finditer(rf'"{re.escape(section)}"\s*:\s*\{{', text):
+            body = text[match.end() :]
+            end = body.find("}")
+            yield from re.findall(r'"([^"]+)"\s*:', body if end < 0 else body[:end])
+
+
+def _load_toml(text: str) -> dict[str, Any]:
+    """TOMLを読む（切り詰められていれば完結しているテーブルまで）."""
+    try:
+        return tomllib.loads(text)
+    except tomllib.TOMLDecodeError:
+        pass
+    # 途中で切れたテーブルから順に落とす
+    headers = [m.start() for m in re.finditer(r"^\[", text, re.MULTILINE)]
+    for start in reversed(headers):
+        try:
+            return tomllib.loads(text[:start])
+        except tomllib.TOMLDecodeError:
+            continue
+    return {}
+
+
+def _table(data: Any, *keys: str) -> dict[str, Any]:
+    for key in keys:
+        data = data.get(key) if isinstance(data, dict) else None
+    return data if isinstance(data, dict) else {}
+
+
+def _pep508_names(requirements: Any) -> Iterator[str]:
+    if not isinstance(requirements, list):
+        return
+    for requirement in requirements:
+        if isinstance(requirement, str) and (match := _PEP508_NAME.match(requirement)):
+            yield normalize_pypi(match.group(1))
+
+
+def parse_package_json(text: str) -> list[str]:
+    """package.json（dependencies / devDependencies / peer / optional）."""
+    return [name.lower() for name in _json_sections(text, NPM_SECTIONS)]
+
+
+def parse_composer_json(text: str) -> list[str]:
+    """composer.json（require / require-dev、PHP本体・拡張は除く）."""
+    return [
+        name.lower() for name in _json_sections(text, COMPOSER_SECTIONS) if "/" in name
+    ]
+
+
+def parse_requirements_txt(text: str) -> list[str]:
+    """requirements.txt（オプション行・URLは #egg= があるもののみ）."""
+    names: list[str] = []
+    for raw in text.splitlines():
+        line = raw.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-") or "://" in line:
+            if match := _EGG_NAME.search(line):
+                names.append(normalize_pypi(match.group(1)))
+            continue
+        if match := _PEP508_NAME.match(line):
+            names.append(normalize_pypi(match.group(1)))
+    return names
+
+
+def parse_pyproject_toml(text: str) -> list[str]:
+    """pyproject.toml（PEP 621・PEP 735 のグループ・Poetry）."""
+    data = _load_toml(text)
+    project = _table(data, "project")
+    names = list(_pep508_names(project.get("dependencies")))
+    for group in _table(project, "optional-dependencies").values():
+        names.extend(_pep508_names(group))
+    for group in _table(data, "dependency-groups").values():
+        names.extend(_pep508_names(group))
+    poetry = _table(data, "tool", "poetry")
+    tables = [_table(poetry, "dependencies"), _table(poetry, "dev-dependencies")]
+    tables.extend(
+        _table(group, "dependencies") for group in _table(poetry, "group").values()
+    )
+    for table in tables:
+        names.extend(normalize_pypi(name) for name in table if name != "python")
+    return names
+
+
+def parse_cargo_toml(text: str) -> list[str]:
+    """Cargo.toml（package = で名前を変えた依存は実際のクレート名）."""
+    data = _load_toml(text)
+    tables = [_table(data, section) for section in CARGO_SECTIONS]
+    tables.append(_table(data, "workspace", "dependencies"))
+    for target in _table(data, "target").values():
+        tables.extend(_table(target, section) for section in CARGO_SECTIONS)
+    names: list[str] = []
+    for table in tables:
+        for name, spec in table.items():
+            package = spec.get("package") if isinstance(spec, dict) else None
+            names.append(package if isinstance(package, str) else name)
+    return names
+
+
+def parse_go_mod(text: str) -> list[str]:
+    """go.mod（require の直接依存、// indirect は除く）."""
+    names: list[str] = []
+    in_block = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("require ("):
+            in_block = True
+            continue
+        if in_block and line.startswith(")"):
+            in_block = False
+            continue
+        if not in_block and not line.startswith("require "):
+            continue
+        match = _GO_REQUIRE.match(line)
+        if match and "// indirect" not in match.group(2):
+            names.append(match.group(1))
+    return names
+
+
+def parse_gemfile(text: str) -> list[str]:
+    """Gemfile（gem "name"）."""
+    return _GEM.findall(text)
+
+
+def parse_pom_xml(text: str) -> list[str]:
+    """pom.xml（<dependency> の groupId:artifactId）."""
+    names: list[str] = []
+    for block in _POM_DEPENDENCY.findall(text):
+        group = _POM_GROUP.search(block)
+        artifact = _POM_ARTIFACT.search(block)
+        if group and artifact:
+            names.append(f"{group.group(1)}:{artifact.group(1)}")
+    return names
+
+
+def parse_build_gradle(text: str) -> list[str]:
+    """build.gradle（"group:name:version" と group: / name: の記法）."""
+    matches = [*_GRADLE_DEPENDENCY.finditer(text), *_GRADLE_MAP.finditer(text)]
+    matches.sort(key=lambda match: match.start())
+    return [f"{match.group(1)}:{match.group(2)}" for match in matches]
+
+
+# ファイル名 → (エコシステム, 解析関数)
+PARSERS: dict[str, tuple[str, Callable[[str], list[str]]]] = {
+    "package.json": ("npm", parse_package_json),
+    "requirements.txt": ("pypi", parse_requirements_txt),
+    "pyproject.toml": ("pypi", parse_pyproject_toml),
+    "Cargo.toml": ("cargo", parse_cargo_toml),
+    "go.mod": ("go", parse_go_mod),
+    "Gemfile": ("rubygems", parse_gemfile),
+    "pom.xml": ("maven", parse_pom_xml),
+    "build.gradle": ("maven", parse_build_gradle),
+    "composer.json": ("packagist", parse_composer_json),
+}
+
+# (ファイル名, blob SHA) → 解析結果
+_cache: OrderedDict[tuple[str, str], Manifest | None] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _parse(name: str, content: str) -> Manifest | None:
+    ecosystem, parser = PARSERS[name]
+    dependencies = _dedupe(parser(content))
+    return Manifest(ecosystem, dependencies) if dependencies else None
+
+
+def parse_manifest(path: str, content: str, sha: str | None = None) -> Manifest | None:
+    """依存ファイルを解析（sha があれば結果をキャッシュする）."""
+    name = path.rpartition("/")[2]
+    if name not in PARSERS:
+        return None
+    if sha is None:
+        return _parse(name, content)
+    key = (name, sha)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    manifest = _parse(name, content)
+    with _cache_lock:
+        _cache[key] = manifest
+        while len(_cache) > MANIFEST_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return manifest
+
+
+def repo_dependencies(files: Iterable[_DependencyFile]) -> dict[str, list[str]]:
+    """リポジトリの依存ファイルからエコシステムごとの依存一覧を作る."""
+    merged: dict[str, dict[str, None]] = {}
+    for file in files:
+        manifest = parse_manifest(file.path, file.content, file.sha)
+        if manifest is not None:
+            merged.setdefault(manifest.ecosystem, {}).update(
+                dict.fromkeys(manifest.dependencies)
+            )
+    return {
+        ecosystem: list(names)[:MAX_DEPENDENCIES] for ecosystem, names in merged.items()
+    }
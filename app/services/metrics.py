@@ -0,0 +1,328 @@
+"""プロセス内メトリクスレジストリ（カウンタ・ゲージ・レイテンシヒストグラム）.
+
+外部呼び出し（Firestore / GitHub / Vertex AI / Perplexity）のレイテンシと
+成否を集計し、依存先ごとのp95/p99 SLOを設定できるようにする。
+
+    with observe_call("firestore", "profiles.get"):
+        doc = doc_ref.get()
+
+計測はクライアントの呼び出し1回ごとに行う（複数回呼ぶヘルパーや、例外を
+握りつぶすヘルパー全体を囲むと、レイテンシも成否も実態と合わなくなる）。
+`tracing.span(..., dependency="vertex")` も内部でこれを使う。
+
+出力:
+    - Prometheus形式: `METRICS_PORT` を設定するとサイドポートで `/metrics` を公開
+    - Cloud Logging: `METRICS_LOG_CALLS` を有効にすると呼び出し1回ごとに
+      "Dependency call" を構造化ログで出力（terraform/monitoring.tf のログベース指標が
+      レイテンシの分布に集計し、分位点はCloud Monitoring側で求める）
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.const import METRICS_LOG_CALLS, METRICS_PORT
+from app.services.logging_config import log_structured
+
+logger = logging.getLogger(__name__)
+
+Labels = tuple[tuple[str, str], ...]
+
+# 依存先ごとの外部呼び出しメトリクス名
+CALLS_METRIC = "dependency_calls"
+LATENCY_METRIC = "dependency_latency_ms"
+
+# Prometheus出力・集計する分位点
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class Counter:
+    """単調増加するカウンタ."""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """加算."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """現在値."""
+        return self._value
+
+
+class Gauge:
+    """任意に増減する値."""
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        """値をセット."""
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        """加算（負の値で減算）."""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """現在値."""
+        return self._value
+
+
+class Histogram:
+    """HDR方式のヒストグラム（相対誤差を一定に保つ対数線形バケット）.
+
+    値はマイクロ秒単位の整数に丸めて記録し、2の冪ごとの区間を
+    2^SUB_BUCKET_BITS 個に等分する。固定バケットと異なり範囲の事前指定が不要で、
+    p99のようなテールの分位点も相対誤差約1.6%以内で求められる。
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    def __init__(self) -> None:
+        self._buckets: dict[tuple[int, int], int] = {}
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _bucket(cls, value_us: int) -> tuple[int, int]:
+        shift = max(value_us.bit_length() - cls.SUB_BUCKET_BITS, 0)
+        return shift, value_us >> shift
+
+    @staticmethod
+    def _bucket_midpoint(bucket: tuple[int, int]) -> float:
+        shift, sub = bucket
+        return ((sub << shift) + ((1 << shift) - 1) / 2) / 1000
+
+    def observe(self, value_ms: float) -> None:
+        """値（ミリ秒）を記録."""
+        bucket = self._bucket(max(int(value_ms * 1000), 0))
+        with self._lock:
+            self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+            self._count += 1
+            self._sum += value_ms
+            self._max = max(self._max, value_ms)
+
+    @property
+    def count(self) -> int:
+        """記録件数."""
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """記録値の合計（ミリ秒）."""
+        return self._sum
+
+    def quantile(self, q: float) -> float:
+        """分位点（ミリ秒）を返す（記録がなければ0）."""
+        with self._lock:
+            if not self._count:
+                return 0.0
+            rank = q * self._count
+            seen = 0
+            for bucket in sorted(self._buckets):
+                seen += self._buckets[bucket]
+                if seen >= rank:
+                    return min(self._bucket_midpoint(bucket), self._max)
+            return self._max
+
+
+class MetricsRegistry:
+    """名前とラベルでメトリクスを管理するレジストリ."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[tuple[str, Labels], Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: type, name: str, labels: dict[str, str]):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, kind())
+        if not isinstance(metric, kind):
+            raise TypeError(f"{name} is already registered as {type(metric).__name__}")
+        return metric
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        """カウンタを取得（未登録なら作成）."""
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, **labels: str) -> Gauge:
+        """ゲージを取得（未登録なら作成）."""
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """ヒストグラムを取得（未登録なら作成）."""
+        return self._get(Histogram, name, labels)
+
+    def items(self) -> list[tuple[str, Labels, Counter | Gauge | Histogram]]:
+        """登録済みメトリクスを (名前, ラベル, メトリクス) で返す."""
+        with self._lock:
+            return [(name, labels, m) for (name, labels), m in self._metrics.items()]
+
+    def clear(self) -> None:
+        """全メトリクスを削除（テスト用）."""
+        with self._lock:
+            self._metrics.clear()
+
+
+registry = MetricsRegistry()
+
+
+@dataclass
+class Call:
+    """計測中の外部呼び出し（例外以外の失敗は outcome を書き換えて記録する）."""
+
+    outcome: str = "ok"
+
+
+@contextmanager
+def observe_call(dependency: str, operation: str) -> Iterator[Call]:
+    """外部呼び出し1回分のレイテンシと成否を記録する."""
+    started = time.perf_counter()
+    call = Call()
+    try:
+        yield call
+    except Exception:
+        call.outcome = "error"
+        raise
+    finally:
+        record_call(
+            dependency, operation, (time.perf_counter() - started) * 1000, call.outcome
+        )
+
+
+def record_call(
+    dependency: str, operation: str, latency_ms: float, outcome: str = "ok"
+) -> None:
+    """計測済みの外部呼び出しを記録."""
+    registry.counter(
+        CALLS_METRIC, dependency=dependency, operation=operation, outcome=outcome
+    ).inc()
+    registry.histogram(
+        LATENCY_METRIC, dependency=dependency, operation=operation
+    ).observe(latency_ms)
+    if METRICS_LOG_CALLS:
+        log_structured(
+            logger,
+            "Dependency call",
+            dependency=dependency,
+            operation=operation,
+            outcome=outcome,
+            latency_ms=round(latency_ms, 3),
+        )
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus() -> str:
+    """Prometheusのテキスト形式で出力（ヒストグラムはsummaryとして分位点を出す）."""
+    lines: list[str] = []
+    typed: set[str] = set()
+    for name, labels, metric in sorted(
+        registry.items(), key=lambda item: (item[0], item[1])
+    ):
+        if isinstance(metric, Counter):
+            metric_name = f"{name}_total"
+            kind = "counter"
+        elif isinstance(metric, Gauge):
+            metric_name = name
+            kind = "gauge"
+        else:
+            metric_name = name
+            kind = "summary"
+        if metric_name not in typed:
+            lines.append(f"# TYPE {metric_name} {kind}")
+            typed.add(metric_name)
+
+        if isinstance(metric, Histogram):
+            for q in QUANTILES:
+                quantile_labels = _format_labels(labels, quantile=str(q))
+                lines.append(f"{name}{quantile_labels} {metric.quantile(q)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+        else:
+            lines.append(f"{metric_name}{_format_labels(labels)} {metric.value}")
+    return "\n".join(lines) + "\n"
+
+
+def dependency_summary() -> list[dict[str, object]]:
+    """依存先・操作ごとの件数、エラー数、分位点の一覧."""
+    errors: dict[Labels, float] = {}
+    for name, labels, metric in registry.items():
+        if name == CALLS_METRIC and dict(labels).get("outcome") == "error":
+            key = tuple(item for item in labels if item[0] != "outcome")
+            errors[key] = errors.get(key, 0) + metric.value  # type: ignore[union-attr]
+
+    summary: list[dict[str, object]] = []
+    for name, labels, metric in sorted(
+        registry.items(), key=lambda item: (item[0], item[1])
+    ):
+        if name != LATENCY_METRIC or not isinstance(metric, Histogram):
+            continue
+        summary.append(
+            {
+                **dict(labels),
+                "count": metric.count,
+                "errors": int(errors.get(labels, 0)),
+                **{
+                    f"p{round(q * 100)}_ms": round(metric.quantile(q), 2)
+                    for q in QUANTILES
+                },
+            }
+        )
+    return summary
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """スクレイプごとのアクセスログは出さない."""
+
+
+def start_metrics_server(port: int | None = METRICS_PORT) -> ThreadingHTTPServer | None:
+    """Prometheus形式の `/metrics` をサイドポートで公開（portが未設定なら何もしない）."""
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    ).start()
+    log_structured(logger, "Metrics endpoint started", port=port)
+    return server
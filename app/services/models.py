@@ -20,6 +20,8 @@ class FileContent(BaseModel):
 
     path: str
     content: str
+    # git blob SHA（BlobStoreのキー、切り詰め前の内容に対する値）
+    sha: str | None = None
 
 
 class RepoMetadata(BaseModel):
@@ -31,6 +33,7 @@ class RepoMetadata(BaseModel):
     language: str | None
     stars: int
     is_fork: bool
+    is_archived: bool = False
 
 
 class RepoInfo(BaseModel):
@@ -46,10 +49,12 @@ class RepoInfo(BaseModel):
     forks: int
     updated_at: str
     is_fork: bool = False
+    is_archived: bool = False
     file_structure: list[str] = Field(default_factory=list)
     dependency_files: list[FileContent] = Field(default_factory=list)
     main_files: list[FileContent] = Field(default_factory=list)
     config_files: list[str] = Field(default_factory=list)
+    readme_sha: str | None = None
 
 
 class TechStack(BaseModel):
@@ -128,6 +133,14 @@ class JobSearchResult(BaseModel):
     status: str
     error: str | None = None
 
+    def latest(self, count: int) -> JobSearchResult:
+        """直近 count 件の求人のみを残した結果（古いものから削除）."""
+        if len(self.recommendations) <= count:
+            return self
+        return self.model_copy(
+            update={"recommendations": self.recommendations[-count:]}
+        )
+
 
 class JobPreferences(BaseModel):
     """求職者の希望条件."""
@@ -0,0 +1,175 @@
+"""リポジトリのパス一覧の索引（ファイル探索用）.
+
+get_repo_structure が返すパス一覧（幅優先の順）に対して、依存ファイル・主要コード・
+設定ファイル・READMEの探索で「パスが存在するか」「ディレクトリ配下に何かあるか」を
+何度も調べる。リストを毎回走査すると パターン数 × 接頭辞数 × パス数 になるため、
+リポジトリごとに1回だけ索引を作り、すべての探索で共有する。
+
+- ディレクトリ単位: "/" で区切ったトライ（各ノードに配下で最初に現れるパスの位置を持つ）
+- 完全一致・接頭辞: パス → トライのノードのハッシュ表（トライを辿らずに引ける）
+- ファイル名: 名前 → パス一覧（モノレポの packages/*/package.json 等を深さ指定で探す。
+  初回の find_name で作る）
+- グロブ: セグメントごとの fnmatch（"**" は0個以上のディレクトリ）
+
+幅優先の一覧では親ディレクトリが子より先に現れるため、構築は親のノードを
+ハッシュ表から引いて1セグメント足すだけで済む（パス全体を分割しない）。
+
+結果は常に元のパス一覧の順（幅優先）で返す。
+
+    index = PathIndex(structure)
+    "package.json" in index
+    index.first_under(".github/workflows")
+    index.glob("packages/*/package.json")
+"""
+
+from __future__ import annotations
+
+import fnmatch
+from collections.abc import Iterator, Sequence
+
+# グロブとして扱う文字（含まなければ子ノードを直接引く）
+_GLOB_CHARS = frozenset("*?[")
+
+
+class _Node:
+    """トライの1ディレクトリ（またはファイル）."""
+
+    __slots__ = ("children", "first", "index")
+
+    def __init__(self, first: int, index: int = -1) -> None:
+        # 子ノード（大半を占めるファイルでは作らない）
+        self.children: dict[str, _Node] | None = None
+        # 配下（自身を含む）で最初に現れるパスの位置
+        self.first = first
+        # 自身がパス一覧に含まれていればその位置（-1: 含まれない中間ディレクトリ）
+        self.index = index
+
+    def child(self, name: str, first: int) -> _Node:
+        """子ノードを取得（なければ作る）."""
+        if self.children is None:
+            self.children = {}
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = _Node(first)
+        return node
+
+
+class PathIndex:
+    """パス一覧のトライ + ノードのハッシュ表 + ファイル名の索引."""
+
+    __slots__ = ("_by_name", "_nodes", "_paths", "_root")
+
+    def __init__(self, paths: Sequence[str]) -> None:
+        self._paths = paths
+        self._root = _Node(0)
+        # パス（中間ディレクトリを含む）→ ノード
+        self._nodes: dict[str, _Node] = {}
+        self._by_name: dict[str, list[int]] | None = None
+        nodes = self._nodes
+        for position, path in enumerate(paths):
+            node = nodes.get(path)
+            if node is not None:
+                # _ensure で作った中間ディレクトリ、または重複したパス
+                if node.index < 0:
+                    node.index = position
+                continue
+            parent_path, _, name = path.rpartition("/")
+            parent = nodes.get(parent_path) if parent_path else self._root
+            if parent is None:
+                parent = self._ensure(parent_path, position)
+            if parent.children is None:
+                parent.children = {}
+            # 位置は昇順に追加されるため、作成時の位置が配下の最小値になる
+            node = parent.children[name] = nodes[path] = _Node(position, position)
+
+    def _ensure(self, directory: str, position: int) -> _Node:
+        """一覧に現れていない中間ディレクトリのノードを作る."""
+        node = self._root
+        prefix = ""
+        for segment in directory.split("/"):
+            prefix = f"{prefix}/{segment}" if prefix else segment
+            node = self._nodes[prefix] = node.child(segment, position)
+        return node
+
+    @classmethod
+    def of(cls, structure: PathIndex | Sequence[str]) -> PathIndex:
+        """索引を取得（既に索引ならそのまま返す）."""
+        return structure if isinstance(structure, PathIndex) else cls(structure)
+
+    @property
+    def paths(self) -> Sequence[str]:
+        """元のパス一覧."""
+        return self._paths
+
+    def __contains__(self, path: object) -> bool:
+        node = self._nodes.get(path) if isinstance(path, str) else None
+        return node is not None and node.index >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def _node(self, prefix: str) -> _Node | None:
+        stripped = prefix.strip("/")
+        return self._nodes.get(stripped) if stripped else self._root
+
+    def has_dir(self, directory: str) -> bool:
+        """directory/ 配下にパスがあるか."""
+        node = self._node(directory)
+        return node is not None and bool(node.children)
+
+    def first_under(self, path: str) -> str | None:
+        """path 自身または path/ 配下で最初に現れるパス."""
+        node = self._node(path)
+        return None if node is None else self._paths[node.first]
+
+    def list_dir(self, directory: str = "") -> list[str]:
+        """directory 直下のパス."""
+        node = self._node(directory)
+        if node is None or node.children is None:
+            return []
+        return [
+            self._paths[i]
+            for i in sorted(c.index for c in node.children.values() if c.index >= 0)
+        ]
+
+    def find_name(self, name: str, max_depth: int | None = None) -> list[str]:
+        """ファイル名が name のパス（max_depth: ルート直下を0とした深さの上限）."""
+        if self._by_name is None:
+            by_name: dict[str, list[int]] = {}
+            for position, path in enumerate(self._paths):
+                by_name.setdefault(path.rpartition("/")[2], []).append(position)
+            self._by_name = by_name
+        paths = (self._paths[i] for i in self._by_name.get(name, ()))
+        if max_depth is None:
+            return list(paths)
+        return [p for p in paths if p.count("/") <= max_depth]
+
+    def glob(self, pattern: str) -> list[str]:
+        """グロブに一致するパス（"*" "?" "[...]" はセグメント内、"**" は複数階層）."""
+        matches: set[int] = set()
+        self._glob(self._root, pattern.strip("/").split("/"), matches)
+        return [self._paths[i] for i in sorted(matches)]
+
+    def _glob(self, node: _Node, segments: list[str], matches: set[int]) -> None:
+        if not segments:
+            if node.index >= 0:
+                matches.add(node.index)
+            return
+        head, rest = segments[0], segments[1:]
+        children = node.children or {}
+        if head == "**":
+            # 0階層 + 子ノードごとに "**" を残して1階層進む
+            self._glob(node, rest, matches)
+            for child in children.values():
+                self._glob(child, segments, matches)
+        elif _GLOB_CHARS.isdisjoint(head):
+            child = children.get(head)
+            if child is not None:
+                self._glob(child, rest, matches)
+        else:
+            for name, child in children.items():
+                if fnmatch.fnmatchcase(name, head):
+                    self._glob(child, rest, matches)
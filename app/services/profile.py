@@ -1,36 +1,192 @@
 """Profile generation using LLM (Vertex AI)."""
 
+import contextvars
+import functools
 import json
+import logging
 import os
+import re
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
 
-import vertexai
-from langchain_core.output_parsers import PydanticOutputParser
-from vertexai.generative_models import GenerativeModel
-
+from app.services.analysis_plan import AnalysisPlan
+from app.services.const import PROFILE_LLM_TIMEOUT_SECONDS, PROFILE_LLM_WORKERS
+from app.services.lazy_import import lazy_attr, lazy_module
+from app.services.logging_config import log_structured
+from app.services.manifests import parse_manifest, repo_dependencies
+from app.services.metrics import registry
 from app.services.models import DeveloperProfile, RepoInfo
+from app.services.quick_profile import merge_profiles, quick_profile
+from app.services.repo_record import RepoRecord
+from app.services.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
+# vertexai はimportが重いため初回生成時まで遅延
+vertexai = lazy_module("vertexai")
+GenerativeModel = lazy_attr("vertexai.generative_models", "GenerativeModel")
+GenerationConfig = lazy_attr("vertexai.generative_models", "GenerationConfig")
+
+# Vertex AIの response_schema（OpenAPIのサブセット）で使えるキー
+_SCHEMA_KEYS = {"type", "description", "properties", "required", "items", "enum"}
+_CODE_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+class ProfileParseError(ValueError):
+    """LLMの出力をプロファイルとして読めない."""
+
+
+def _inline_schema(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    """$ref を展開し、response_schema で使えないキー（title・default等）を除く."""
+    if "$ref" in schema:
+        resolved = defs[schema["$ref"].rsplit("/", 1)[-1]]
+        # 参照先の説明より、フィールド側の説明を優先する
+        schema = {**resolved, **{k: v for k, v in schema.items() if k != "$ref"}}
+    result: dict[str, Any] = {}
+    for key, value in schema.items():
+        if key not in _SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: _inline_schema(prop, defs) for name, prop in value.items()}
+        elif key == "items":
+            value = _inline_schema(value, defs)
+        result[key] = value
+    return result
+
+
+@functools.cache
+def profile_response_schema() -> dict[str, Any]:
+    """DeveloperProfile から作る response_schema."""
+    schema = DeveloperProfile.model_json_schema()
+    return _inline_schema(schema, schema.get("$defs", {}))
+
+
+def _close_truncated(text: str) -> str:
+    """出力上限で途中で切れたJSONの開いている文字列・括弧を閉じる."""
+    stack: list[str] = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text.rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def parse_profile(text: str) -> DeveloperProfile:
+    """LLMの出力（JSON）をプロファイルとして読む.
+
+    response_schema 指定時の出力はそのまま検証できる。読めない場合のみ、
+    コードブロック・前後の説明文・末尾のカンマ・途中で切れた括弧を補修して読み直す。
+
+    Raises:
+        ProfileParseError: 補修しても読めない
+    """
+    try:
+        profile = DeveloperProfile.model_validate_json(text)
+    except ValueError:
+        pass
+    else:
+        registry.counter("profile_parse", outcome="native").inc()
+        return profile
+    repaired = _CODE_FENCE.sub("", text.strip())
+    start = repaired.find("{")
+    if start < 0:
+        raise ProfileParseError("No JSON object in response")
+    end = repaired.rfind("}")
+    candidates = [repaired[start : end + 1]] if end > start else []
+    candidates.append(_close_truncated(repaired[start:]))
+    for candidate in candidates:
+        try:
+            data = json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+            profile = DeveloperProfile.model_validate(data)
+        except ValueError:
+            continue
+        registry.counter("profile_parse", outcome="repaired").inc()
+        return profile
+    raise ProfileParseError("Response is not a valid profile")
+
+
+def _chunk_text(chunk: Any) -> str:
+    """ストリームの1チャンクのテキスト（終了理由のみのチャンク等は空）."""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def _read_stream(stream: Any, deadline: float | None) -> str:
+    """生成のストリームを読み、deadline を過ぎたら閉じて（RPCを取り消して）打ち切る."""
+    parts: list[str] = []
+    try:
+        for chunk in stream:
+            parts.append(_chunk_text(chunk))
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("Profile generation exceeded its deadline")
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+    return "".join(parts)
+
+
+_vertex_initialized = False
 
 
 def init_vertex_ai():
-    """Initialize Vertex AI with project settings."""
+    """Initialize Vertex AI with project settings (once per process)."""
+    global _vertex_initialized
+    if _vertex_initialized:
+        return
     project_id = os.getenv("GCP_PROJECT_ID")
     location = os.getenv("GCP_LOCATION", "asia-northeast1")
     vertexai.init(project=project_id, location=location)
+    _vertex_initialized = True
 
 
-def generate_profile(repos: list[RepoInfo]) -> dict:
+@traced()
+def generate_profile(
+    repos: Sequence[RepoRecord | RepoInfo],
+    plan: AnalysisPlan | None = None,
+    deadline: float | None = None,
+) -> dict:
     """Generate a developer profile from GitHub repositories using LLM.
 
     Analyzes repositories from a recruiter's perspective.
+    プロンプトには plan でプロファイルに使うと分類したリポジトリのみを含める
+    （plan がなければ repos から作る）。
+
+    Vertex AIのSDKはリクエストのタイムアウトを指定できないため、応答をストリームで
+    受け取り、deadline（time.monotonic() の値）を過ぎたらストリームを閉じて打ち切る。
+
+    Raises:
+        TimeoutError: deadline までに生成が終わらなかった
     """
+    plan = plan if plan is not None else AnalysisPlan.for_repos(repos)
     init_vertex_ai()
     model = GenerativeModel("gemini-2.5-flash")
-    parser = PydanticOutputParser(pydantic_object=DeveloperProfile)
 
     # Prepare repository summaries
     repo_summaries = []
     for repo in repos:
-        # フォークは除外（オリジナル作品を重視）
-        if repo.is_fork:
+        # フォーク・アーカイブは除外（オリジナル作品・現在の技術力を重視）
+        if not plan.is_profiled(repo.name):
             continue
 
         summary = {
@@ -43,9 +199,12 @@ def generate_profile(repos: list[RepoInfo]) -> dict:
             "readme_preview": repo.readme[:2000] if repo.readme else None,
             "file_structure": repo.file_structure[:50],  # 最大50ファイル
             "config_files": repo.config_files,
-            "dependencies": [
+            # 依存ファイルは解析したパッケージ名のみ（解析できないものは内容の先頭）
+            "dependencies": repo_dependencies(repo.dependency_files),
+            "dependency_files": [
                 {"path": f.path, "content": f.content[:1000]}
                 for f in repo.dependency_files
+                if parse_manifest(f.path, f.content, f.sha) is None and f.content
             ],
             "code_samples": [
                 {"path": f.path, "content": f.content[:1500]} for f in repo.main_files
@@ -60,7 +219,7 @@ def generate_profile(repos: list[RepoInfo]) -> dict:
 - リポジトリ基本情報（名前、説明、言語、トピック、スター数）
 - ファイル構造（プロジェクトの構成）
 - 設定ファイル（Dockerfile、CI/CD、Terraform等）
-- 依存関係（package.json、requirements.txt等の内容）
+- 依存関係（package.json、requirements.txt等から抽出したエコシステムごとのパッケージ名）
 - コードサンプル（主要ファイルの実装内容）
 
 採用担当者として以下の観点で評価してください：
@@ -72,13 +231,100 @@ def generate_profile(repos: list[RepoInfo]) -> dict:
 6. マッチしそうな求人の特徴
 
 リポジトリ情報:
-{json.dumps(repo_summaries, ensure_ascii=False, indent=2)}
+{json.dumps(repo_summaries, ensure_ascii=False, indent=2)}"""
+
+    with span(
+        "profile.llm_generate", dependency="vertex", repo_count=len(repo_summaries)
+    ):
+        # 出力形式はプロンプトではなく response_schema で指定する
+        stream = model.generate_content(
+            prompt,
+            generation_config=GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=profile_response_schema(),
+            ),
+            stream=True,
+        )
+        text = _read_stream(stream, deadline)
+    with span("profile.parse"):
+        profile = parse_profile(text)
 
-{parser.get_format_instructions()}
+    return profile.model_dump()
 
-重要: 出力は純粋なJSONのみにしてください。マークダウンのコードブロック（```）や説明文は不要です。"""
 
-    response = model.generate_content(prompt)
-    profile = parser.parse(response.text)
+# LLMの呼び出しを待ち時間の上限付きで実行する
+_executor = ThreadPoolExecutor(
+    max_workers=PROFILE_LLM_WORKERS, thread_name_prefix="profile-llm"
+)
+# 実行中の呼び出し数。ワーカーが埋まっていれば待ち行列に積まずに縮退する
+_in_flight = threading.BoundedSemaphore(PROFILE_LLM_WORKERS)
 
-    return profile.model_dump()
+
+def _generate_in_worker(
+    repos: Sequence[RepoRecord | RepoInfo], plan: AnalysisPlan, deadline: float
+) -> dict:
+    try:
+        return generate_profile(repos, plan, deadline=deadline)
+    finally:
+        _in_flight.release()
+
+
+def generate_profile_or_quick(
+    repos: Sequence[RepoRecord | RepoInfo],
+    plan: AnalysisPlan | None = None,
+    quick: dict | None = None,
+    timeout: float = PROFILE_LLM_TIMEOUT_SECONDS,
+) -> tuple[dict, bool]:
+    """LLMでプロファイルを生成し、失敗・タイムアウト時は簡易プロファイルで縮退する.
+
+    生成できたプロファイルには簡易プロファイルの技術スタックを補う（merge_profiles）。
+    タイムアウトした呼び出しはワーカー側でも同じ期限でストリームを閉じて打ち切る
+    （最初のチャンクを待っている間は打ち切れない）。ワーカーがすべて使用中なら
+    待ち行列に積まず、すぐに簡易プロファイルを返す。
+
+    Args:
+        repos: 分析済みのリポジトリ
+        plan: 分析の計画（なければ repos から作る）
+        quick: 表示済みの簡易プロファイル（なければここで作る）
+        timeout: LLMの応答を待つ秒数
+
+    Returns:
+        (プロファイル, 簡易プロファイルで縮退したか)
+    """
+    plan = plan if plan is not None else AnalysisPlan.for_repos(repos)
+    quick = quick if quick is not None else quick_profile(repos, plan)
+    if not _in_flight.acquire(blocking=False):
+        registry.counter("profile_generation", outcome="saturated").inc()
+        log_structured(
+            logger,
+            "Profile generation workers are busy, using quick profile",
+            level=logging.WARNING,
+            workers=PROFILE_LLM_WORKERS,
+        )
+        return quick, True
+    deadline = time.monotonic() + timeout
+    future = _executor.submit(
+        contextvars.copy_context().run, _generate_in_worker, repos, plan, deadline
+    )
+    try:
+        generated = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        registry.counter("profile_generation", outcome="timeout").inc()
+        log_structured(
+            logger,
+            "Profile generation timed out, using quick profile",
+            level=logging.WARNING,
+            timeout=timeout,
+        )
+        return quick, True
+    except Exception:
+        registry.counter("profile_generation", outcome="error").inc()
+        log_structured(
+            logger,
+            "Profile generation failed, using quick profile",
+            level=logging.ERROR,
+            exc_info=True,
+        )
+        return quick, True
+    registry.counter("profile_generation", outcome="ok").inc()
+    return merge_profiles(quick, generated), False
@@ -0,0 +1,327 @@
+"""リポジトリの統計から作る簡易プロファイル（LLMを使わない）.
+
+generate_profile はGeminiの呼び出しに数秒〜数十秒かかる。技術スタックと得意領域は
+言語ごとのバイト数・トピック・設定ファイル・依存パッケージ名から決まる部分が大きいため、
+ローカルで決定的に推定した DeveloperProfile を先に表示し、LLMの結果が届いたら
+merge_profiles で置き換える。Vertex AIが遅い・使えない場合はこれを縮退版として使う。
+
+リポジトリ × 言語（・フレームワーク・インフラ）の行列をNumPyで作り、スター数による
+重み付きの割合から一度に集計する（リポジトリ数が増えても1回の行列積で済む）。
+
+- 言語: リポジトリごとのバイト数の割合を重み付き平均し、5%以上のもの
+- フレームワーク・インフラ: 依存パッケージ名（manifests）・トピック・設定ファイルの対応表
+- 得意領域: 言語・フレームワーク・インフラの割合 × 領域の対応表
+- フォーク・アーカイブは generate_profile と同じく AnalysisPlan で除外する
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+
+from app.services.analysis_plan import AnalysisPlan
+from app.services.lazy_import import lazy_module
+from app.services.manifests import repo_dependencies
+from app.services.models import (
+    DeveloperProfile,
+    JobFit,
+    NotableProject,
+    RepoInfo,
+    SkillAssessment,
+    TechStack,
+)
+from app.services.repo_record import RepoRecord
+
+np = lazy_module("numpy")
+
+AREAS = ["フロントエンド", "バックエンド", "インフラ", "データ・機械学習", "モバイル"]
+_FRONTEND, _BACKEND, _INFRA, _DATA, _MOBILE = AREAS
+
+# 言語 → 領域ごとの寄与
+LANGUAGE_AREAS: dict[str, dict[str, float]] = {
+    "JavaScript": {_FRONTEND: 0.7, _BACKEND: 0.3},
+    "TypeScript": {_FRONTEND: 0.7, _BACKEND: 0.3},
+    "HTML": {_FRONTEND: 1.0},
+    "CSS": {_FRONTEND: 1.0},
+    "SCSS": {_FRONTEND: 1.0},
+    "Vue": {_FRONTEND: 1.0},
+    "Svelte": {_FRONTEND: 1.0},
+    "Python": {_BACKEND: 0.6, _DATA: 0.4},
+    "Go": {_BACKEND: 0.8, _INFRA: 0.2},
+    "Rust": {_BACKEND: 1.0},
+    "Java": {_BACKEND: 0.8, _MOBILE: 0.2},
+    "Kotlin": {_MOBILE: 0.6, _BACKEND: 0.4},
+    "Scala": {_BACKEND: 0.6, _DATA: 0.4},
+    "Ruby": {_BACKEND: 1.0},
+    "PHP": {_BACKEND: 1.0},
+    "C#": {_BACKEND: 1.0},
+    "Elixir": {_BACKEND: 1.0},
+    "C": {_BACKEND: 1.0},
+    "C++": {_BACKEND: 1.0},
+    "Swift": {_MOBILE: 1.0},
+    "Objective-C": {_MOBILE: 1.0},
+    "Dart": {_MOBILE: 1.0},
+    "Jupyter Notebook": {_DATA: 1.0},
+    "R": {_DATA: 1.0},
+    "HCL": {_INFRA: 1.0},
+    "Shell": {_INFRA: 1.0},
+    "Dockerfile": {_INFRA: 1.0},
+    "Nix": {_INFRA: 1.0},
+}
+
+# 依存パッケージ名・トピック → (フレームワーク名, 領域)
+FRAMEWORKS: dict[str, tuple[str, str]] = {
+    "react": ("React", _FRONTEND),
+    "next": ("Next.js", _FRONTEND),
+    "nextjs": ("Next.js", _FRONTEND),
+    "vue": ("Vue.js", _FRONTEND),
+    "nuxt": ("Nuxt", _FRONTEND),
+    "svelte": ("Svelte", _FRONTEND),
+    "@angular/core": ("Angular", _FRONTEND),
+    "angular": ("Angular", _FRONTEND),
+    "tailwindcss": ("Tailwind CSS", _FRONTEND),
+    "express": ("Express", _BACKEND),
+    "@nestjs/core": ("NestJS", _BACKEND),
+    "fastapi": ("FastAPI", _BACKEND),
+    "django": ("Django", _BACKEND),
+    "flask": ("Flask", _BACKEND),
+    "streamlit": ("Streamlit", _DATA),
+    "github.com/gin-gonic/gin": ("Gin", _BACKEND),
+    "github.com/labstack/echo/v4": ("Echo", _BACKEND),
+    "actix-web": ("Actix Web", _BACKEND),
+    "axum": ("Axum", _BACKEND),
+    "rails": ("Ruby on Rails", _BACKEND),
+    "laravel/framework": ("Laravel", _BACKEND),
+    "org.springframework.boot:spring-boot-starter-web": ("Spring Boot", _BACKEND),
+    "org.springframework.boot:spring-boot-starter": ("Spring Boot", _BACKEND),
+    "torch": ("PyTorch", _DATA),
+    "pytorch": ("PyTorch", _DATA),
+    "tensorflow": ("TensorFlow", _DATA),
+    "scikit-learn": ("scikit-learn", _DATA),
+    "pandas": ("pandas", _DATA),
+    "numpy": ("NumPy", _DATA),
+    "transformers": ("Transformers", _DATA),
+    "langchain": ("LangChain", _DATA),
+    "react-native": ("React Native", _MOBILE),
+    "flutter": ("Flutter", _MOBILE),
+}
+
+# 設定ファイル（パスの先頭）・依存パッケージ名・トピック → インフラ技術名
+INFRA_CONFIG: dict[str, str] = {
+    "Dockerfile": "Docker",
+    "docker-compose.yml": "Docker Compose",
+    "docker-compose.yaml": "Docker Compose",
+    ".github/workflows": "GitHub Actions",
+    "terraform": "Terraform",
+}
+INFRA_NAMES: dict[str, str] = {
+    "docker": "Docker",
+    "kubernetes": "Kubernetes",
+    "k8s": "Kubernetes",
+    "terraform": "Terraform",
+    "aws": "AWS",
+    "boto3": "AWS",
+    "aws-sdk": "AWS",
+    "gcp": "Google Cloud",
+    "google-cloud": "Google Cloud",
+    "google-cloud-firestore": "Google Cloud",
+    "google-cloud-aiplatform": "Google Cloud",
+    "firebase": "Firebase",
+    "firebase-admin": "Firebase",
+    "azure": "Azure",
+    "vercel": "Vercel",
+}
+
+# 得意領域 → 職種
+AREA_ROLES: dict[str, str] = {
+    _FRONTEND: "フロントエンドエンジニア",
+    _BACKEND: "バックエンドエンジニア",
+    _INFRA: "SRE・インフラエンジニア",
+    _DATA: "データ・MLエンジニア",
+    _MOBILE: "モバイルアプリエンジニア",
+}
+
+# 言語として残す割合・得意領域とみなすスコアの下限
+MIN_LANGUAGE_SHARE = 0.05
+MIN_AREA_SCORE = 0.2
+MAX_LANGUAGES = 8
+MAX_FRAMEWORKS = 10
+MAX_NOTABLE_PROJECTS = 3
+MAX_INTERESTS = 5
+
+PENDING_ASSESSMENT = "未評価（リポジトリの統計のみから推定した簡易プロファイル）"
+
+
+def _repo_weights(repos: Sequence[RepoRecord | RepoInfo]):
+    """リポジトリの重み（スターの多いものをやや重視）."""
+    stars = np.array([max(repo.stars, 0) for repo in repos], dtype=np.float64)
+    return 1.0 + np.log1p(stars)
+
+
+def _weighted_share(weights, matrix):
+    """行ごとの割合を重み付き平均した列ごとの値（行の合計が0の行は無視）."""
+    totals = matrix.sum(axis=1, keepdims=True)
+    shares = np.divide(matrix, totals, out=np.zeros_like(matrix), where=totals > 0)
+    active = weights * (totals[:, 0] > 0)
+    total_weight = active.sum()
+    if total_weight == 0:
+        return np.zeros(matrix.shape[1])
+    return active @ shares / total_weight
+
+
+def _presence(rows: list[set[str]], columns: list[str]):
+    """リポジトリ × 項目の0/1行列."""
+    matrix = np.zeros((len(rows), len(columns)))
+    position = {name: i for i, name in enumerate(columns)}
+    for row, names in enumerate(rows):
+        for name in names:
+            matrix[row, position[name]] = 1.0
+    return matrix
+
+
+def _ranked(columns: list[str], scores, minimum: float, limit: int) -> list[str]:
+    order = np.argsort(-scores, kind="stable")
+    return [columns[i] for i in order[:limit] if scores[i] > minimum]
+
+
+def _area_matrix(columns: list[str], areas: dict[str, dict[str, float]]):
+    """項目 × 得意領域の寄与行列."""
+    matrix = np.zeros((len(columns), len(AREAS)))
+    for row, name in enumerate(columns):
+        for area, value in areas.get(name, {}).items():
+            matrix[row, AREAS.index(area)] = value
+    return matrix
+
+
+def _signals(repo: RepoRecord | RepoInfo) -> tuple[set[str], set[str]]:
+    """リポジトリのフレームワーク名とインフラ技術名."""
+    names = {
+        name
+        for deps in repo_dependencies(repo.dependency_files).values()
+        for name in deps
+    }
+    names.update(topic.lower() for topic in repo.topics)
+    frameworks = {FRAMEWORKS[name][0] for name in names if name in FRAMEWORKS}
+    infrastructure = {INFRA_NAMES[name] for name in names if name in INFRA_NAMES}
+    for path in repo.config_files:
+        for prefix, name in INFRA_CONFIG.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                infrastructure.add(name)
+    return frameworks, infrastructure
+
+
+def _unique(values: Iterable[str]) -> list[str]:
+    return list(dict.fromkeys(values))
+
+
+def quick_profile(
+    repos: Sequence[RepoRecord | RepoInfo], plan: AnalysisPlan | None = None
+) -> dict:
+    """リポジトリの統計から簡易プロファイルを作る（generate_profile と同じ形式）."""
+    plan = plan if plan is not None else AnalysisPlan.for_repos(repos)
+    repos = [repo for repo in repos if plan.is_profiled(repo.name)]
+    weights = _repo_weights(repos)
+
+    # 言語: リポジトリ × 言語のバイト数
+    languages = _unique(name for repo in repos for name in repo.languages)
+    language_bytes = np.zeros((len(repos), len(languages)))
+    position = {name: i for i, name in enumerate(languages)}
+    for row, repo in enumerate(repos):
+        for name, size in repo.languages.items():
+            language_bytes[row, position[name]] = size
+    language_share = _weighted_share(weights, language_bytes)
+
+    # フレームワーク・インフラ: リポジトリ × 項目の有無
+    signals = [_signals(repo) for repo in repos]
+    frameworks = sorted({name for found, _ in signals for name in found})
+    infrastructure = sorted({name for _, found in signals for name in found})
+    total_weight = weights.sum() or 1.0
+    framework_presence = _presence([f for f, _ in signals], frameworks)
+    infra_presence = _presence([i for _, i in signals], infrastructure)
+    framework_share = weights @ framework_presence / total_weight
+    infra_share = weights @ infra_presence / total_weight
+
+    # 得意領域: 言語の割合 + その領域のフレームワーク・インフラを使うリポジトリの割合
+    # （1リポジトリで同じ領域のフレームワークを複数使っていても1回と数える）
+    framework_areas = {name: {area: 1.0} for name, area in FRAMEWORKS.values()}
+    infra_areas = {name: {_INFRA: 1.0} for name in infrastructure}
+    repo_areas = np.minimum(
+        framework_presence @ _area_matrix(frameworks, framework_areas)
+        + infra_presence @ _area_matrix(infrastructure, infra_areas),
+        1.0,
+    )
+    area_scores = language_share @ _area_matrix(languages, LANGUAGE_AREAS)
+    area_scores = area_scores + 0.5 * (weights @ repo_areas) / total_weight
+    expertise = _ranked(AREAS, area_scores, MIN_AREA_SCORE, len(AREAS))
+
+    top_languages = _ranked(
+        languages, language_share, MIN_LANGUAGE_SHARE, MAX_LANGUAGES
+    )
+    top_frameworks = _ranked(frameworks, framework_share, 0.0, MAX_FRAMEWORKS)
+    top_infrastructure = _ranked(infrastructure, infra_share, 0.0, MAX_FRAMEWORKS)
+
+    # トピック（重み付きの出現数）
+    topics = _unique(topic for repo in repos for topic in repo.topics)
+    topic_counts = weights @ _presence([set(repo.topics) for repo in repos], topics)
+    interests = _ranked(topics, topic_counts, 0.0, MAX_INTERESTS)
+
+    notable = [
+        NotableProject(
+            name=repos[i].name,
+            highlight=repos[i].description
+            or f"{repos[i].language or '不明'}のプロジェクト",
+        )
+        for i in np.argsort(-weights, kind="stable")[:MAX_NOTABLE_PROJECTS]
+    ]
+
+    roles = [AREA_ROLES[area] for area in expertise]
+    if _FRONTEND in expertise and _BACKEND in expertise:
+        roles.insert(0, "フルスタックエンジニア")
+
+    summary = "リポジトリの統計から推定した簡易プロファイルです。"
+    if top_languages:
+        summary += f"主な言語は{'、'.join(top_languages[:3])}"
+        summary += (
+            f"、得意領域は{'、'.join(expertise)}と推定されます。"
+            if expertise
+            else "です。"
+        )
+
+    profile = DeveloperProfile(
+        tech_stack=TechStack(
+            languages=top_languages,
+            frameworks=top_frameworks,
+            infrastructure=top_infrastructure,
+        ),
+        expertise_areas=expertise,
+        skill_assessment=SkillAssessment(
+            code_quality=PENDING_ASSESSMENT,
+            design_ability=PENDING_ASSESSMENT,
+            completion_rate=PENDING_ASSESSMENT,
+        ),
+        notable_projects=notable,
+        interests=interests,
+        job_fit=JobFit(
+            ideal_roles=roles,
+            company_types=[],
+            keywords=_unique([*top_languages[:3], *top_frameworks[:5]]),
+        ),
+        summary=summary,
+    )
+    return profile.model_dump()
+
+
+def merge_profiles(quick: dict, generated: dict) -> dict:
+    """LLMのプロファイルを優先し、技術スタックに簡易プロファイルの検出分を補う."""
+    merged = dict(generated)
+    tech = dict(generated.get("tech_stack", {}))
+    for key in ("languages", "frameworks", "infrastructure"):
+        values = list(tech.get(key, []))
+        known = {value.lower() for value in values}
+        values.extend(
+            value
+            for value in quick.get("tech_stack", {}).get(key, [])
+            if value.lower() not in known
+        )
+        tech[key] = values
+    merged["tech_stack"] = tech
+    return merged
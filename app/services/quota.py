@@ -1,28 +1,106 @@
-"""Freemium quota management service（共通クレジット制）."""
+"""Freemium quota management service（共通クレジット制）.
 
+クレジットは `credits/{user_id}` を起点とした台帳で管理する。
+
+- `credits/{user_id}`: 基本残高（`credits`）。初回アクセス時に作成
+- `credits/{user_id}/shards/{n}`: 増減分をアトミックな `Increment` で書き込むシャード
+- `credits/{user_id}/reservations/{id}`: 未確定の予約（確定・解放時に削除）
+- `credits/{user_id}/usage/{id}`: 追記のみの利用履歴
+
+残高は「基本残高 + 全シャードの合計」。単一ドキュメントへの
+read-modify-writeトランザクションを使わないため、複数タブや
+リトライによる同時書き込みでも競合・再試行が発生しない。
+
+消費は予約 → 確定（commit）または解放（release）の2段階で行い、
+検索・生成が成功したときだけクレジットを消費する。
+
+UIからは楽観的API（reserve_credit_optimistic / settle_credit_optimistic）を使う。
+session_stateのクォータを即座に減算して描画をブロックせず、Firestoreへの
+予約・確定はバックグラウンドで行い、次回の get_quota_status で照合する。
+表示値がサーバー値から遅れるのは QUOTA_MAX_STALENESS_SECONDS までに制限される。
+"""
+
+from __future__ import annotations
+
+import contextvars
 import logging
-from datetime import UTC, datetime
+import random
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any, TypeVar
 
 import streamlit as st
-from google.api_core.exceptions import AlreadyExists
-from google.cloud import firestore
-from google.cloud.firestore_v1 import DocumentSnapshot
 
 from app.services.cache import get_firestore_client
-from app.services.const import FREE_PLAN_INITIAL_CREDITS
+from app.services.const import (
+    CREDIT_RESERVATION_TTL_MINUTES,
+    CREDIT_SHARD_COUNT,
+    FREE_PLAN_INITIAL_CREDITS,
+    QUOTA_MAX_STALENESS_SECONDS,
+)
+from app.services.lazy_import import lazy_module
 from app.services.logging_config import log_structured
+from app.services.metrics import observe_call, registry
 from app.services.models import QuotaStatus
-from app.services.session_keys import QUOTA_STATUS
+from app.services.session_keys import (
+    QUOTA_PENDING,
+    QUOTA_REFRESH,
+    QUOTA_STATUS,
+    QUOTA_SYNCED_AT,
+)
+from app.services.tracing import traced
+
+if TYPE_CHECKING:
+    from google.cloud.firestore_v1 import DocumentSnapshot
 
 logger = logging.getLogger(__name__)
 
+# Firestore SDKはimportが重いため初回アクセスまで遅延
+firestore = lazy_module("google.cloud.firestore")
+api_exceptions = lazy_module("google.api_core.exceptions")
+
+T = TypeVar("T")
+
+# Firestoreへの予約・確定をUIスレッドから切り離すためのワーカー
+_reconcile_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="quota-reconcile"
+)
+
+
+def _submit(fn: Callable[..., T], *args: Any) -> Future[T]:
+    """呼び出し元のコンテキスト（トレースのスパン）を引き継いでワーカーで実行."""
+    return _reconcile_executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+@dataclass
+class _PendingCredit:
+    """楽観的に反映済みで、サーバーとの照合を待っているクレジット操作."""
+
+    started_at: float
+    reserve: Future[tuple[str | None, int]]
+    settle: Future[tuple[int, int, float]] | None = None
+    # 確定・解放をバックグラウンドに投げた時刻
+    settled_at: float | None = None
+    # session_stateに反映済みの増減（予約で-1、失敗時の解放で+1）
+    local_delta: int = -1
+
+
+def _credits_ref(user_id: int) -> firestore.DocumentReference:
+    """ユーザーのクレジット台帳ルートを取得."""
+    db = get_firestore_client()
+    return db.collection("credits").document(str(user_id))
+
 
 def _get_credits_data(user_id: int) -> dict | None:
     """クレジットデータを取得."""
     try:
-        db = get_firestore_client()
-        doc_ref = db.collection("credits").document(str(user_id))
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        doc_ref = _credits_ref(user_id)
+        with observe_call("firestore", "credits.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
 
         if not doc.exists:
             return None
@@ -41,8 +119,7 @@ def _get_credits_data(user_id: int) -> dict | None:
 
 def _init_credits(user_id: int) -> dict:
     """クレジットを初期化（既存の場合はスキップ）."""
-    db = get_firestore_client()
-    doc_ref = db.collection("credits").document(str(user_id))
+    doc_ref = _credits_ref(user_id)
     now = datetime.now(UTC)
 
     data = {
@@ -54,9 +131,10 @@ def _init_credits(user_id: int) -> dict:
 
     try:
         # create()は既存の場合AlreadyExistsを発生させる（競合回避）
-        doc_ref.create(data)
+        with observe_call("firestore", "credits.create"):
+            doc_ref.create(data)
         return data
-    except AlreadyExists:
+    except api_exceptions.AlreadyExists:
         # 競合で既に作成済み → 初回ユーザーの並行リクエスト
         log_structured(
             logger,
@@ -64,7 +142,8 @@ def _init_credits(user_id: int) -> dict:
             level=logging.INFO,
             user_id=user_id,
         )
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        with observe_call("firestore", "credits.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
         return doc.to_dict() or data
     except Exception:
         log_structured(
@@ -77,15 +156,90 @@ def _init_credits(user_id: int) -> dict:
         return {"credits": FREE_PLAN_INITIAL_CREDITS}
 
 
-def _fetch_quota_status(user_id: int) -> QuotaStatus:
-    """Firestoreからクォータ状態を取得（内部用）."""
+def _sum_shards(user_id: int) -> int:
+    """全シャードの増減分を合計."""
+    with observe_call("firestore", "shards.query"):
+        shards = list(_credits_ref(user_id).collection("shards").stream())
+    return sum((doc.to_dict() or {}).get("credits", 0) for doc in shards)
+
+
+def _read_balance(user_id: int) -> int:
+    """現在の残高（基本残高 + シャード合計）を取得."""
     credits_data = _get_credits_data(user_id)
 
     if credits_data is None:
         # 初回アクセス → クレジット初期化
         credits_data = _init_credits(user_id)
 
-    credits = credits_data.get("credits", FREE_PLAN_INITIAL_CREDITS)
+    base = credits_data.get("credits", FREE_PLAN_INITIAL_CREDITS)
+    return base + _sum_shards(user_id)
+
+
+def _random_shard(user_id: int) -> firestore.DocumentReference:
+    """書き込み先のシャードをランダムに選択."""
+    shard_id = str(random.randrange(CREDIT_SHARD_COUNT))
+    return _credits_ref(user_id).collection("shards").document(shard_id)
+
+
+def _append_usage(
+    batch: firestore.WriteBatch,
+    user_id: int,
+    event: str,
+    amount: int,
+    *,
+    reservation_id: str | None = None,
+) -> None:
+    """利用履歴を追記（バッチに積むだけでコミットはしない）."""
+    usage_ref = _credits_ref(user_id).collection("usage").document()
+    batch.set(
+        usage_ref,
+        {
+            "event": event,
+            "amount": amount,
+            "reservation_id": reservation_id,
+            "created_at": datetime.now(UTC),
+        },
+    )
+
+
+def _set_quota_cache(credits: int) -> None:
+    """session_stateのクォータキャッシュを更新."""
+    st.session_state[QUOTA_STATUS] = QuotaStatus(
+        credits=credits,
+        can_use=credits > 0,
+    )
+
+
+def _release_stale_reservations(user_id: int) -> int:
+    """期限切れの未確定予約を解放（プロセス停止等で残った予約の回収）."""
+    now = datetime.now(UTC)
+    query = (
+        _credits_ref(user_id).collection("reservations").where("expires_at", "<", now)
+    )
+    with observe_call("firestore", "reservations.query"):
+        reservations = list(query.stream())
+    released = 0
+    for doc in reservations:
+        if _finish_reservation(user_id, doc.id, refund=True, event="expire"):
+            released += 1
+    return released
+
+
+@traced()
+def _fetch_quota_status(user_id: int) -> QuotaStatus:
+    """Firestoreからクォータ状態を取得（内部用）."""
+    try:
+        _release_stale_reservations(user_id)
+        credits = _read_balance(user_id)
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to fetch quota status",
+            level=logging.ERROR,
+            exc_info=True,
+            user_id=user_id,
+        )
+        credits = FREE_PLAN_INITIAL_CREDITS
 
     return QuotaStatus(
         credits=credits,
@@ -96,103 +250,200 @@ def _fetch_quota_status(user_id: int) -> QuotaStatus:
 def get_quota_status(user_id: int) -> QuotaStatus:
     """ユーザーのクォータ状態を取得（session_stateキャッシュ付き）.
 
+    キャッシュがあれば未照合の操作を照合してから返す。サーバー値との
+    同期から QUOTA_MAX_STALENESS_SECONDS の半分を過ぎたらバックグラウンドで
+    再取得し、上限を過ぎた場合のみ同期的に取得する。
+
     Args:
         user_id: GitHubUser.id
 
     Returns:
         QuotaStatus
     """
-    # session_stateにキャッシュがあれば返す
     if QUOTA_STATUS in st.session_state:
-        return st.session_state[QUOTA_STATUS]
+        _reconcile_pending(user_id)
+        quota: QuotaStatus = st.session_state[QUOTA_STATUS]
+        if st.session_state.get(QUOTA_PENDING):
+            return quota
+
+        age = time.monotonic() - st.session_state.get(QUOTA_SYNCED_AT, 0.0)
+        if age <= QUOTA_MAX_STALENESS_SECONDS / 2:
+            return quota
+        if age <= QUOTA_MAX_STALENESS_SECONDS:
+            if QUOTA_REFRESH not in st.session_state:
+                st.session_state[QUOTA_REFRESH] = _submit(_read_balance_at, user_id)
+            return quota
 
     # Firestoreから取得してキャッシュ
     quota = _fetch_quota_status(user_id)
     st.session_state[QUOTA_STATUS] = quota
+    st.session_state[QUOTA_SYNCED_AT] = time.monotonic()
+    st.session_state.pop(QUOTA_REFRESH, None)
     return quota
 
 
 def invalidate_quota_cache() -> None:
     """クォータキャッシュを無効化."""
-    st.session_state.pop(QUOTA_STATUS, None)
+    for key in (QUOTA_STATUS, QUOTA_SYNCED_AT, QUOTA_PENDING, QUOTA_REFRESH):
+        st.session_state.pop(key, None)
 
 
-def consume_credit(user_id: int) -> bool:
-    """クレジットを1消費（トランザクションで競合回避）.
+def _read_balance_at(user_id: int) -> tuple[int, float]:
+    """残高と読み取り開始時刻（monotonic）を返す."""
+    started = time.monotonic()
+    return _read_balance(user_id), started
+
+
+@traced()
+def _reserve(user_id: int) -> tuple[str | None, int]:
+    """クレジットを1つ予約し、(予約ID, 予約後の残高) を返す（session_state非依存）.
+
+    先に減算してから残高を確認し、マイナスになった場合は取り消す。
+    同時予約で残高がちょうど尽きた場合は双方が失敗しうるが、
+    残高がマイナスのまま確定することはない。
+    """
+    db = get_firestore_client()
+    reservation_id = str(uuid.uuid4())
+    shard_ref = _random_shard(user_id)
+    now = datetime.now(UTC)
+
+    batch = db.batch()
+    batch.set(shard_ref, {"credits": firestore.Increment(-1)}, merge=True)
+    batch.set(
+        _credits_ref(user_id).collection("reservations").document(reservation_id),
+        {
+            "shard": shard_ref.id,
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=CREDIT_RESERVATION_TTL_MINUTES),
+        },
+    )
+    with observe_call("firestore", "reservations.commit"):
+        batch.commit()
+
+    balance = _read_balance(user_id)
+    if balance < 0:
+        _finish_reservation(user_id, reservation_id, refund=True, event="reject")
+        return None, balance + 1
+
+    return reservation_id, balance
+
+
+def reserve_credit(user_id: int) -> str | None:
+    """クレジットを1つ予約（シャードへのIncrementで仮押さえ）.
 
     Args:
         user_id: GitHubUser.id
 
     Returns:
-        成功した場合True
+        予約ID（残高不足・失敗時はNone）
     """
     try:
-        db = get_firestore_client()
-        doc_ref = db.collection("credits").document(str(user_id))
-        now = datetime.now(UTC)
-
-        @firestore.transactional
-        def consume_in_transaction(
-            transaction: firestore.Transaction,
-        ) -> int | None:
-            doc: DocumentSnapshot = doc_ref.get(transaction=transaction)  # type: ignore[assignment]
-
-            if not doc.exists:
-                # トランザクション内で初期化
-                transaction.set(
-                    doc_ref,
-                    {
-                        "user_id": user_id,
-                        "credits": FREE_PLAN_INITIAL_CREDITS - 1,
-                        "created_at": now,
-                        "updated_at": now,
-                    },
-                )
-                return FREE_PLAN_INITIAL_CREDITS - 1
-
-            data = doc.to_dict()
-            if data is None:
-                return None
-
-            current_credits = data.get("credits", 0)
-            if current_credits <= 0:
-                return None
-
-            new_credits = current_credits - 1
-            transaction.update(
-                doc_ref,
-                {
-                    "credits": new_credits,
-                    "updated_at": now,
-                },
-            )
-            return new_credits
+        reservation_id, balance = _reserve(user_id)
+        _set_quota_cache(balance)
+        return reservation_id
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to reserve credit",
+            level=logging.ERROR,
+            exc_info=True,
+            user_id=user_id,
+        )
+        return None
 
-        transaction = db.transaction()
-        new_credits = consume_in_transaction(transaction)
 
-        if new_credits is None:
-            return False
+@traced()
+def _finish_reservation(
+    user_id: int,
+    reservation_id: str,
+    *,
+    refund: bool,
+    event: str,
+) -> bool:
+    """予約を終了（refund=Trueなら払い戻し）.
 
-        # キャッシュを新しい値で即座に更新
-        st.session_state[QUOTA_STATUS] = QuotaStatus(
-            credits=new_credits,
-            can_use=new_credits > 0,
+    予約ドキュメントの存在を前提条件にしてバッチで削除するため、
+    同じ予約を二重に確定・解放しても二重払い戻しにはならない。
+    """
+    db = get_firestore_client()
+    reservation_ref = (
+        _credits_ref(user_id).collection("reservations").document(reservation_id)
+    )
+
+    batch = db.batch()
+    batch.delete(reservation_ref, option=db.write_option(exists=True))
+    if refund:
+        batch.set(
+            _random_shard(user_id), {"credits": firestore.Increment(1)}, merge=True
         )
+    _append_usage(batch, user_id, event, 1, reservation_id=reservation_id)
+
+    try:
+        with observe_call("firestore", "reservations.commit"):
+            batch.commit()
         return True
     except Exception:
         log_structured(
             logger,
-            "Failed to consume credit",
+            "Failed to finish credit reservation",
             level=logging.ERROR,
             exc_info=True,
             user_id=user_id,
+            reservation_id=reservation_id,
+            event=event,
         )
         return False
 
 
+def commit_credit(user_id: int, reservation_id: str) -> bool:
+    """予約したクレジットの消費を確定.
+
+    Args:
+        user_id: GitHubUser.id
+        reservation_id: reserve_credit() の戻り値
+
+    Returns:
+        成功した場合True
+    """
+    return _finish_reservation(user_id, reservation_id, refund=False, event="consume")
+
+
+def release_credit(user_id: int, reservation_id: str) -> bool:
+    """予約したクレジットを解放（払い戻し）.
+
+    Args:
+        user_id: GitHubUser.id
+        reservation_id: reserve_credit() の戻り値
+
+    Returns:
+        成功した場合True
+    """
+    released = _finish_reservation(
+        user_id, reservation_id, refund=True, event="release"
+    )
+    if released and QUOTA_STATUS in st.session_state:
+        _set_quota_cache(st.session_state[QUOTA_STATUS].credits + 1)
+    return released
+
+
+def consume_credit(user_id: int) -> bool:
+    """クレジットを1消費（予約して即確定）.
+
+    Args:
+        user_id: GitHubUser.id
+
+    Returns:
+        成功した場合True
+    """
+    reservation_id = reserve_credit(user_id)
+    if reservation_id is None:
+        return False
+    return commit_credit(user_id, reservation_id)
+
+
+@traced()
 def add_credits(user_id: int, amount: int) -> bool:
-    """クレジットを追加（トランザクションで競合回避）.
+    """クレジットを追加（シャードへのIncrementで競合回避）.
 
     Args:
         user_id: GitHubUser.id
@@ -203,55 +454,16 @@ def add_credits(user_id: int, amount: int) -> bool:
     """
     try:
         db = get_firestore_client()
-        doc_ref = db.collection("credits").document(str(user_id))
-        now = datetime.now(UTC)
-
-        @firestore.transactional
-        def add_in_transaction(
-            transaction: firestore.Transaction,
-        ) -> int | None:
-            doc: DocumentSnapshot = doc_ref.get(transaction=transaction)  # type: ignore[assignment]
-
-            if not doc.exists:
-                # トランザクション内で初期化 + 追加
-                new_credits = FREE_PLAN_INITIAL_CREDITS + amount
-                transaction.set(
-                    doc_ref,
-                    {
-                        "user_id": user_id,
-                        "credits": new_credits,
-                        "created_at": now,
-                        "updated_at": now,
-                    },
-                )
-                return new_credits
-
-            data = doc.to_dict()
-            if data is None:
-                return None
-
-            current_credits = data.get("credits", 0)
-            new_credits = current_credits + amount
-            transaction.update(
-                doc_ref,
-                {
-                    "credits": new_credits,
-                    "updated_at": now,
-                },
-            )
-            return new_credits
-
-        transaction = db.transaction()
-        new_credits = add_in_transaction(transaction)
-
-        if new_credits is None:
-            return False
+        batch = db.batch()
+        batch.set(
+            _random_shard(user_id), {"credits": firestore.Increment(amount)}, merge=True
+        )
+        _append_usage(batch, user_id, "grant", amount)
+        with observe_call("firestore", "shards.commit"):
+            batch.commit()
 
         # キャッシュを新しい値で即座に更新
-        st.session_state[QUOTA_STATUS] = QuotaStatus(
-            credits=new_credits,
-            can_use=new_credits > 0,
-        )
+        _set_quota_cache(_read_balance(user_id))
         return True
     except Exception:
         log_structured(
@@ -262,3 +474,208 @@ def add_credits(user_id: int, amount: int) -> bool:
             user_id=user_id,
         )
         return False
+
+
+def reserve_credit_optimistic(user_id: int) -> str | None:
+    """クレジットを楽観的に予約（session_stateを即時減算し、Firestoreは非同期）.
+
+    Args:
+        user_id: GitHubUser.id
+
+    Returns:
+        ローカルの操作ID（表示上の残高が0の場合はNone）
+    """
+    quota = get_quota_status(user_id)
+    if not quota.can_use:
+        return None
+
+    _set_quota_cache(quota.credits - 1)
+    local_id = str(uuid.uuid4())
+    pending: dict[str, _PendingCredit] = st.session_state.setdefault(QUOTA_PENDING, {})
+    pending[local_id] = _PendingCredit(
+        started_at=time.monotonic(),
+        reserve=_submit(_reserve, user_id),
+    )
+    return local_id
+
+
+def settle_credit_optimistic(user_id: int, local_id: str, *, success: bool) -> None:
+    """楽観的予約を確定（success=True）または解放（False）.
+
+    失敗時は表示上の残高を即座に戻し、Firestoreへの確定・解放は
+    予約完了後にバックグラウンドで行う。
+
+    Args:
+        user_id: GitHubUser.id
+        local_id: reserve_credit_optimistic() の戻り値
+        success: 検索・生成が成功したか
+    """
+    pending: dict[str, _PendingCredit] = st.session_state.get(QUOTA_PENDING, {})
+    op = pending.get(local_id)
+    if op is None or op.settle is not None:
+        return
+
+    if not success:
+        op.local_delta = 0
+        quota: QuotaStatus | None = st.session_state.get(QUOTA_STATUS)
+        if quota is not None:
+            _set_quota_cache(quota.credits + 1)
+
+    op.settled_at = time.monotonic()
+    op.settle = _submit(_settle_in_background, user_id, op.reserve, success)
+
+
+def confirm_credit_optimistic(user_id: int, local_id: str) -> bool:
+    """楽観的予約がサーバー側で成立したかを確認.
+
+    表示上の残高が古い場合や別タブで消費された場合、予約はサーバーで拒否される。
+    有料の結果を渡す前に呼び、成立していなければ予約を解放して False を返す。
+    予約は生成・検索の開始時に投げているため、通常は待たずに結果が得られる。
+
+    Args:
+        user_id: GitHubUser.id
+        local_id: reserve_credit_optimistic() の戻り値
+
+    Returns:
+        予約が成立していればTrue
+    """
+    pending: dict[str, _PendingCredit] = st.session_state.get(QUOTA_PENDING, {})
+    op = pending.get(local_id)
+    if op is None:
+        return False
+
+    try:
+        reservation_id, _ = op.reserve.result(timeout=QUOTA_MAX_STALENESS_SECONDS)
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to confirm credit reservation",
+            level=logging.ERROR,
+            exc_info=True,
+            user_id=user_id,
+        )
+        reservation_id = None
+
+    if reservation_id is None:
+        settle_credit_optimistic(user_id, local_id, success=False)
+        return False
+    return True
+
+
+def _settle_in_background(
+    user_id: int,
+    reserve: Future[tuple[str | None, int]],
+    success: bool,
+) -> tuple[int, int, float]:
+    """予約完了を待って確定・解放し、(サーバー側の増減, 残高, 読み取り時刻) を返す."""
+    reservation_id, balance = reserve.result()
+    if reservation_id is None:
+        # 残高不足で予約自体が取り消された
+        return 0, balance, time.monotonic()
+
+    # ワーカースレッドからはsession_stateに触れないため_finish_reservationを直接使う
+    if success:
+        _finish_reservation(user_id, reservation_id, refund=False, event="consume")
+        server_delta = -1
+    else:
+        released = _finish_reservation(
+            user_id, reservation_id, refund=True, event="release"
+        )
+        # 解放に失敗した予約は期限切れまで残高から引かれたまま
+        server_delta = 0 if released else -1
+
+    balance, read_at = _read_balance_at(user_id)
+    return server_delta, balance, read_at
+
+
+def _reconcile_pending(user_id: int) -> None:
+    """完了した楽観的操作をサーバー結果と照合し、必要なら表示値を補正.
+
+    - 予約がサーバー側で拒否された等、反映済みの増減と実際の増減が
+      異なる操作はその差分だけロールバックする
+    - 未照合の操作がなくなった時点で、最も新しく読み取ったサーバー残高に
+      表示値を合わせ、その差（ドリフト）を記録する（差がなくても記録し、
+      分布からドリフトが稀であることを確認できるようにする）
+    """
+    quota: QuotaStatus | None = st.session_state.get(QUOTA_STATUS)
+    if quota is None:
+        return
+
+    pending: dict[str, _PendingCredit] = st.session_state.get(QUOTA_PENDING, {})
+    credits = quota.credits
+    latest: tuple[float, int] | None = None
+    now = time.monotonic()
+
+    for local_id, op in list(pending.items()):
+        # 照合はブロックせず、完了していない操作は次回のrerunで再確認する
+        if op.settle is None or not op.settle.done():
+            if op.settled_at is None:
+                # 生成・検索の実行中（確定されないまま予約が期限切れになったら諦める）
+                overdue = now - op.started_at > CREDIT_RESERVATION_TTL_MINUTES * 60
+            else:
+                overdue = now - op.settled_at > QUOTA_MAX_STALENESS_SECONDS
+            if overdue:
+                # サーバー値を読み直す（未確定の予約は期限切れで自動解放される）
+                pending.pop(local_id)
+                st.session_state.pop(QUOTA_SYNCED_AT, None)
+            continue
+
+        try:
+            server_delta, balance, read_at = op.settle.result()
+        except Exception:
+            log_structured(
+                logger,
+                "Failed to reconcile credit operation",
+                level=logging.ERROR,
+                exc_info=True,
+                user_id=user_id,
+            )
+            pending.pop(local_id)
+            st.session_state.pop(QUOTA_SYNCED_AT, None)
+            continue
+
+        pending.pop(local_id)
+        if server_delta != op.local_delta:
+            registry.counter("quota_rollbacks").inc()
+            log_structured(
+                logger,
+                "Quota rolled back",
+                level=logging.WARNING,
+                user_id=user_id,
+                quota_rollback=server_delta - op.local_delta,
+            )
+        credits += server_delta - op.local_delta
+        if latest is None or read_at > latest[0]:
+            latest = (read_at, balance)
+
+    refresh: Future[tuple[int, float]] | None = st.session_state.get(QUOTA_REFRESH)
+    if refresh is not None and refresh.done():
+        st.session_state.pop(QUOTA_REFRESH)
+        try:
+            balance, read_at = refresh.result()
+            if latest is None or read_at > latest[0]:
+                latest = (read_at, balance)
+        except Exception:
+            log_structured(
+                logger,
+                "Failed to refresh quota in background",
+                level=logging.ERROR,
+                exc_info=True,
+                user_id=user_id,
+            )
+
+    if not pending and latest is not None:
+        drift = latest[1] - credits
+        registry.histogram("quota_reconcile_drift").observe(abs(drift))
+        log_structured(
+            logger,
+            "Quota reconciled",
+            level=logging.WARNING if drift else logging.INFO,
+            user_id=user_id,
+            quota_drift=drift,
+        )
+        credits = latest[1]
+        st.session_state[QUOTA_SYNCED_AT] = latest[0]
+
+    if credits != quota.credits:
+        _set_quota_cache(credits)
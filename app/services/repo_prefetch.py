@@ -0,0 +1,141 @@
+"""ログイン直後のリポジトリ一覧の先読み.
+
+認証が成功した時点でユーザーのloginは分かっているため、「リポジトリを読み込む」を
+押す前にバックグラウンドで get_repos_metadata を実行し、プロセス共有の
+ユーザー別キャッシュに置いておく。選択UIは完了済みならそのまま表示し、
+取得中なら新たにリクエストせず完了を待つ。
+
+    prefetch_repo_metadata(user.login, access_token)      # 認証直後
+    repos = load_repo_metadata(user.login, 10, token)     # 選択UI
+
+先読みは Priority.BACKGROUND で行う。GitHubの残り予算が予約分以下なら開始せず、
+選択UIでの通常の取得（INTERACTIVE）に任せる。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+from app.services.const import (
+    REPO_PREFETCH_LIMIT,
+    REPO_PREFETCH_MAX_USERS,
+    REPO_PREFETCH_TTL_SECONDS,
+    REPO_PREFETCH_WAIT_SECONDS,
+    REPO_PREFETCH_WORKERS,
+)
+from app.services.github import get_repos_metadata
+from app.services.github_scheduler import Priority, github_user, has_budget
+from app.services.logging_config import log_structured
+from app.services.metrics import registry
+from app.services.models import RepoMetadata
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=REPO_PREFETCH_WORKERS, thread_name_prefix="repo-prefetch"
+)
+
+
+@dataclass
+class _Prefetch:
+    """ユーザー1人分の先読み."""
+
+    limit: int
+    started_at: float
+    future: Future[list[RepoMetadata]]
+
+    def expired(self, now: float) -> bool:
+        return now - self.started_at > REPO_PREFETCH_TTL_SECONDS
+
+    def failed(self) -> bool:
+        return self.future.done() and self.future.exception() is not None
+
+
+_entries: OrderedDict[str, _Prefetch] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _fetch(username: str, limit: int, access_token: str | None) -> list[RepoMetadata]:
+    with github_user(username, Priority.BACKGROUND):
+        return get_repos_metadata(username, limit=limit, access_token=access_token)
+
+
+def prefetch_repo_metadata(
+    username: str, access_token: str | None, limit: int = REPO_PREFETCH_LIMIT
+) -> None:
+    """リポジトリ一覧の取得をバックグラウンドで開始（実行中・取得済みなら何もしない）."""
+    if not has_budget(access_token):
+        registry.counter("repo_prefetch", outcome="skipped").inc()
+        return
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(username)
+        if (
+            entry is not None
+            and entry.limit >= limit
+            and not entry.expired(now)
+            and not entry.failed()
+        ):
+            return
+        future = _executor.submit(
+            contextvars.copy_context().run, _fetch, username, limit, access_token
+        )
+        _entries[username] = _Prefetch(limit=limit, started_at=now, future=future)
+        _entries.move_to_end(username)
+        while len(_entries) > REPO_PREFETCH_MAX_USERS:
+            _entries.popitem(last=False)
+    registry.counter("repo_prefetch", outcome="started").inc()
+
+
+def get_prefetched_metadata(
+    username: str, limit: int, timeout: float = 0.0
+) -> list[RepoMetadata] | None:
+    """先読み結果を取得（未完了・失敗・期限切れならNone）.
+
+    Args:
+        username: GitHub username
+        limit: 必要な件数（先読みした件数以下なら先頭から切り出す）
+        timeout: 取得中の場合に完了を待つ秒数
+    """
+    with _lock:
+        entry = _entries.get(username)
+    if entry is None or entry.limit < limit or entry.expired(time.monotonic()):
+        return None
+    try:
+        repos = entry.future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return None
+    except Exception:
+        log_structured(
+            logger,
+            "Repo metadata prefetch failed",
+            level=logging.WARNING,
+            exc_info=True,
+            username=username,
+        )
+        return None
+    return repos[:limit]
+
+
+def load_repo_metadata(
+    username: str, limit: int, access_token: str | None
+) -> list[RepoMetadata]:
+    """選択UI用のリポジトリ一覧（先読みがあれば使い、なければ取得する）."""
+    repos = get_prefetched_metadata(username, limit, timeout=REPO_PREFETCH_WAIT_SECONDS)
+    registry.counter("repo_prefetch", outcome="miss" if repos is None else "hit").inc()
+    if repos is None:
+        repos = get_repos_metadata(username, limit=limit, access_token=access_token)
+    return repos
+
+
+def discard_prefetched(username: str) -> None:
+    """ユーザーの先読み結果を破棄（ログアウト時）."""
+    with _lock:
+        _entries.pop(username, None)
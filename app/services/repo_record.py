@@ -0,0 +1,233 @@
+"""リポジトリ解析のホットパス用の軽量レコード.
+
+RepoInfo / FileContent（pydantic）はREADME・ファイル一覧・ファイル内容を
+丸ごと保持するため、キャッシュ読み込みのたびにフィールドごとの検証が走り、
+インスタンスごとに __dict__ と検証用のメタデータを抱える。
+解析 → キャッシュ保存 → プロファイル生成の間は __slots__ dataclass の
+RepoRecord / FileRecord で扱い、pydantic は外部とのやり取り（API境界）でのみ使う。
+
+- 解析時のパス文字列は sys.intern で共有する（file_structure / config_files /
+  各ファイルのパスで同じ文字列が繰り返し現れるため）
+- encode_repo / decode_repo はリスト・文字列をコピーせずに
+  Firestoreのdictと相互変換する（キャッシュの形式は RepoInfo.model_dump() と同一）。
+  復元時の file_structure は1件ずつ intern するとデコードより高くつくため、
+  読み込んだリストをそのまま使う
+- pack_repos / unpack_repo はリポジトリごとにzstdで圧縮したフレームを連結し、
+  オフセットの索引で個別に取り出せる形式に変換する（キャッシュのチャンク分割用）
+- BlobStore（app/services/blob_store.py）に保存済みのREADME・ファイル内容は
+  blob SHAの参照としてエンコードし、復元時に BlobStore から解決する
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from collections.abc import Callable, Container
+from dataclasses import dataclass, field
+from typing import Any
+
+import zstandard
+
+from app.services.models import FileContent, RepoInfo
+
+# 解凍が速く、README・ソースコードで十分な圧縮率が出るレベル
+ZSTD_LEVEL = 3
+
+# blob SHAから内容を取得する関数（見つからなければNone）
+BlobResolver = Callable[[str], bytes | None]
+
+
+@dataclass(slots=True)
+class FileRecord:
+    """リポジトリ内ファイルの内容."""
+
+    path: str
+    content: str
+    # git blob SHA（切り詰め前の内容に対する値）
+    sha: str | None = None
+
+    def __post_init__(self) -> None:
+        self.path = sys.intern(self.path)
+
+
+@dataclass(slots=True)
+class RepoRecord:
+    """RepoInfoの軽量版（フィールドは同一）."""
+
+    name: str
+    description: str | None
+    language: str | None
+    languages: dict[str, int]
+    topics: list[str]
+    readme: str | None
+    stars: int
+    forks: int
+    updated_at: str
+    is_fork: bool = False
+    is_archived: bool = False
+    file_structure: list[str] = field(default_factory=list)
+    dependency_files: list[FileRecord] = field(default_factory=list)
+    main_files: list[FileRecord] = field(default_factory=list)
+    config_files: list[str] = field(default_factory=list)
+    readme_sha: str | None = None
+
+    def to_model(self) -> RepoInfo:
+        """API境界用にRepoInfoへ変換（値は検証済みのため再検証しない）."""
+        return RepoInfo.model_construct(
+            name=self.name,
+            description=self.description,
+            language=self.language,
+            languages=self.languages,
+            topics=self.topics,
+            readme=self.readme,
+            stars=self.stars,
+            forks=self.forks,
+            updated_at=self.updated_at,
+            is_fork=self.is_fork,
+            is_archived=self.is_archived,
+            file_structure=self.file_structure,
+            dependency_files=[
+                FileContent.model_construct(path=f.path, content=f.content, sha=f.sha)
+                for f in self.dependency_files
+            ],
+            main_files=[
+                FileContent.model_construct(path=f.path, content=f.content, sha=f.sha)
+                for f in self.main_files
+            ],
+            config_files=self.config_files,
+            readme_sha=self.readme_sha,
+        )
+
+    @classmethod
+    def from_model(cls, info: RepoInfo) -> RepoRecord:
+        """RepoInfoから変換."""
+        return decode_repo(info.model_dump())
+
+
+def _encode_file(file: FileRecord, referenced: Container[str]) -> dict[str, Any]:
+    if file.sha is not None and file.sha in referenced:
+        return {"path": file.path, "sha": file.sha, "length": len(file.content)}
+    return {"path": file.path, "content": file.content, "sha": file.sha}
+
+
+def encode_repo(record: RepoRecord, referenced: Container[str] = ()) -> dict[str, Any]:
+    """Firestoreに保存するdictへ変換（リスト・文字列はコピーしない）.
+
+    Args:
+        record: 変換するリポジトリ
+        referenced: BlobStoreに保存済みのSHA（該当する内容は参照として保存する）
+    """
+    data = {
+        "name": record.name,
+        "description": record.description,
+        "language": record.language,
+        "languages": record.languages,
+        "topics": record.topics,
+        "readme": record.readme,
+        "readme_sha": record.readme_sha,
+        "stars": record.stars,
+        "forks": record.forks,
+        "updated_at": record.updated_at,
+        "is_fork": record.is_fork,
+        "is_archived": record.is_archived,
+        "file_structure": record.file_structure,
+        "dependency_files": [
+            _encode_file(f, referenced) for f in record.dependency_files
+        ],
+        "main_files": [_encode_file(f, referenced) for f in record.main_files],
+        "config_files": record.config_files,
+    }
+    if record.readme is not None and record.readme_sha in referenced:
+        data["readme"] = None
+        data["readme_length"] = len(record.readme)
+    return data
+
+
+def _resolve(sha: str | None, length: int, blobs: BlobResolver | None) -> str:
+    """参照として保存された内容をBlobStoreから取得."""
+    data = blobs(sha) if sha is not None and blobs is not None else None
+    if data is None:
+        raise LookupError(f"Blob not found: {sha}")
+    return data.decode("utf-8")[:length]
+
+
+def _decode_file(data: dict[str, Any], blobs: BlobResolver | None) -> FileRecord:
+    content = data.get("content")
+    if content is None:
+        content = _resolve(data.get("sha"), data["length"], blobs)
+    return FileRecord(data["path"], content, data.get("sha"))
+
+
+def decode_repo(data: dict[str, Any], blobs: BlobResolver | None = None) -> RepoRecord:
+    """キャッシュのdictから復元（保存時に検証済みのため型検証はしない）.
+
+    Raises:
+        LookupError: 参照している内容がBlobStoreにない
+    """
+    readme = data.get("readme")
+    if readme is None and "readme_length" in data:
+        readme = _resolve(data.get("readme_sha"), data["readme_length"], blobs)
+    return RepoRecord(
+        name=data["name"],
+        description=data.get("description"),
+        language=data.get("language"),
+        languages=data.get("languages") or {},
+        topics=data.get("topics") or [],
+        readme=readme,
+        stars=data.get("stars", 0),
+        forks=data.get("forks", 0),
+        updated_at=data.get("updated_at", ""),
+        is_fork=data.get("is_fork", False),
+        is_archived=data.get("is_archived", False),
+        file_structure=data.get("file_structure") or [],
+        dependency_files=[
+            _decode_file(f, blobs) for f in data.get("dependency_files") or ()
+        ],
+        main_files=[_decode_file(f, blobs) for f in data.get("main_files") or ()],
+        config_files=data.get("config_files") or [],
+        readme_sha=data.get("readme_sha"),
+    )
+
+
+@dataclass(slots=True)
+class PackedRepo:
+    """連結ストリーム内の1リポジトリ分の位置."""
+
+    name: str
+    offset: int
+    length: int
+
+    def to_dict(self) -> dict[str, Any]:
+        """Firestoreに保存するdictへ変換."""
+        return {"name": self.name, "offset": self.offset, "length": self.length}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PackedRepo:
+        """dictから復元."""
+        return cls(name=data["name"], offset=data["offset"], length=data["length"])
+
+
+def pack_repos(
+    records: list[RepoRecord], referenced: Container[str] = ()
+) -> tuple[list[PackedRepo], bytes]:
+    """リポジトリごとにzstd圧縮し、索引と連結したバイト列を返す."""
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    index: list[PackedRepo] = []
+    frames: list[bytes] = []
+    offset = 0
+    for record in records:
+        raw = json.dumps(
+            encode_repo(record, referenced), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        frame = compressor.compress(raw)
+        index.append(PackedRepo(name=record.name, offset=offset, length=len(frame)))
+        frames.append(frame)
+        offset += len(frame)
+    return index, b"".join(frames)
+
+
+def unpack_repo(frame: bytes, blobs: BlobResolver | None = None) -> RepoRecord:
+    """pack_reposで圧縮した1リポジトリ分のフレームから復元."""
+    return decode_repo(
+        json.loads(zstandard.ZstdDecompressor().decompress(frame)), blobs
+    )
@@ -0,0 +1,213 @@
+"""リポジトリのtarballスナップショットの読み込み.
+
+ファイル数の多いリポジトリでは、extract_repo_info がディレクトリごと・ファイルごとに
+Contents APIを呼ぶ。代わりに codeload.github.com のtarball（デフォルトブランチ）を
+ストリームで1回だけ読み、ファイル一覧と必要なファイルの内容を同時に取り出す。
+
+- アーカイブはディスクにもメモリにも保持しない（tarfileのストリームモードで逐次読む）
+- ダウンロード量が max_bytes を超えたら中断する（呼び出し側でAPIに切り替える）
+- 内容は wanted が返す文字数までだけ保持する
+- ファイル一覧は get_repo_structure と同じ幅優先の順・深さにそろえる
+
+codeloadはAPIのレート制限を消費しない。どちらを使うかは github.py が
+リポジトリごとに判断する（choose_extraction_mode）。
+"""
+
+from __future__ import annotations
+
+import codecs
+import io
+import logging
+import tarfile
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from urllib.parse import quote
+
+import httpx
+
+from app.services.blob_store import git_blob_sha
+from app.services.const import GITHUB_CODELOAD_URL, GITHUB_RAW_TIMEOUT_SECONDS
+from app.services.logging_config import log_structured
+from app.services.metrics import observe_call, registry
+from app.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# パス → 保持する最大文字数（Noneなら内容は読まない）
+WantedContent = Callable[[str], int | None]
+
+
+class SnapshotTooLarge(Exception):
+    """ダウンロード量が上限を超えた."""
+
+
+@dataclass
+class Snapshot:
+    """tarballから取り出したファイル一覧と内容."""
+
+    structure: list[str] = field(default_factory=list)
+    # パス → 内容（先頭のみの場合あり）
+    contents: dict[str, str] = field(default_factory=dict)
+    # パス → git blob SHA（内容を切り詰めずに保持したファイルのみ）
+    shas: dict[str, str] = field(default_factory=dict)
+    # パス → サイズ（バイト）
+    sizes: dict[str, int] = field(default_factory=dict)
+    received_bytes: int = 0
+
+
+class _CappedStream(io.RawIOBase):
+    """HTTPのチャンクを読み込み用のファイルとして見せる（上限を超えたら中断）."""
+
+    def __init__(self, chunks: Iterator[bytes], max_bytes: int) -> None:
+        self._chunks = chunks
+        self._buffer = b""
+        self.max_bytes = max_bytes
+        self.received = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:  # type: ignore[override]
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self.received += len(chunk)
+            if self.received > self.max_bytes:
+                raise SnapshotTooLarge(self.received)
+            self._buffer = chunk
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _breadth_first(paths: list[str]) -> list[str]:
+    """tarの順（深さ優先）から get_repo_structure と同じ幅優先の順に並べ替える."""
+    children: dict[str, list[str]] = {}
+    for path in paths:
+        children.setdefault(path.rpartition("/")[0], []).append(path)
+    ordered: list[str] = []
+    queue = list(children.get("", []))
+    position = 0
+    while position < len(queue):
+        path = queue[position]
+        position += 1
+        ordered.append(path)
+        queue.extend(children.get(path, []))
+    return ordered
+
+
+def _read_text(data: bytes, complete: bool) -> str | None:
+    """UTF-8としてデコード（バイナリならNone）.
+
+    途中で切ったもの（complete=False）は末尾の不完全な文字のみ捨てる。
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        return decoder.decode(data, final=complete)
+    except UnicodeDecodeError:
+        return None
+
+
+@traced()
+def read_snapshot(
+    full_name: str,
+    ref: str,
+    *,
+    max_depth: int,
+    wanted: WantedContent,
+    max_bytes: int,
+    max_file_bytes: int,
+) -> Snapshot | None:
+    """tarballを1回読み、ファイル一覧と必要な内容を取り出す.
+
+    Args:
+        full_name: "owner/repo"
+        ref: ブランチ名
+        max_depth: ファイル一覧に含める深さ（get_repo_structure と同じ意味）
+        wanted: パスごとに保持する最大文字数を返す関数
+        max_bytes: ダウンロード量の上限（圧縮後）
+        max_file_bytes: これを超えるファイルは先頭 wanted 文字分のみ読む
+
+    Returns:
+        Snapshot、または取得できない・上限を超えた場合はNone
+    """
+    url = f"{GITHUB_CODELOAD_URL}/{full_name}/tar.gz/{quote(ref)}"
+    snapshot = Snapshot()
+    paths: list[str] = []
+    try:
+        with (
+            observe_call("github", "codeload.tarball") as call,
+            httpx.stream(
+                "GET", url, timeout=GITHUB_RAW_TIMEOUT_SECONDS, follow_redirects=True
+            ) as response,
+        ):
+            if response.status_code != 200:
+                if response.status_code >= 500:
+                    call.outcome = "error"
+                log_structured(
+                    logger,
+                    "Failed to download snapshot",
+                    level=logging.WARNING,
+                    repo=full_name,
+                    status=response.status_code,
+                )
+                return None
+            stream = _CappedStream(response.iter_bytes(), max_bytes)
+            with tarfile.open(
+                fileobj=io.BufferedReader(stream), mode="r|gz"
+            ) as archive:
+                for member in archive:
+                    # 先頭の "{repo}-{ref}/" を除く
+                    _, _, path = member.name.partition("/")
+                    if not path or not (member.isfile() or member.isdir()):
+                        continue
+                    path = path.rstrip("/")
+                    if path.count("/") <= max_depth:
+                        paths.append(path)
+                    if not member.isfile():
+                        continue
+                    snapshot.sizes[path] = member.size
+                    limit = wanted(path)
+                    if limit is None:
+                        continue
+                    file = archive.extractfile(member)
+                    if file is None:
+                        continue
+                    complete = member.size <= max_file_bytes
+                    # UTF-8は1文字最大4バイト
+                    data = file.read() if complete else file.read(limit * 4)
+                    text = _read_text(data, complete)
+                    if text is None:
+                        continue
+                    snapshot.contents[path] = text[:limit]
+                    # 内容が切り詰められていなければBlobStoreに保存できる
+                    if complete and len(text) <= limit:
+                        snapshot.shas[path] = git_blob_sha(data)
+            snapshot.received_bytes = stream.received
+    except SnapshotTooLarge as exc:
+        registry.counter("github_snapshot", outcome="too_large").inc()
+        log_structured(
+            logger,
+            "Snapshot exceeded size limit",
+            level=logging.INFO,
+            repo=full_name,
+            received_bytes=exc.args[0],
+        )
+        return None
+    except (httpx.HTTPError, tarfile.TarError, OSError, EOFError):
+        registry.counter("github_snapshot", outcome="error").inc()
+        log_structured(
+            logger,
+            "Failed to read snapshot",
+            level=logging.WARNING,
+            exc_info=True,
+            repo=full_name,
+        )
+        return None
+
+    snapshot.structure = _breadth_first(paths)
+    registry.counter("github_snapshot", outcome="ok").inc()
+    registry.counter("github_file_bytes", mode="snapshot").inc(snapshot.received_bytes)
+    return snapshot
@@ -0,0 +1,172 @@
+"""リポジトリ選択中の先行分析（extract_repo_info の投機実行）.
+
+リポジトリを選んでから「プロファイル生成」を押すまでの間、サーバーは何もしていない。
+選択UIが描画されるたびに現在の選択を渡し、選択中のリポジトリの extract_repo_info を
+Priority.BACKGROUND でワーカーに投入しておく。選択から外れたリポジトリの処理は取り消す。
+生成ボタンが押されたら完了済みの結果を受け取り、残りだけを通常どおり分析する。
+
+    speculate_repo_info(user.login, selected, access_token)   # 選択UIの描画ごと
+    extracted = take_speculated(user.login, selected)          # 生成ボタン押下時
+    repos = analyze_selected_repos(user.login, selected, token, extracted)
+
+選択の操作中に無駄な取得をしないよう、各処理は REPO_SPECULATION_DELAY_SECONDS
+待ってから開始する（その間に外されたものは取得しない）。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from app.services.const import (
+    REPO_PREFETCH_MAX_USERS,
+    REPO_SPECULATION_DELAY_SECONDS,
+    REPO_SPECULATION_TTL_SECONDS,
+    REPO_SPECULATION_WAIT_SECONDS,
+    REPO_SPECULATION_WORKERS,
+)
+from app.services.github import analyze_selected_repos
+from app.services.github_scheduler import Priority, github_user, has_budget
+from app.services.metrics import registry
+from app.services.repo_record import RepoRecord
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=REPO_SPECULATION_WORKERS, thread_name_prefix="repo-speculation"
+)
+
+
+@dataclass
+class _Job:
+    """リポジトリ1件分の先行分析."""
+
+    future: Future[RepoRecord | None] = field(init=False)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    started: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        self.future.cancel()
+
+
+@dataclass
+class _Speculation:
+    """ユーザー1人分の先行分析."""
+
+    updated_at: float
+    jobs: dict[str, _Job] = field(default_factory=dict)
+
+
+_speculations: dict[str, _Speculation] = {}
+_lock = threading.Lock()
+
+
+def _extract(
+    username: str, name: str, access_token: str | None, job: _Job
+) -> RepoRecord | None:
+    # 選択が落ち着くまで待ち、その間に外されたら何もしない
+    if job.cancelled.wait(REPO_SPECULATION_DELAY_SECONDS):
+        return None
+    job.started.set()
+    with github_user(username, Priority.BACKGROUND):
+        records = analyze_selected_repos(username, [name], access_token)
+    return records[0] if records else None
+
+
+def _evict_expired(now: float) -> None:
+    """期限切れ・上限超過のユーザーを破棄（_lock を保持して呼ぶ）."""
+    for username, speculation in list(_speculations.items()):
+        if now - speculation.updated_at > REPO_SPECULATION_TTL_SECONDS:
+            for job in speculation.jobs.values():
+                job.cancel()
+            del _speculations[username]
+    while len(_speculations) > REPO_PREFETCH_MAX_USERS:
+        oldest = min(_speculations, key=lambda u: _speculations[u].updated_at)
+        for job in _speculations.pop(oldest).jobs.values():
+            job.cancel()
+
+
+def speculate_repo_info(
+    username: str, repo_names: Iterable[str], access_token: str | None
+) -> None:
+    """選択中のリポジトリの分析を開始し、選択から外れたものを取り消す."""
+    selected = set(repo_names)
+    now = time.monotonic()
+    with _lock:
+        _evict_expired(now)
+        speculation = _speculations.setdefault(username, _Speculation(updated_at=now))
+        speculation.updated_at = now
+        for name in list(speculation.jobs):
+            if name not in selected:
+                speculation.jobs.pop(name).cancel()
+                registry.counter("repo_speculation", outcome="cancelled").inc()
+        # 予算が少ないときは新たに始めない（取得済み・実行中のものは残す）
+        if not has_budget(access_token):
+            return
+        for name in selected:
+            job = speculation.jobs.get(name)
+            if job is not None and not (
+                job.future.done() and job.future.exception() is not None
+            ):
+                continue
+            job = _Job()
+            job.future = _executor.submit(
+                contextvars.copy_context().run,
+                _extract,
+                username,
+                name,
+                access_token,
+                job,
+            )
+            speculation.jobs[name] = job
+            registry.counter("repo_speculation", outcome="started").inc()
+
+
+def take_speculated(username: str, repo_names: Iterable[str]) -> dict[str, RepoRecord]:
+    """先行分析の結果を受け取る（以降の先行分析は破棄する）.
+
+    実行中のものは REPO_SPECULATION_WAIT_SECONDS まで（全件まとめて）完了を待つ。
+    未開始のもの・期限内に終わらなかったものは取り消し、呼び出し側で分析させる
+    （BACKGROUND優先度のまま待つより早い）。
+    """
+    with _lock:
+        speculation = _speculations.pop(username, None)
+    if speculation is None:
+        return {}
+    selected = set(repo_names)
+    running: dict[str, _Job] = {}
+    for name, job in speculation.jobs.items():
+        if name in selected and job.started.is_set():
+            running[name] = job
+        else:
+            job.cancel()
+    wait(
+        [job.future for job in running.values()],
+        timeout=REPO_SPECULATION_WAIT_SECONDS,
+    )
+    extracted: dict[str, RepoRecord] = {}
+    for name, job in running.items():
+        if not job.future.done():
+            # 期限内に終わらなかったものは呼び出し側で改めて分析する
+            job.cancel()
+            registry.counter("repo_speculation", outcome="abandoned").inc()
+            continue
+        if job.future.exception() is None and job.future.result() is not None:
+            extracted[name] = job.future.result()
+    registry.counter("repo_speculation", outcome="used").inc(len(extracted))
+    return extracted
+
+
+def discard_speculation(username: str) -> None:
+    """ユーザーの先行分析を破棄（ログアウト時）."""
+    with _lock:
+        speculation = _speculations.pop(username, None)
+    if speculation is not None:
+        for job in speculation.jobs.values():
+            job.cancel()
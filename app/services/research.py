@@ -4,8 +4,7 @@ import json
 import logging
 import os
 
-from perplexity import Perplexity
-
+from app.services.lazy_import import lazy_attr
 from app.services.logging_config import log_structured
 from app.services.models import (
     JobPreferences,
@@ -14,9 +13,13 @@ from app.services.models import (
     JobSource,
     MatchReason,
 )
+from app.services.tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
+# perplexity SDKはimportが重いため初回検索時まで遅延
+Perplexity = lazy_attr("perplexity", "Perplexity")
+
 
 def build_search_prompt(
     profile: dict,
@@ -112,6 +115,7 @@ Return the result strictly in the following JSON format:
 """
 
 
+@traced()
 def search_jobs(
     profile: dict,
     preferences: JobPreferences | None = None,
@@ -173,70 +177,71 @@ def search_jobs(
         )
         client = Perplexity(api_key=api_key)  # 明示的にAPIキーを渡す
 
-        completion = client.chat.completions.create(
-            model="sonar-pro",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.0,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "recommendations": {
-                                "type": "array",
-                                "minItems": 3,
-                                "maxItems": 3,
-                                "items": {
-                                    "type": "object",
-                                    "properties": {
-                                        "job_title": {"type": "string"},
-                                        "company": {"type": "string"},
-                                        "location": {"type": "string"},
-                                        "salary_range": {"type": "string"},
-                                        "reason": {
-                                            "type": "object",
-                                            "properties": {
-                                                "summary": {"type": "string"},
-                                                "matched_conditions": {
-                                                    "type": "array",
-                                                    "items": {"type": "string"},
-                                                },
-                                                "why_good": {"type": "string"},
-                                            },
-                                            "required": [
-                                                "summary",
-                                                "matched_conditions",
-                                                "why_good",
-                                            ],
-                                        },
-                                        "sources": {
-                                            "type": "array",
-                                            "items": {
+        with span("research.perplexity_request", dependency="perplexity"):
+            completion = client.chat.completions.create(
+                model="sonar-pro",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.0,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "recommendations": {
+                                    "type": "array",
+                                    "minItems": 3,
+                                    "maxItems": 3,
+                                    "items": {
+                                        "type": "object",
+                                        "properties": {
+                                            "job_title": {"type": "string"},
+                                            "company": {"type": "string"},
+                                            "location": {"type": "string"},
+                                            "salary_range": {"type": "string"},
+                                            "reason": {
                                                 "type": "object",
                                                 "properties": {
-                                                    "url": {"type": "string"},
-                                                    "used_for": {"type": "string"},
+                                                    "summary": {"type": "string"},
+                                                    "matched_conditions": {
+                                                        "type": "array",
+                                                        "items": {"type": "string"},
+                                                    },
+                                                    "why_good": {"type": "string"},
+                                                },
+                                                "required": [
+                                                    "summary",
+                                                    "matched_conditions",
+                                                    "why_good",
+                                                ],
+                                            },
+                                            "sources": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "url": {"type": "string"},
+                                                        "used_for": {"type": "string"},
+                                                    },
+                                                    "required": ["url", "used_for"],
                                                 },
-                                                "required": ["url", "used_for"],
                                             },
                                         },
+                                        "required": [
+                                            "job_title",
+                                            "company",
+                                            "location",
+                                            "reason",
+                                            "sources",
+                                        ],
                                     },
-                                    "required": [
-                                        "job_title",
-                                        "company",
-                                        "location",
-                                        "reason",
-                                        "sources",
-                                    ],
-                                },
-                            }
-                        },
-                        "required": ["recommendations"],
-                    }
+                                }
+                            },
+                            "required": ["recommendations"],
+                        }
+                    },
                 },
-            },
-        )
+            )
 
         content = completion.choices[0].message.content
         if not isinstance(content, str):
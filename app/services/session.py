@@ -1,12 +1,13 @@
 """Session persistence service using Firestore and Cookies."""
 
+from __future__ import annotations
+
 import logging
 import uuid
 from datetime import UTC, datetime, timedelta
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import streamlit as st
-from google.cloud.firestore_v1 import DocumentSnapshot
 
 from app.services.cache import get_firestore_client
 from app.services.const import (
@@ -14,9 +15,15 @@ from app.services.const import (
     SESSION_TTL_DAYS,
 )
 from app.services.logging_config import log_structured
+from app.services.metrics import observe_call
 from app.services.models import GitHubUser
 from app.services.session_keys import SESSION_ID
 from app.services.streamlit_components.cookie_manager import CookieManager
+from app.services.tracing import traced
+from app.services.ttl import EXPIRES_AT_FIELD, compute_expires_at, is_expired
+
+if TYPE_CHECKING:
+    from google.cloud.firestore_v1 import DocumentSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -87,6 +94,7 @@ def invalidate_session(
         delete_session_cookie(cookie_manager)
 
 
+@traced()
 def get_firestore_session(session_id: str) -> dict[str, Any] | None:
     """Firestoreからセッションを取得.
 
@@ -99,7 +107,8 @@ def get_firestore_session(session_id: str) -> dict[str, Any] | None:
     try:
         db = get_firestore_client()
         doc_ref = db.collection("sessions").document(session_id)
-        doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
+        with observe_call("firestore", "sessions.get"):
+            doc: DocumentSnapshot = doc_ref.get()  # type: ignore[assignment]
 
         if not doc.exists:
             return None
@@ -108,14 +117,9 @@ def get_firestore_session(session_id: str) -> dict[str, Any] | None:
         if data is None:
             return None
 
-        # TTLチェック（last_accessed_atから7日以上経過していたら無効）
-        last_accessed = data.get("last_accessed_at")
-        if last_accessed:
-            expiry = last_accessed + timedelta(days=SESSION_TTL_DAYS)
-            if datetime.now(UTC) > expiry:
-                # 期限切れ → セッション削除
-                delete_firestore_session(session_id)
-                return None
+        # TTLチェック（期限切れドキュメントの削除はFirestore TTL / スイーパーが行う）
+        if is_expired(data, "sessions"):
+            return None
 
         return data
     except Exception:
@@ -129,6 +133,7 @@ def get_firestore_session(session_id: str) -> dict[str, Any] | None:
         return None
 
 
+@traced()
 def save_firestore_session(
     session_id: str,
     user: GitHubUser,
@@ -147,22 +152,24 @@ def save_firestore_session(
 
         now = datetime.now(UTC)
 
-        doc_ref.set(
-            {
-                "session_id": session_id,
-                "user_id": user.id,
-                "access_token": access_token,
-                "user_data": {
-                    "id": user.id,
-                    "login": user.login,
-                    "name": user.name,
-                    "email": user.email,
-                    "avatar_url": user.avatar_url,
-                },
-                "created_at": now,
-                "last_accessed_at": now,
-            }
-        )
+        with observe_call("firestore", "sessions.set"):
+            doc_ref.set(
+                {
+                    "session_id": session_id,
+                    "user_id": user.id,
+                    "access_token": access_token,
+                    "user_data": {
+                        "id": user.id,
+                        "login": user.login,
+                        "name": user.name,
+                        "email": user.email,
+                        "avatar_url": user.avatar_url,
+                    },
+                    "created_at": now,
+                    "last_accessed_at": now,
+                    EXPIRES_AT_FIELD: compute_expires_at(now, SESSION_TTL_DAYS),
+                }
+            )
     except Exception:
         # 保存失敗は無視（セッション永続化は必須ではない）
         log_structured(
@@ -174,8 +181,9 @@ def save_firestore_session(
         )
 
 
+@traced()
 def update_session_last_accessed(session_id: str) -> None:
-    """セッションのlast_accessed_atを更新.
+    """セッションのlast_accessed_atとexpires_atを更新.
 
     Args:
         session_id: セッションID
@@ -183,7 +191,14 @@ def update_session_last_accessed(session_id: str) -> None:
     try:
         db = get_firestore_client()
         doc_ref = db.collection("sessions").document(session_id)
-        doc_ref.update({"last_accessed_at": datetime.now(UTC)})
+        now = datetime.now(UTC)
+        with observe_call("firestore", "sessions.update"):
+            doc_ref.update(
+                {
+                    "last_accessed_at": now,
+                    EXPIRES_AT_FIELD: compute_expires_at(now, SESSION_TTL_DAYS),
+                }
+            )
     except Exception:
         log_structured(
             logger,
@@ -194,6 +209,7 @@ def update_session_last_accessed(session_id: str) -> None:
         )
 
 
+@traced()
 def delete_firestore_session(session_id: str) -> None:
     """Firestoreからセッションを削除.
 
@@ -203,7 +219,8 @@ def delete_firestore_session(session_id: str) -> None:
     try:
         db = get_firestore_client()
         doc_ref = db.collection("sessions").document(session_id)
-        doc_ref.delete()
+        with observe_call("firestore", "sessions.delete"):
+            doc_ref.delete()
     except Exception:
         log_structured(
             logger,
@@ -214,6 +231,7 @@ def delete_firestore_session(session_id: str) -> None:
         )
 
 
+@traced()
 def delete_user_sessions(user_id: int) -> int:
     """指定ユーザーの全セッションを削除.
 
@@ -227,11 +245,13 @@ def delete_user_sessions(user_id: int) -> int:
         db = get_firestore_client()
         sessions_ref = db.collection("sessions")
         query = sessions_ref.where("user_id", "==", user_id)
-        docs = query.stream()
+        with observe_call("firestore", "sessions.query"):
+            docs = list(query.stream())
 
         deleted_count = 0
         for doc in docs:
-            doc.reference.delete()
+            with observe_call("firestore", "sessions.delete"):
+                doc.reference.delete()
             deleted_count += 1
 
         if deleted_count > 0:
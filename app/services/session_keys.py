@@ -7,6 +7,8 @@ USER = "user"
 
 # Profile view/session state
 PROFILE_STATE = "profile"
+# PROFILE_STATE がLLMを使わない簡易プロファイル（縮退）であればTrue
+PROFILE_DEGRADED = "profile_degraded"
 REPO_METADATA_LIST = "repo_metadata_list"
 SELECTED_REPOS = "selected_repos"
 REGEN_REPO_METADATA_LIST = "regen_repo_metadata_list"
@@ -23,12 +25,22 @@ OTHER_PREFERENCES = "other_preferences"
 
 # Firestore キャッシュ用キー（再レンダリング時のFirestore呼び出し削減用）
 QUOTA_STATUS = "_cache_quota_status"
+QUOTA_SYNCED_AT = "_cache_quota_synced_at"  # サーバー値と最後に一致した時刻
+QUOTA_PENDING = "_cache_quota_pending"  # 楽観的に反映済みで未照合のクレジット操作
+QUOTA_REFRESH = "_cache_quota_refresh"  # バックグラウンド再取得のFuture
 PROFILE = "_cache_profile"
 USER_SETTINGS = "_cache_user_settings"
 
 # 検索結果キャッシュ
 JOB_RESULTS = "_cache_job_results"
 JOB_PREFERENCES = "_cache_job_preferences"  # 検索条件（追加検索用）
+# 表示済みの企業名（古いページを削除しても追加検索で除外する）
+JOB_EXCLUDED_COMPANIES = "_cache_job_excluded_companies"
+
+# メモリ予算超過でFirestoreへ退避したキー（session_memory.restore_spilledで復元）
+SPILLED_KEYS = "_spilled_keys"
+# 退避済みの内容のハッシュ（キー -> ハッシュ。変わっていなければ再度書き込まない）
+SPILLED_HASHES = "_spilled_hashes"
 
 # Onboarding
 SHOW_PROFILE_SUCCESS = "_show_profile_success"
@@ -0,0 +1,363 @@
+"""セッションごとのメモリ計測と、予算超過時のsession_state退避.
+
+1インスタンス（1Gi）で最大80セッションを処理するため、各セッションの
+st.session_state の深いサイズを計測し、予算を超えたら以下の順で減らす。
+
+1. 再構築可能なエントリを削除（リポジトリ一覧、Firestoreキャッシュのコピー、
+   Cookieキャッシュ等。次回必要になった時点で再取得される）
+2. 求人検索結果の古いページを削除（直近の1ページのみ残す）
+3. 永続化が必要なエントリ（クレジットを消費した求人検索結果）を
+   Firestore `session_spill/{user_id}_{セッションIDのハッシュ}` に退避し、
+   session_stateから削除する。参照する箇所で restore_spilled() を呼ぶと
+   復元される（同じユーザーの別タブ・別端末のセッションとは混ざらない）。
+   退避時の内容のハッシュを SPILLED_HASHES に残し、復元後に変わっていなければ
+   Firestoreに書き直さずにsession_stateから削除するだけにする。
+
+インスタンス全体のRSSが INSTANCE_MEMORY_SOFT_LIMIT_BYTES を超えている間は
+予算を1/4に絞り、OOMによる再起動を避ける。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import resource
+import sys
+import threading
+from collections.abc import Callable, Iterable, MutableMapping
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from types import FunctionType, ModuleType
+from typing import Any
+
+import streamlit as st
+
+from app.services.cache import get_firestore_client
+from app.services.const import (
+    FREE_PLAN_JOB_LIMIT,
+    INSTANCE_MEMORY_SOFT_LIMIT_BYTES,
+    SESSION_MEMORY_BUDGET_BYTES,
+    SESSION_TTL_DAYS,
+)
+from app.services.logging_config import log_structured
+from app.services.metrics import observe_call, registry
+from app.services.models import JobSearchResult
+from app.services.session_keys import (
+    JOB_RESULTS,
+    PROFILE,
+    PROFILE_DEGRADED,
+    PROFILE_STATE,
+    REGEN_REPO_METADATA_LIST,
+    REPO_METADATA_LIST,
+    SESSION_ID,
+    SPILLED_HASHES,
+    SPILLED_KEYS,
+    USER_SETTINGS,
+)
+from app.services.tracing import traced
+from app.services.ttl import EXPIRES_AT_FIELD, compute_expires_at
+
+logger = logging.getLogger(__name__)
+
+SPILL_COLLECTION = "session_spill"
+
+# 削除してよいキー（削除順）。次回必要になった時点で再取得・再生成される
+REBUILDABLE_KEYS = [
+    REGEN_REPO_METADATA_LIST,
+    REPO_METADATA_LIST,
+    "_cookie_manager_cache",  # cookie_manager._COOKIES_CACHE_KEY（ヘッダーから再構築）
+    USER_SETTINGS,
+    PROFILE,  # Firestore profiles のコピー
+    PROFILE_STATE,  # profile_section がキャッシュからセットし直す（縮退時を除く）
+]
+
+# 古い部分を削除して縮めるキー -> 縮めた値を返す関数
+TRIMMABLE_KEYS: dict[str, Callable[[Any], Any]] = {
+    JOB_RESULTS: lambda value: value.latest(FREE_PLAN_JOB_LIMIT),
+}
+
+# 削除せずFirestoreへ退避するキー -> (シリアライズ, デシリアライズ)
+SPILLABLE_KEYS: dict[str, tuple[Callable[[Any], Any], Callable[[Any], Any]]] = {
+    JOB_RESULTS: (
+        lambda value: value.model_dump(mode="json"),
+        JobSearchResult.model_validate,
+    ),
+}
+
+# 中身を辿らない型（共有オブジェクト、スレッド関連、不変のスカラー）
+_LEAF_TYPES = (
+    type,
+    ModuleType,
+    FunctionType,
+    Future,
+    type(threading.Lock()),
+    str,
+    bytes,
+    bytearray,
+    int,
+    float,
+)
+
+
+def deep_sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    """オブジェクトが参照する全要素を含めたおおよそのバイト数.
+
+    同一オブジェクトは1回だけ数える（seenを共有すると複数キー間の共有も除外される）。
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, _LEAF_TYPES):
+        return size
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    elif isinstance(obj, list | tuple | set | frozenset):
+        for item in obj:
+            size += deep_sizeof(item, seen)
+
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, slot):
+            size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+@dataclass
+class SessionMemoryReport:
+    """1セッション分のsession_stateサイズ."""
+
+    total_bytes: int
+    # キーごとのサイズ（他のキーと共有しているオブジェクトは先に数えたキーに計上）
+    by_key: dict[str, int] = field(default_factory=dict)
+
+    def largest(self, count: int = 5) -> list[tuple[str, int]]:
+        """サイズの大きいキー上位."""
+        return sorted(self.by_key.items(), key=lambda item: item[1], reverse=True)[
+            :count
+        ]
+
+
+def measure_session(state: MutableMapping[str, Any]) -> SessionMemoryReport:
+    """session_stateのキーごとの深いサイズを計測."""
+    seen: set[int] = set()
+    by_key = {str(key): deep_sizeof(state[key], seen) for key in list(state.keys())}
+    return SessionMemoryReport(total_bytes=sum(by_key.values()), by_key=by_key)
+
+
+def _process_rss_bytes() -> int:
+    """プロセスの現在のRSS（取得できない環境ではピークRSS）."""
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * resource.getpagesize()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_budget() -> int:
+    """現在のセッションあたり予算（インスタンスがメモリ逼迫中なら1/4）."""
+    if _process_rss_bytes() > INSTANCE_MEMORY_SOFT_LIMIT_BYTES:
+        return SESSION_MEMORY_BUDGET_BYTES // 4
+    return SESSION_MEMORY_BUDGET_BYTES
+
+
+def _spill_doc_id(user_id: int) -> str | None:
+    """現在のセッションの退避先ドキュメントID（セッションIDがなければNone）.
+
+    セッションIDはCookieの値そのものなので、ハッシュにしてから使う。
+    """
+    session_id = st.session_state.get(SESSION_ID)
+    if not session_id:
+        return None
+    digest = hashlib.sha256(str(session_id).encode()).hexdigest()[:16]
+    return f"{user_id}_{digest}"
+
+
+@traced()
+def _spill(user_id: int, values: dict[str, Any]) -> bool:
+    """エントリをFirestoreへ退避."""
+    doc_id = _spill_doc_id(user_id)
+    if doc_id is None:
+        return False
+    try:
+        now = datetime.now(UTC)
+        doc_ref = get_firestore_client().collection(SPILL_COLLECTION).document(doc_id)
+        with observe_call("firestore", f"{SPILL_COLLECTION}.set"):
+            doc_ref.set(
+                {
+                    **values,
+                    "user_id": user_id,
+                    "spilled_at": now,
+                    EXPIRES_AT_FIELD: compute_expires_at(now, SESSION_TTL_DAYS),
+                },
+                merge=True,
+            )
+        return True
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to spill session state",
+            level=logging.ERROR,
+            exc_info=True,
+            user_id=user_id,
+            keys=list(values),
+        )
+        return False
+
+
+def _digest(value: Any) -> str:
+    """退避する内容（JSON互換）のハッシュ."""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def enforce_session_budget(user_id: int | None) -> list[str]:
+    """現在のセッションが予算を超えていれば退避し、削除・退避したキーを返す.
+
+    スクリプト実行の最後に呼び出す。
+
+    Args:
+        user_id: 退避先のユーザーID（未ログインなら退避せず削除のみ）
+    """
+    state = st.session_state
+    report = measure_session(state)
+    registry.histogram("session_state_kib").observe(report.total_bytes / 1024)
+    budget = current_budget()
+    if report.total_bytes <= budget:
+        return []
+
+    total = report.total_bytes
+    evicted: list[str] = []
+    for key in REBUILDABLE_KEYS:
+        if total <= budget:
+            break
+        if key == PROFILE_STATE and state.get(PROFILE_DEGRADED):
+            # 縮退時の簡易プロファイルはキャッシュしていないため再構築できない
+            continue
+        if key in state:
+            total -= report.by_key.get(key, 0)
+            del state[key]
+            evicted.append(key)
+
+    trimmed: list[str] = []
+    for key, trim in TRIMMABLE_KEYS.items():
+        if total <= budget:
+            break
+        value = state.get(key)
+        if value is None:
+            continue
+        smaller = trim(value)
+        if smaller is not value:
+            size = deep_sizeof(smaller)
+            total -= report.by_key.get(key, 0) - size
+            report.by_key[key] = size
+            state[key] = smaller
+            trimmed.append(key)
+
+    if total > budget and user_id is not None:
+        to_spill = {
+            key: SPILLABLE_KEYS[key][0](state[key])
+            for key in SPILLABLE_KEYS
+            if state.get(key) is not None
+        }
+        hashes = dict(state.get(SPILLED_HASHES) or {})
+        digests = {key: _digest(value) for key, value in to_spill.items()}
+        # 復元後に変わっていないものはFirestoreに残っているため書き直さない
+        changed = {
+            key: value
+            for key, value in to_spill.items()
+            if hashes.get(key) != digests[key]
+        }
+        if to_spill and (not changed or _spill(user_id, changed)):
+            spilled = set(state.get(SPILLED_KEYS, set()))
+            for key in to_spill:
+                total -= report.by_key.get(key, 0)
+                del state[key]
+                spilled.add(key)
+                evicted.append(key)
+            state[SPILLED_KEYS] = spilled
+            state[SPILLED_HASHES] = {**hashes, **digests}
+
+    log_structured(
+        logger,
+        "Session memory budget exceeded",
+        level=logging.WARNING,
+        user_id=user_id,
+        session_bytes=report.total_bytes,
+        budget_bytes=budget,
+        remaining_bytes=total,
+        evicted=evicted,
+        trimmed=trimmed,
+        largest=dict(report.largest()),
+    )
+    return evicted
+
+
+@traced()
+def _load_spilled(user_id: int) -> dict[str, Any] | None:
+    """退避したエントリをFirestoreから読み込む."""
+    doc_id = _spill_doc_id(user_id)
+    if doc_id is None:
+        return None
+    try:
+        doc_ref = get_firestore_client().collection(SPILL_COLLECTION).document(doc_id)
+        with observe_call("firestore", f"{SPILL_COLLECTION}.get"):
+            doc = doc_ref.get()
+        return doc.to_dict() or {}
+    except Exception:
+        log_structured(
+            logger,
+            "Failed to restore spilled session state",
+            level=logging.ERROR,
+            exc_info=True,
+            user_id=user_id,
+        )
+        return None
+
+
+def restore_spilled(user_id: int, keys: Iterable[str] | None = None) -> list[str]:
+    """退避済みのエントリをsession_stateに戻し、復元したキーを返す.
+
+    退避していなければFirestoreにはアクセスしない。値を読む箇所で、読むキーだけを
+    指定して呼ぶ。退避後に新しい値がセットされたキーは上書きしない。
+
+    Args:
+        user_id: 退避先のユーザーID
+        keys: 復元するキー（省略時は退避済みのすべて）
+    """
+    spilled: set[str] = st.session_state.get(SPILLED_KEYS) or set()
+    wanted = spilled if keys is None else spilled & set(keys)
+    if not wanted:
+        return []
+
+    remaining = spilled - wanted
+    stale = {key for key in wanted if key in st.session_state}
+    wanted -= stale
+    data = _load_spilled(user_id) if wanted else {}
+    if data is None:
+        return []
+
+    restored = []
+    for key in wanted:
+        if key in data and key in SPILLABLE_KEYS:
+            st.session_state[key] = SPILLABLE_KEYS[key][1](data[key])
+            restored.append(key)
+    if stale:
+        # 新しい値で置き換えられたもの（Firestoreの内容とは一致しない）
+        hashes = dict(st.session_state.get(SPILLED_HASHES) or {})
+        for key in stale:
+            hashes.pop(key, None)
+        st.session_state[SPILLED_HASHES] = hashes
+    if remaining:
+        st.session_state[SPILLED_KEYS] = remaining
+    else:
+        st.session_state.pop(SPILLED_KEYS, None)
+    return restored
@@ -0,0 +1,301 @@
+"""プロファイル生成・求人検索パイプラインのトレーシング.
+
+各処理段階（GitHub API呼び出し、LLM生成、Firestore読み書き等）を
+入れ子のスパンとして計測し、どこで時間がかかったかを追跡する。
+
+    with span("pipeline.profile", repo_count=3):
+        ...
+
+    @traced()
+    def get_repo_structure(...): ...
+
+エクスポーターは環境変数 `TRACE_EXPORTER` で選択する:
+    - 未設定: 無効（スパンは作成されず、オーバーヘッドはほぼない）
+    - "json": 1スパン1行のJSONを標準エラーに出力（Cloud Runでは構造化ログになる）
+    - "otel": OpenTelemetry（opentelemetry-sdk導入時のみ。未導入ならjsonにフォールバック）
+
+`dependency=` を指定したスパンはトレーシング無効時も
+`app.services.metrics` に依存先別のレイテンシとして記録される。
+
+ルートスパン作成時に `logging_config._get_user_context` のuser_id/loginと
+セッションIDを取得し、同じトレース内の全スパンに付与する。
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import logging
+import secrets
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any, Protocol, TextIO, TypeVar
+
+from app.services.const import TRACE_EXPORTER
+from app.services.logging_config import _get_user_context
+from app.services.metrics import observe_call, record_call
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Span:
+    """計測中または計測済みのスパン."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    # トレース共通の属性（user_id, login, session_id）
+    context: dict[str, str]
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    status: str = "ok"
+    error: str | None = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """属性を追加（結果件数など、処理後に判明する値用）."""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        """エクスポート用の辞書に変換."""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": datetime.fromtimestamp(self.start_time, UTC).isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            **self.context,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(Protocol):
+    """スパンの出力先."""
+
+    def on_start(self, span: Span) -> None:
+        """スパン開始時に呼ばれる."""
+
+    def on_end(self, span: Span) -> None:
+        """スパン終了時に呼ばれる."""
+
+
+class JsonExporter:
+    """終了したスパンを1行1スパンのJSONで出力するエクスポーター.
+
+    テストでは `io.StringIO` を渡して出力を検証できる。
+    """
+
+    def __init__(self, stream: TextIO | None = None) -> None:
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        """開始時は何もしない."""
+
+    def on_end(self, span: Span) -> None:
+        """スパンをJSON行として書き出す."""
+        line = json.dumps(
+            {"message": "trace span", **span.to_dict()},
+            ensure_ascii=False,
+            default=str,
+        )
+        stream = self._stream or sys.stderr
+        with self._lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+
+class OpenTelemetryExporter:
+    """OpenTelemetryのトレーサーへスパンを転送するエクスポーター.
+
+    プロバイダー・エクスポーター（Cloud Trace等）の設定は
+    OpenTelemetry SDK側で行う前提とする。
+    """
+
+    def __init__(self) -> None:
+        from opentelemetry import trace as otel_trace
+
+        self._trace = otel_trace
+        self._tracer = otel_trace.get_tracer("job-recommender")
+        self._active: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        """対応するOpenTelemetryスパンを開始."""
+        with self._lock:
+            parent = self._active.get(span.parent_id) if span.parent_id else None
+        context = self._trace.set_span_in_context(parent) if parent else None
+        otel_span = self._tracer.start_span(
+            span.name,
+            context=context,
+            start_time=int(span.start_time * 1e9),
+            attributes=span.context,
+        )
+        with self._lock:
+            self._active[span.span_id] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        """属性・ステータスを反映してOpenTelemetryスパンを終了."""
+        with self._lock:
+            otel_span = self._active.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if isinstance(value, str | bool | int | float):
+                otel_span.set_attribute(key, value)
+        if span.status == "error":
+            otel_span.set_status(self._trace.StatusCode.ERROR, span.error)
+        otel_span.end()
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_exporters: list[SpanExporter] | None = None
+
+
+def _exporters_from_env() -> list[SpanExporter]:
+    if TRACE_EXPORTER == "otel":
+        try:
+            return [OpenTelemetryExporter()]
+        except ModuleNotFoundError:
+            logger.warning("opentelemetry is not available; falling back to json.")
+            return [JsonExporter()]
+    if TRACE_EXPORTER == "json":
+        return [JsonExporter()]
+    return []
+
+
+def get_exporters() -> list[SpanExporter]:
+    """有効なエクスポーター一覧（初回は環境変数から構成）."""
+    global _exporters
+    if _exporters is None:
+        _exporters = _exporters_from_env()
+    return _exporters
+
+
+def set_exporters(exporters: list[SpanExporter] | None) -> None:
+    """エクスポーターを差し替える（Noneで環境変数の設定に戻す）."""
+    global _exporters
+    _exporters = exporters
+
+
+def current_span() -> Span | None:
+    """現在のスパン（トレーシング無効時やスパン外ではNone）."""
+    return _current_span.get()
+
+
+def _trace_context() -> dict[str, str]:
+    """ルートスパンに付与するuser_id/login/session_idを取得."""
+    user_id, login = _get_user_context()
+    context = {"user_id": user_id, "login": login}
+    try:
+        import streamlit as st
+
+        from app.services.session_keys import SESSION_ID
+
+        context["session_id"] = st.session_state.get(SESSION_ID)
+    except (ImportError, AttributeError, RuntimeError):
+        pass
+    return {key: value for key, value in context.items() if value}
+
+
+def _notify(exporters: list[SpanExporter], method: str, span: Span) -> None:
+    for exporter in exporters:
+        try:
+            getattr(exporter, method)(span)
+        except Exception:
+            # トレーシングの失敗で本処理を止めない
+            logger.debug("Span exporter failed", exc_info=True)
+
+
+@contextmanager
+def span(
+    name: str, *, dependency: str | None = None, **attributes: Any
+) -> Iterator[Span | None]:
+    """入れ子可能なスパンを計測するコンテキストマネージャ.
+
+    例外は記録した上でそのまま再送出する。
+    トレーシング無効時は何もせずNoneを返す。
+
+    Args:
+        name: スパン名
+        dependency: 外部呼び出しの依存先（"firestore" 等）。指定すると
+            トレーシングの有効・無効に関わらず metrics にレイテンシを記録する
+        **attributes: スパンの属性
+    """
+    exporters = get_exporters()
+    if not exporters:
+        if dependency is None:
+            yield None
+        else:
+            with observe_call(dependency, name):
+                yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        context=parent.context if parent else _trace_context(),
+        attributes=attributes,
+    )
+    if dependency is not None:
+        current.attributes["dependency"] = dependency
+    _notify(exporters, "on_start", current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    # StreamlitのRerunException・StopException（BaseException）は制御フローのため
+    # エラーとして記録しない
+    except Exception as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.duration_ms = (time.perf_counter() - current._started) * 1000
+        if dependency is not None:
+            record_call(dependency, name, current.duration_ms, current.status)
+        _notify(exporters, "on_end", current)
+
+
+def traced(
+    name: str | None = None, *, dependency: str | None = None
+) -> Callable[[F], F]:
+    """関数呼び出しをスパンとして計測するデコレーター.
+
+    Args:
+        name: スパン名（省略時は "<モジュール末尾>.<関数名>"）
+        dependency: 外部呼び出しの依存先（span() と同じ）
+    """
+
+    def decorator(fn: F) -> F:
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if dependency is None and not get_exporters():
+                return fn(*args, **kwargs)
+            with span(span_name, dependency=dependency):
+                return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
@@ -0,0 +1,227 @@
+"""Firestoreドキュメントの有効期限（expires_at）管理とスイーパー.
+
+本番環境ではFirestoreネイティブのTTLポリシー（terraform/firestore.tf）が
+`expires_at` を過ぎたドキュメントを自動削除する。TTLが使えない環境
+（Firestoreエミュレータ、ローカル検証用プロジェクト等）では本モジュールの
+スイーパーをバッチジョブとして実行する。
+
+Usage:
+    python -m app.services.ttl            # 期限切れドキュメントを削除
+    python -m app.services.ttl --backfill # expires_at未設定の旧ドキュメントを補完
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from app.services.const import CACHE_TTL_DAYS, SESSION_TTL_DAYS
+from app.services.logging_config import log_structured, setup_logging
+
+if TYPE_CHECKING:
+    from google.cloud import firestore
+
+logger = logging.getLogger(__name__)
+
+EXPIRES_AT_FIELD = "expires_at"
+
+# コレクション名 -> (有効期限の起点フィールド, TTL日数)
+TTL_COLLECTIONS: dict[str, tuple[str, int]] = {
+    "sessions": ("last_accessed_at", SESSION_TTL_DAYS),
+    "profiles": ("updated_at", CACHE_TTL_DAYS),
+    "repos": ("updated_at", CACHE_TTL_DAYS),
+    "session_spill": ("spilled_at", SESSION_TTL_DAYS),
+    "repo_chunks": ("updated_at", CACHE_TTL_DAYS),
+}
+
+# サブコレクション（コレクショングループとして全ユーザー分をまとめて処理）
+TTL_COLLECTION_GROUPS = {"repo_chunks"}
+
+# Firestoreのバッチ書き込み上限
+MAX_BATCH_SIZE = 500
+
+
+def compute_expires_at(base: datetime, ttl_days: int) -> datetime:
+    """起点時刻とTTL日数からexpires_atを計算."""
+    return base + timedelta(days=ttl_days)
+
+
+def is_expired(
+    data: dict[str, Any], collection: str, now: datetime | None = None
+) -> bool:
+    """ドキュメントのexpires_atが過ぎているか判定.
+
+    TTLによる削除は即時ではない（最大24時間程度の遅延）ため、
+    読み取り側は削除を待たずにこの判定だけを行う。
+    expires_atを持たない旧ドキュメントは、`--backfill` で補完されるまで
+    起点フィールド + TTL日数（TTL_COLLECTIONS）で判定する。
+    """
+    expires_at = data.get(EXPIRES_AT_FIELD)
+    if not expires_at:
+        base_field, ttl_days = TTL_COLLECTIONS[collection]
+        base = data.get(base_field)
+        if not base:
+            return False
+        expires_at = compute_expires_at(base, ttl_days)
+    return (now or datetime.now(UTC)) >= expires_at
+
+
+def _collection(db: firestore.Client, collection: str) -> Any:
+    if collection in TTL_COLLECTION_GROUPS:
+        return db.collection_group(collection)
+    return db.collection(collection)
+
+
+def sweep_expired(
+    db: firestore.Client,
+    collection: str,
+    *,
+    now: datetime | None = None,
+    batch_size: int = MAX_BATCH_SIZE,
+) -> int:
+    """期限切れドキュメントをバッチ削除.
+
+    Args:
+        db: Firestoreクライアント
+        collection: 対象コレクション名
+        now: 基準時刻（省略時は現在時刻）
+        batch_size: 1バッチあたりの削除件数（最大500）
+
+    Returns:
+        削除したドキュメント数
+    """
+    now = now or datetime.now(UTC)
+    batch_size = min(batch_size, MAX_BATCH_SIZE)
+    deleted = 0
+
+    while True:
+        query = (
+            _collection(db, collection)
+            .where(EXPIRES_AT_FIELD, "<", now)
+            .limit(batch_size)
+        )
+        docs = list(query.stream())
+        if not docs:
+            break
+
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+
+        if len(docs) < batch_size:
+            break
+
+    return deleted
+
+
+def backfill_expires_at(
+    db: firestore.Client,
+    collection: str,
+    *,
+    batch_size: int = MAX_BATCH_SIZE,
+) -> int:
+    """expires_atを持たない旧ドキュメントに起点フィールドから値を補完.
+
+    Args:
+        db: Firestoreクライアント
+        collection: 対象コレクション名（TTL_COLLECTIONSに含まれること）
+        batch_size: 1バッチあたりの更新件数（最大500）
+
+    Returns:
+        更新したドキュメント数
+    """
+    base_field, ttl_days = TTL_COLLECTIONS[collection]
+    batch_size = min(batch_size, MAX_BATCH_SIZE)
+    updated = 0
+    pending = 0
+    batch = db.batch()
+
+    for doc in _collection(db, collection).stream():
+        data = doc.to_dict() or {}
+        if data.get(EXPIRES_AT_FIELD) or not data.get(base_field):
+            continue
+
+        batch.update(
+            doc.reference,
+            {EXPIRES_AT_FIELD: compute_expires_at(data[base_field], ttl_days)},
+        )
+        pending += 1
+        if pending >= batch_size:
+            batch.commit()
+            updated += pending
+            pending = 0
+            batch = db.batch()
+
+    if pending:
+        batch.commit()
+        updated += pending
+
+    return updated
+
+
+def run_sweeper(
+    db: firestore.Client,
+    collections: list[str] | None = None,
+    *,
+    backfill: bool = False,
+) -> dict[str, int]:
+    """対象コレクションすべてに対してスイープ（またはバックフィル）を実行.
+
+    Returns:
+        コレクション名 -> 処理件数
+    """
+    results: dict[str, int] = {}
+    for collection in collections or list(TTL_COLLECTIONS):
+        try:
+            if backfill:
+                results[collection] = backfill_expires_at(db, collection)
+            else:
+                results[collection] = sweep_expired(db, collection)
+        except Exception:
+            log_structured(
+                logger,
+                "Failed to sweep collection",
+                level=logging.ERROR,
+                exc_info=True,
+                collection=collection,
+                backfill=backfill,
+            )
+            results[collection] = 0
+
+    log_structured(
+        logger,
+        "Backfilled expires_at" if backfill else "Swept expired documents",
+        results=results,
+    )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--collection",
+        action="append",
+        choices=list(TTL_COLLECTIONS),
+        help="対象コレクション（複数指定可、省略時はすべて）",
+    )
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help="削除の代わりにexpires_at未設定のドキュメントを補完する",
+    )
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    # 循環importを避けるため遅延import
+    from app.services.cache import get_firestore_client
+
+    run_sweeper(get_firestore_client(), args.collection, backfill=args.backfill)
+
+
+if __name__ == "__main__":
+    main()
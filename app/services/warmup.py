@@ -0,0 +1,130 @@
+"""コンテナ起動時の事前初期化（ウォームアップ）.
+
+Streamlitサーバーがポートを開く前に、初回リクエストで発生していた
+重い初期化（SDKのimport、Firestoreチャネル確立、Vertex AI初期化、
+Cookieコンポーネント登録）を済ませる。Cloud Runのstartup_probeは
+ポートが開くまで通らないため、最初のユーザーはコールドスタートの
+コストを負担しない。
+
+Usage（DockerfileのCMD）:
+    python -m app.services.warmup run app/main.py --server.port=8501 ...
+
+引数はそのまま `streamlit` CLIに渡され、同一プロセスで起動する。
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import sys
+import time
+from collections.abc import Callable
+
+from app.services.const import WARMUP_FIRESTORE_PING
+from app.services.lazy_import import preload
+from app.services.logging_config import log_structured, setup_logging
+from app.services.metrics import start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+# ウォームアップ時のFirestore空読み込み先（存在しなくてよい）
+_PING_COLLECTION = "sessions"
+_PING_DOCUMENT = "_warmup"
+
+
+def _import_app() -> None:
+    """エントリーポイントとUIを読み込む（Cookieコンポーネントの登録を含む）."""
+    importlib.import_module("app.main")
+
+
+def _import_sdks() -> None:
+    """遅延登録された重いSDKを読み込む."""
+    preload()
+
+
+def _create_firestore_client() -> None:
+    """共有Firestoreクライアントを作成."""
+    from app.services.cache import get_firestore_client
+
+    get_firestore_client()
+
+
+def _init_vertex_ai() -> None:
+    """Vertex AIを初期化."""
+    from app.services.profile import init_vertex_ai
+
+    init_vertex_ai()
+
+
+def _ping_firestore() -> None:
+    """存在しないドキュメントを読み、gRPCチャネルと認証を確立する."""
+    from app.services.cache import get_firestore_client
+
+    db = get_firestore_client()
+    db.collection(_PING_COLLECTION).document(_PING_DOCUMENT).get()
+
+
+def _steps(firestore_ping: bool) -> list[tuple[str, Callable[[], None]]]:
+    steps: list[tuple[str, Callable[[], None]]] = [
+        ("import_app", _import_app),
+        ("import_sdks", _import_sdks),
+        ("firestore_client", _create_firestore_client),
+        ("vertex_ai", _init_vertex_ai),
+    ]
+    if firestore_ping:
+        steps.append(("firestore_ping", _ping_firestore))
+    return steps
+
+
+def run_warmup(*, firestore_ping: bool = WARMUP_FIRESTORE_PING) -> dict[str, float]:
+    """事前初期化を実行し、ステップごとの所要秒数を返す.
+
+    失敗したステップはログに残してスキップする（起動自体は止めない。
+    その場合は初回リクエスト時に従来どおり初期化される）。
+
+    Args:
+        firestore_ping: Firestoreへの空読み込みを行うか
+
+    Returns:
+        ステップ名 → 所要秒数（失敗したステップは含まない）
+    """
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    for name, step in _steps(firestore_ping):
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            log_structured(
+                logger,
+                "Warm-up step failed",
+                level=logging.WARNING,
+                step=name,
+                error=str(e),
+            )
+            continue
+        timings[name] = time.perf_counter() - step_started
+
+    log_structured(
+        logger,
+        "Warm-up completed",
+        total_ms=round((time.perf_counter() - started) * 1000, 1),
+        steps_ms={name: round(sec * 1000, 1) for name, sec in timings.items()},
+    )
+    return timings
+
+
+def main(argv: list[str] | None = None) -> None:
+    """ウォームアップ後、同一プロセスでStreamlitを起動する."""
+    setup_logging()
+    start_metrics_server()
+    run_warmup()
+
+    from streamlit.web import cli as stcli
+
+    sys.argv = ["streamlit", *(sys.argv[1:] if argv is None else argv)]
+    sys.exit(stcli.main())
+
+
+if __name__ == "__main__":
+    main()
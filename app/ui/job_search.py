@@ -3,16 +3,23 @@
 import streamlit as st
 
 from app.services.cache import get_user_settings, save_user_settings
+from app.services.const import FREE_PLAN_JOB_LIMIT, JOB_RESULTS_MAX_PAGES
 from app.services.models import (
     JobPreferences,
     JobSearchResult,
     QuotaStatus,
     UserSettings,
 )
-from app.services.quota import consume_credit, get_quota_status
+from app.services.quota import (
+    confirm_credit_optimistic,
+    get_quota_status,
+    reserve_credit_optimistic,
+    settle_credit_optimistic,
+)
 from app.services.research import search_jobs
 from app.services.session_keys import (
     EMPLOYMENT_TYPE,
+    JOB_EXCLUDED_COMPANIES,
     JOB_LOCATION,
     JOB_PREFERENCES,
     JOB_RESULTS,
@@ -22,6 +29,8 @@ from app.services.session_keys import (
     SETTINGS_LOADED,
     WORK_STYLE,
 )
+from app.services.session_memory import restore_spilled
+from app.services.tracing import span
 from app.ui.credits import render_credit_button
 
 
@@ -145,18 +154,22 @@ def job_search(
 
     if search_button:
         _save_settings(user_id, repo_limit)
-        consume_credit(user_id)
-
-        preferences = _build_preferences()
-        # 検索条件を保存（追加検索用）
-        st.session_state[JOB_PREFERENCES] = preferences
-        _set_job_results(profile, preferences)
+        reservation_id = reserve_credit_optimistic(user_id)
+        if reservation_id is None:
+            st.warning("クレジットがありません。")
+        else:
+            preferences = _build_preferences()
+            # 検索条件を保存（追加検索用）
+            st.session_state[JOB_PREFERENCES] = preferences
+            _set_job_results(profile, preferences, user_id, reservation_id)
 
     _display_job_results(user_id, profile)
 
 
 def _display_job_results(user_id: int, profile: dict) -> None:
     """求人結果を表示."""
+    # メモリ予算超過でFirestoreへ退避した検索結果を戻す
+    restore_spilled(user_id, [JOB_RESULTS])
     job_results: JobSearchResult | None = st.session_state.get(JOB_RESULTS)
     _render_job_results_state(job_results, user_id, profile)
 
@@ -227,14 +240,21 @@ def _show_more_button(user_id: int, profile: dict) -> None:
     )
 
     if more_button:
-        consume_credit(user_id)
+        reservation_id = reserve_credit_optimistic(user_id)
+        if reservation_id is None:
+            st.warning("クレジットがありません。")
+            return
 
-        # 既存の企業名を取得して除外
-        exclude_companies = [rec.company for rec in job_results.recommendations]
+        # 表示済みの企業名を除外（削除した古いページの企業も含む）
+        exclude_companies = st.session_state.get(JOB_EXCLUDED_COMPANIES) or [
+            rec.company for rec in job_results.recommendations
+        ]
 
         # 保存された検索条件を取得
         preferences = st.session_state.get(JOB_PREFERENCES) or JobPreferences()
-        _append_job_results(profile, preferences, exclude_companies)
+        _append_job_results(
+            profile, preferences, exclude_companies, user_id, reservation_id
+        )
 
 
 def _build_preferences() -> JobPreferences:
@@ -252,22 +272,53 @@ def _build_preferences() -> JobPreferences:
 def _run_job_search(
     profile: dict,
     preferences: JobPreferences,
+    user_id: int,
+    reservation_id: str,
     *,
     exclude_companies: list[str] | None = None,
 ) -> JobSearchResult:
-    """求人検索を実行."""
-    return search_jobs(
-        profile,
-        preferences=preferences,
-        exclude_companies=exclude_companies,
-    )
+    """求人検索を実行（求人が見つかった場合のみクレジットを消費）."""
+    with span(
+        "pipeline.job_search", additional=exclude_companies is not None
+    ) as pipeline:
+        try:
+            result = search_jobs(
+                profile,
+                preferences=preferences,
+                exclude_companies=exclude_companies,
+            )
+        except Exception:
+            settle_credit_optimistic(user_id, reservation_id, success=False)
+            raise
+
+        success = result.status == "success" and bool(result.recommendations)
+        if success and not confirm_credit_optimistic(user_id, reservation_id):
+            # 表示上の残高が古く、サーバーで予約が拒否された（別タブでの消費等）
+            success = False
+            result = JobSearchResult(
+                recommendations=[], status="error", error="クレジットがありません。"
+            )
+        else:
+            settle_credit_optimistic(user_id, reservation_id, success=success)
+        if pipeline is not None:
+            pipeline.set_attribute("success", success)
+            pipeline.set_attribute("recommendations", len(result.recommendations))
+    return result
 
 
-def _set_job_results(profile: dict, preferences: JobPreferences) -> None:
+def _set_job_results(
+    profile: dict,
+    preferences: JobPreferences,
+    user_id: int,
+    reservation_id: str,
+) -> None:
     """求人検索の結果をセット."""
     with st.spinner("求人を検索中..."):
-        job_results = _run_job_search(profile, preferences)
+        job_results = _run_job_search(profile, preferences, user_id, reservation_id)
         st.session_state[JOB_RESULTS] = job_results
+        st.session_state[JOB_EXCLUDED_COMPANIES] = [
+            rec.company for rec in job_results.recommendations
+        ]
         st.rerun()
 
 
@@ -275,12 +326,16 @@ def _append_job_results(
     profile: dict,
     preferences: JobPreferences,
     exclude_companies: list[str],
+    user_id: int,
+    reservation_id: str,
 ) -> None:
-    """追加検索結果を既存結果にマージ."""
+    """追加検索結果を既存結果にマージ（直近 JOB_RESULTS_MAX_PAGES ページ分のみ保持）."""
     with st.spinner("追加の求人を検索中..."):
         new_results = _run_job_search(
             profile,
             preferences,
+            user_id,
+            reservation_id,
             exclude_companies=exclude_companies,
         )
 
@@ -291,7 +346,10 @@ def _append_job_results(
             st.session_state[JOB_RESULTS] = JobSearchResult(
                 recommendations=combined_recommendations,
                 status="success",
-            )
+            ).latest(JOB_RESULTS_MAX_PAGES * FREE_PLAN_JOB_LIMIT)
+            st.session_state[JOB_EXCLUDED_COMPANIES] = exclude_companies + [
+                rec.company for rec in new_results.recommendations
+            ]
         elif new_results.error:
             st.warning(f"追加検索エラー: {new_results.error}")
         else:
@@ -2,6 +2,7 @@
 
 import streamlit as st
 
+from app.services.analysis_plan import AnalysisPlan
 from app.services.cache import (
     get_cached_profile,
     invalidate_profile_cache,
@@ -9,25 +10,48 @@ from app.services.cache import (
     save_profile_cache,
     save_repos_cache,
 )
-from app.services.github import analyze_selected_repos, get_repos_metadata
+from app.services.github import analyze_selected_repos
+from app.services.github_scheduler import GitHubBusyError
 from app.services.models import QuotaStatus, RepoMetadata
-from app.services.profile import generate_profile
-from app.services.quota import consume_credit
+from app.services.profile import generate_profile_or_quick
+from app.services.quick_profile import quick_profile
+from app.services.quota import (
+    confirm_credit_optimistic,
+    reserve_credit_optimistic,
+    settle_credit_optimistic,
+)
+from app.services.repo_prefetch import get_prefetched_metadata, load_repo_metadata
+from app.services.repo_speculation import speculate_repo_info, take_speculated
 from app.services.session_keys import (
+    ACCESS_TOKEN,
+    JOB_EXCLUDED_COMPANIES,
     JOB_RESULTS,
+    PROFILE_DEGRADED,
     PROFILE_STATE,
     REGEN_REPO_METADATA_LIST,
     REGEN_SELECTED_REPOS,
     REPO_METADATA_LIST,
     SELECTED_REPOS,
     SHOW_PROFILE_SUCCESS,
+    SPILLED_HASHES,
+    SPILLED_KEYS,
 )
+from app.services.tracing import span
 from app.ui.credits import render_remaining_credits_caption
 
 # セッションキー
 REPO_METADATA_KEY = REPO_METADATA_LIST
 SELECTED_REPOS_KEY = SELECTED_REPOS
 
+GITHUB_BUSY_MESSAGE = "GitHub APIが混雑しています。しばらくしてから再度お試しください。"
+QUICK_PROFILE_MESSAGE = (
+    "リポジトリの統計から推定した簡易プロファイルです。AIによる分析中..."
+)
+DEGRADED_PROFILE_MESSAGE = (
+    "AIによる分析が利用できなかったため、リポジトリの統計から推定した"
+    "簡易プロファイルを表示しています（クレジットは消費していません）。"
+)
+
 
 def display_profile(profile: dict) -> None:
     """プロファイルを表示."""
@@ -63,16 +87,21 @@ def _format_repo_label(repo: RepoMetadata) -> str:
     """リポジトリのラベルをフォーマット."""
     lang = repo.language or "N/A"
     fork_badge = " [Fork]" if repo.is_fork else ""
-    return f"{repo.name} ({lang}, {repo.stars} stars){fork_badge}"
+    archived_badge = " [Archived]" if repo.is_archived else ""
+    return f"{repo.name} ({lang}, {repo.stars} stars){fork_badge}{archived_badge}"
 
 
 def _render_repo_selector(
     user_login: str,
     repo_limit: int,
     key_prefix: str = "",
+    speculate: bool = False,
 ) -> list[str] | None:
     """リポジトリ選択UIを描画.
 
+    Args:
+        speculate: 選択中のリポジトリの分析を生成ボタンの押下前に始めるか
+
     Returns:
         選択されたリポジトリ名のリスト、または未選択/読み込み前はNone
     """
@@ -81,12 +110,24 @@ def _render_repo_selector(
 
     # リポジトリ一覧を読み込み
     if metadata_key not in st.session_state:
-        if st.button("リポジトリを読み込む", key=f"{key_prefix}load_repos"):
-            with st.spinner("リポジトリ一覧を取得中..."):
-                repos_meta = get_repos_metadata(user_login, limit=repo_limit)
-                st.session_state[metadata_key] = repos_meta
-                st.rerun()
-        return None
+        # ログイン直後に先読みが完了していればそのまま表示
+        prefetched = get_prefetched_metadata(user_login, repo_limit)
+        if prefetched is None:
+            if st.button("リポジトリを読み込む", key=f"{key_prefix}load_repos"):
+                with st.spinner("リポジトリ一覧を取得中..."):
+                    try:
+                        repos_meta = load_repo_metadata(
+                            user_login,
+                            repo_limit,
+                            access_token=st.session_state.get(ACCESS_TOKEN),
+                        )
+                    except GitHubBusyError:
+                        st.warning(GITHUB_BUSY_MESSAGE)
+                        return None
+                    st.session_state[metadata_key] = repos_meta
+                    st.rerun()
+            return None
+        st.session_state[metadata_key] = prefetched
 
     repos_meta: list[RepoMetadata] = st.session_state[metadata_key]
 
@@ -100,8 +141,10 @@ def _render_repo_selector(
     # オプション作成
     options = {_format_repo_label(r): r.name for r in repos_meta}
 
-    # Fork以外をデフォルト選択
-    default_labels = [_format_repo_label(r) for r in repos_meta if not r.is_fork][:10]
+    # Fork・アーカイブ以外をデフォルト選択
+    default_labels = [
+        _format_repo_label(r) for r in repos_meta if not r.is_fork and not r.is_archived
+    ][:10]
 
     selected_labels = st.multiselect(
         "分析対象のリポジトリを選択",
@@ -115,7 +158,10 @@ def _render_repo_selector(
         st.warning("少なくとも1つのリポジトリを選択してください")
         return None
 
-    return [options[label] for label in selected_labels]
+    selected = [options[label] for label in selected_labels]
+    if speculate:
+        speculate_repo_info(user_login, selected, st.session_state.get(ACCESS_TOKEN))
+    return selected
 
 
 def profile_section(
@@ -136,6 +182,7 @@ def profile_section(
     if cached_profile:
         display_profile(cached_profile)
         st.session_state[PROFILE_STATE] = cached_profile
+        st.session_state.pop(PROFILE_DEGRADED, None)
 
         # 再生成UI
         with st.expander("プロファイルを再生成"):
@@ -159,16 +206,25 @@ def profile_section(
 
         return cached_profile
 
-    # プロファイル未生成
-    st.info("プロファイルを生成して、あなたに最適な求人を見つけましょう。")
+    # プロファイル未生成（LLMを使えず簡易プロファイルで縮退した場合はそれを表示）
+    degraded_profile = (
+        st.session_state.get(PROFILE_STATE)
+        if st.session_state.get(PROFILE_DEGRADED)
+        else None
+    )
+    if degraded_profile:
+        st.warning(DEGRADED_PROFILE_MESSAGE)
+        display_profile(degraded_profile)
+    else:
+        st.info("プロファイルを生成して、あなたに最適な求人を見つけましょう。")
 
     if not quota.can_use:
         st.warning("クレジットがありません。")
-        return None
+        return degraded_profile
 
     render_remaining_credits_caption(quota.credits)
 
-    selected_repos = _render_repo_selector(user_login, repo_limit * 3)
+    selected_repos = _render_repo_selector(user_login, repo_limit * 3, speculate=True)
 
     if selected_repos:
         if st.button(
@@ -177,7 +233,7 @@ def profile_section(
         ):
             _generate_profile(user_id, user_login, selected_repos)
 
-    return None
+    return degraded_profile
 
 
 def _run_profile_generation(
@@ -189,23 +245,75 @@ def _run_profile_generation(
     keys_to_clear: list[str],
     invalidate_cache: bool = False,
 ) -> None:
-    """プロファイル生成の共通処理."""
-    consume_credit(user_id)
+    """プロファイル生成の共通処理（生成に成功した場合のみクレジットを消費）."""
+    reservation_id = reserve_credit_optimistic(user_id)
+    if reservation_id is None:
+        st.warning("クレジットがありません。")
+        return
 
     if invalidate_cache:
         invalidate_repos_cache(user_id)
         invalidate_profile_cache(user_id)
         st.session_state.pop(PROFILE_STATE, None)
         st.session_state.pop(JOB_RESULTS, None)
+        st.session_state.pop(JOB_EXCLUDED_COMPANIES, None)
+        # 退避済みの旧プロファイルの検索結果を復元しない
+        st.session_state.pop(SPILLED_KEYS, None)
+        st.session_state.pop(SPILLED_HASHES, None)
 
     for key in keys_to_clear:
         st.session_state.pop(key, None)
 
-    with st.spinner(spinner_text):
-        repos = analyze_selected_repos(user_login, repo_names)
-        if repos:
+    with (
+        st.spinner(spinner_text),
+        span("pipeline.profile", repo_count=len(repo_names)) as pipeline,
+    ):
+        plan = AnalysisPlan()
+        preview = st.empty()
+        try:
+            repos = analyze_selected_repos(
+                user_login,
+                repo_names,
+                access_token=st.session_state.get(ACCESS_TOKEN),
+                extracted=take_speculated(user_login, repo_names),
+                plan=plan,
+            )
+            plan.log_report()
+            profile, degraded = None, False
+            if repos:
+                # LLMの結果を待つ間、統計から推定した簡易プロファイルを表示する
+                quick = quick_profile(repos, plan)
+                with preview.container():
+                    st.caption(QUICK_PROFILE_MESSAGE)
+                    display_profile(quick)
+                profile, degraded = generate_profile_or_quick(repos, plan, quick)
+        except GitHubBusyError:
+            # クレジットは消費せず、混雑が解消してから再実行してもらう
+            settle_credit_optimistic(user_id, reservation_id, success=False)
+            st.warning(GITHUB_BUSY_MESSAGE)
+            return
+        except Exception:
+            settle_credit_optimistic(user_id, reservation_id, success=False)
+            raise
+
+        # 簡易プロファイルで縮退した場合はクレジットを消費しない
+        charged = bool(profile) and not degraded
+        if charged and not confirm_credit_optimistic(user_id, reservation_id):
+            # 表示上の残高が古く、サーバーで予約が拒否された（別タブでの消費等）
+            preview.empty()
+            st.warning("クレジットがありません。")
+            return
+        settle_credit_optimistic(user_id, reservation_id, success=charged)
+        if pipeline is not None:
+            pipeline.set_attribute("success", bool(repos and profile))
+            pipeline.set_attribute("degraded", degraded)
+        if repos and profile and degraded:
+            # 簡易プロファイルはキャッシュせず、次回の生成でLLMを再度使う
+            save_repos_cache(user_id, repos)
+            st.session_state[PROFILE_STATE] = profile
+            st.session_state[PROFILE_DEGRADED] = True
+        elif repos and profile:
             save_repos_cache(user_id, repos)
-            profile = generate_profile(repos)
             save_profile_cache(
                 user_id=user_id,
                 github_login=user_login,
@@ -213,11 +321,12 @@ def _run_profile_generation(
                 repo_count=len(repos),
             )
             st.session_state[PROFILE_STATE] = profile
+            st.session_state.pop(PROFILE_DEGRADED, None)
             if not invalidate_cache:
                 st.session_state[SHOW_PROFILE_SUCCESS] = True
         else:
             st.error("リポジトリの分析に失敗しました")
-        st.rerun()
+    st.rerun()
 
 
 def _regenerate_profile(user_id: int, user_login: str, repo_names: list[str]) -> None:
@@ -0,0 +1 @@
+"""性能計測用のベンチマーク・ロードテスト（本番イメージには含めない）."""
@@ -0,0 +1,376 @@
+"""外部API通信の記録・再生（カセット）.
+
+GitHub REST（PyGithub → requests）、Perplexity・raw・codeload（httpx）、
+Vertex AI（GenerativeModel.generate_content、stream=True を含む）の通信を
+JSONファイルに記録し、ネットワークなしで再生する。再生時は依存先ごとに遅延と
+ジッターを注入でき、実際のAPIに近いレイテンシ条件でパイプライン全体を計測できる。
+
+    with Cassette("benchmarks/cassettes/profile.json", mode="replay",
+                  latency_ms={"github": 80, "vertex": 4000}) as cassette:
+        run_pipeline()
+    print(cassette.stats)
+
+記録対象はメソッド・URL・リクエストボディのハッシュと、レスポンスの
+ステータス・一部ヘッダー・ボディのみ。Authorizationヘッダー等の
+認証情報はカセットに保存しない。
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Literal
+from unittest.mock import patch
+
+CASSETTE_VERSION = 1
+
+# レスポンスから保存するヘッダー（PyGithubのページング・レート制限に必要なもの）
+_KEPT_HEADERS = {
+    "content-type",
+    "etag",
+    "last-modified",
+    "link",
+    "x-ratelimit-limit",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+    "x-ratelimit-used",
+}
+
+
+class CassetteMiss(LookupError):
+    """再生モードでカセットに記録のないリクエストが発生した."""
+
+
+@dataclass
+class CallStats:
+    """依存先ごとの呼び出し統計."""
+
+    calls: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    injected_ms: float = 0.0
+
+
+@dataclass
+class Interaction:
+    """記録された1往復分の通信."""
+
+    kind: str
+    key: str
+    status: int
+    headers: dict[str, str]
+    body: str
+    body_encoding: Literal["utf-8", "base64"]
+    elapsed_ms: float
+
+    def content(self) -> bytes:
+        """レスポンスボディをバイト列で返す."""
+        if self.body_encoding == "base64":
+            return base64.b64decode(self.body)
+        return self.body.encode("utf-8")
+
+    @classmethod
+    def from_response(
+        cls,
+        kind: str,
+        key: str,
+        status: int,
+        headers: dict[str, str],
+        content: bytes,
+        elapsed_ms: float,
+    ) -> Interaction:
+        """レスポンスから記録用データを作成."""
+        try:
+            body, encoding = content.decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+        return cls(
+            kind=kind,
+            key=key,
+            status=status,
+            headers={
+                k.lower(): v for k, v in headers.items() if k.lower() in _KEPT_HEADERS
+            },
+            body=body,
+            body_encoding=encoding,  # type: ignore[arg-type]
+            elapsed_ms=round(elapsed_ms, 1),
+        )
+
+
+def _request_key(method: str, url: str, body: bytes | str | None) -> str:
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256(body or b"").hexdigest()[:16]
+    return f"{method.upper()} {url} {digest}"
+
+
+def _kind_for_url(url: str) -> str:
+    return "perplexity" if "perplexity.ai" in url else "github"
+
+
+@dataclass
+class Cassette:
+    """外部API通信の記録・再生を行うコンテキストマネージャ.
+
+    Args:
+        path: カセットファイル（JSON）
+        mode: "record"（実通信して保存）または "replay"（ネットワークなしで再生）
+        latency_ms: 再生時に注入する依存先ごとの遅延（"recorded" で記録時の実測値）
+        jitter_ms: 遅延に加える一様乱数の幅（±）
+        seed: ジッターの乱数シード
+    """
+
+    path: Path | str
+    mode: Literal["record", "replay"] = "replay"
+    latency_ms: dict[str, float | Literal["recorded"]] = field(default_factory=dict)
+    jitter_ms: dict[str, float] = field(default_factory=dict)
+    seed: int = 0
+    stats: dict[str, CallStats] = field(
+        default_factory=lambda: defaultdict(CallStats), init=False
+    )
+    _interactions: dict[str, list[Interaction]] = field(
+        default_factory=lambda: defaultdict(list), init=False
+    )
+    _cursors: dict[str, int] = field(
+        default_factory=lambda: defaultdict(int), init=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _patches: list[Any] = field(default_factory=list, init=False)
+
+    def __post_init__(self) -> None:
+        self.path = Path(self.path)
+        self._random = random.Random(self.seed)
+        if self.mode == "replay":
+            self._load()
+
+    # ------------------------------------------------------------------
+    # 記録・再生
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        data = json.loads(Path(self.path).read_text(encoding="utf-8"))
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+        for raw in data["interactions"]:
+            interaction = Interaction(**raw)
+            self._interactions[interaction.key].append(interaction)
+
+    def save(self) -> None:
+        """記録内容をファイルに書き出す."""
+        path = Path(self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        interactions = [
+            interaction.__dict__
+            for recorded in self._interactions.values()
+            for interaction in recorded
+        ]
+        path.write_text(
+            json.dumps(
+                {"version": CASSETTE_VERSION, "interactions": interactions},
+                ensure_ascii=False,
+                indent=1,
+            ),
+            encoding="utf-8",
+        )
+
+    def _record(self, interaction: Interaction) -> None:
+        with self._lock:
+            self._interactions[interaction.key].append(interaction)
+
+    def _next(self, kind: str, key: str) -> Interaction:
+        """同じキーの記録を記録順に返す（使い切ったら先頭に戻る）."""
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded {kind} interaction for {key}")
+            index = self._cursors[key] % len(recorded)
+            self._cursors[key] += 1
+            return recorded[index]
+
+    def _inject_latency(self, interaction: Interaction) -> None:
+        configured = self.latency_ms.get(interaction.kind, 0)
+        base = interaction.elapsed_ms if configured == "recorded" else float(configured)
+        jitter = self.jitter_ms.get(interaction.kind, 0.0)
+        with self._lock:
+            delay = max(base + self._random.uniform(-jitter, jitter), 0.0)
+            self.stats[interaction.kind].injected_ms += delay
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _count(self, kind: str, sent: int, received: int) -> None:
+        with self._lock:
+            stats = self.stats[kind]
+            stats.calls += 1
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+
+    # ------------------------------------------------------------------
+    # requests（PyGithub）
+    # ------------------------------------------------------------------
+    def _requests_send(self, original: Any) -> Any:
+        import requests
+
+        cassette = self
+
+        def send(adapter: Any, request: Any, **kwargs: Any) -> Any:
+            body = request.body or b""
+            key = _request_key(request.method, request.url, body)
+            kind = _kind_for_url(request.url)
+
+            if cassette.mode == "record":
+                started = time.perf_counter()
+                response = original(adapter, request, **kwargs)
+                interaction = Interaction.from_response(
+                    kind,
+                    key,
+                    response.status_code,
+                    dict(response.headers),
+                    response.content,
+                    (time.perf_counter() - started) * 1000,
+                )
+                cassette._record(interaction)
+            else:
+                interaction = cassette._next(kind, key)
+                cassette._inject_latency(interaction)
+                response = requests.Response()
+                response.status_code = interaction.status
+                response.headers.update(interaction.headers)
+                response._content = interaction.content()
+                response.url = request.url
+                response.request = request
+                response.encoding = "utf-8"
+
+            cassette._count(kind, len(body), len(interaction.content()))
+            return response
+
+        return send
+
+    # ------------------------------------------------------------------
+    # httpx（Perplexity SDK）
+    # ------------------------------------------------------------------
+    def _httpx_handle_request(self, original: Any) -> Any:
+        import httpx
+
+        cassette = self
+
+        def handle_request(transport: Any, request: Any) -> Any:
+            body = request.read()
+            url = str(request.url)
+            key = _request_key(request.method, url, body)
+            kind = _kind_for_url(url)
+
+            if cassette.mode == "record":
+                started = time.perf_counter()
+                response = original(transport, request)
+                content = response.read()
+                interaction = Interaction.from_response(
+                    kind,
+                    key,
+                    response.status_code,
+                    dict(response.headers),
+                    content,
+                    (time.perf_counter() - started) * 1000,
+                )
+                cassette._record(interaction)
+            else:
+                interaction = cassette._next(kind, key)
+                cassette._inject_latency(interaction)
+            content = interaction.content()
+            cassette._count(kind, len(body), len(content))
+            # 圧縮済みヘッダーを渡すと二重に展開されるため再構築する
+            return httpx.Response(
+                interaction.status,
+                headers=interaction.headers,
+                content=content,
+                request=request,
+            )
+
+        return handle_request
+
+    # ------------------------------------------------------------------
+    # Vertex AI
+    # ------------------------------------------------------------------
+    def _generate_content(self, original: Any) -> Any:
+        cassette = self
+
+        def generate_content(
+            model: Any, contents: Any, *args: Any, **kwargs: Any
+        ) -> Any:
+            prompt = (
+                contents
+                if isinstance(contents, str)
+                else json.dumps(contents, default=str, ensure_ascii=False)
+            )
+            key = _request_key("GENERATE", model._model_name, prompt)
+
+            stream = kwargs.get("stream", False)
+
+            if cassette.mode == "record":
+                started = time.perf_counter()
+                response = original(model, contents, *args, **kwargs)
+                # ストリームは全チャンクを読み切って1件として記録する
+                chunks = response if stream else [response]
+                recorded = "".join(chunk.text for chunk in chunks)
+                interaction = Interaction.from_response(
+                    "vertex",
+                    key,
+                    200,
+                    {},
+                    recorded.encode("utf-8"),
+                    (time.perf_counter() - started) * 1000,
+                )
+                cassette._record(interaction)
+            else:
+                interaction = cassette._next("vertex", key)
+                cassette._inject_latency(interaction)
+            text = interaction.content().decode("utf-8")
+            cassette._count(
+                "vertex", len(prompt.encode("utf-8")), len(text.encode("utf-8"))
+            )
+            response = SimpleNamespace(text=text)
+            return iter([response]) if stream else response
+
+        return generate_content
+
+    # ------------------------------------------------------------------
+    # コンテキストマネージャ
+    # ------------------------------------------------------------------
+    def __enter__(self) -> Cassette:
+        import httpx
+        import requests.adapters
+        from vertexai.generative_models import GenerativeModel
+
+        targets = [
+            (requests.adapters.HTTPAdapter, "send", self._requests_send),
+            (httpx.HTTPTransport, "handle_request", self._httpx_handle_request),
+            (GenerativeModel, "generate_content", self._generate_content),
+        ]
+        for owner, name, factory in targets:
+            replacement = factory(getattr(owner, name))
+            patcher = patch.object(owner, name, replacement)
+            patcher.start()
+            self._patches.append(patcher)
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        for patcher in reversed(self._patches):
+            patcher.stop()
+        self._patches.clear()
+        if self.mode == "record" and exc_info[0] is None:
+            self.save()
+
+
+def parse_latency(values: list[str]) -> dict[str, Any]:
+    """CLI引数 "github=80" / "vertex=recorded" を辞書に変換."""
+    parsed: dict[str, Any] = {}
+    for value in values:
+        kind, _, amount = value.partition("=")
+        parsed[kind] = amount if amount == "recorded" else float(amount)
+    return parsed
@@ -0,0 +1,51 @@
+"""ベンチマーク共通ヘルパー."""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sys
+from collections.abc import Sequence
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """nearest-rank法でパーセンタイルを計算（q: 0-100）."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence[object]]) -> None:
+    """結果を固定幅のテーブルで標準出力に表示."""
+    cells = [[str(h) for h in headers]] + [
+        [f"{v:.2f}" if isinstance(v, float) else str(v) for v in row] for row in rows
+    ]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for index, row in enumerate(cells):
+        print(
+            "  ".join(
+                cell.rjust(width) for cell, width in zip(row, widths, strict=True)
+            )
+        )
+        if index == 0:
+            print("  ".join("-" * width for width in widths))
+
+
+def require_emulator() -> None:
+    """Firestoreエミュレータ以外に接続しないようにガード."""
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit(
+            "FIRESTORE_EMULATOR_HOST is not set. "
+            "Start the emulator: gcloud emulators firestore start --host-port=localhost:8080"
+        )
+    os.environ.setdefault("GCP_PROJECT_ID", "job-recommender-bench")
+
+
+def quiet_streamlit() -> None:
+    """bare mode実行時のScriptRunContext警告を抑制（streamlit import後に呼ぶ）."""
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
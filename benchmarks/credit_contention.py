@@ -0,0 +1,191 @@
+"""クレジット消費の競合ロードテスト（Firestoreエミュレータ向け）.
+
+同一ユーザーのクレジットを複数スレッドから同時に消費し、
+旧方式（単一ドキュメントへのread-modify-writeトランザクション）と
+台帳方式（シャードカウンタへのIncrement + 予約）の
+スループット・レイテンシ・試行回数を比較する。
+
+Usage:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 \\
+        python -m benchmarks.credit_contention --threads 16 --ops 25
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from benchmarks.common import percentile, print_table, quiet_streamlit, require_emulator
+
+
+@dataclass
+class RunResult:
+    """1モード分の計測結果."""
+
+    mode: str
+    latencies: list[float] = field(default_factory=list)
+    succeeded: int = 0
+    failed: int = 0
+    attempts: int = 0
+    wall_seconds: float = 0.0
+    final_balance: int = 0
+
+
+def _seed_credits(user_id: int, credits: int) -> None:
+    """ユーザーの台帳をリセットして基本残高をセット."""
+    from app.services.cache import get_firestore_client
+
+    db = get_firestore_client()
+    root = db.collection("credits").document(str(user_id))
+    for sub in ("shards", "reservations", "usage"):
+        for doc in root.collection(sub).stream():
+            doc.reference.delete()
+    root.set({"user_id": user_id, "credits": credits})
+
+
+def _legacy_consume_factory(
+    user_id: int, attempts: list[int], lock: threading.Lock
+) -> Callable[[], bool]:
+    """旧方式（トランザクション）の消費関数を作成."""
+    from google.cloud import firestore
+
+    from app.services.cache import get_firestore_client
+
+    db = get_firestore_client()
+    doc_ref = db.collection("credits").document(str(user_id))
+
+    @firestore.transactional
+    def consume_in_transaction(transaction: firestore.Transaction) -> bool:
+        with lock:
+            attempts[0] += 1
+        doc = doc_ref.get(transaction=transaction)
+        current = (doc.to_dict() or {}).get("credits", 0)
+        if current <= 0:
+            return False
+        transaction.update(doc_ref, {"credits": current - 1})
+        return True
+
+    def consume() -> bool:
+        try:
+            return consume_in_transaction(db.transaction())
+        except Exception:
+            return False
+
+    return consume
+
+
+def _ledger_consume_factory(
+    user_id: int, attempts: list[int], lock: threading.Lock
+) -> Callable[[], bool]:
+    """台帳方式（予約 → 確定）の消費関数を作成."""
+    from app.services.quota import commit_credit, reserve_credit
+
+    def consume() -> bool:
+        with lock:
+            attempts[0] += 1
+        reservation_id = reserve_credit(user_id)
+        if reservation_id is None:
+            return False
+        return commit_credit(user_id, reservation_id)
+
+    return consume
+
+
+def run_mode(mode: str, user_id: int, threads: int, ops: int) -> RunResult:
+    """指定モードで threads × ops 回の同時消費を実行."""
+    from app.services.quota import _read_balance
+
+    _seed_credits(user_id, threads * ops)
+    attempts = [0]
+    lock = threading.Lock()
+    factory = (
+        _legacy_consume_factory if mode == "transaction" else _ledger_consume_factory
+    )
+    consume = factory(user_id, attempts, lock)
+    result = RunResult(mode=mode)
+
+    def worker() -> None:
+        for _ in range(ops):
+            started = time.perf_counter()
+            ok = consume()
+            elapsed = time.perf_counter() - started
+            with lock:
+                result.latencies.append(elapsed)
+                if ok:
+                    result.succeeded += 1
+                else:
+                    result.failed += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(threads):
+            pool.submit(worker)
+    result.wall_seconds = time.perf_counter() - started
+    result.attempts = attempts[0]
+    result.final_balance = _read_balance(user_id)
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="Credit contention load test")
+    parser.add_argument("--threads", type=int, default=16, help="同時実行数")
+    parser.add_argument("--ops", type=int, default=25, help="スレッドあたりの消費回数")
+    parser.add_argument(
+        "--mode",
+        action="append",
+        choices=["transaction", "ledger"],
+        help="計測するモード（省略時は両方）",
+    )
+    args = parser.parse_args(argv)
+
+    require_emulator()
+    import app.services.quota  # noqa: F401  streamlit importを先に済ませる
+
+    quiet_streamlit()
+
+    rows = []
+    for index, mode in enumerate(args.mode or ["transaction", "ledger"]):
+        result = run_mode(mode, 900_000_000 + index, args.threads, args.ops)
+        total = result.succeeded + result.failed
+        expected_balance = args.threads * args.ops - result.succeeded
+        rows.append(
+            [
+                result.mode,
+                total,
+                result.succeeded,
+                result.failed,
+                total / result.wall_seconds,
+                percentile(result.latencies, 50) * 1000,
+                percentile(result.latencies, 95) * 1000,
+                percentile(result.latencies, 99) * 1000,
+                result.attempts / max(total, 1),
+                "ok" if result.final_balance == expected_balance else "MISMATCH",
+            ]
+        )
+
+    print(f"threads={args.threads} ops/thread={args.ops}")
+    print_table(
+        [
+            "mode",
+            "ops",
+            "ok",
+            "failed",
+            "ops/s",
+            "p50 ms",
+            "p95 ms",
+            "p99 ms",
+            "attempts/op",
+            "balance",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
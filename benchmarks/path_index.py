@@ -0,0 +1,184 @@
+"""リポジトリ内のファイル探索（依存・主要コード・設定・README）の比較.
+
+合成したパス一覧（get_repo_structure と同じ幅優先の順）に対して、
+リストを走査する従来の探索と PathIndex（ハッシュ集合 + トライ）を使う探索の
+実行時間を比較する。依存ファイルにはモノレポのワークスペース（packages/*/package.json）
+の探索（PathIndex では find_name と glob）を含む。索引の構築時間も含めて計測し、結果が一致することを確認する。
+
+Usage:
+    python -m benchmarks.path_index --paths 50000 --iterations 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import gc
+import statistics
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+from unittest.mock import patch
+
+from benchmarks.common import print_table
+
+
+def make_structure(paths: int) -> list[str]:
+    """モノレポ風の合成パス一覧（幅優先の順）."""
+    tree: dict[str, list[str]] = {
+        "": ["README.md", "package.json", "Makefile", "packages", "src", "docs"]
+    }
+    tree["src"] = ["src/main.py", "src/utils"]
+    tree["docs"] = ["docs/index.md"]
+    tree["packages"] = []
+    count = sum(len(children) for children in tree.values())
+    package = 0
+    while count < paths:
+        root = f"packages/pkg-{package}"
+        tree["packages"].append(root)
+        tree[root] = [f"{root}/package.json", f"{root}/src", f"{root}/tests"]
+        for directory in ("src", "tests"):
+            files = [f"{root}/{directory}/module_{n}.ts" for n in range(40)]
+            tree[f"{root}/{directory}"] = files
+        count += 1 + 3 + 80
+        package += 1
+
+    structure: list[str] = []
+    queue = deque(tree[""])
+    while queue and len(structure) < paths:
+        path = queue.popleft()
+        structure.append(path)
+        queue.extend(tree.get(path, ()))
+    return structure
+
+
+def _legacy_collect(
+    structure: list[str], patterns: list[str], prefixes: list[str], max_files: int
+) -> list[str]:
+    found: list[str] = []
+    for pattern in patterns:
+        for prefix in prefixes:
+            path = f"{prefix}{pattern}"
+            if path in structure or pattern in structure:
+                found.append(path if path in structure else pattern)
+                break
+        if len(found) >= max_files:
+            break
+    return found
+
+
+def _legacy_nested(structure: list[str], names: list[str], limit: int) -> list[str]:
+    from app.services.github import WORKSPACE_DIRS
+
+    found: dict[str, None] = {}
+    for name in names:
+        found.update(
+            (path, None)
+            for path in structure
+            if path.count("/") == 1 and path.rpartition("/")[2] == name
+        )
+        for directory in WORKSPACE_DIRS:
+            pattern = f"{directory}/*/{name}"
+            found.update(
+                (path, None)
+                for path in structure
+                if path.count("/") == 2 and fnmatch.fnmatchcase(path, pattern)
+            )
+        if len(found) >= limit:
+            break
+    return list(found)[:limit]
+
+
+def discover_legacy(structure: list[str]) -> tuple[list[str], ...]:
+    """従来の探索（リストの走査）."""
+    from app.services.const import GITHUB_NESTED_MANIFESTS
+    from app.services.github import (
+        CONFIG_FILES,
+        DEPENDENCY_FILES,
+        MAIN_FILE_PATTERNS,
+        README_NAMES,
+    )
+
+    nested = _legacy_nested(structure, DEPENDENCY_FILES, GITHUB_NESTED_MANIFESTS)
+    dependencies = _legacy_collect(
+        structure, DEPENDENCY_FILES + nested, [""], len(structure)
+    )
+    prefixes = [""] + [
+        f"{d}/"
+        for d in ["src", "app", "lib", "cmd"]
+        if any(p.startswith(d + "/") for p in structure)
+    ]
+    main = _legacy_collect(structure, MAIN_FILE_PATTERNS, prefixes, 3)
+    config: list[str] = []
+    for entry in CONFIG_FILES:
+        for path in structure:
+            if path == entry or path.startswith(entry + "/"):
+                config.append(path)
+                break
+    readme = [p for p in structure if "/" not in p and p.lower() in README_NAMES][:1]
+    return dependencies, main, config, readme
+
+
+def discover_indexed(structure: list[str]) -> tuple[list[str], ...]:
+    """PathIndexを使った探索（索引の構築を含む）."""
+    from app.services.github import (
+        README_NAMES,
+        get_config_files,
+        get_dependency_files,
+        get_main_files,
+    )
+    from app.services.path_index import PathIndex
+
+    index = PathIndex(structure)
+    dependencies = [f.path for f in get_dependency_files(None, index)]
+    main = [f.path for f in get_main_files(None, index)]
+    config = get_config_files(index)
+    readme = [p for p in index.list_dir() if p.lower() in README_NAMES][:1]
+    return dependencies, main, config, readme
+
+
+def _time(func: Callable[[Any], Any], arg: Any, iterations: int) -> float:
+    """中央値（ms）."""
+    samples = []
+    for _ in range(iterations):
+        # 前の計測で作った索引の回収を計測に含めない
+        gc.collect()
+        started = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="File discovery benchmark")
+    parser.add_argument("--paths", type=int, default=50000, help="パス数")
+    parser.add_argument("--iterations", type=int, default=20, help="計測回数")
+    args = parser.parse_args(argv)
+
+    from app.services.path_index import PathIndex
+
+    structure = make_structure(args.paths)
+    # ファイル内容の取得（GitHub・BlobStore）は計測対象外
+    with patch("app.services.github.get_file_text", return_value="x"):
+        legacy = discover_legacy(structure)
+        indexed = discover_indexed(structure)
+        if legacy != indexed:
+            raise SystemExit(f"results differ:\n{legacy}\n{indexed}")
+
+        rows = [
+            ["list scan", _time(discover_legacy, structure, args.iterations)],
+            ["PathIndex (build)", _time(PathIndex, structure, args.iterations)],
+            [
+                "PathIndex (build + discover)",
+                _time(discover_indexed, structure, args.iterations),
+            ],
+        ]
+
+    print(f"paths={len(structure)} iterations={args.iterations}")
+    print_table(["discovery", "median ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""プロファイル生成 → 求人検索パイプラインのオフラインベンチマーク.
+
+`analyze_selected_repos` → `generate_profile` → `search_jobs` を
+カセット（benchmarks/cassette.py）の再生で実行し、段階ごとの実行時間、
+依存先ごとの呼び出し回数・転送バイト数・レイテンシ分位点を報告する。
+
+benchmarks/cassettes/pipeline.json は octocat/hello-world（tarballで取得）と
+octocat/spoon-knife（Contents API + rawの先頭読み）を模した合成データのカセットで、
+認証情報なしでそのまま再生できる。
+
+Usage:
+    # 0. 同梱のカセットを再生
+    python -m benchmarks.pipeline --user octocat --repos hello-world,spoon-knife
+
+    # 1. 実APIで記録（GITHUB_TOKEN / PERPLEXITY_API_KEY / GCP認証が必要）
+    python -m benchmarks.pipeline --record --user octocat --repos hello-world,Spoon-Knife
+
+    # 2. ネットワークなしで再生（遅延・ジッターを注入）
+    python -m benchmarks.pipeline --user octocat --repos hello-world,Spoon-Knife \\
+        --latency github=80 --latency vertex=recorded --jitter github=30 --iterations 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from pathlib import Path
+
+from benchmarks.cassette import Cassette, parse_latency
+from benchmarks.common import print_table, quiet_streamlit
+
+DEFAULT_CASSETTE = Path(__file__).parent / "cassettes" / "pipeline.json"
+
+STAGES = ["analyze_selected_repos", "generate_profile", "search_jobs"]
+
+
+def run_pipeline(user: str, repos: list[str]) -> dict[str, float]:
+    """パイプラインを1回実行し、段階ごとの所要秒数を返す."""
+    from app.services.github import analyze_selected_repos
+    from app.services.models import JobPreferences
+    from app.services.profile import generate_profile
+    from app.services.research import search_jobs
+
+    timings: dict[str, float] = {}
+
+    started = time.perf_counter()
+    repo_infos = analyze_selected_repos(user, repos)
+    timings["analyze_selected_repos"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    profile = generate_profile(repo_infos)
+    timings["generate_profile"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    search_jobs(profile, preferences=JobPreferences())
+    timings["search_jobs"] = time.perf_counter() - started
+    return timings
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmark")
+    parser.add_argument("--user", required=True, help="GitHubユーザー名")
+    parser.add_argument("--repos", required=True, help="カンマ区切りのリポジトリ名")
+    parser.add_argument("--cassette", type=Path, default=DEFAULT_CASSETTE)
+    parser.add_argument("--record", action="store_true", help="実APIで記録する")
+    parser.add_argument("--iterations", type=int, default=3, help="再生回数")
+    parser.add_argument(
+        "--latency",
+        action="append",
+        default=[],
+        help="依存先ごとの注入遅延 ms（例: github=80, vertex=recorded）",
+    )
+    parser.add_argument(
+        "--jitter", action="append", default=[], help="注入遅延のジッター ms（±）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="ジッターの乱数シード")
+    args = parser.parse_args(argv)
+
+    if not args.record:
+        # 再生時は認証情報不要（クライアント生成のためのダミー値）
+        os.environ.setdefault("GITHUB_TOKEN", "cassette-replay")
+        os.environ.setdefault("PERPLEXITY_API_KEY", "cassette-replay")
+        os.environ.setdefault("GCP_PROJECT_ID", "cassette-replay")
+
+    from app.services.metrics import dependency_summary, registry
+
+    quiet_streamlit()
+
+    repos = [name.strip() for name in args.repos.split(",") if name.strip()]
+    iterations = 1 if args.record else args.iterations
+    runs: list[dict[str, float]] = []
+    registry.clear()
+    for index in range(iterations):
+        cassette = Cassette(
+            args.cassette,
+            mode="record" if args.record else "replay",
+            latency_ms=parse_latency(args.latency),
+            jitter_ms={k: float(v) for k, v in parse_latency(args.jitter).items()},
+            seed=args.seed + index,
+        )
+        with cassette:
+            started = time.perf_counter()
+            timings = run_pipeline(args.user, repos)
+            timings["total"] = time.perf_counter() - started
+        runs.append(timings)
+
+    mode = "record" if args.record else "replay"
+    print(f"{mode}: user={args.user} repos={len(repos)} iterations={iterations}")
+    print_table(
+        ["stage", "median s", "min s", "max s"],
+        [
+            [
+                stage,
+                statistics.median(run[stage] for run in runs),
+                min(run[stage] for run in runs),
+                max(run[stage] for run in runs),
+            ]
+            for stage in [*STAGES, "total"]
+        ],
+    )
+
+    # 統計は最終イテレーション分（各回同じ呼び出し数になる）
+    print()
+    print_table(
+        ["dependency", "calls", "bytes sent", "bytes received", "injected ms"],
+        [
+            [kind, s.calls, s.bytes_sent, s.bytes_received, s.injected_ms]
+            for kind, s in sorted(cassette.stats.items())
+        ],
+    )
+
+    print()
+    summary = dependency_summary()
+    print_table(
+        ["dependency", "operation", "count", "errors", "p50 ms", "p95 ms", "p99 ms"],
+        [
+            [
+                row["dependency"],
+                row["operation"],
+                row["count"],
+                row["errors"],
+                row["p50_ms"],
+                row["p95_ms"],
+                row["p99_ms"],
+            ]
+            for row in summary
+        ],
+    )
+    if args.record:
+        print(f"\ncassette saved: {args.cassette}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""リポジトリキャッシュのエンコード・デコード比較.
+
+Firestoreの `repos` ドキュメント相当のdictから復元するコストを
+RepoInfo（pydantic・フィールドごとに検証）と RepoRecord（__slots__ dataclass）で比較し、
+実行時間と復元後のメモリ使用量（tracemalloc）を報告する。
+あわせて旧形式（dictのリストを1ドキュメントに保存）とzstd圧縮形式の
+保存バイト数（読み込み時の転送量）を比較する。
+
+Usage:
+    python -m benchmarks.repo_codec --repos 30 --files 400 --iterations 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from benchmarks.common import print_table
+
+
+def make_cached_repos(repos: int, files: int) -> list[dict[str, Any]]:
+    """キャッシュ保存形式の合成データ（RepoInfo.model_dump() と同じ形）.
+
+    Firestoreから読み込んだ値を模すため、パス文字列はドキュメントごとに別オブジェクトにする。
+    """
+    directories = ["src", "app", "lib", "tests", "docs", ".github/workflows"]
+    cached = []
+    for index in range(repos):
+        structure = [
+            "".join([directories[n % len(directories)], "/", f"module_{n}.py"])
+            for n in range(files)
+        ]
+        cached.append(
+            {
+                "name": f"repo-{index}",
+                "description": "synthetic repository",
+                "language": "Python",
+                "languages": {"Python": 12000, "Dockerfile": 300},
+                "topics": ["python", "fastapi"],
+                "readme": "# README\n" + "lorem ipsum " * 400,
+                "stars": index,
+                "forks": 0,
+                "updated_at": "2024-01-15T10:00:00+00:00",
+                "is_fork": False,
+                "file_structure": structure,
+                "dependency_files": [
+                    {"path": "".join(["requirements", ".txt"]), "content": "x" * 2000}
+                ],
+                "main_files": [
+                    {"path": "".join(["src/", "module_1.py"]), "content": "y" * 3000}
+                ],
+                "config_files": ["".join(["Docker", "file"])],
+            }
+        )
+    return cached
+
+
+def _decode_pydantic(cached: list[dict[str, Any]]) -> list[Any]:
+    from app.services.models import RepoInfo
+
+    return [RepoInfo.model_validate(data) for data in cached]
+
+
+def _decode_record(cached: list[dict[str, Any]]) -> list[Any]:
+    from app.services.repo_record import decode_repo
+
+    return [decode_repo(data) for data in cached]
+
+
+def _encode_pydantic(repos: list[Any]) -> list[Any]:
+    return [repo.model_dump() for repo in repos]
+
+
+def _encode_record(repos: list[Any]) -> list[Any]:
+    from app.services.repo_record import encode_repo
+
+    return [encode_repo(repo) for repo in repos]
+
+
+def _packed(records: list[Any]) -> tuple[list[Any], bytes]:
+    from app.services.repo_record import pack_repos
+
+    return pack_repos(records)
+
+
+def _unpack_all(packed: tuple[list[Any], bytes]) -> list[Any]:
+    from app.services.repo_record import unpack_repo
+
+    index, payload = packed
+    return [unpack_repo(payload[e.offset : e.offset + e.length]) for e in index]
+
+
+def _time(func: Callable[[Any], Any], arg: Any, iterations: int) -> float:
+    """中央値（ms）."""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(arg)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def _retained_kib(func: Callable[[Any], Any], arg: Any) -> float:
+    """復元後に保持されるメモリ（入力dictとの差分、KiB）."""
+    gc.collect()
+    tracemalloc.start()
+    result = func(arg)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / 1024
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="Repo cache codec benchmark")
+    parser.add_argument("--repos", type=int, default=30, help="リポジトリ数")
+    parser.add_argument("--files", type=int, default=400, help="1リポジトリのパス数")
+    parser.add_argument("--iterations", type=int, default=20, help="計測回数")
+    args = parser.parse_args(argv)
+
+    cached = make_cached_repos(args.repos, args.files)
+    models = _decode_pydantic(cached)
+    records = _decode_record(cached)
+
+    rows = []
+    for label, decode, encode, decoded in [
+        ("RepoInfo", _decode_pydantic, _encode_pydantic, models),
+        ("RepoRecord", _decode_record, _encode_record, records),
+    ]:
+        rows.append(
+            [
+                label,
+                _time(decode, cached, args.iterations),
+                _time(encode, decoded, args.iterations),
+                _retained_kib(decode, cached),
+            ]
+        )
+
+    print(f"repos={args.repos} paths/repo={args.files} iterations={args.iterations}")
+    print_table(["representation", "decode ms", "encode ms", "retained KiB"], rows)
+
+    from app.services.cache import REPOS_CHUNK_BYTES, REPOS_INLINE_BYTES
+
+    legacy_bytes = len(json.dumps(cached, ensure_ascii=False).encode("utf-8"))
+    packed = _packed(records)
+    packed_bytes = len(packed[1])
+    chunk_docs = (
+        0
+        if packed_bytes <= REPOS_INLINE_BYTES
+        else -(-packed_bytes // REPOS_CHUNK_BYTES)
+    )
+    print()
+    print_table(
+        ["storage", "stored KiB", "documents", "decode ms"],
+        [
+            ["legacy (1 doc)", legacy_bytes / 1024, 1, rows[0][1]],
+            [
+                "zstd packed",
+                packed_bytes / 1024,
+                1 + chunk_docs,
+                _time(_unpack_all, packed, args.iterations),
+            ],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
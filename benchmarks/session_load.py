@@ -0,0 +1,277 @@
+"""同時セッション数ごとのロードテスト（Firestoreエミュレータ向け）.
+
+Cloud Runの `max_instance_request_concurrency`（1インスタンスあたりの
+同時リクエスト数）を実測値から決めるため、N個のStreamlitセッションを
+`streamlit.testing` の AppTest で同時に実行し、同時実行数ごとの
+スループット・レイテンシ分位点・CPU使用率・RSSを報告する。
+
+各セッションは1回の再実行（rerun）ごとに以下を行う:
+    restore_session → get_quota_status → get_cached_profile
+    （--llm-ms 指定時はLLM呼び出し相当のブロッキング待ちを追加）
+
+1回目の実行はsession_stateキャッシュがないためFirestoreを読む（cold）。
+LLM・GitHub等の外部APIは呼び出さない。
+
+Usage:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 \\
+        python -m benchmarks.session_load --levels 1,10,40,80 --reruns 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from benchmarks.common import percentile, print_table, quiet_streamlit, require_emulator
+
+# AppTestのセッションごとに割り当てるセッションIDのsession_stateキー
+LOAD_SESSION_KEY = "_load_test_session_id"
+LOAD_LLM_MS_KEY = "_load_test_llm_ms"
+
+# シード用ユーザーIDの開始値（実ユーザーと衝突しない範囲）
+USER_ID_BASE = 800_000_000
+
+APP_TIMEOUT = 60
+
+
+def load_session_app() -> None:
+    """1セッション分の描画処理（AppTest.from_function用）.
+
+    関数のソースのみが実行されるため、モジュールの定数は参照できない。
+    """
+    import time
+
+    import streamlit as st
+
+    from app.services.auth import get_current_user, restore_session
+    from app.services.cache import get_cached_profile
+    from app.services.quota import get_quota_status
+
+    # 有効なセッションのみシードしているため cookie_manager（Cookie削除用）は不要
+    if not restore_session(None):  # type: ignore[arg-type]
+        st.error("session not restored")
+        st.stop()
+
+    user = get_current_user()
+    quota = get_quota_status(user.id)
+    profile = get_cached_profile(user.id, repo_count=3)
+
+    llm_ms = st.session_state.get("_load_test_llm_ms", 0)  # LOAD_LLM_MS_KEY
+    if llm_ms:
+        # LLM呼び出し（スタブ）: スクリプトスレッドを占有するブロッキング待ち
+        time.sleep(llm_ms / 1000)
+
+    st.write(f"{user.login}: credits={quota.credits} profile={bool(profile)}")
+
+
+@dataclass
+class LevelResult:
+    """1つの同時実行数での計測結果."""
+
+    sessions: int
+    latencies: list[float] = field(default_factory=list)
+    cold_latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rss_before_mb: float = 0.0
+    rss_after_mb: float = 0.0
+
+
+def _rss_mb() -> float:
+    """現在のRSS（MB）."""
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        pages = int(statm.read_text().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    # /procがない環境ではピークRSSで代用（macOSはバイト単位）
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / 1024
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def seed_sessions(count: int) -> list[str]:
+    """セッション・クレジット・プロファイルキャッシュをシードし、セッションIDを返す."""
+    from app.services.cache import save_profile_cache
+    from app.services.models import GitHubUser
+    from app.services.session import save_firestore_session
+
+    session_ids = []
+    for index in range(count):
+        user_id = USER_ID_BASE + index
+        user = GitHubUser(
+            id=user_id,
+            login=f"load-user-{index}",
+            name=None,
+            email=None,
+            avatar_url="https://avatars.githubusercontent.com/u/0",
+        )
+        session_id = f"load-session-{index}"
+        save_firestore_session(session_id, user, "load-test-token")
+        save_profile_cache(
+            user_id=user_id,
+            github_login=user.login,
+            profile_data={"summary": f"load test profile {index}"},
+            repo_count=3,
+        )
+        session_ids.append(session_id)
+    return session_ids
+
+
+@contextmanager
+def _concurrent_apptest_runtime() -> Iterator[None]:
+    """AppTestを複数スレッドから同時に実行できるようにする.
+
+    AppTest.run() はモックのRuntimeをグローバルに設定し、終了時にNoneへ戻すため、
+    同時実行すると他セッションの実行中にRuntimeが消える。
+    直近に設定されたRuntimeを返し続けるようにして回避する。
+    """
+    from streamlit.runtime import Runtime
+
+    last: list[Any] = [None]
+
+    def instance() -> Any:
+        current = Runtime._instance
+        if current is not None:
+            last[0] = current
+        if last[0] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last[0]
+
+    with (
+        patch.object(Runtime, "instance", side_effect=instance),
+        patch.object(Runtime, "exists", side_effect=lambda: last[0] is not None),
+    ):
+        yield
+
+
+def run_level(session_ids: list[str], reruns: int, llm_ms: int) -> LevelResult:
+    """len(session_ids) 個のセッションを同時に reruns 回ずつ実行."""
+    from streamlit.testing.v1 import AppTest
+
+    result = LevelResult(sessions=len(session_ids))
+    lock = threading.Lock()
+    apps = []
+    for session_id in session_ids:
+        app = AppTest.from_function(load_session_app, default_timeout=APP_TIMEOUT)
+        app.session_state[LOAD_SESSION_KEY] = session_id
+        app.session_state[LOAD_LLM_MS_KEY] = llm_ms
+        apps.append(app)
+
+    def drive(app: AppTest) -> None:
+        for rerun in range(reruns):
+            started = time.perf_counter()
+            try:
+                app.run()
+                failed = bool(app.exception or app.error)
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                result.latencies.append(elapsed)
+                if rerun == 0:
+                    result.cold_latencies.append(elapsed)
+                if failed:
+                    result.errors += 1
+
+    result.rss_before_mb = _rss_mb()
+    cpu_started = _cpu_seconds()
+    started = time.perf_counter()
+    with (
+        _concurrent_apptest_runtime(),
+        ThreadPoolExecutor(max_workers=len(apps)) as pool,
+    ):
+        list(pool.map(drive, apps))
+    result.wall_seconds = time.perf_counter() - started
+    result.cpu_seconds = _cpu_seconds() - cpu_started
+    result.rss_after_mb = _rss_mb()
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="Concurrent session load test")
+    parser.add_argument(
+        "--levels", default="1,10,40,80", help="カンマ区切りの同時セッション数"
+    )
+    parser.add_argument(
+        "--reruns", type=int, default=5, help="セッションあたりの実行回数"
+    )
+    parser.add_argument(
+        "--llm-ms", type=int, default=0, help="1回の実行ごとのLLMスタブ待ち時間 ms"
+    )
+    args = parser.parse_args(argv)
+
+    require_emulator()
+    import streamlit as st
+
+    import app.services.auth  # noqa: F401  streamlit importを先に済ませる
+
+    quiet_streamlit()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    session_ids = seed_sessions(max(levels))
+
+    rows = []
+    # セッションIDはCookieの代わりにAppTestのsession_stateから渡す。
+    # ログイン後の先読みはダミーのトークンでGitHubを呼ぶため止める
+    with (
+        patch(
+            "app.services.auth.get_session_cookie",
+            side_effect=lambda: st.session_state.get(LOAD_SESSION_KEY),
+        ),
+        patch("app.services.auth.prefetch_repo_metadata"),
+    ):
+        for level in levels:
+            result = run_level(session_ids[:level], args.reruns, args.llm_ms)
+            runs = len(result.latencies)
+            rows.append(
+                [
+                    level,
+                    runs,
+                    result.errors,
+                    runs / result.wall_seconds,
+                    percentile(result.latencies, 50) * 1000,
+                    percentile(result.latencies, 95) * 1000,
+                    percentile(result.latencies, 99) * 1000,
+                    percentile(result.cold_latencies, 95) * 1000,
+                    result.cpu_seconds / result.wall_seconds * 100,
+                    result.rss_after_mb,
+                    (result.rss_after_mb - result.rss_before_mb) / level,
+                ]
+            )
+
+    print(f"reruns/session={args.reruns} llm_ms={args.llm_ms}")
+    print_table(
+        [
+            "sessions",
+            "runs",
+            "errors",
+            "runs/s",
+            "p50 ms",
+            "p95 ms",
+            "p99 ms",
+            "cold p95 ms",
+            "cpu %",
+            "rss MB",
+            "rss/session MB",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Streamlitエントリーポイントのimport時間プロファイル（`-X importtime`）.
+
+`import app.main` を別プロセスで複数回計測し、モジュールごとの
+累積/自己時間の上位と、重いSDKが起動時に読み込まれていないかを報告する。
+予算超過または重いSDKの読み込みを検出した場合は終了コード1で終わる。
+
+Usage:
+    python -m benchmarks.startup --runs 5 --budget-ms 1500
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from benchmarks.common import print_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 初回ページ描画前に読み込まれてはいけないSDK（app.services.lazy_importで遅延）
+HEAVY_MODULES = [
+    "vertexai",
+    "langchain_core",
+    "perplexity",
+    "github",
+    "google.cloud.firestore",
+    "google.cloud.logging",
+    "google.cloud.storage",
+]
+
+
+@dataclass
+class ImportRecord:
+    """`-X importtime` の1行分."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    """`-X importtime` の出力をパース."""
+    records: list[ImportRecord] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(
+            ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+    return records
+
+
+def profile_import(target: str) -> list[ImportRecord]:
+    """新しいインタプリタで target を import してプロファイルを取得."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """CLIエントリーポイント."""
+    parser = argparse.ArgumentParser(description="Startup import-time benchmark")
+    parser.add_argument("--target", default="app.main", help="計測するモジュール")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数")
+    parser.add_argument("--top", type=int, default=15, help="表示する上位件数")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=1500.0,
+        help="target の累積import時間の上限（中央値）",
+    )
+    args = parser.parse_args(argv)
+
+    runs = [profile_import(args.target) for _ in range(args.runs)]
+    totals = [
+        next(r.cumulative_us for r in records if r.name == args.target) / 1000
+        for records in runs
+    ]
+    median_ms = statistics.median(totals)
+
+    # 中央値に最も近い回の内訳を表示
+    representative = runs[totals.index(min(totals, key=lambda t: abs(t - median_ms)))]
+    top = sorted(representative, key=lambda r: r.cumulative_us, reverse=True)
+    print(f"{args.target}: median {median_ms:.1f} ms over {args.runs} runs")
+    print_table(
+        ["module", "cumulative ms", "self ms"],
+        [[r.name, r.cumulative_us / 1000, r.self_us / 1000] for r in top[: args.top]],
+    )
+
+    imported = {r.name for r in representative}
+    eager = [m for m in HEAVY_MODULES if m in imported]
+    print()
+    print(f"heavy SDKs imported at startup: {', '.join(eager) or 'none'}")
+
+    failures = []
+    if eager:
+        failures.append(f"heavy SDKs imported eagerly: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"median {median_ms:.1f} ms exceeds {args.budget_ms:.0f} ms")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,3 +28,28 @@ resource "google_project_iam_member" "app_firestore" {
   role    = "roles/datastore.user"
   member  = "serviceAccount:${google_service_account.app.email}"
 }
+
+# ============================================
+# Firestore TTL Policies
+# ============================================
+# expires_at を過ぎたドキュメントを自動削除（削除は最大24時間程度遅延する）。
+# スイーパー（app/services/ttl.py）の expires_at < now クエリに必要な
+# 昇順インデックスのみ残し、降順・配列インデックスは作らない。
+# repo_chunks は repos/{user_id} 配下のサブコレクション（コレクショングループ単位で適用）。
+resource "google_firestore_field" "ttl" {
+  for_each = toset(["sessions", "profiles", "repos", "session_spill", "repo_chunks"])
+
+  project    = var.project_id
+  database   = google_firestore_database.default.name
+  collection = each.key
+  field      = "expires_at"
+
+  ttl_config {}
+
+  index_config {
+    indexes {
+      order       = "ASCENDING"
+      query_scope = each.key == "repo_chunks" ? "COLLECTION_GROUP" : "COLLECTION"
+    }
+  }
+}
@@ -118,6 +118,8 @@ resource "google_cloud_run_v2_service" "app" {
           cpu    = "1000m"
           memory = "1Gi"
         }
+        # 起動時のウォームアップ（app.services.warmup）を高速化
+        startup_cpu_boost = true
       }
 
       env {
@@ -135,6 +137,22 @@ resource "google_cloud_run_v2_service" "app" {
         value = var.region
       }
 
+      env {
+        name  = "BLOB_STORE_BACKEND"
+        value = "gcs"
+      }
+
+      env {
+        name  = "BLOB_STORE_BUCKET"
+        value = google_storage_bucket.blob_store.name
+      }
+
+      # 依存先SLOのログベース指標（terraform/monitoring.tf）の元になる呼び出しログ
+      env {
+        name  = "METRICS_LOG_CALLS"
+        value = "1"
+      }
+
       env {
         name = "GITHUB_TOKEN"
         value_source {
@@ -227,6 +245,8 @@ resource "google_cloud_run_v2_service" "green" {
           cpu    = "1000m"
           memory = "1Gi"
         }
+        # 起動時のウォームアップ（app.services.warmup）を高速化
+        startup_cpu_boost = true
       }
 
       env {
@@ -244,6 +264,22 @@ resource "google_cloud_run_v2_service" "green" {
         value = var.region
       }
 
+      env {
+        name  = "BLOB_STORE_BACKEND"
+        value = "gcs"
+      }
+
+      env {
+        name  = "BLOB_STORE_BUCKET"
+        value = google_storage_bucket.blob_store.name
+      }
+
+      # 依存先SLOのログベース指標（terraform/monitoring.tf）の元になる呼び出しログ
+      env {
+        name  = "METRICS_LOG_CALLS"
+        value = "1"
+      }
+
       env {
         name = "GITHUB_TOKEN"
         value_source {
@@ -78,3 +78,99 @@ resource "google_monitoring_alert_policy" "build_failure" {
     mime_type = "text/markdown"
   }
 }
+
+# ============================================
+# Dependency Latency SLO
+# ============================================
+
+# app.services.metrics が外部呼び出し1回ごとに出力する "Dependency call" ログの
+# レイテンシを分布として集計する（p95/p99 は Cloud Monitoring 側で分布から求める）
+resource "google_logging_metric" "dependency_latency" {
+  name   = "dependency_latency"
+  filter = <<-EOT
+    resource.type="cloud_run_revision"
+    resource.labels.service_name="${google_cloud_run_v2_service.app.name}"
+    jsonPayload.message="Dependency call"
+  EOT
+
+  metric_descriptor {
+    metric_kind = "DELTA"
+    value_type  = "DISTRIBUTION"
+    unit        = "ms"
+
+    labels {
+      key        = "dependency"
+      value_type = "STRING"
+    }
+    labels {
+      key        = "operation"
+      value_type = "STRING"
+    }
+    labels {
+      key        = "outcome"
+      value_type = "STRING"
+    }
+  }
+
+  value_extractor = "EXTRACT(jsonPayload.latency_ms)"
+  label_extractors = {
+    dependency = "EXTRACT(jsonPayload.dependency)"
+    operation  = "EXTRACT(jsonPayload.operation)"
+    outcome    = "EXTRACT(jsonPayload.outcome)"
+  }
+
+  bucket_options {
+    exponential_buckets {
+      num_finite_buckets = 32
+      growth_factor      = 1.5
+      scale              = 1
+    }
+  }
+}
+
+# ============================================
+# Quota Reconciliation
+# ============================================
+
+# app.services.quota が楽観的クォータの照合ごとに出力する "Quota reconciled" の
+# ドリフト（サーバー残高 - 表示値）を分布として集計する（差がない照合も含む）
+resource "google_logging_metric" "quota_drift" {
+  name   = "quota_drift"
+  filter = <<-EOT
+    resource.type="cloud_run_revision"
+    resource.labels.service_name="${google_cloud_run_v2_service.app.name}"
+    jsonPayload.message="Quota reconciled"
+  EOT
+
+  metric_descriptor {
+    metric_kind = "DELTA"
+    value_type  = "DISTRIBUTION"
+    unit        = "1"
+  }
+
+  value_extractor = "EXTRACT(jsonPayload.quota_drift)"
+
+  bucket_options {
+    linear_buckets {
+      num_finite_buckets = 21
+      width              = 1
+      offset             = -10.5
+    }
+  }
+}
+
+# サーバー側の結果と食い違い、表示値をロールバックした楽観的操作の件数
+resource "google_logging_metric" "quota_rollbacks" {
+  name   = "quota_rollbacks"
+  filter = <<-EOT
+    resource.type="cloud_run_revision"
+    resource.labels.service_name="${google_cloud_run_v2_service.app.name}"
+    jsonPayload.message="Quota rolled back"
+  EOT
+
+  metric_descriptor {
+    metric_kind = "DELTA"
+    value_type  = "INT64"
+    unit        = "1"
+  }
+}
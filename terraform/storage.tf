@@ -0,0 +1,30 @@
+# ============================================
+# GCS Bucket for Blob Store
+# ============================================
+# README・ファイル内容をgit blob SHAをキーに保存（app.services.blob_store）。
+# 複数ユーザーのリポジトリ間で共有されるため、ユーザー単位では削除しない。
+# reposキャッシュの保存時に参照するblobの custom_time を更新するため、最後に参照した
+# キャッシュの期限（CACHE_TTL_DAYS = 7日）を過ぎてから削除する。作成日時（age）では
+# 削除しない（共有blobがそれを参照する新しいキャッシュより先に消えるため）。
+resource "google_storage_bucket" "blob_store" {
+  name                        = "${var.project_id}-blob-store"
+  location                    = var.region
+  uniform_bucket_level_access = true
+  public_access_prevention    = "enforced"
+  force_destroy               = true
+
+  lifecycle_rule {
+    condition {
+      days_since_custom_time = 8
+    }
+    action {
+      type = "Delete"
+    }
+  }
+}
+
+resource "google_storage_bucket_iam_member" "app_blob_store" {
+  bucket = google_storage_bucket.blob_store.name
+  role   = "roles/storage.objectUser"
+  member = "serviceAccount:${google_service_account.app.email}"
+}
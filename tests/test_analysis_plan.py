@@ -0,0 +1,149 @@
+"""Tests for app/services/analysis_plan.py."""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services.analysis_plan import AnalysisPlan, RepoClass, classify_repo
+from app.services.github import analyze_selected_repos
+from app.services.github_scheduler import GitHubScheduler, count_requests
+from app.services.repo_record import RepoRecord
+
+
+def github_repo(name: str, fork: bool = False, archived: bool = False):
+    return SimpleNamespace(
+        name=name,
+        description=None,
+        language="Python",
+        topics=["cli"],
+        stargazers_count=3,
+        forks_count=1,
+        updated_at=None,
+        fork=fork,
+        archived=archived,
+    )
+
+
+def record(name: str, **kwargs) -> RepoRecord:
+    return RepoRecord(
+        name=name,
+        description=None,
+        language="Python",
+        languages={"Python": 100},
+        topics=[],
+        readme="# readme",
+        stars=0,
+        forks=0,
+        updated_at="",
+        **kwargs,
+    )
+
+
+class TestClassifyRepo:
+    """classify_repo関数のテスト."""
+
+    @pytest.mark.parametrize(
+        ("is_fork", "is_archived", "expected"),
+        [
+            (False, False, RepoClass.ORIGINAL),
+            (True, False, RepoClass.FORK),
+            (False, True, RepoClass.ARCHIVED),
+            (True, True, RepoClass.FORK),
+        ],
+    )
+    def test_classes(self, is_fork, is_archived, expected):
+        assert classify_repo(is_fork, is_archived) is expected
+
+    def test_plan_from_records(self):
+        """キャッシュ済みのレコードからも同じ分類になる."""
+        plan = AnalysisPlan.for_repos(
+            [
+                record("app"),
+                record("fork", is_fork=True),
+                record("old", is_archived=True),
+            ]
+        )
+
+        assert [n for n in plan.classes if plan.is_profiled(n)] == ["app"]
+        assert not plan.is_profiled("unknown")
+
+
+class TestCountRequests:
+    """count_requests のテスト."""
+
+    def test_counts_scheduled_requests_and_adds_to_outer(self):
+        scheduler = GitHubScheduler()
+        response = SimpleNamespace(status_code=200, headers={})
+
+        with count_requests() as outer:
+            scheduler.run(lambda: response)
+            with count_requests() as inner:
+                scheduler.run(lambda: response)
+                scheduler.run(lambda: response)
+
+        assert inner.value == 2
+        assert outer.value == 3
+
+
+class TestAnalyzeSelectedReposPlan:
+    """analyze_selected_repos の分類ごとの抽出のテスト."""
+
+    def test_skips_deep_extraction_for_ignored_repos(self):
+        """フォーク・アーカイブは extract_repo_info を呼ばずメタデータのみにする."""
+        repos = [
+            github_repo("app"),
+            github_repo("fork", fork=True),
+            github_repo("old", archived=True),
+        ]
+        plan = AnalysisPlan()
+        with (
+            patch("app.services.github.get_repos_by_names", return_value=repos),
+            patch(
+                "app.services.github.extract_repo_info",
+                side_effect=lambda repo: record(repo.name),
+            ) as extract,
+        ):
+            records = analyze_selected_repos(
+                "octocat", ["app", "fork", "old"], plan=plan
+            )
+
+        assert [c.args[0].name for c in extract.call_args_list] == ["app"]
+        fork, old = records[1], records[2]
+        assert (fork.is_fork, fork.readme, fork.topics) == (True, None, ["cli"])
+        assert old.is_archived and old.file_structure == []
+        assert plan.classes == {
+            "app": RepoClass.ORIGINAL,
+            "fork": RepoClass.FORK,
+            "old": RepoClass.ARCHIVED,
+        }
+        report = plan.report()
+        assert {k: v["repos"] for k, v in report.items()} == {
+            "original": 1,
+            "fork": 1,
+            "archived": 1,
+        }
+
+    def test_report_counts_requests_per_class(self):
+        """分類ごとにスケジューラを通ったリクエスト数を集計する."""
+        scheduler = GitHubScheduler()
+        response = SimpleNamespace(status_code=200, headers={})
+
+        def extract(repo):
+            for _ in range(4):
+                scheduler.run(lambda: response)
+            return record(repo.name)
+
+        plan = AnalysisPlan()
+        with (
+            patch(
+                "app.services.github.get_repos_by_names",
+                return_value=[github_repo("app"), github_repo("fork", fork=True)],
+            ),
+            patch("app.services.github.extract_repo_info", side_effect=extract),
+        ):
+            analyze_selected_repos("octocat", ["app", "fork"], plan=plan)
+
+        report = plan.report()
+        assert report["original"]["requests"] == 4
+        assert report["fork"]["requests"] == 0
@@ -0,0 +1,146 @@
+"""Tests for app/services/blob_store.py."""
+
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from app.services.blob_store import (
+    BlobStore,
+    GcsBlobBackend,
+    LocalBlobBackend,
+    LruBlobCache,
+    git_blob_sha,
+)
+from app.services.github import get_file_text
+
+HELLO = b"hello\n"
+# `echo hello | git hash-object --stdin`
+HELLO_SHA = "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+class TestBlobStore:
+    """BlobStoreクラスのテスト."""
+
+    def test_git_blob_sha(self):
+        """gitのblob SHAと同じ値を返す."""
+        assert git_blob_sha(HELLO) == HELLO_SHA
+
+    def test_local_backend_round_trip(self, tmp_path):
+        """LRUから消えてもローカルディスクから読める."""
+        store = BlobStore(LocalBlobBackend(tmp_path), LruBlobCache(1024))
+        assert store.put(HELLO_SHA, HELLO)
+
+        fresh = BlobStore(LocalBlobBackend(tmp_path), LruBlobCache(1024))
+
+        assert fresh.get(HELLO_SHA) == HELLO
+        assert fresh.exists(HELLO_SHA)
+
+    def test_rejects_sha_mismatch(self, tmp_path):
+        """内容とSHAが一致しなければ保存しない."""
+        store = BlobStore(LocalBlobBackend(tmp_path), LruBlobCache(1024))
+
+        assert not store.put(HELLO_SHA, b"tampered\n")
+        assert store.get(HELLO_SHA) is None
+
+    def test_exists_checks_backend_not_lru(self, tmp_path):
+        """LRUにあってもバックエンドから消えていれば保存済みとみなさない."""
+        backend = LocalBlobBackend(tmp_path)
+        store = BlobStore(backend, LruBlobCache(1024))
+        store.put(HELLO_SHA, HELLO)
+        backend._path(HELLO_SHA).unlink()
+
+        assert not store.exists(HELLO_SHA)
+
+    def test_touch_reputs_blobs_missing_from_backend(self, tmp_path):
+        """バックエンドから消えたblobはLRUの内容で保存し直し、参照できるものを返す."""
+        backend = LocalBlobBackend(tmp_path)
+        store = BlobStore(backend, LruBlobCache(1024))
+        store.put(HELLO_SHA, HELLO)
+        backend._path(HELLO_SHA).unlink()
+        unknown = "0" * 40
+
+        assert store.touch({HELLO_SHA, unknown}) == {HELLO_SHA}
+        assert backend.get(HELLO_SHA) == HELLO
+
+    def test_memory_only_store_is_not_durable(self):
+        """バックエンドなしでは参照として保存できない."""
+        store = BlobStore(None, LruBlobCache(1024))
+        store.put(HELLO_SHA, HELLO)
+
+        assert store.get(HELLO_SHA) == HELLO
+        assert not store.exists(HELLO_SHA)
+
+
+class TestGcsBlobBackend:
+    """GcsBlobBackendクラスのテスト."""
+
+    def test_touch_batches_custom_time_updates(self):
+        """custom_time の更新を100件ごとのバッチで送り、存在したものだけを返す."""
+        bucket = MagicMock()
+        blobs = {}
+
+        def blob(name):
+            mock = blobs[name] = MagicMock()
+            sha = name.rpartition("/")[2]
+            # 失敗した patch は未解決のまま（参照すると KeyError）
+            generation = PropertyMock(
+                side_effect=KeyError("future") if sha.startswith("f") else None,
+                return_value=1,
+            )
+            type(mock).generation = generation
+            return mock
+
+        bucket.blob.side_effect = blob
+        backend = GcsBlobBackend("bucket")
+        backend.__dict__["_bucket"] = bucket
+        shas = [f"{i:040x}" for i in range(150)] + ["f" * 40]
+
+        found = backend.touch(shas)
+
+        assert found == set(shas) - {"f" * 40}
+        assert bucket.client.batch.call_count == 2
+        bucket.client.batch.assert_called_with(raise_exception=False)
+        for mock in blobs.values():
+            mock.patch.assert_called_once_with()
+            assert mock.custom_time is not None
+
+
+class TestLruBlobCache:
+    """LruBlobCacheクラスのテスト."""
+
+    def test_evicts_least_recently_used(self):
+        """合計バイト数が上限を超えたら最も古いものから捨てる."""
+        cache = LruBlobCache(max_bytes=10)
+        cache.put("a", b"12345")
+        cache.put("b", b"12345")
+        cache.get("a")
+        cache.put("c", b"12345")
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert cache.size == 10
+
+
+class TestGetFileText:
+    """get_file_text関数のテスト."""
+
+    def test_reuses_blob_without_github_call(self):
+        """BlobStoreにあればGitHubを呼ばない."""
+        store = BlobStore(None, LruBlobCache(1024))
+        store.put(HELLO_SHA, HELLO)
+        repo = MagicMock()
+
+        with patch("app.services.github.get_blob_store", return_value=store):
+            assert get_file_text(repo, "README", HELLO_SHA) == "hello\n"
+
+        repo.get_contents.assert_not_called()
+
+    def test_stores_fetched_content(self):
+        """GitHubから取得した内容をBlobStoreに保存する."""
+        store = BlobStore(None, LruBlobCache(1024))
+
+        with (
+            patch("app.services.github.get_blob_store", return_value=store),
+            patch("app.services.github.get_file_content", return_value="hello\n"),
+        ):
+            get_file_text(MagicMock(), "README", HELLO_SHA)
+
+        assert store.get(HELLO_SHA) == HELLO
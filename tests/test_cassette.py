@@ -0,0 +1,199 @@
+"""Tests for benchmarks/cassette.py."""
+
+import io
+import json
+import tarfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+import requests
+import requests.adapters
+from vertexai.generative_models import GenerativeModel
+
+from app.services.blob_store import git_blob_sha
+from app.services.github import get_file_prefix
+from app.services.repo_snapshot import read_snapshot
+from benchmarks.cassette import Cassette, CassetteMiss
+from benchmarks.pipeline import DEFAULT_CASSETTE, run_pipeline
+
+REPO = SimpleNamespace(full_name="octocat/hello-world", default_branch="main")
+
+
+def _tarball(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path, data in files.items():
+            info = tarfile.TarInfo(f"hello-world-main/{path}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _requests_upstream(adapter, request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(
+        {
+            "Content-Type": "application/json",
+            "Link": '<https://api.github.com/x?page=2>; rel="next"',
+            "Set-Cookie": "session=secret",
+        }
+    )
+    response._content = json.dumps({"name": "hello-world"}).encode()
+    response.url = request.url
+    response.request = request
+    return response
+
+
+def _httpx_upstream(files: dict[str, bytes]):
+    def handle_request(transport, request):
+        url = str(request.url)
+        if "codeload.github.com" in url:
+            return httpx.Response(200, content=_tarball(files), request=request)
+        path = url.split("/main/", 1)[1]
+        end = int(request.headers["range"].split("-")[1])
+        return httpx.Response(206, content=files[path][: end + 1], request=request)
+
+    return handle_request
+
+
+@pytest.fixture
+def upstream():
+    """記録時の通信先（Cassetteは差し替え前の実装としてこれらを包む）."""
+    files = {
+        "README.md": b"# hello-world\n",
+        "requirements.txt": b"fastapi==0.115.0\n",
+        "src/main.py": "print('こんにちは')\n".encode() * 200,
+    }
+    chunks = ['{"summary": ', '"開発者"}']
+
+    def generate(model, contents, *args, **kwargs):
+        if kwargs.get("stream"):
+            return iter(SimpleNamespace(text=text) for text in chunks)
+        return SimpleNamespace(text="".join(chunks))
+
+    with (
+        patch.object(requests.adapters.HTTPAdapter, "send", _requests_upstream),
+        patch.object(httpx.HTTPTransport, "handle_request", _httpx_upstream(files)),
+        patch.object(GenerativeModel, "generate_content", generate),
+    ):
+        yield SimpleNamespace(files=files)
+
+
+class TestRequestsRoundTrip:
+    """requests（PyGithub）の記録・再生のテスト."""
+
+    def test_replays_recorded_response(self, tmp_path, upstream):
+        """記録したステータス・ヘッダー・ボディを再生し、認証情報は保存しない."""
+        path = tmp_path / "cassette.json"
+        url = "https://api.github.com/repos/octocat/hello-world"
+        headers = {"Authorization": "token ghp_secret"}
+        with Cassette(path, mode="record"):
+            recorded = requests.get(url, headers=headers, timeout=5)
+
+        with Cassette(path) as cassette:
+            replayed = requests.get(url, headers=headers, timeout=5)
+
+        assert replayed.status_code == recorded.status_code == 200
+        assert replayed.json() == {"name": "hello-world"}
+        assert replayed.links["next"]["url"] == "https://api.github.com/x?page=2"
+        assert cassette.stats["github"].calls == 1
+        saved = path.read_text(encoding="utf-8")
+        assert "ghp_secret" not in saved
+        assert "session=secret" not in saved
+
+    def test_unrecorded_request_is_a_miss(self, tmp_path, upstream):
+        """記録にないリクエストはネットワークに出ずに失敗する."""
+        path = tmp_path / "cassette.json"
+        with Cassette(path, mode="record"):
+            pass
+
+        with Cassette(path), pytest.raises(CassetteMiss):
+            requests.get("https://api.github.com/rate_limit", timeout=5)
+
+
+class TestHttpxRoundTrip:
+    """httpx（raw・codeload のストリーミング）の記録・再生のテスト."""
+
+    def test_raw_prefix(self, tmp_path, upstream):
+        """Range付きのrawの先頭読みを再生する."""
+        path = tmp_path / "cassette.json"
+        with Cassette(path, mode="record"):
+            recorded = get_file_prefix(REPO, "src/main.py", 100)
+
+        with Cassette(path, latency_ms={"github": 1}) as cassette:
+            replayed = get_file_prefix(REPO, "src/main.py", 100)
+
+        assert replayed == recorded
+        assert replayed is not None
+        assert len(replayed) == 100
+        assert replayed.startswith("print('こんにちは')")
+        assert cassette.stats["github"].injected_ms == 1
+
+    def test_tarball_snapshot(self, tmp_path, upstream):
+        """tarballのストリーミング展開を再生する（バイナリはbase64で保存）."""
+        path = tmp_path / "cassette.json"
+
+        def snapshot():
+            return read_snapshot(
+                "octocat/hello-world",
+                "main",
+                max_depth=2,
+                wanted=lambda p: 5000 if "/" not in p else None,
+                max_bytes=1 << 20,
+                max_file_bytes=1 << 20,
+            )
+
+        with Cassette(path, mode="record"):
+            recorded = snapshot()
+
+        with Cassette(path):
+            replayed = snapshot()
+
+        assert replayed is not None and recorded is not None
+        assert replayed.structure == recorded.structure
+        assert replayed.contents == recorded.contents
+        assert replayed.shas["requirements.txt"] == git_blob_sha(
+            upstream.files["requirements.txt"]
+        )
+        assert '"body_encoding": "base64"' in path.read_text(encoding="utf-8")
+
+
+class TestVertexRoundTrip:
+    """Vertex AIの記録・再生のテスト."""
+
+    def test_stream(self, tmp_path, upstream):
+        """stream=True の応答はチャンクを連結して記録し、反復可能な形で再生する."""
+        path = tmp_path / "cassette.json"
+        model = SimpleNamespace(_model_name="gemini")
+        with Cassette(path, mode="record"):
+            GenerativeModel.generate_content(model, "prompt", stream=True)
+
+        with Cassette(path):
+            chunks = list(
+                GenerativeModel.generate_content(model, "prompt", stream=True)
+            )
+            response = GenerativeModel.generate_content(model, "prompt")
+
+        assert "".join(chunk.text for chunk in chunks) == '{"summary": "開発者"}'
+        assert response.text == '{"summary": "開発者"}'
+
+
+class TestPipelineCassette:
+    """同梱のカセットのテスト."""
+
+    def test_pipeline_replays_offline(self, monkeypatch):
+        """同梱のカセットでパイプライン全体をネットワークなしで再生できる."""
+        monkeypatch.setenv("GITHUB_TOKEN", "cassette-replay")
+        monkeypatch.setenv("PERPLEXITY_API_KEY", "cassette-replay")
+        monkeypatch.setenv("GCP_PROJECT_ID", "cassette-replay")
+
+        with Cassette(DEFAULT_CASSETTE) as cassette:
+            run_pipeline("octocat", ["hello-world", "spoon-knife"])
+
+        assert cassette.stats["vertex"].calls == 1
+        assert cassette.stats["perplexity"].calls == 1
+        # 記録にないGitHubリクエストは呼び出し側で握りつぶされるため件数で確認する
+        assert cassette.stats["github"].calls >= 5
@@ -0,0 +1,294 @@
+"""Tests for the GitHub client factory in app/services/github.py."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from github.GithubException import BadCredentialsException
+
+from app.services import github
+from app.services.const import GITHUB_SKIP_FILE_BYTES
+from app.services.github_scheduler import get_scheduler, token_key
+
+
+@pytest.fixture(autouse=True)
+def clients(monkeypatch):
+    """共有トークンを設定し、クライアントのキャッシュを空にする."""
+    monkeypatch.setenv("GITHUB_TOKEN", "shared-token")
+    monkeypatch.setattr(github, "_clients", type(github._clients)())
+    with patch("app.services.github.Github", side_effect=MagicMock) as factory:
+        yield factory
+
+
+class TestGetGithubClient:
+    """get_github_client関数のテスト."""
+
+    def test_prefers_user_token_and_caches(self, clients):
+        """ユーザーのトークンがあればそれを使い、トークンごとに使い回す."""
+        client = github.get_github_client("user-token")
+
+        assert github.get_github_client("user-token") is client
+        assert github.get_github_client() is not client
+        assert [c.args for c in clients.call_args_list] == [
+            ("user-token",),
+            ("shared-token",),
+        ]
+
+    def test_falls_back_when_user_budget_is_low(self, clients):
+        """ユーザーのトークンの残り予算が少なければ共有トークンを使う."""
+        get_scheduler(token_key("exhausted-token")).observe(
+            200,
+            {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "9999999999"},
+        )
+
+        github.get_github_client("exhausted-token")
+
+        clients.assert_called_once_with("shared-token")
+
+
+class TestTokenFallback:
+    """認証エラー時のフォールバックのテスト."""
+
+    def test_rejected_user_token_retries_with_shared(self):
+        """ユーザーのトークンが無効なら共有トークンでやり直す."""
+        calls = []
+
+        def fetch(token):
+            calls.append(token)
+            if token:
+                raise BadCredentialsException(401, {}, {})
+            return ["repo"]
+
+        assert github._with_token_fallback("revoked", fetch) == ["repo"]
+        assert calls == ["revoked", None]
+
+
+def repo(name: str, fork: bool = False, archived: bool = False) -> dict:
+    """一覧APIが返すリポジトリ."""
+    return {"name": name, "fork": fork, "archived": archived}
+
+
+class TestGetUserRepos:
+    """get_user_repos関数のテスト."""
+
+    @pytest.fixture
+    def requester(self, clients):
+        """2ページ分のリポジトリ一覧を返すRequester."""
+        pages = [
+            [repo("fork", fork=True), repo("old", archived=True)],
+            [repo("app"), repo("lib")],
+        ]
+        requester = MagicMock()
+
+        def request(verb, url, parameters=None, headers=None):
+            page = pages[requester.requestJsonAndCheck.call_count - 1]
+            link = {"link": '<https://api.github.com/next>; rel="next"'}
+            return (link if page is pages[0] else {}), page
+
+        requester.requestJsonAndCheck.side_effect = request
+        clients.side_effect = lambda token: MagicMock(requester=requester)
+        return requester
+
+    def test_stops_after_limit(self, requester):
+        """limit 件に達したら次のページを取得しない."""
+        repos = github.get_user_repos("octocat", limit=2)
+
+        assert [r.name for r in repos] == ["fork", "old"]
+        requester.requestJsonAndCheck.assert_called_once()
+        _, kwargs = requester.requestJsonAndCheck.call_args
+        assert kwargs["parameters"]["per_page"] == 2
+        assert kwargs["parameters"]["type"] == "owner"
+
+    def test_filters_forks_and_archived(self, requester):
+        """フォーク・アーカイブを除外しながら必要なページまで取得する."""
+        repos = github.get_user_repos(
+            "octocat", limit=1, include_forks=False, include_archived=False
+        )
+
+        assert [r.name for r in repos] == ["app"]
+        assert requester.requestJsonAndCheck.call_count == 2
+
+
+class FakeStream:
+    """httpx.stream のレスポンス（読み込んだチャンク数を記録）."""
+
+    def __init__(self, chunks: list[bytes], status_code: int = 206):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.read = 0
+        self.request_headers: dict[str, str] = {}
+
+    def __call__(self, method, url, headers=None, timeout=None):
+        self.url = url
+        self.request_headers = headers or {}
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_bytes(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+@pytest.fixture
+def raw_repo() -> MagicMock:
+    repo = MagicMock()
+    repo.full_name = "octocat/app"
+    repo.default_branch = "main"
+    return repo
+
+
+class TestGetFilePrefix:
+    """get_file_prefix関数のテスト."""
+
+    def test_stops_reading_at_limit(self, raw_repo):
+        """limit 文字に達したら以降のチャンクを読まない."""
+        stream = FakeStream([b"a" * 10, b"b" * 10, b"c" * 10])
+
+        with patch("app.services.github.httpx.stream", stream):
+            text = github.get_file_prefix(raw_repo, "dist/main.js", limit=15)
+
+        assert text == "a" * 10 + "b" * 5
+        assert stream.read == 2
+        assert stream.url.endswith("/octocat/app/main/dist/main.js")
+        assert stream.request_headers["Range"] == "bytes=0-59"
+
+    def test_decodes_characters_split_across_chunks(self, raw_repo):
+        """チャンクの境界で分かれたマルチバイト文字を正しく復元する."""
+        encoded = "日本語".encode()
+        stream = FakeStream([encoded[:4], encoded[4:]])
+
+        with patch("app.services.github.httpx.stream", stream):
+            assert github.get_file_prefix(raw_repo, "README", limit=10) == "日本語"
+
+    def test_returns_none_on_error_status(self, raw_repo):
+        """取得できなければNone（呼び出し側でContents APIに切り替える）."""
+        with patch("app.services.github.httpx.stream", FakeStream([], 404)):
+            assert github.get_file_prefix(raw_repo, "missing", limit=10) is None
+
+
+class TestGetFileTextSizes:
+    """get_file_text のサイズによる取得方法の切り替えのテスト."""
+
+    @pytest.fixture(autouse=True)
+    def empty_store(self):
+        from app.services.blob_store import BlobStore, LruBlobCache
+
+        store = BlobStore(None, LruBlobCache(1024))
+        with patch("app.services.github.get_blob_store", return_value=store):
+            yield
+
+    def test_large_file_is_range_read(self, raw_repo):
+        """大きいファイルは先頭だけを読み、Contents APIは呼ばない."""
+        with (
+            patch("app.services.github.get_file_prefix", return_value="{") as prefix,
+            patch("app.services.github.get_file_content") as contents,
+        ):
+            text = github.get_file_text(
+                raw_repo, "main.js", None, size=500_000, limit=3000
+            )
+
+        assert text == "{"
+        prefix.assert_called_once_with(raw_repo, "main.js", 3000)
+        contents.assert_not_called()
+
+    def test_huge_file_is_skipped(self, raw_repo):
+        """上限を超えるファイルは取得しない."""
+        with (
+            patch("app.services.github.get_file_prefix") as prefix,
+            patch("app.services.github.get_file_content") as contents,
+        ):
+            assert (
+                github.get_file_text(raw_repo, "main.js", None, size=50_000_000) is None
+            )
+
+        prefix.assert_not_called()
+        contents.assert_not_called()
+
+    def test_small_file_uses_contents_api(self, raw_repo):
+        """小さいファイルは従来どおり Contents API で全体を取得する."""
+        with (
+            patch("app.services.github.get_file_prefix") as prefix,
+            patch("app.services.github.get_file_content", return_value="x") as api,
+        ):
+            github.get_file_text(raw_repo, "go.mod", None, size=100, limit=5000)
+
+        prefix.assert_not_called()
+        api.assert_called_once()
+
+    def test_parsable_manifest_is_read_whole(self, raw_repo):
+        """解析できるマニフェストは大きくても先頭で切り詰めず全体を取得する."""
+        manifest = '{"description": "' + "x" * 40_000 + '", "dependencies": {"a": "1"}}'
+        with (
+            patch("app.services.github.get_file_prefix") as prefix,
+            patch("app.services.github.get_file_content", return_value=manifest),
+        ):
+            files = github.get_dependency_files(
+                raw_repo, ["package.json"], sizes={"package.json": len(manifest)}
+            )
+
+        prefix.assert_not_called()
+        assert files[0].content == manifest
+
+    def test_snapshot_keeps_parsable_manifests_whole(self):
+        """tarballからも解析できるマニフェストは全体を保持する."""
+        assert github._snapshot_wanted("package.json") == GITHUB_SKIP_FILE_BYTES
+
+
+class TestNestedManifests:
+    """ルート以外の依存ファイルの探索のテスト."""
+
+    STRUCTURE = [
+        "package.json",
+        "frontend",
+        "packages",
+        "examples",
+        "frontend/package.json",
+        "packages/api",
+        "packages/web",
+        "examples/demo",
+        "packages/api/package.json",
+        "packages/api/requirements.txt",
+        "packages/web/package.json",
+        "examples/demo/package.json",
+    ]
+
+    def test_finds_subdirectory_and_workspace_manifests(self):
+        """1階層下とワークスペース配下の依存ファイルをルートに続けて読む."""
+        with patch("app.services.github.get_file_text", return_value="{}"):
+            files = github.get_dependency_files(None, self.STRUCTURE)
+
+        assert [f.path for f in files] == [
+            "package.json",
+            "frontend/package.json",
+            "packages/api/package.json",
+            "packages/web/package.json",
+            "packages/api/requirements.txt",
+        ]
+
+    def test_number_of_nested_manifests_is_capped(self):
+        """ルート以外の依存ファイルは上限件数までしか取得しない."""
+        with (
+            patch("app.services.github.GITHUB_NESTED_MANIFESTS", 2),
+            patch("app.services.github.get_file_text", return_value="{}") as fetch,
+        ):
+            github.get_dependency_files(None, self.STRUCTURE)
+
+        assert fetch.call_count == 3
+
+    @pytest.mark.parametrize(
+        ("path", "wanted"),
+        [
+            ("frontend/package.json", True),
+            ("packages/api/package.json", True),
+            ("examples/demo/package.json", False),
+            ("packages/api/src/package.json", False),
+        ],
+    )
+    def test_snapshot_reads_nested_manifests(self, path, wanted):
+        """tarballからもルート以外の依存ファイルを読む."""
+        assert (github._snapshot_wanted(path) is not None) is wanted
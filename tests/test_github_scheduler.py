@@ -0,0 +1,221 @@
+"""Tests for app/services/github_scheduler.py."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.github_scheduler import (
+    SHARED_TOKEN,
+    GitHubBusyError,
+    GitHubScheduler,
+    Priority,
+    _current_priority,
+    get_scheduler,
+    github_user,
+    token_key,
+)
+
+
+class FakeClock:
+    """手動で進める時計."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def response(status: int = 200, remaining: int = 4000, reset: float = 4600.0):
+    """X-RateLimit-* ヘッダー付きのレスポンス."""
+    return SimpleNamespace(
+        status_code=status,
+        headers={
+            "x-ratelimit-limit": "5000",
+            "x-ratelimit-remaining": str(remaining),
+            "x-ratelimit-reset": str(reset),
+        },
+    )
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """単調時計と壁時計を兼ねる時計."""
+    return FakeClock()
+
+
+def make_scheduler(clock: FakeClock, **kwargs) -> GitHubScheduler:
+    return GitHubScheduler(clock=clock, wall_clock=clock, **kwargs)
+
+
+class TestRateLimit:
+    """レート制限ヘッダーの反映のテスト."""
+
+    def test_observe_updates_budget_and_rate(self, clock):
+        """残り予算をリセットまでの秒数で割った補充レートにする."""
+        scheduler = make_scheduler(clock)
+
+        scheduler.observe(200, response(remaining=3600, reset=clock.now + 3600).headers)
+
+        snapshot = scheduler.snapshot()
+        assert snapshot["remaining"] == 3600
+        assert snapshot["rate_per_second"] == 1.0
+
+    def test_tokens_never_exceed_remaining(self, clock):
+        """バケットの残量はGitHub側の残り予算を超えない."""
+        scheduler = make_scheduler(clock, burst=100)
+
+        scheduler.observe(200, response(remaining=3, reset=clock.now + 60).headers)
+
+        assert scheduler.snapshot()["tokens"] <= 3
+
+    def test_reset_restores_budget(self, clock):
+        """リセット時刻を過ぎたら上限まで回復したとみなす."""
+        scheduler = make_scheduler(clock, burst=10)
+        scheduler.observe(200, response(remaining=0, reset=clock.now + 60).headers)
+
+        clock.now += 61
+
+        snapshot = scheduler.snapshot()
+        assert snapshot["remaining"] == 5000
+        assert snapshot["tokens"] == 10
+
+    def test_background_is_held_back_under_reserve(self, clock):
+        """残り予算が予約分以下ならBACKGROUNDは実行されない."""
+        scheduler = make_scheduler(clock, reserve=500, queue_timeout=0)
+        scheduler.observe(200, response(remaining=400).headers)
+
+        with github_user("octocat", Priority.BACKGROUND):
+            with pytest.raises(GitHubBusyError, match="timeout"):
+                scheduler.run(response)
+        with github_user("octocat", Priority.INTERACTIVE):
+            assert scheduler.run(response).status_code == 200
+
+
+class TestQueue:
+    """待ち行列のテスト."""
+
+    def test_queue_full_is_rejected(self, clock):
+        """待ち行列が上限なら即座に GitHubBusyError."""
+        scheduler = make_scheduler(clock, max_queue=0)
+
+        with pytest.raises(GitHubBusyError, match="queue_full"):
+            scheduler.run(response)
+
+    def test_priority_then_fairness(self, clock):
+        """優先度 → 取得数の少ないユーザー → 到着順で選ぶ."""
+        scheduler = make_scheduler(clock)
+        with github_user("heavy"):
+            for _ in range(3):
+                scheduler.run(response)
+
+        with scheduler._cond:
+            for priority, user in [
+                (Priority.ANALYSIS, "heavy"),
+                (Priority.ANALYSIS, "light"),
+                (Priority.INTERACTIVE, "heavy"),
+            ]:
+                scheduler._seq += 1
+                scheduler._waiters.append(
+                    SimpleNamespace(priority=priority, user=user, seq=scheduler._seq)
+                )
+            order = []
+            while scheduler._waiters:
+                waiter = scheduler._next()
+                order.append((waiter.priority, waiter.user))
+                scheduler._waiters.remove(waiter)
+
+        assert order == [
+            (Priority.INTERACTIVE, "heavy"),
+            (Priority.ANALYSIS, "light"),
+            (Priority.ANALYSIS, "heavy"),
+        ]
+
+    def test_concurrency_is_bounded(self):
+        """同時に送信されるリクエスト数は上限を超えない."""
+        scheduler = GitHubScheduler(max_concurrency=2, queue_timeout=5)
+        lock = threading.Lock()
+        active = peak = 0
+
+        def send():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            threading.Event().wait(0.01)
+            with lock:
+                active -= 1
+            return SimpleNamespace(status_code=200, headers={})
+
+        threads = [
+            threading.Thread(target=scheduler.run, args=(send,)) for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak <= 2
+
+
+class TestAdaptiveConcurrency:
+    """AIMDによる同時実行数制御のテスト."""
+
+    def test_throttled_response_halves_limit(self, clock):
+        """403/429/5xxで同時実行数の上限を半減し、成功で少しずつ戻す."""
+        scheduler = make_scheduler(clock, max_concurrency=8)
+
+        scheduler.run(lambda: response(status=429))
+        assert scheduler.snapshot()["concurrency_limit"] == 4
+
+        scheduler.run(response)
+        assert 4 < scheduler.snapshot()["concurrency_limit"] < 5
+
+    def test_transport_error_counts_as_throttled(self, clock):
+        """送信時の例外でも上限を下げ、例外はそのまま伝える."""
+        scheduler = make_scheduler(clock, max_concurrency=8)
+
+        def fail():
+            raise ConnectionError("reset by peer")
+
+        with pytest.raises(ConnectionError):
+            scheduler.run(fail)
+
+        snapshot = scheduler.snapshot()
+        assert snapshot["concurrency_limit"] == 4
+        assert snapshot["inflight"] == 0
+
+
+class TestGithubUser:
+    """github_userコンテキストのテスト."""
+
+    def test_outer_lower_priority_is_kept(self):
+        """外側のBACKGROUNDは内側のINTERACTIVEで上書きされない."""
+        with github_user("octocat", Priority.BACKGROUND):
+            with github_user("octocat", Priority.INTERACTIVE):
+                assert _current_priority.get() == Priority.BACKGROUND
+        assert _current_priority.get() is None
+
+
+class TestPerTokenSchedulers:
+    """トークンごとのスケジューラのテスト."""
+
+    def test_shared_token_maps_to_shared_scheduler(self, monkeypatch):
+        """GITHUB_TOKEN とトークンなしは共有のスケジューラを使う."""
+        monkeypatch.setenv("GITHUB_TOKEN", "shared-secret")
+
+        assert token_key("shared-secret") == SHARED_TOKEN
+        assert token_key(None) == SHARED_TOKEN
+        assert "user-secret" not in token_key("user-secret")
+
+    def test_user_tokens_track_separate_budgets(self):
+        """ユーザートークンごとに別の予算を追跡する."""
+        first = get_scheduler(token_key("token-a"))
+        second = get_scheduler(token_key("token-b"))
+        first.observe(200, response(remaining=10, reset=9999999999).headers)
+
+        assert first is get_scheduler(token_key("token-a"))
+        assert not first.has_budget()
+        assert second.has_budget()
+        assert get_scheduler() is not first
@@ -0,0 +1,52 @@
+"""Tests for app/services/lazy_import.py."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from app.services.lazy_import import lazy_attr, lazy_module, preload
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyModule:
+    """lazy_module / lazy_attr のテスト."""
+
+    def test_imports_on_first_attribute_access(self):
+        """属性アクセスまでimportしない."""
+        sys.modules.pop("colorsys", None)
+        module = lazy_module("colorsys")
+        assert "colorsys" not in sys.modules
+
+        assert module.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+        assert "colorsys" in sys.modules
+
+    def test_lazy_attr_is_callable(self):
+        """lazy_attrは元のクラス・関数として呼び出せる."""
+        ordered_dict = lazy_attr("collections", "OrderedDict")
+        assert ordered_dict(a=1) == {"a": 1}
+
+    def test_preload_reports_timings(self):
+        """preloadはモジュールごとの所要時間を返す."""
+        lazy_module("colorsys")
+        timings = preload(["colorsys"])
+        assert set(timings) == {"colorsys"}
+        assert timings["colorsys"] >= 0
+
+
+def test_entrypoint_does_not_import_heavy_sdks():
+    """app.mainのimportで重いSDKが読み込まれないこと."""
+    code = (
+        "import sys, app.main; "
+        "heavy = ['vertexai', 'langchain_core', 'perplexity', 'github', "
+        "'google.cloud.firestore', 'google.cloud.logging']; "
+        "print(','.join(m for m in heavy if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.strip() == ""
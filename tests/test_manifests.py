@@ -0,0 +1,224 @@
+"""Tests for app/services/manifests.py."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services import manifests
+from app.services.manifests import parse_manifest, repo_dependencies
+from app.services.repo_record import FileRecord
+
+PACKAGE_JSON = """{
+  "name": "web-app",
+  "dependencies": {"React": "^18.2.0", "@tanstack/react-query": "^5.0.0"},
+  "devDependencies": {"vite": "^5.0.0", "react": "^18.2.0"}
+}"""
+
+PYPROJECT = """[project]
+name = "api"
+dependencies = ["FastAPI>=0.100", "pydantic_settings[dotenv]; python_version>'3.10'"]
+
+[project.optional-dependencies]
+dev = ["pytest"]
+
+[dependency-groups]
+lint = ["Ruff==0.5"]
+
+[tool.poetry.dependencies]
+python = "^3.11"
+SQLAlchemy = "^2.0"
+
+[tool.poetry.group.test.dependencies]
+pytest-cov = "*"
+"""
+
+CARGO = """[package]
+name = "cli"
+
+[dependencies]
+serde = { version = "1", features = ["derive"] }
+tokio = "1"
+rustls-crate = { package = "rustls", version = "0.23" }
+
+[target.'cfg(unix)'.dependencies]
+nix = "0.29"
+"""
+
+GO_MOD = """module example.com/app
+
+go 1.22
+
+require github.com/spf13/cobra v1.8.0
+
+require (
+\tgithub.com/gin-gonic/gin v1.9.1
+\tgolang.org/x/sys v0.20.0 // indirect
+)
+"""
+
+POM = """<project>
+  <parent><groupId>org.springframework.boot</groupId>
+  <artifactId>spring-boot-starter-parent</artifactId></parent>
+  <dependencies>
+    <dependency>
+      <groupId>org.springframework.boot</groupId>
+      <artifactId>spring-boot-starter-web</artifactId>
+    </dependency>
+    <dependency>
+      <groupId>org.projectlombok</groupId>
+      <artifactId>lombok</artifactId>
+"""
+
+GRADLE = """dependencies {
+    implementation 'com.squareup.retrofit2:retrofit:2.9.0'
+    testImplementation("junit:junit:4.13.2")
+    compileOnly group: 'org.projectlombok', name: 'lombok', version: '1.18.30'
+}
+"""
+
+
+def parsed(path: str, content: str) -> tuple[str, ...] | None:
+    manifest = parse_manifest(path, content)
+    return None if manifest is None else manifest.dependencies
+
+
+class TestParsers:
+    """形式ごとの解析のテスト."""
+
+    def test_package_json(self):
+        """全セクションを小文字にして重複を除く."""
+        assert parsed("package.json", PACKAGE_JSON) == (
+            "react",
+            "@tanstack/react-query",
+            "vite",
+        )
+
+    def test_truncated_package_json(self):
+        """JSONとして読めなくても依存セクションの読める範囲を取り出す."""
+        truncated = PACKAGE_JSON[: PACKAGE_JSON.index('"vite"') + 10]
+
+        assert parsed("package.json", truncated) == (
+            "react",
+            "@tanstack/react-query",
+            "vite",
+        )
+
+    def test_requirements_txt(self):
+        content = (
+            "# comment\n-r base.txt\nDjango==5.0  # web\nrequests[socks]>=2\n"
+            "git+https://github.com/org/lib.git#egg=Internal_Lib\n"
+            "zope.interface ; python_version<'4'\n"
+        )
+
+        assert parsed("requirements.txt", content) == (
+            "django",
+            "requests",
+            "internal-lib",
+            "zope-interface",
+        )
+
+    def test_pyproject_toml(self):
+        """PEP 621・PEP 735・Poetry の依存をPEP 503で正規化する."""
+        assert parsed("backend/pyproject.toml", PYPROJECT) == (
+            "fastapi",
+            "pydantic-settings",
+            "pytest",
+            "ruff",
+            "sqlalchemy",
+            "pytest-cov",
+        )
+
+    def test_truncated_pyproject_toml(self):
+        """途中で切れたテーブルを落として残りを読む."""
+        truncated = PYPROJECT[: PYPROJECT.index("SQLAlchemy") + 5]
+
+        assert parsed("pyproject.toml", truncated) == (
+            "fastapi",
+            "pydantic-settings",
+            "pytest",
+            "ruff",
+        )
+
+    def test_cargo_toml(self):
+        assert parsed("Cargo.toml", CARGO) == ("serde", "tokio", "rustls", "nix")
+
+    def test_go_mod(self):
+        """直接依存のみ（// indirect は除く）."""
+        assert parsed("go.mod", GO_MOD) == (
+            "github.com/spf13/cobra",
+            "github.com/gin-gonic/gin",
+        )
+
+    def test_gemfile(self):
+        content = "source 'https://rubygems.org'\ngem 'rails', '~> 7.1'\ngem \"pg\"\n"
+
+        assert parsed("Gemfile", content) == ("rails", "pg")
+
+    def test_pom_xml(self):
+        """親POMは除き、切れた <dependency> は含めない."""
+        assert parsed("pom.xml", POM) == (
+            "org.springframework.boot:spring-boot-starter-web",
+        )
+
+    def test_build_gradle(self):
+        assert parsed("build.gradle", GRADLE) == (
+            "com.squareup.retrofit2:retrofit",
+            "junit:junit",
+            "org.projectlombok:lombok",
+        )
+
+    def test_composer_json(self):
+        """PHP本体・拡張は除く."""
+        content = (
+            '{"require": {"php": ">=8.1", "ext-json": "*", "Laravel/Framework": "^11"}}'
+        )
+
+        assert parsed("composer.json", content) == ("laravel/framework",)
+
+    def test_unknown_or_empty(self):
+        assert parsed("setup.py", "install_requires=['x']") is None
+        assert parsed("package.json", '{"name": "empty"}') is None
+
+
+class TestRepoDependencies:
+    """repo_dependencies のテスト."""
+
+    def test_merges_by_ecosystem(self):
+        files = [
+            FileRecord("requirements.txt", "fastapi\nuvicorn\n"),
+            FileRecord(
+                "pyproject.toml", '[project]\ndependencies = ["FastAPI", "httpx"]'
+            ),
+            FileRecord("package.json", PACKAGE_JSON),
+        ]
+
+        assert repo_dependencies(files) == {
+            "pypi": ["fastapi", "uvicorn", "httpx"],
+            "npm": ["react", "@tanstack/react-query", "vite"],
+        }
+
+    def test_caches_by_sha(self):
+        """同じファイル名・SHAの内容は再解析しない."""
+        files = [FileRecord("go.mod", GO_MOD, sha="abc")]
+        manifests._cache.clear()
+
+        with (
+            patch.object(
+                manifests, "parse_go_mod", wraps=manifests.parse_go_mod
+            ) as parser,
+            patch.dict(manifests.PARSERS, {"go.mod": ("go", parser)}),
+        ):
+            first = repo_dependencies(files)
+            second = repo_dependencies(files)
+
+        assert first == second
+        assert parser.call_count == 1
+
+    @pytest.mark.parametrize("size", [1, 2])
+    def test_cache_is_bounded(self, size):
+        manifests._cache.clear()
+        with patch("app.services.manifests.MANIFEST_CACHE_SIZE", size):
+            for n in range(5):
+                parse_manifest("go.mod", GO_MOD, sha=f"sha-{n}")
+
+        assert len(manifests._cache) == size
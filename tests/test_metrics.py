@@ -0,0 +1,167 @@
+"""Tests for app/services/metrics.py."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.github_scheduler import _operation, _send_observed
+from app.services.metrics import (
+    Histogram,
+    dependency_summary,
+    observe_call,
+    registry,
+    render_prometheus,
+)
+from app.services.tracing import set_exporters, traced
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """テストごとにレジストリを空にする."""
+    registry.clear()
+    yield
+    registry.clear()
+
+
+class TestHistogram:
+    """Histogramクラスのテスト."""
+
+    def test_quantiles_within_relative_error(self):
+        """分位点は相対誤差2%以内."""
+        histogram = Histogram()
+        for value in range(1, 10_001):
+            histogram.observe(float(value))
+
+        assert histogram.count == 10_000
+        assert histogram.quantile(0.5) == pytest.approx(5000, rel=0.02)
+        assert histogram.quantile(0.99) == pytest.approx(9900, rel=0.02)
+
+    def test_small_values_are_exact(self):
+        """128µs未満は丸めなしで記録される."""
+        histogram = Histogram()
+        histogram.observe(0.05)
+
+        assert histogram.quantile(0.5) == pytest.approx(0.05)
+
+    def test_empty_histogram(self):
+        """記録がなければ0を返す."""
+        assert Histogram().quantile(0.99) == 0.0
+
+
+class TestDependencyMetrics:
+    """依存先別メトリクスのテスト."""
+
+    def test_observe_call_counts_errors(self):
+        """例外は outcome=error として記録して再送出する."""
+        with observe_call("github", "get_file_content"):
+            pass
+        with pytest.raises(RuntimeError), observe_call("github", "get_file_content"):
+            raise RuntimeError("rate limited")
+
+        (series,) = dependency_summary()
+        assert series["dependency"] == "github"
+        assert series["count"] == 2
+        assert series["errors"] == 1
+
+    def test_traced_dependency_records_without_exporters(self):
+        """トレーシング無効でも dependency 指定の呼び出しは記録される."""
+        set_exporters([])
+
+        @traced(dependency="firestore")
+        def read() -> str:
+            return "doc"
+
+        try:
+            assert read() == "doc"
+        finally:
+            set_exporters(None)
+
+        (series,) = dependency_summary()
+        assert series["operation"] == "test_metrics.read"
+
+    def test_prometheus_format(self):
+        """Prometheusテキスト形式でカウンタと分位点を出力する."""
+        with observe_call("vertex", "profile.llm_generate"):
+            pass
+        registry.gauge("active_sessions").set(3)
+
+        text = render_prometheus()
+
+        assert "# TYPE dependency_calls_total counter" in text
+        assert (
+            'dependency_calls_total{dependency="vertex",'
+            'operation="profile.llm_generate",outcome="ok"} 1.0'
+        ) in text
+        assert 'quantile="0.99"' in text
+        assert "active_sessions 3" in text
+
+    def test_logs_each_call_when_enabled(self):
+        """METRICS_LOG_CALLS 有効時は呼び出し1回ごとにレイテンシを出力する."""
+        with (
+            patch("app.services.metrics.METRICS_LOG_CALLS", True),
+            patch("app.services.metrics.log_structured") as mock_log,
+        ):
+            with observe_call("firestore", "sessions.get"):
+                pass
+            with observe_call("firestore", "sessions.get") as call:
+                call.outcome = "error"
+
+        assert [c.args[1] for c in mock_log.call_args_list] == ["Dependency call"] * 2
+        first, second = (c.kwargs for c in mock_log.call_args_list)
+        assert first["outcome"] == "ok"
+        assert second["outcome"] == "error"
+        assert first["latency_ms"] >= 0
+
+
+class TestClientCallTiming:
+    """クライアント呼び出し単位の計測のテスト."""
+
+    def test_swallowed_firestore_error_is_recorded(self):
+        """例外を握りつぶすヘルパーでも、失敗したクライアント呼び出しは error になる."""
+        from app.services.session import get_firestore_session
+
+        db = MagicMock()
+        db.collection.return_value.document.return_value.get.side_effect = RuntimeError(
+            "unavailable"
+        )
+        with patch("app.services.session.get_firestore_client", return_value=db):
+            assert get_firestore_session("sid") is None
+
+        (series,) = dependency_summary()
+        assert (series["operation"], series["errors"]) == ("sessions.get", 1)
+
+    def test_each_delete_is_timed(self):
+        """複数回呼ぶヘルパーは全体ではなく呼び出しごとに記録する."""
+        from app.services.session import delete_user_sessions
+
+        db = MagicMock()
+        docs = [MagicMock(), MagicMock(), MagicMock()]
+        db.collection.return_value.where.return_value.stream.return_value = docs
+        with patch("app.services.session.get_firestore_client", return_value=db):
+            assert delete_user_sessions(1) == 3
+
+        counts = {s["operation"]: s["count"] for s in dependency_summary()}
+        assert counts == {"sessions.query": 1, "sessions.delete": 3}
+
+    @pytest.mark.parametrize(
+        ("path", "expected"),
+        [
+            ("/repos/octocat/app/contents/src/main.py?ref=main", "GET repos.contents"),
+            ("/repos/octocat/app", "GET repos"),
+            ("/users/octocat/repos?per_page=100", "GET users.repos"),
+        ],
+    )
+    def test_github_operation_omits_names(self, path, expected):
+        request = SimpleNamespace(method="GET", path_url=path)
+
+        assert _operation(request) == expected
+
+    def test_github_server_error_is_recorded(self):
+        """GitHubの5xxレスポンスは例外がなくても error として記録する."""
+        response = SimpleNamespace(status_code=502)
+
+        assert _send_observed(lambda: response, "GET repos") is response
+
+        (series,) = dependency_summary()
+        assert series["errors"] == 1
@@ -0,0 +1,114 @@
+"""Tests for app/services/path_index.py."""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services.github import get_config_files, get_main_files
+from app.services.path_index import PathIndex
+
+# get_repo_structure と同じ幅優先の順
+STRUCTURE = [
+    "README.md",
+    "package.json",
+    ".github",
+    "packages",
+    "src",
+    ".github/workflows",
+    "packages/api",
+    "packages/web",
+    "src/main.py",
+    ".github/workflows/ci.yml",
+    "packages/api/package.json",
+    "packages/api/src",
+    "packages/web/package.json",
+    "packages/api/src/index.ts",
+]
+
+
+@pytest.fixture
+def index() -> PathIndex:
+    return PathIndex(STRUCTURE)
+
+
+class TestPathIndex:
+    """PathIndexクラスのテスト."""
+
+    def test_membership(self, index):
+        """一覧にあるパスのみ含む（中間ディレクトリは一覧にあるもののみ）."""
+        assert "src/main.py" in index
+        assert "packages/api" in index
+        assert "main.py" not in index
+        assert len(index) == len(STRUCTURE)
+
+    def test_prefix_queries(self, index):
+        """ディレクトリ配下の有無と最初に現れるパス."""
+        assert index.has_dir("src")
+        assert not index.has_dir("src/main.py")
+        assert not index.has_dir("lib")
+        assert index.first_under(".github/workflows") == ".github/workflows"
+        assert index.first_under("packages/api/src") == "packages/api/src"
+        assert index.first_under("terraform") is None
+
+    def test_list_dir(self, index):
+        """直下のパスを一覧の順で返す."""
+        assert index.list_dir() == [
+            "README.md",
+            "package.json",
+            ".github",
+            "packages",
+            "src",
+        ]
+        assert index.list_dir("packages") == ["packages/api", "packages/web"]
+
+    def test_find_name_with_depth(self, index):
+        """モノレポの深さまでファイル名で探す."""
+        assert index.find_name("package.json") == [
+            "package.json",
+            "packages/api/package.json",
+            "packages/web/package.json",
+        ]
+        assert index.find_name("package.json", max_depth=0) == ["package.json"]
+
+    @pytest.mark.parametrize(
+        ("pattern", "expected"),
+        [
+            (
+                "packages/*/package.json",
+                ["packages/api/package.json", "packages/web/package.json"],
+            ),
+            ("**/*.ts", ["packages/api/src/index.ts"]),
+            ("**/package.json", STRUCTURE[1:2] + STRUCTURE[10:11] + STRUCTURE[12:13]),
+            (".github/workflows/*.y?l", [".github/workflows/ci.yml"]),
+            ("src/*.rs", []),
+        ],
+    )
+    def test_glob(self, index, pattern, expected):
+        """グロブに一致するパスを一覧の順で返す."""
+        assert index.glob(pattern) == expected
+
+    def test_missing_intermediate_directories(self):
+        """親ディレクトリが一覧にない場合も索引を作れる."""
+        index = PathIndex(["a/b/c.txt", "a/d.txt"])
+
+        assert "a/b/c.txt" in index
+        assert "a" not in index
+        assert index.has_dir("a/b")
+        assert index.first_under("a") == "a/b/c.txt"
+        assert index.list_dir("a") == ["a/d.txt"]
+
+
+class TestDiscoveryWithIndex:
+    """github.py のファイル探索が索引で同じ結果を返すかのテスト."""
+
+    def test_config_files_match_list_scan(self, index):
+        """リストでも索引でも同じ設定ファイルを返す."""
+        assert get_config_files(index) == get_config_files(STRUCTURE)
+        assert get_config_files(index) == [".github/workflows"]
+
+    def test_main_files_search_subdirectories(self, index):
+        """src/ 配下のファイルも探す."""
+        with patch("app.services.github.get_file_text", return_value="print()"):
+            files = get_main_files(None, index)
+
+        assert [f.path for f in files] == ["src/main.py"]
@@ -1,8 +1,9 @@
 """Tests for app/services/profile.py."""
 
+import json
 from unittest.mock import MagicMock, patch
 
-from langchain_core.output_parsers import PydanticOutputParser
+import pytest
 
 from app.services.models import (
     DeveloperProfile,
@@ -12,7 +13,12 @@ from app.services.models import (
     SkillAssessment,
     TechStack,
 )
-from app.services.profile import generate_profile
+from app.services.profile import (
+    ProfileParseError,
+    generate_profile,
+    parse_profile,
+    profile_response_schema,
+)
 
 
 class TestPydanticModels:
@@ -60,81 +66,61 @@ class TestPydanticModels:
         assert sample_profile.summary is not None
 
 
-class TestPydanticOutputParser:
-    """Tests for PydanticOutputParser with DeveloperProfile."""
+class TestParseProfile:
+    """parse_profile関数のテスト."""
 
-    def test_parser_format_instructions(self):
-        """Test that parser generates format instructions."""
-        parser = PydanticOutputParser(pydantic_object=DeveloperProfile)
-        instructions = parser.get_format_instructions()
+    def test_parses_valid_json(self, sample_profile: DeveloperProfile):
+        result = parse_profile(sample_profile.model_dump_json())
 
-        assert "tech_stack" in instructions
-        assert "expertise_areas" in instructions
-        assert "summary" in instructions
+        assert result == sample_profile
 
-    def test_parser_parse_valid_json(self):
-        """Test parsing valid JSON response."""
-        parser = PydanticOutputParser(pydantic_object=DeveloperProfile)
+    def test_repairs_markdown_and_surrounding_text(
+        self, sample_profile: DeveloperProfile
+    ):
+        """コードブロック・前後の説明文を除いて読む."""
+        text = f"プロファイルです。\n```json\n{sample_profile.model_dump_json()}\n```"
 
-        valid_json = """{
-            "tech_stack": {
-                "languages": ["Python"],
-                "frameworks": ["FastAPI"],
-                "infrastructure": ["Docker"]
-            },
-            "expertise_areas": ["バックエンド"],
-            "skill_assessment": {
-                "code_quality": "高い",
-                "design_ability": "良い",
-                "completion_rate": "高い"
-            },
-            "notable_projects": [
-                {"name": "project1", "highlight": "特筆点"}
-            ],
-            "interests": ["AI"],
-            "job_fit": {
-                "ideal_roles": ["エンジニア"],
-                "company_types": ["スタートアップ"],
-                "keywords": ["Python"]
-            },
-            "summary": "優秀なエンジニア"
-        }"""
+        assert parse_profile(text) == sample_profile
+
+    def test_repairs_trailing_commas(self, sample_profile: DeveloperProfile):
+        text = sample_profile.model_dump_json(indent=2).replace("\n}", ",\n}")
+
+        assert parse_profile(text) == sample_profile
+
+    def test_repairs_truncated_output(self, sample_profile: DeveloperProfile):
+        """出力上限で切れたJSONの括弧・文字列を閉じて読む."""
+        text = sample_profile.model_dump_json()
+        truncated = text[: text.index('"summary"') + len('"summary":"バック')]
+
+        result = parse_profile(truncated)
+
+        assert result.summary == "バック"
+        assert result.tech_stack == sample_profile.tech_stack
 
-        result = parser.parse(valid_json)
-        assert isinstance(result, DeveloperProfile)
-        assert result.tech_stack.languages == ["Python"]
-
-    def test_parser_parse_json_with_markdown(self):
-        """Test parsing JSON wrapped in markdown code block."""
-        parser = PydanticOutputParser(pydantic_object=DeveloperProfile)
-
-        markdown_json = """```json
-{
-    "tech_stack": {
-        "languages": ["Go"],
-        "frameworks": [],
-        "infrastructure": []
-    },
-    "expertise_areas": [],
-    "skill_assessment": {
-        "code_quality": "良い",
-        "design_ability": "良い",
-        "completion_rate": "良い"
-    },
-    "notable_projects": [],
-    "interests": [],
-    "job_fit": {
-        "ideal_roles": [],
-        "company_types": [],
-        "keywords": []
-    },
-    "summary": "テスト"
-}
-```"""
-
-        result = parser.parse(markdown_json)
-        assert isinstance(result, DeveloperProfile)
-        assert result.tech_stack.languages == ["Go"]
+    @pytest.mark.parametrize("text", ["", "生成できませんでした", '{"summary": "x"}'])
+    def test_raises_when_unrecoverable(self, text: str):
+        with pytest.raises(ProfileParseError):
+            parse_profile(text)
+
+
+class TestProfileResponseSchema:
+    """profile_response_schema関数のテスト."""
+
+    def test_inlines_references(self):
+        """Vertex AIの response_schema は $ref を解決できないため展開する."""
+        schema = profile_response_schema()
+
+        assert "$ref" not in json.dumps(schema)
+        assert "$defs" not in schema
+        assert "title" not in schema
+        tech_stack = schema["properties"]["tech_stack"]
+        assert tech_stack["type"] == "object"
+        assert tech_stack["properties"]["languages"] == {
+            "description": "プログラミング言語リスト",
+            "items": {"type": "string"},
+            "type": "array",
+        }
+        assert set(schema["required"]) == set(DeveloperProfile.model_fields)
 
 
 class TestGenerateProfile:
@@ -175,7 +161,7 @@ class TestGenerateProfile:
         }"""
 
         mock_model = MagicMock()
-        mock_model.generate_content.return_value = mock_response
+        mock_model.generate_content.return_value = [mock_response]
         mock_model_class.return_value = mock_model
 
         result = generate_profile(sample_repos)
@@ -184,6 +170,38 @@ class TestGenerateProfile:
         assert "tech_stack" in result
         assert "TypeScript" in result["tech_stack"]["languages"]
         mock_init.assert_called_once()
+        kwargs = mock_model.generate_content.call_args.kwargs
+        assert kwargs["generation_config"].to_dict()["response_mime_type"] == (
+            "application/json"
+        )
+        assert kwargs["stream"] is True
+
+    @patch("app.services.profile.GenerativeModel")
+    @patch("app.services.profile.init_vertex_ai")
+    def test_stream_is_closed_after_deadline(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        sample_repos: list[RepoInfo],
+        sample_profile: DeveloperProfile,
+    ):
+        """期限を過ぎたら残りを読まずにストリームを閉じる（RPCの取り消し）."""
+        text = sample_profile.model_dump_json()
+        read = []
+
+        def chunks():
+            for start in range(0, len(text), 50):
+                read.append(start)
+                yield MagicMock(text=text[start : start + 50])
+
+        stream = chunks()
+        mock_model_class.return_value.generate_content.return_value = stream
+
+        with pytest.raises(TimeoutError):
+            generate_profile(sample_repos, deadline=0)
+
+        assert len(read) == 1
+        assert stream.gi_frame is None
 
     @patch("app.services.profile.GenerativeModel")
     @patch("app.services.profile.init_vertex_ai")
@@ -217,10 +235,35 @@ class TestGenerateProfile:
         }"""
 
         mock_model = MagicMock()
-        mock_model.generate_content.return_value = mock_response
+        mock_model.generate_content.return_value = [mock_response]
         mock_model_class.return_value = mock_model
 
         result = generate_profile([])
 
         assert isinstance(result, dict)
         assert result["tech_stack"]["languages"] == []
+
+    @patch("app.services.profile.GenerativeModel")
+    @patch("app.services.profile.init_vertex_ai")
+    def test_generate_profile_excludes_forks_and_archived(
+        self,
+        mock_init: MagicMock,
+        mock_model_class: MagicMock,
+        sample_repos: list[RepoInfo],
+    ):
+        """フォーク・アーカイブのリポジトリはプロンプトに含めない."""
+        archived = sample_repos[0].model_copy(
+            update={"name": "old-app", "is_archived": True}
+        )
+        forked = sample_repos[1].model_copy(update={"name": "forked", "is_fork": True})
+        mock_model = MagicMock()
+        mock_model.generate_content.side_effect = RuntimeError("stop")
+        mock_model_class.return_value = mock_model
+
+        with pytest.raises(RuntimeError):
+            generate_profile([*sample_repos, archived, forked])
+
+        prompt = mock_model.generate_content.call_args.args[0]
+        assert all(repo.name in prompt for repo in sample_repos)
+        assert "old-app" not in prompt
+        assert "forked" not in prompt
@@ -0,0 +1,137 @@
+"""Tests for app/services/quick_profile.py and the degraded profile path."""
+
+import threading
+from unittest.mock import patch
+
+from app.services.models import DeveloperProfile, RepoInfo
+from app.services.profile import generate_profile_or_quick
+from app.services.quick_profile import merge_profiles, quick_profile
+
+
+class TestQuickProfile:
+    """quick_profile関数のテスト."""
+
+    def test_builds_valid_profile_from_statistics(self, sample_repos: list[RepoInfo]):
+        """言語・依存・トピック・設定ファイルから技術スタックと得意領域を推定する."""
+        profile = quick_profile(sample_repos)
+
+        DeveloperProfile.model_validate(profile)
+        tech = profile["tech_stack"]
+        assert tech["languages"] == ["Python", "TypeScript", "CSS"]
+        assert tech["frameworks"] == ["Next.js", "React", "FastAPI"]
+        assert tech["infrastructure"] == ["Docker"]
+        assert profile["expertise_areas"][:2] == ["バックエンド", "フロントエンド"]
+        assert profile["job_fit"]["ideal_roles"][0] == "フルスタックエンジニア"
+        assert [p["name"] for p in profile["notable_projects"]] == [
+            "web-app",
+            "api-server",
+        ]
+
+    def test_is_deterministic(self, sample_repos: list[RepoInfo]):
+        assert quick_profile(sample_repos) == quick_profile(list(sample_repos))
+
+    def test_excludes_forks_and_archived(self, sample_repos: list[RepoInfo]):
+        """generate_profile と同じくフォーク・アーカイブは使わない."""
+        fork = sample_repos[0].model_copy(
+            update={"name": "go-fork", "is_fork": True, "languages": {"Go": 10**6}}
+        )
+        archived = sample_repos[0].model_copy(
+            update={"name": "old", "is_archived": True, "languages": {"Ruby": 10**6}}
+        )
+
+        profile = quick_profile([*sample_repos, fork, archived])
+
+        assert profile == quick_profile(sample_repos)
+
+    def test_empty_repos(self):
+        profile = quick_profile([])
+
+        DeveloperProfile.model_validate(profile)
+        assert profile["tech_stack"]["languages"] == []
+        assert profile["expertise_areas"] == []
+
+
+class TestMergeProfiles:
+    """merge_profiles関数のテスト."""
+
+    def test_generated_wins_and_tech_stack_is_supplemented(self):
+        quick = {
+            "tech_stack": {
+                "languages": ["Python", "Go"],
+                "frameworks": ["FastAPI"],
+                "infrastructure": ["Docker"],
+            },
+            "summary": "quick",
+        }
+        generated = {
+            "tech_stack": {
+                "languages": ["python"],
+                "frameworks": [],
+                "infrastructure": ["GCP"],
+            },
+            "summary": "llm",
+        }
+
+        merged = merge_profiles(quick, generated)
+
+        assert merged["summary"] == "llm"
+        assert merged["tech_stack"] == {
+            "languages": ["python", "Go"],
+            "frameworks": ["FastAPI"],
+            "infrastructure": ["GCP", "Docker"],
+        }
+
+
+class TestGenerateProfileOrQuick:
+    """generate_profile_or_quick関数のテスト."""
+
+    def test_merges_generated_profile(self, sample_repos, sample_profile):
+        with patch(
+            "app.services.profile.generate_profile",
+            return_value=sample_profile.model_dump(),
+        ):
+            profile, degraded = generate_profile_or_quick(sample_repos)
+
+        assert not degraded
+        assert profile["summary"] == sample_profile.summary
+        assert "FastAPI" in profile["tech_stack"]["frameworks"]
+
+    def test_falls_back_when_vertex_fails(self, sample_repos):
+        """Vertex AIのエラーでは簡易プロファイルで縮退する."""
+        with patch(
+            "app.services.profile.generate_profile",
+            side_effect=RuntimeError("vertex unavailable"),
+        ):
+            profile, degraded = generate_profile_or_quick(sample_repos)
+
+        assert degraded
+        assert profile == quick_profile(sample_repos)
+
+    def test_falls_back_on_timeout(self, sample_repos):
+        """応答が timeout を超えたら待たずに簡易プロファイルを返す."""
+        release = threading.Event()
+
+        def slow(repos, plan, deadline):
+            release.wait(5)
+            return {}
+
+        with patch("app.services.profile.generate_profile", side_effect=slow):
+            profile, degraded = generate_profile_or_quick(sample_repos, timeout=0.05)
+            release.set()
+
+        assert degraded
+        assert profile["tech_stack"]["languages"]
+
+    def test_falls_back_without_queueing_when_workers_are_busy(self, sample_repos):
+        """ワーカーが埋まっていれば待ち行列に積まず、すぐに簡易プロファイルを返す."""
+        busy = threading.BoundedSemaphore(1)
+        busy.acquire()
+        with (
+            patch("app.services.profile._in_flight", busy),
+            patch("app.services.profile.generate_profile") as generate,
+        ):
+            profile, degraded = generate_profile_or_quick(sample_repos)
+
+        assert degraded
+        assert profile == quick_profile(sample_repos)
+        generate.assert_not_called()
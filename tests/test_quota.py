@@ -0,0 +1,299 @@
+"""Tests for app/services/quota.py - credit ledger."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.metrics import registry
+from app.services.quota import (
+    commit_credit,
+    consume_credit,
+    release_credit,
+    reserve_credit,
+)
+
+
+@pytest.fixture
+def mock_db():
+    """Firestoreクライアントのモック."""
+    db = MagicMock()
+    with patch("app.services.quota.get_firestore_client", return_value=db):
+        yield db
+
+
+@pytest.fixture(autouse=True)
+def mock_session_state():
+    """session_stateのモック."""
+    with patch("app.services.quota.st") as mock_st:
+        mock_st.session_state = {}
+        yield mock_st.session_state
+
+
+class TestReserveCredit:
+    """reserve_credit関数のテスト."""
+
+    def test_reserves_when_balance_remains(self, mock_db, mock_session_state):
+        """減算後の残高が0以上なら予約IDを返す."""
+        with patch("app.services.quota._read_balance", return_value=2):
+            reservation_id = reserve_credit(1)
+
+        assert reservation_id is not None
+        mock_db.batch.return_value.commit.assert_called_once()
+        assert mock_session_state["_cache_quota_status"].credits == 2
+
+    def test_rejects_and_refunds_when_overdrawn(self, mock_db, mock_session_state):
+        """減算後の残高がマイナスなら払い戻してNoneを返す."""
+        with patch("app.services.quota._read_balance", return_value=-1):
+            reservation_id = reserve_credit(1)
+
+        assert reservation_id is None
+        # 予約バッチ + 払い戻しバッチ
+        assert mock_db.batch.return_value.commit.call_count == 2
+        assert mock_session_state["_cache_quota_status"].can_use is False
+
+    def test_returns_none_on_error(self, mock_db):
+        """Firestoreエラー時はNoneを返す."""
+        mock_db.batch.return_value.commit.side_effect = Exception("unavailable")
+
+        assert reserve_credit(1) is None
+
+
+class TestFinishReservation:
+    """commit_credit / release_credit関数のテスト."""
+
+    def test_commit_requires_existing_reservation(self, mock_db):
+        """確定は予約ドキュメントの存在を前提条件に削除する."""
+        assert commit_credit(1, "res-1") is True
+
+        batch = mock_db.batch.return_value
+        _, kwargs = batch.delete.call_args
+        assert kwargs["option"] == mock_db.write_option.return_value
+        mock_db.write_option.assert_called_with(exists=True)
+
+    def test_double_release_is_rejected(self, mock_db):
+        """前提条件違反（二重解放）はFalseを返す."""
+        mock_db.batch.return_value.commit.side_effect = Exception("not found")
+
+        assert release_credit(1, "res-1") is False
+
+    def test_consume_credit_reserves_then_commits(self):
+        """consume_creditは予約して即確定する."""
+        with (
+            patch("app.services.quota.reserve_credit", return_value="res-1"),
+            patch("app.services.quota.commit_credit", return_value=True) as commit,
+        ):
+            assert consume_credit(1) is True
+
+        commit.assert_called_once_with(1, "res-1")
+
+
+class TestOptimisticQuota:
+    """楽観的クォータ（即時減算 + 非同期照合）のテスト."""
+
+    @pytest.fixture
+    def synced_quota(self, mock_session_state):
+        """サーバー値と同期済みのクォータ（残り3）."""
+        import time
+
+        from app.services.models import QuotaStatus
+
+        mock_session_state["_cache_quota_status"] = QuotaStatus(credits=3, can_use=True)
+        mock_session_state["_cache_quota_synced_at"] = time.monotonic()
+        registry.clear()
+        yield mock_session_state
+        registry.clear()
+
+    @staticmethod
+    def _wait_pending(state):
+        for op in state.get("_cache_quota_pending", {}).values():
+            op.settle.result(timeout=5)
+
+    def test_decrements_locally_before_server_responds(self, synced_quota):
+        """予約はサーバー応答を待たずに表示値を減算する."""
+        import threading
+
+        from app.services.quota import reserve_credit_optimistic
+
+        gate = threading.Event()
+
+        def slow_reserve(_user_id):
+            gate.wait(timeout=5)
+            return "res-1", 2
+
+        with patch("app.services.quota._reserve", side_effect=slow_reserve):
+            local_id = reserve_credit_optimistic(1)
+            assert local_id is not None
+            assert synced_quota["_cache_quota_status"].credits == 2
+            gate.set()
+
+    def test_rolls_back_when_server_rejects(self, synced_quota):
+        """サーバーで予約が拒否された場合は照合時にロールバック."""
+        from app.services.quota import (
+            get_quota_status,
+            reserve_credit_optimistic,
+            settle_credit_optimistic,
+        )
+
+        with (
+            patch("app.services.quota._reserve", return_value=(None, 3)),
+            patch("app.services.quota._read_balance", return_value=3),
+        ):
+            local_id = reserve_credit_optimistic(1)
+            settle_credit_optimistic(1, local_id, success=True)
+            self._wait_pending(synced_quota)
+
+            quota = get_quota_status(1)
+
+        assert quota.credits == 3
+        assert synced_quota["_cache_quota_pending"] == {}
+        assert registry.counter("quota_rollbacks").value == 1
+
+    def test_release_restores_local_credit_immediately(self, synced_quota):
+        """失敗時の解放は表示値を即座に戻す."""
+        from app.services.quota import (
+            reserve_credit_optimistic,
+            settle_credit_optimistic,
+        )
+
+        with (
+            patch("app.services.quota._reserve", return_value=("res-1", 2)),
+            patch("app.services.quota._finish_reservation", return_value=True),
+            patch("app.services.quota._read_balance", return_value=3),
+        ):
+            local_id = reserve_credit_optimistic(1)
+            settle_credit_optimistic(1, local_id, success=False)
+            assert synced_quota["_cache_quota_status"].credits == 3
+            self._wait_pending(synced_quota)
+
+    def test_adopts_server_balance_and_reports_drift(self, synced_quota):
+        """照合完了時はサーバー残高に合わせ、差分をドリフトとして記録."""
+        from app.services.quota import (
+            get_quota_status,
+            reserve_credit_optimistic,
+            settle_credit_optimistic,
+        )
+
+        with (
+            patch("app.services.quota._reserve", return_value=("res-1", 1)),
+            patch("app.services.quota._finish_reservation", return_value=True),
+            # 別タブでの消費により、サーバー残高は表示値より1少ない
+            patch("app.services.quota._read_balance", return_value=1),
+            patch("app.services.quota.log_structured") as mock_log,
+        ):
+            local_id = reserve_credit_optimistic(1)
+            settle_credit_optimistic(1, local_id, success=True)
+            self._wait_pending(synced_quota)
+
+            quota = get_quota_status(1)
+
+        assert quota.credits == 1
+        _, kwargs = mock_log.call_args
+        assert kwargs["quota_drift"] == -1
+        drift = registry.histogram("quota_reconcile_drift")
+        assert drift.count == 1
+        assert drift.sum == 1
+        assert registry.counter("quota_rollbacks").value == 0
+
+    def test_records_zero_drift(self, synced_quota):
+        """サーバー残高と一致した照合もドリフト0として記録する."""
+        from app.services.quota import (
+            get_quota_status,
+            reserve_credit_optimistic,
+            settle_credit_optimistic,
+        )
+
+        with (
+            patch("app.services.quota._reserve", return_value=("res-1", 2)),
+            patch("app.services.quota._finish_reservation", return_value=True),
+            patch("app.services.quota._read_balance", return_value=2),
+        ):
+            local_id = reserve_credit_optimistic(1)
+            settle_credit_optimistic(1, local_id, success=True)
+            self._wait_pending(synced_quota)
+
+            quota = get_quota_status(1)
+
+        assert quota.credits == 2
+        drift = registry.histogram("quota_reconcile_drift")
+        assert drift.count == 1
+        assert drift.sum == 0
+
+    def test_no_reservation_when_local_quota_is_empty(self, mock_session_state):
+        """表示上の残高が0なら予約しない."""
+        import time
+
+        from app.services.models import QuotaStatus
+        from app.services.quota import reserve_credit_optimistic
+
+        mock_session_state["_cache_quota_status"] = QuotaStatus(
+            credits=0, can_use=False
+        )
+        mock_session_state["_cache_quota_synced_at"] = time.monotonic()
+
+        assert reserve_credit_optimistic(1) is None
+
+    def test_confirm_releases_rejected_reservation(self, synced_quota):
+        """サーバーで拒否された予約は確認時に解放し、結果を渡さない."""
+        from app.services.quota import (
+            confirm_credit_optimistic,
+            reserve_credit_optimistic,
+        )
+
+        with (
+            patch("app.services.quota._reserve", return_value=(None, 0)),
+            patch("app.services.quota._read_balance", return_value=0),
+        ):
+            local_id = reserve_credit_optimistic(1)
+            assert not confirm_credit_optimistic(1, local_id)
+            assert synced_quota["_cache_quota_status"].credits == 3
+            self._wait_pending(synced_quota)
+
+    def test_confirm_accepts_successful_reservation(self, synced_quota):
+        from app.services.quota import (
+            confirm_credit_optimistic,
+            reserve_credit_optimistic,
+        )
+
+        with patch("app.services.quota._reserve", return_value=("res-1", 2)):
+            local_id = reserve_credit_optimistic(1)
+            assert confirm_credit_optimistic(1, local_id)
+
+        assert synced_quota["_cache_quota_status"].credits == 2
+
+    def test_reconcile_does_not_wait_for_running_settlement(self, synced_quota):
+        """長い生成の後に投げた確定は、完了を待たずに次回のrerunで照合する."""
+        import threading
+        import time
+
+        from app.services.quota import (
+            get_quota_status,
+            reserve_credit_optimistic,
+            settle_credit_optimistic,
+        )
+
+        gate = threading.Event()
+
+        def slow_finish(*_args, **_kwargs):
+            gate.wait(timeout=5)
+            return True
+
+        with (
+            patch("app.services.quota._reserve", return_value=("res-1", 2)),
+            patch("app.services.quota._finish_reservation", side_effect=slow_finish),
+            patch("app.services.quota._read_balance", return_value=2),
+        ):
+            local_id = reserve_credit_optimistic(1)
+            op = synced_quota["_cache_quota_pending"][local_id]
+            # 予約から90秒かかった生成
+            op.started_at -= 90
+            settle_credit_optimistic(1, local_id, success=True)
+
+            started = time.monotonic()
+            quota = get_quota_status(1)
+            elapsed = time.monotonic() - started
+
+            assert elapsed < 1
+            assert quota.credits == 2
+            assert local_id in synced_quota["_cache_quota_pending"]
+            gate.set()
+            self._wait_pending(synced_quota)
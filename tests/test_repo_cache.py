@@ -0,0 +1,172 @@
+"""Tests for the repos cache in app/services/cache.py."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.blob_store import (
+    BlobStore,
+    LocalBlobBackend,
+    LruBlobCache,
+    git_blob_sha,
+)
+from app.services.cache import get_cached_repos, save_repos_cache
+from app.services.models import RepoInfo
+from app.services.repo_record import RepoRecord, pack_repos
+
+
+@pytest.fixture
+def records(sample_repos: list[RepoInfo]) -> list[RepoRecord]:
+    """サンプルのRepoRecordリスト."""
+    return [RepoRecord.from_model(info) for info in sample_repos]
+
+
+class FakeFirestore:
+    """reposドキュメントとチャンクのみを扱う最小限のFirestore代替."""
+
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.client = MagicMock()
+        self.client.collection.side_effect = lambda name: self._collection(name)
+        self.client.batch.side_effect = self._batch
+        self.client.get_all.side_effect = lambda refs: [self._snapshot(r) for r in refs]
+
+    def _ref(self, path: str) -> MagicMock:
+        ref = MagicMock()
+        ref.id = path.rsplit("/", 1)[-1]
+        ref.path = path
+        ref.get.side_effect = lambda: self._snapshot(ref)
+        ref.collection.side_effect = lambda name: self._collection(f"{path}/{name}")
+        return ref
+
+    def _collection(self, path: str) -> MagicMock:
+        collection = MagicMock()
+        collection.document.side_effect = lambda doc_id: self._ref(f"{path}/{doc_id}")
+        collection.list_documents.side_effect = lambda: [
+            self._ref(p)
+            for p in self.docs
+            if p.startswith(path + "/") and "/" not in p[len(path) + 1 :]
+        ]
+        return collection
+
+    def _snapshot(self, ref: MagicMock) -> MagicMock:
+        snapshot = MagicMock()
+        snapshot.id = ref.id
+        snapshot.exists = ref.path in self.docs
+        snapshot.to_dict.return_value = self.docs.get(ref.path)
+        return snapshot
+
+    def _batch(self) -> MagicMock:
+        ops: list = []
+        batch = MagicMock()
+        batch.set.side_effect = lambda ref, data: ops.append((ref.path, data))
+        batch.delete.side_effect = lambda ref: ops.append((ref.path, None))
+
+        def commit():
+            for path, data in ops:
+                if data is None:
+                    self.docs.pop(path, None)
+                else:
+                    self.docs[path] = data
+
+        batch.commit.side_effect = commit
+        return batch
+
+    def chunk_paths(self) -> list[str]:
+        return sorted(p for p in self.docs if "/repo_chunks/" in p)
+
+
+@pytest.fixture
+def fake_db():
+    """インメモリのFirestore."""
+    db = FakeFirestore()
+    with patch("app.services.cache.get_firestore_client", return_value=db.client):
+        yield db
+
+
+class TestReposCache:
+    """save_repos_cache / get_cached_repos のテスト."""
+
+    def test_small_payload_is_stored_inline(self, fake_db, records):
+        """小さいキャッシュはチャンクを作らず1ドキュメントに保存する."""
+        save_repos_cache(1, records)
+
+        assert fake_db.chunk_paths() == []
+        assert get_cached_repos(1, repo_count=2) == records
+        fake_db.client.get_all.assert_not_called()
+
+    def test_large_payload_is_chunked(self, fake_db, records):
+        """上限を超えると repo_chunks に分割し、必要なチャンクだけ読む."""
+        with (
+            patch("app.services.cache.REPOS_INLINE_BYTES", 0),
+            patch("app.services.cache.REPOS_CHUNK_BYTES", 64),
+        ):
+            save_repos_cache(1, records)
+            assert len(fake_db.chunk_paths()) > 2
+
+            assert get_cached_repos(1, repo_count=2) == records
+            (subset,) = get_cached_repos(1, repo_count=2, repo_names=["api-server"])
+
+        assert subset == records[1]
+        all_chunks, subset_chunks = fake_db.client.get_all.call_args_list
+        assert len(subset_chunks.args[0]) < len(all_chunks.args[0])
+
+    def test_resave_removes_old_generation(self, fake_db, records):
+        """再保存時に旧世代のチャンクを削除する."""
+        with (
+            patch("app.services.cache.REPOS_INLINE_BYTES", 0),
+            patch("app.services.cache.REPOS_CHUNK_BYTES", 64),
+        ):
+            save_repos_cache(1, records)
+            first = fake_db.chunk_paths()
+            save_repos_cache(1, records[:1])
+
+        assert not set(first) & set(fake_db.chunk_paths())
+        assert get_cached_repos(1, repo_count=2) == records[:1]
+
+    def test_reads_legacy_format(self, fake_db, sample_repos):
+        """旧形式（dictのリスト）のキャッシュも読める."""
+        fake_db.docs["repos/1"] = {
+            "repos": [info.model_dump() for info in sample_repos],
+            "repo_count": 2,
+        }
+
+        cached = get_cached_repos(1, repo_count=2)
+
+        assert [r.to_model() for r in cached] == sample_repos
+
+
+class TestReposCacheBlobReferences:
+    """BlobStoreへの参照を使ったキャッシュのテスト."""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        """ローカルディスクのBlobStore."""
+        store = BlobStore(LocalBlobBackend(tmp_path), LruBlobCache(1024 * 1024))
+        with patch("app.services.cache.get_blob_store", return_value=store):
+            yield store
+
+    @pytest.fixture
+    def blob_records(self, store, records) -> list[RepoRecord]:
+        """依存ファイルの内容をBlobStoreに保存済みのRepoRecord."""
+        for record in records:
+            for file in record.dependency_files:
+                file.sha = git_blob_sha(file.content.encode("utf-8"))
+                store.put(file.sha, file.content.encode("utf-8"))
+        return records
+
+    def test_stores_references_and_resolves(self, fake_db, store, blob_records):
+        """保存済みの内容はSHAのみを保存し、読み込み時に解決する."""
+        save_repos_cache(1, blob_records)
+
+        _, payload = pack_repos(blob_records)
+        assert fake_db.docs["repos/1"]["stored_bytes"] < len(payload)
+        assert get_cached_repos(1, repo_count=2) == blob_records
+
+    def test_missing_blob_is_cache_miss(self, fake_db, store, blob_records, tmp_path):
+        """参照先のblobが消えていればキャッシュなしとして扱う."""
+        save_repos_cache(1, blob_records)
+        fresh = BlobStore(LocalBlobBackend(tmp_path / "empty"), LruBlobCache(1024))
+
+        with patch("app.services.cache.get_blob_store", return_value=fresh):
+            assert get_cached_repos(1, repo_count=2) is None
@@ -0,0 +1,92 @@
+"""Tests for app/services/repo_prefetch.py."""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.services import repo_prefetch
+from app.services.github_scheduler import GitHubBusyError, _current_priority
+from app.services.models import RepoMetadata
+
+
+def metadata(count: int) -> list[RepoMetadata]:
+    return [
+        RepoMetadata(
+            name=f"repo-{n}",
+            full_name=f"octocat/repo-{n}",
+            description=None,
+            language="Python",
+            stars=n,
+            is_fork=False,
+        )
+        for n in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def entries(monkeypatch):
+    """先読みのキャッシュを空にし、予算は十分にあるとみなす."""
+    monkeypatch.setattr(repo_prefetch, "_entries", type(repo_prefetch._entries)())
+    monkeypatch.setattr(repo_prefetch, "has_budget", lambda token: True)
+
+
+class TestRepoPrefetch:
+    """先読みのテスト."""
+
+    def test_prefetched_result_is_reused(self):
+        """先読みした一覧を選択UIの件数に切り出して返し、再取得しない."""
+        priorities = []
+
+        def fetch(username, limit, access_token):
+            priorities.append(_current_priority.get())
+            return metadata(limit)
+
+        with patch("app.services.repo_prefetch.get_repos_metadata", side_effect=fetch):
+            repo_prefetch.prefetch_repo_metadata("octocat", "token", limit=30)
+            repo_prefetch.prefetch_repo_metadata("octocat", "token", limit=30)
+            repos = repo_prefetch.load_repo_metadata("octocat", 10, "token")
+
+        assert [r.name for r in repos] == [f"repo-{n}" for n in range(10)]
+        assert priorities == [repo_prefetch.Priority.BACKGROUND]
+
+    def test_waits_for_in_flight_prefetch(self):
+        """取得中なら新たにリクエストせず完了を待つ."""
+        release = threading.Event()
+
+        def fetch(username, limit, access_token):
+            release.wait(5)
+            return metadata(limit)
+
+        with patch(
+            "app.services.repo_prefetch.get_repos_metadata", side_effect=fetch
+        ) as get:
+            repo_prefetch.prefetch_repo_metadata("octocat", None, limit=30)
+            assert repo_prefetch.get_prefetched_metadata("octocat", 10) is None
+            release.set()
+            repos = repo_prefetch.load_repo_metadata("octocat", 10, None)
+
+        assert len(repos) == 10
+        get.assert_called_once()
+
+    def test_failed_prefetch_falls_back_to_direct_fetch(self):
+        """先読みが失敗していれば通常どおり取得する."""
+        with patch(
+            "app.services.repo_prefetch.get_repos_metadata",
+            side_effect=[GitHubBusyError("busy"), metadata(10)],
+        ) as get:
+            repo_prefetch.prefetch_repo_metadata("octocat", None, limit=30)
+            repos = repo_prefetch.load_repo_metadata("octocat", 10, None)
+
+        assert len(repos) == 10
+        assert get.call_count == 2
+
+    def test_skipped_without_budget(self, monkeypatch):
+        """残り予算が予約分以下なら先読みしない."""
+        monkeypatch.setattr(repo_prefetch, "has_budget", lambda token: False)
+
+        with patch("app.services.repo_prefetch.get_repos_metadata") as get:
+            repo_prefetch.prefetch_repo_metadata("octocat", None)
+
+        get.assert_not_called()
+        assert repo_prefetch.get_prefetched_metadata("octocat", 10) is None
@@ -0,0 +1,53 @@
+"""Tests for app/services/repo_record.py."""
+
+from app.services.models import RepoInfo
+from app.services.repo_record import (
+    FileRecord,
+    RepoRecord,
+    decode_repo,
+    encode_repo,
+)
+
+
+class TestRepoRecordCodec:
+    """encode_repo / decode_repo のテスト."""
+
+    def test_cache_format_matches_model_dump(self, sample_repos: list[RepoInfo]):
+        """キャッシュ形式は RepoInfo.model_dump() と同一（既存キャッシュを読める）."""
+        for info in sample_repos:
+            record = decode_repo(info.model_dump())
+
+            assert encode_repo(record) == info.model_dump()
+            assert record.to_model() == info
+
+    def test_decode_reuses_lists(self, sample_repos: list[RepoInfo]):
+        """復元時にファイル一覧をコピーしない."""
+        data = sample_repos[0].model_dump()
+
+        record = decode_repo(data)
+
+        assert record.file_structure is data["file_structure"]
+        assert encode_repo(record)["file_structure"] is record.file_structure
+
+    def test_file_paths_are_interned(self):
+        """ファイルパスはインターンされ、同じパスは同一オブジェクトを共有する."""
+        first = FileRecord("".join(["src/", "main.py"]), "a")
+        second = FileRecord("".join(["src/", "main.py"]), "b")
+
+        assert first.path is second.path
+
+    def test_records_have_no_instance_dict(self):
+        """__slots__ によりインスタンスごとの __dict__ を持たない."""
+        record = RepoRecord(
+            name="repo",
+            description=None,
+            language=None,
+            languages={},
+            topics=[],
+            readme=None,
+            stars=0,
+            forks=0,
+            updated_at="",
+        )
+
+        assert not hasattr(record, "__dict__")
@@ -0,0 +1,272 @@
+"""Tests for app/services/repo_snapshot.py and the snapshot extraction mode."""
+
+import io
+import tarfile
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from github.GithubException import GithubException, UnknownObjectException
+
+from app.services import github
+from app.services.blob_store import (
+    BlobStore,
+    LocalBlobBackend,
+    LruBlobCache,
+    git_blob_sha,
+)
+from app.services.repo_snapshot import read_snapshot
+
+
+def make_tarball(files: dict[str, bytes], prefix: str = "app-main") -> bytes:
+    """codeload（git archive）と同じ形式のtarball.
+
+    先頭に "{repo}-{ref}/" が付き、ディレクトリのエントリの直後にその中身が続く。
+    """
+    entries: dict[str, bytes | None] = dict(files)
+    for path in files:
+        parts = path.split("/")[:-1]
+        for depth in range(1, len(parts) + 1):
+            entries["/".join(parts[:depth])] = None
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for path in sorted(entries):
+            data = entries[path]
+            info = tarfile.TarInfo(f"{prefix}/{path}")
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            else:
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class FakeStream:
+    """httpx.stream のレスポンス（tarballを小さなチャンクで返す）."""
+
+    def __init__(self, body: bytes, status_code: int = 200):
+        self.body = body
+        self.status_code = status_code
+        self.received = 0
+
+    def __call__(self, method, url, timeout=None, follow_redirects=False):
+        self.url = url
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_bytes(self):
+        for start in range(0, len(self.body), 64):
+            chunk = self.body[start : start + 64]
+            self.received += len(chunk)
+            yield chunk
+
+
+FILES = {
+    "README.md": b"# App\n",
+    "package.json": b'{"name": "app"}',
+    "src/main.py": b"print('hi')\n" * 10,
+    "src/deep/a/b.py": b"x = 1\n",
+    "logo.png": b"\x89PNG\xff\xfe",
+}
+
+
+def wanted(path: str) -> int | None:
+    return {"README.md": 100, "package.json": 100, "src/main.py": 20}.get(path)
+
+
+def read(body: bytes, **kwargs):
+    stream = FakeStream(body)
+    options = {"max_depth": 2, "max_bytes": 1024 * 1024, "max_file_bytes": 1024}
+    options.update(kwargs)
+    with patch("app.services.repo_snapshot.httpx.stream", stream):
+        snapshot = read_snapshot("octocat/app", "main", wanted=wanted, **options)
+    return snapshot, stream
+
+
+class TestReadSnapshot:
+    """read_snapshot関数のテスト."""
+
+    def test_structure_is_breadth_first_and_depth_limited(self):
+        """get_repo_structure と同じ幅優先の順で、max_depth までを返す."""
+        snapshot, stream = read(make_tarball(FILES))
+
+        assert stream.url == "https://codeload.github.com/octocat/app/tar.gz/main"
+        assert snapshot.structure == [
+            "README.md",
+            "logo.png",
+            "package.json",
+            "src",
+            "src/deep",
+            "src/main.py",
+            "src/deep/a",
+        ]
+        assert snapshot.sizes["src/deep/a/b.py"] == 6
+
+    def test_keeps_only_wanted_contents(self):
+        """wanted のファイルだけを保持し、切り詰めたものにはSHAを付けない."""
+        snapshot, _ = read(make_tarball(FILES))
+
+        assert snapshot.contents == {
+            "README.md": "# App\n",
+            "package.json": '{"name": "app"}',
+            "src/main.py": ("print('hi')\n" * 2)[:20],
+        }
+        assert snapshot.shas == {
+            "README.md": git_blob_sha(b"# App\n"),
+            "package.json": git_blob_sha(b'{"name": "app"}'),
+        }
+
+    def test_large_file_reads_prefix_only(self):
+        """max_file_bytes を超えるファイルは先頭だけを読む."""
+        body = make_tarball({"package.json": "é".encode() * 500})
+
+        snapshot, _ = read(body, max_file_bytes=10)
+
+        assert snapshot.contents == {"package.json": "é" * 100}
+        assert snapshot.shas == {}
+
+    def test_aborts_over_max_bytes(self):
+        """ダウンロード量が上限を超えたら読み込みをやめてNoneを返す."""
+        body = make_tarball({"big.bin": bytes(range(256)) * 400})
+
+        snapshot, stream = read(body, max_bytes=256)
+
+        assert snapshot is None
+        assert stream.received < len(body)
+
+    def test_http_error_returns_none(self):
+        """codeloadがエラーを返せばNone."""
+        stream = FakeStream(b"", status_code=404)
+        with patch("app.services.repo_snapshot.httpx.stream", stream):
+            snapshot = read_snapshot(
+                "octocat/app",
+                "main",
+                max_depth=2,
+                wanted=wanted,
+                max_bytes=1024,
+                max_file_bytes=1024,
+            )
+
+        assert snapshot is None
+
+
+def entry(path: str, type_: str = "file") -> SimpleNamespace:
+    return SimpleNamespace(path=path, type=type_, sha=f"sha-{path}", size=10)
+
+
+class TestChooseExtractionMode:
+    """choose_extraction_mode関数のテスト."""
+
+    ROOT = [entry("src", "dir"), entry("docs", "dir"), entry("package.json")]
+
+    @pytest.mark.parametrize(
+        ("size", "expected"),
+        [(100, "snapshot"), (5 * 256, "snapshot"), (5 * 256 + 1, "api")],
+    )
+    def test_compares_size_with_expected_calls(self, size, expected):
+        """ディレクトリ2 + 候補ファイル1 + README・言語2 = 5回分のサイズまでtarball."""
+        repo = SimpleNamespace(size=size)
+
+        assert github.choose_extraction_mode(repo, self.ROOT) == expected
+
+    def test_large_repo_always_uses_api(self):
+        """GITHUB_SNAPSHOT_MAX_KB を超えれば強制指定でもAPI."""
+        repo = SimpleNamespace(size=10 * 1024 + 1)
+
+        with patch("app.services.github.GITHUB_EXTRACTION_MODE", "snapshot"):
+            assert github.choose_extraction_mode(repo, self.ROOT) == "api"
+
+    def test_mode_can_be_forced(self):
+        """GITHUB_EXTRACTION_MODE で固定できる."""
+        repo = SimpleNamespace(size=5000)
+
+        with patch("app.services.github.GITHUB_EXTRACTION_MODE", "snapshot"):
+            assert github.choose_extraction_mode(repo, self.ROOT) == "snapshot"
+        with patch("app.services.github.GITHUB_EXTRACTION_MODE", "api"):
+            assert github.choose_extraction_mode(SimpleNamespace(size=1), []) == "api"
+
+
+class TestExtractRepoInfoSnapshot:
+    """tarballを使った extract_repo_info のテスト."""
+
+    def test_builds_record_without_file_calls(self, tmp_path):
+        """ファイル一覧・README・依存・主要コードをtarballから取り、内容のAPIは呼ばない."""
+        repo = MagicMock()
+        repo.name = "app"
+        repo.full_name = "octocat/app"
+        repo.default_branch = "main"
+        repo.size = 10
+        repo.fork = False
+        repo.topics = ["cli"]
+        repo.updated_at = None
+        repo.get_contents.return_value = [entry("src", "dir"), entry("package.json")]
+        repo.get_languages.return_value = {"Python": 100}
+        store = BlobStore(LocalBlobBackend(tmp_path), LruBlobCache(1024 * 1024))
+
+        with (
+            patch(
+                "app.services.repo_snapshot.httpx.stream",
+                FakeStream(make_tarball(FILES)),
+            ),
+            patch("app.services.github.get_blob_store", return_value=store),
+        ):
+            record = github.extract_repo_info(repo)
+
+        repo.get_contents.assert_called_once_with("")
+        repo.get_readme.assert_not_called()
+        assert record.readme == "# App\n"
+        assert record.topics == ["cli"]
+        assert [f.path for f in record.dependency_files] == ["package.json"]
+        assert [f.path for f in record.main_files] == ["src/main.py"]
+        assert record.file_structure[:3] == ["README.md", "logo.png", "package.json"]
+        assert store.get(record.readme_sha) == b"# App\n"
+
+    def test_falls_back_to_api(self):
+        """tarballが読めなければルートの一覧を再利用してAPIで取得する."""
+        repo = MagicMock()
+        repo.size = 10
+        repo.updated_at = None
+        repo.get_contents.return_value = [entry("README.md")]
+        repo.get_languages.return_value = {}
+
+        with (
+            patch("app.services.github.read_snapshot", return_value=None),
+            patch("app.services.github.get_readme", return_value=("hi", None)),
+        ):
+            record = github.extract_repo_info(repo)
+
+        repo.get_contents.assert_called_once_with("")
+        assert record.file_structure == ["README.md"]
+        assert record.readme == "hi"
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            UnknownObjectException(404, {"message": "This repository is empty."}),
+            GithubException(502, {"message": "Bad Gateway"}),
+        ],
+    )
+    def test_root_listing_failure_is_not_retried(self, error):
+        """ルートの一覧を取得できなければ空として扱い、同じ一覧を取り直さない."""
+        repo = MagicMock()
+        repo.full_name = "octocat/app"
+        repo.size = 10
+        repo.updated_at = None
+        repo.get_contents.side_effect = error
+        repo.get_languages.return_value = {}
+
+        with (
+            patch("app.services.github.read_snapshot") as snapshot,
+            patch("app.services.github.get_readme", return_value=(None, None)),
+        ):
+            record = github.extract_repo_info(repo)
+
+        repo.get_contents.assert_called_once_with("")
+        snapshot.assert_not_called()
+        assert record.file_structure == []
@@ -0,0 +1,163 @@
+"""Tests for app/services/repo_speculation.py."""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from app.services import repo_speculation
+from app.services.github import analyze_selected_repos
+from app.services.repo_record import RepoRecord
+
+
+def record(name: str) -> RepoRecord:
+    return RepoRecord(
+        name=name,
+        description=None,
+        language="Python",
+        languages={},
+        topics=[],
+        readme=None,
+        stars=0,
+        forks=0,
+        updated_at="",
+        is_fork=False,
+        file_structure=[],
+        dependency_files=[],
+        main_files=[],
+        config_files=[],
+    )
+
+
+@pytest.fixture(autouse=True)
+def speculations(monkeypatch):
+    """先行分析の状態を空にし、待ち時間を短くする."""
+    monkeypatch.setattr(repo_speculation, "_speculations", {})
+    monkeypatch.setattr(repo_speculation, "REPO_SPECULATION_DELAY_SECONDS", 0.05)
+    monkeypatch.setattr(repo_speculation, "has_budget", lambda token: True)
+
+
+@pytest.fixture
+def analyze():
+    """リポジトリ名からRepoRecordを作る analyze_selected_repos."""
+    with patch(
+        "app.services.repo_speculation.analyze_selected_repos",
+        side_effect=lambda username, names, token: [record(n) for n in names],
+    ) as mock:
+        yield mock
+
+
+def wait_started(username: str, name: str) -> None:
+    job = repo_speculation._speculations[username].jobs[name]
+    assert job.started.wait(2)
+    job.future.result(timeout=2)
+
+
+class TestSpeculation:
+    """先行分析のテスト."""
+
+    def test_finished_results_are_handed_over(self, analyze):
+        """完了済みの結果を受け取り、残りだけを分析させる."""
+        repo_speculation.speculate_repo_info("octocat", ["app", "lib"], None)
+        wait_started("octocat", "app")
+        wait_started("octocat", "lib")
+
+        extracted = repo_speculation.take_speculated("octocat", ["app", "lib", "cli"])
+
+        assert sorted(extracted) == ["app", "lib"]
+        assert repo_speculation.take_speculated("octocat", ["app"]) == {}
+
+    def test_deselected_repo_is_not_fetched(self, analyze, monkeypatch):
+        """待ち時間中に選択から外したリポジトリは取得しない."""
+        monkeypatch.setattr(repo_speculation, "REPO_SPECULATION_DELAY_SECONDS", 5)
+        repo_speculation.speculate_repo_info("octocat", ["app", "lib"], None)
+        jobs = dict(repo_speculation._speculations["octocat"].jobs)
+
+        repo_speculation.speculate_repo_info("octocat", ["app"], None)
+
+        assert jobs["lib"].cancelled.is_set()
+        assert jobs["lib"].future.cancelled() or jobs["lib"].future.result(2) is None
+        assert list(repo_speculation._speculations["octocat"].jobs) == ["app"]
+        repo_speculation.discard_speculation("octocat")
+        analyze.assert_not_called()
+
+    def test_unstarted_work_is_left_to_caller(self, analyze, monkeypatch):
+        """未開始のものは取り消し、呼び出し側で分析させる."""
+        monkeypatch.setattr(repo_speculation, "REPO_SPECULATION_DELAY_SECONDS", 5)
+        repo_speculation.speculate_repo_info("octocat", ["app"], None)
+
+        assert repo_speculation.take_speculated("octocat", ["app"]) == {}
+        analyze.assert_not_called()
+
+    def test_waits_for_running_work(self, monkeypatch):
+        """実行中のものは完了を待って受け取る."""
+        release = threading.Event()
+
+        def slow(username, names, token):
+            release.wait(2)
+            return [record(n) for n in names]
+
+        with patch(
+            "app.services.repo_speculation.analyze_selected_repos", side_effect=slow
+        ):
+            repo_speculation.speculate_repo_info("octocat", ["app"], None)
+            job = repo_speculation._speculations["octocat"].jobs["app"]
+            assert job.started.wait(2)
+            release.set()
+
+            extracted = repo_speculation.take_speculated("octocat", ["app"])
+
+        assert list(extracted) == ["app"]
+
+    def test_slow_work_is_waited_for_once(self, monkeypatch):
+        """実行中のものは全件まとめて短い期限まで待ち、超えたものは呼び出し側に任せる."""
+        monkeypatch.setattr(repo_speculation, "REPO_SPECULATION_WAIT_SECONDS", 0.2)
+        release = threading.Event()
+
+        def stuck(username, names, token):
+            release.wait(5)
+            return [record(n) for n in names]
+
+        with patch(
+            "app.services.repo_speculation.analyze_selected_repos", side_effect=stuck
+        ):
+            repo_speculation.speculate_repo_info("octocat", ["app", "lib"], None)
+            jobs = dict(repo_speculation._speculations["octocat"].jobs)
+            assert jobs["app"].started.wait(2)
+            assert jobs["lib"].started.wait(2)
+
+            started = time.monotonic()
+            extracted = repo_speculation.take_speculated("octocat", ["app", "lib"])
+            elapsed = time.monotonic() - started
+            release.set()
+
+        assert extracted == {}
+        assert elapsed < 1
+        assert jobs["app"].cancelled.is_set()
+
+
+class TestAnalyzeSelectedRepos:
+    """analyze_selected_repos の extracted 引数のテスト."""
+
+    def test_fetches_only_missing_repos(self):
+        """分析済みのリポジトリは取得せず、選択順で返す."""
+        with (
+            patch(
+                "app.services.github.get_repos_by_names",
+                side_effect=lambda username, names, token: [
+                    SimpleNamespace(name=n, fork=False, archived=False) for n in names
+                ],
+            ) as get,
+            patch(
+                "app.services.github.extract_repo_info",
+                side_effect=lambda repo: record(repo.name),
+            ),
+        ):
+            repos = analyze_selected_repos(
+                "octocat", ["app", "lib"], extracted={"app": record("app")}
+            )
+
+        assert [r.name for r in repos] == ["app", "lib"]
+        assert get.call_args.args[1] == ["lib"]
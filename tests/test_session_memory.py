@@ -0,0 +1,279 @@
+"""Tests for app/services/session_memory.py."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.cache import delete_all_user_data
+from app.services.models import (
+    JobRecommendation,
+    JobSearchResult,
+    MatchReason,
+)
+from app.services.session_keys import (
+    JOB_RESULTS,
+    PROFILE_DEGRADED,
+    PROFILE_STATE,
+    REPO_METADATA_LIST,
+    SESSION_ID,
+    SPILLED_HASHES,
+    SPILLED_KEYS,
+)
+from app.services.session_memory import (
+    deep_sizeof,
+    enforce_session_budget,
+    measure_session,
+    restore_spilled,
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_session_state():
+    """session_stateのモック."""
+    with patch("app.services.session_memory.st") as mock_st:
+        mock_st.session_state = {SESSION_ID: "session-a"}
+        yield mock_st.session_state
+
+
+@pytest.fixture
+def mock_db():
+    """Firestoreクライアントのモック."""
+    db = MagicMock()
+    with patch("app.services.session_memory.get_firestore_client", return_value=db):
+        yield db
+
+
+def _job_results(count: int = 0) -> JobSearchResult:
+    return JobSearchResult(
+        recommendations=[
+            JobRecommendation(
+                job_title="Backend Engineer",
+                company=f"company-{i}",
+                location="東京",
+                salary_range=None,
+                reason=MatchReason(
+                    summary="x" * 2_000, matched_conditions=[], why_good=""
+                ),
+                sources=[],
+            )
+            for i in range(count)
+        ],
+        status="success",
+    )
+
+
+class TestDeepSizeof:
+    """deep_sizeof関数のテスト."""
+
+    def test_counts_nested_contents(self):
+        """ネストした要素のサイズを含める."""
+        payload = ["x" * 10_000]
+
+        assert deep_sizeof({"data": payload}) > 10_000
+
+    def test_shared_objects_counted_once(self):
+        """複数キーから参照される同一オブジェクトは1回だけ数える."""
+        shared = "x" * 10_000
+
+        report = measure_session({"a": shared, "b": shared})
+
+        assert report.by_key["b"] == 0
+        assert report.total_bytes == report.by_key["a"]
+
+
+class TestEnforceSessionBudget:
+    """enforce_session_budget関数のテスト."""
+
+    def test_within_budget_keeps_state(self, mock_session_state):
+        """予算内なら何も削除しない."""
+        mock_session_state[REPO_METADATA_LIST] = ["repo"]
+
+        with patch("app.services.session_memory.current_budget", return_value=1 << 20):
+            assert enforce_session_budget(1) == []
+
+        assert REPO_METADATA_LIST in mock_session_state
+
+    def test_evicts_rebuildable_before_spilling(self, mock_session_state, mock_db):
+        """再構築可能なエントリの削除で予算内に収まれば退避しない."""
+        mock_session_state[REPO_METADATA_LIST] = ["x" * 50_000]
+        mock_session_state[JOB_RESULTS] = _job_results()
+
+        with patch("app.services.session_memory.current_budget", return_value=10_000):
+            evicted = enforce_session_budget(1)
+
+        assert evicted == [REPO_METADATA_LIST]
+        assert JOB_RESULTS in mock_session_state
+        mock_db.collection.assert_not_called()
+
+    def test_keeps_degraded_profile(self, mock_session_state, mock_db):
+        """縮退時の簡易プロファイルはキャッシュにないため削除しない."""
+        mock_session_state[PROFILE_STATE] = {"summary": "x" * 50_000}
+        mock_session_state[PROFILE_DEGRADED] = True
+
+        with patch("app.services.session_memory.current_budget", return_value=10_000):
+            assert enforce_session_budget(1) == []
+
+        assert PROFILE_STATE in mock_session_state
+
+    def test_spills_durable_entries_when_still_over(self, mock_session_state, mock_db):
+        """削除しても予算を超える場合は求人検索結果をFirestoreへ退避する."""
+        mock_session_state[REPO_METADATA_LIST] = ["x" * 1_000]
+        mock_session_state[JOB_RESULTS] = _job_results()
+
+        with patch("app.services.session_memory.current_budget", return_value=0):
+            evicted = enforce_session_budget(1)
+
+        assert evicted == [REPO_METADATA_LIST, JOB_RESULTS]
+        assert JOB_RESULTS not in mock_session_state
+        assert mock_session_state[SPILLED_KEYS] == {JOB_RESULTS}
+        saved = mock_db.collection.return_value.document.return_value.set.call_args
+        assert saved.args[0][JOB_RESULTS]["status"] == "success"
+
+    def test_keeps_entries_when_spill_fails(self, mock_session_state, mock_db):
+        """退避に失敗した場合は求人検索結果を削除しない."""
+        mock_session_state[JOB_RESULTS] = _job_results()
+        set_doc = mock_db.collection.return_value.document.return_value.set
+        set_doc.side_effect = Exception("unavailable")
+
+        with patch("app.services.session_memory.current_budget", return_value=0):
+            assert enforce_session_budget(1) == []
+
+        assert JOB_RESULTS in mock_session_state
+
+    def test_trims_old_results_before_spilling(self, mock_session_state, mock_db):
+        """求人検索結果は古いページを削除し、直近の1ページで予算内なら退避しない."""
+        latest = _job_results(9).latest(3)
+        budget = measure_session({**mock_session_state, JOB_RESULTS: latest})
+        mock_session_state[JOB_RESULTS] = _job_results(9)
+
+        with patch(
+            "app.services.session_memory.current_budget",
+            return_value=budget.total_bytes + 1_000,
+        ):
+            assert enforce_session_budget(1) == []
+
+        companies = [r.company for r in mock_session_state[JOB_RESULTS].recommendations]
+        assert companies == ["company-6", "company-7", "company-8"]
+        mock_db.collection.assert_not_called()
+
+    def test_unchanged_payload_is_not_rewritten(self, mock_session_state, mock_db):
+        """復元後に変わっていない結果は書き直さずに削除だけする."""
+        doc_ref = mock_db.collection.return_value.document.return_value
+        mock_session_state[JOB_RESULTS] = _job_results()
+        with patch("app.services.session_memory.current_budget", return_value=0):
+            enforce_session_budget(1)
+            saved = doc_ref.set.call_args.args[0]
+            doc_ref.get.return_value.to_dict.return_value = saved
+
+            assert restore_spilled(1, [JOB_RESULTS]) == [JOB_RESULTS]
+            assert enforce_session_budget(1) == [JOB_RESULTS]
+
+        assert doc_ref.set.call_count == 1
+        assert JOB_RESULTS not in mock_session_state
+        assert mock_session_state[SPILLED_KEYS] == {JOB_RESULTS}
+
+    def test_spill_is_keyed_by_session(self, mock_session_state, mock_db):
+        """同じユーザーでもセッションごとに別のドキュメントへ退避する."""
+        doc_ids = []
+        for session_id in ["session-a", "session-b"]:
+            mock_session_state.clear()
+            mock_session_state[SESSION_ID] = session_id
+            mock_session_state[JOB_RESULTS] = _job_results()
+            with patch("app.services.session_memory.current_budget", return_value=0):
+                enforce_session_budget(1)
+            doc_ids.append(mock_db.collection.return_value.document.call_args.args[0])
+
+        assert doc_ids[0] != doc_ids[1]
+        assert all(doc_id.startswith("1_") for doc_id in doc_ids)
+        assert not any("session-" in doc_id for doc_id in doc_ids)
+
+    def test_session_without_id_is_not_spilled(self, mock_session_state, mock_db):
+        """セッションIDがなければ退避先を決められないため削除しない."""
+        del mock_session_state[SESSION_ID]
+        mock_session_state[JOB_RESULTS] = _job_results()
+
+        with patch("app.services.session_memory.current_budget", return_value=0):
+            assert enforce_session_budget(1) == []
+
+        assert JOB_RESULTS in mock_session_state
+        mock_db.collection.assert_not_called()
+
+    def test_anonymous_session_is_not_spilled(self, mock_session_state, mock_db):
+        """未ログインのセッションは退避しない."""
+        mock_session_state[JOB_RESULTS] = _job_results()
+
+        with patch("app.services.session_memory.current_budget", return_value=0):
+            assert enforce_session_budget(None) == []
+
+        mock_db.collection.assert_not_called()
+
+
+class TestRestoreSpilled:
+    """restore_spilled関数のテスト."""
+
+    def test_no_firestore_access_without_spill(self, mock_db):
+        """退避していなければFirestoreを読まない."""
+        assert restore_spilled(1) == []
+
+        mock_db.collection.assert_not_called()
+
+    def test_restores_spilled_entries(self, mock_session_state, mock_db):
+        """退避したエントリを復元し、退避済みマークを消す."""
+        mock_session_state[SPILLED_KEYS] = {JOB_RESULTS}
+        doc = mock_db.collection.return_value.document.return_value.get.return_value
+        doc.to_dict.return_value = {
+            JOB_RESULTS: _job_results().model_dump(mode="json"),
+            "user_id": 1,
+        }
+
+        assert restore_spilled(1) == [JOB_RESULTS]
+
+        assert mock_session_state[JOB_RESULTS] == _job_results()
+        assert SPILLED_KEYS not in mock_session_state
+
+    def test_restores_only_requested_keys(self, mock_session_state, mock_db):
+        """指定していないキーだけが退避済みならFirestoreを読まない."""
+        mock_session_state[SPILLED_KEYS] = {JOB_RESULTS}
+
+        assert restore_spilled(1, [PROFILE_STATE]) == []
+
+        mock_db.collection.assert_not_called()
+        assert mock_session_state[SPILLED_KEYS] == {JOB_RESULTS}
+
+    def test_newer_value_is_not_overwritten(self, mock_session_state, mock_db):
+        """退避後に新しい値がセットされたキーは復元せず、ハッシュも捨てる."""
+        mock_session_state[SPILLED_KEYS] = {JOB_RESULTS}
+        mock_session_state[SPILLED_HASHES] = {JOB_RESULTS: "old"}
+        mock_session_state[JOB_RESULTS] = _job_results(1)
+
+        assert restore_spilled(1, [JOB_RESULTS]) == []
+
+        mock_db.collection.assert_not_called()
+        assert mock_session_state[JOB_RESULTS] == _job_results(1)
+        assert SPILLED_KEYS not in mock_session_state
+        assert mock_session_state[SPILLED_HASHES] == {}
+
+
+class TestDeleteSpilled:
+    """ログアウト時の退避ドキュメント削除のテスト."""
+
+    def test_deletes_spill_docs_of_all_sessions(self):
+        """ユーザーの全セッション分の退避ドキュメントを削除する."""
+        db = MagicMock()
+        docs = [MagicMock(), MagicMock()]
+        spill = MagicMock()
+        spill.where.return_value.stream.return_value = docs
+        db.collection.side_effect = lambda name: (
+            spill if name == "session_spill" else MagicMock()
+        )
+
+        with patch("app.services.cache.get_firestore_client", return_value=db):
+            delete_all_user_data("1")
+
+        spill.where.assert_called_once_with("user_id", "==", 1)
+        batch = db.batch.return_value
+        assert [c.args[0] for c in batch.delete.call_args_list[-2:]] == [
+            docs[0].reference,
+            docs[1].reference,
+        ]
+        spill.document.assert_not_called()
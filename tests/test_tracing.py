@@ -0,0 +1,91 @@
+"""Tests for app/services/tracing.py."""
+
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services.tracing import JsonExporter, set_exporters, span, traced
+
+
+@pytest.fixture
+def exported():
+    """JsonExporterの出力をパースして返す."""
+    stream = io.StringIO()
+    set_exporters([JsonExporter(stream)])
+
+    def spans() -> list[dict]:
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    with patch(
+        "app.services.tracing._get_user_context", return_value=("42", "octocat")
+    ):
+        yield spans
+    set_exporters(None)
+
+
+class TestSpan:
+    """span / traced のテスト."""
+
+    def test_nested_spans_share_trace(self, exported):
+        """子スパンは親のtrace_idとspan_idを引き継ぐ."""
+        with span("pipeline.profile", repo_count=2):
+            with span("github.extract_repo_info"):
+                pass
+
+        child, root = exported()
+        assert root["name"] == "pipeline.profile"
+        assert root["parent_id"] is None
+        assert root["attributes"] == {"repo_count": 2}
+        assert child["trace_id"] == root["trace_id"]
+        assert child["parent_id"] == root["span_id"]
+
+    def test_attaches_user_context(self, exported):
+        """全スパンにuser_id/loginを付与する."""
+        with span("pipeline.job_search"):
+            with span("research.search_jobs"):
+                pass
+
+        for record in exported():
+            assert record["user_id"] == "42"
+            assert record["login"] == "octocat"
+
+    def test_records_error_and_reraises(self, exported):
+        """例外はスパンに記録して再送出する."""
+        with pytest.raises(ValueError), span("profile.parse"):
+            raise ValueError("invalid json")
+
+        (record,) = exported()
+        assert record["status"] == "error"
+        assert record["error"] == "ValueError: invalid json"
+
+    def test_script_control_is_not_an_error(self, exported):
+        """Streamlitの再実行・停止（BaseException）はエラーとして記録しない."""
+        from streamlit.runtime.scriptrunner_utils.exceptions import StopException
+
+        with pytest.raises(StopException), span("pipeline.profile"):
+            raise StopException()
+
+        (record,) = exported()
+        assert record["status"] == "ok"
+        assert record["error"] is None
+
+    def test_traced_uses_module_and_function_name(self, exported):
+        """デコレーターのスパン名は "<モジュール末尾>.<関数名>"."""
+
+        @traced()
+        def fetch() -> int:
+            return 1
+
+        assert fetch() == 1
+        assert exported()[0]["name"] == "test_tracing.fetch"
+
+    def test_disabled_without_exporters(self):
+        """エクスポーター未設定ならスパンを作成しない."""
+        set_exporters([])
+        try:
+            with span("noop") as current:
+                assert current is None
+        finally:
+            set_exporters(None)
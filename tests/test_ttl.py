@@ -0,0 +1,99 @@
+"""Tests for app/services/ttl.py."""
+
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+from app.services.const import CACHE_TTL_DAYS
+from app.services.ttl import (
+    EXPIRES_AT_FIELD,
+    backfill_expires_at,
+    compute_expires_at,
+    is_expired,
+    sweep_expired,
+)
+
+NOW = datetime(2026, 1, 15, 12, 0, tzinfo=UTC)
+
+
+def _make_doc(data: dict) -> MagicMock:
+    doc = MagicMock()
+    doc.to_dict.return_value = data
+    return doc
+
+
+class TestIsExpired:
+    """is_expired関数のテスト."""
+
+    def test_not_expired_before_expires_at(self):
+        """expires_at前は有効."""
+        data = {EXPIRES_AT_FIELD: NOW + timedelta(seconds=1)}
+        assert is_expired(data, "sessions", NOW) is False
+
+    def test_expired_at_expires_at(self):
+        """expires_at到達で期限切れ."""
+        data = {EXPIRES_AT_FIELD: NOW}
+        assert is_expired(data, "sessions", NOW) is True
+
+    def test_missing_expires_at_falls_back_to_base_field(self):
+        """expires_at未設定（旧ドキュメント）は起点フィールド + TTL日数で判定."""
+        old = {"updated_at": NOW - timedelta(days=CACHE_TTL_DAYS)}
+        recent = {"updated_at": NOW - timedelta(days=CACHE_TTL_DAYS - 1)}
+
+        assert is_expired(old, "profiles", NOW) is True
+        assert is_expired(recent, "profiles", NOW) is False
+
+    def test_missing_both_fields_is_not_expired(self):
+        assert is_expired({}, "sessions", NOW) is False
+
+    def test_compute_expires_at(self):
+        """起点時刻にTTL日数を加算."""
+        assert compute_expires_at(NOW, 7) == NOW + timedelta(days=7)
+
+
+class TestSweepExpired:
+    """sweep_expired関数のテスト."""
+
+    def test_deletes_in_batches_until_empty(self):
+        """バッチサイズ分ずつ削除し、空になったら終了."""
+        db = MagicMock()
+        query = db.collection.return_value.where.return_value.limit.return_value
+        query.stream.side_effect = [
+            [_make_doc({}), _make_doc({})],
+            [_make_doc({})],
+        ]
+
+        deleted = sweep_expired(db, "sessions", now=NOW, batch_size=2)
+
+        assert deleted == 3
+        db.collection.return_value.where.assert_called_with(EXPIRES_AT_FIELD, "<", NOW)
+        assert db.batch.return_value.delete.call_count == 3
+        assert db.batch.return_value.commit.call_count == 2
+
+    def test_no_expired_documents(self):
+        """期限切れがなければ何もコミットしない."""
+        db = MagicMock()
+        query = db.collection.return_value.where.return_value.limit.return_value
+        query.stream.return_value = []
+
+        assert sweep_expired(db, "profiles", now=NOW) == 0
+        db.batch.return_value.commit.assert_not_called()
+
+
+class TestBackfillExpiresAt:
+    """backfill_expires_at関数のテスト."""
+
+    def test_backfills_only_missing_documents(self):
+        """expires_at未設定かつ起点フィールドがあるドキュメントのみ補完."""
+        db = MagicMock()
+        legacy = _make_doc({"last_accessed_at": NOW})
+        current = _make_doc({"last_accessed_at": NOW, EXPIRES_AT_FIELD: NOW})
+        broken = _make_doc({})
+        db.collection.return_value.stream.return_value = [legacy, current, broken]
+
+        updated = backfill_expires_at(db, "sessions")
+
+        assert updated == 1
+        db.batch.return_value.update.assert_called_once_with(
+            legacy.reference,
+            {EXPIRES_AT_FIELD: NOW + timedelta(days=7)},
+        )
@@ -0,0 +1,45 @@
+"""Tests for app/services/warmup.py."""
+
+from unittest.mock import MagicMock, patch
+
+from app.services.warmup import run_warmup
+
+
+@patch("app.services.warmup._init_vertex_ai")
+@patch("app.services.warmup._create_firestore_client")
+@patch("app.services.warmup._import_sdks")
+@patch("app.services.warmup._import_app")
+class TestRunWarmup:
+    """run_warmup関数のテスト."""
+
+    def test_reports_timing_per_step(self, *_mocks):
+        """ステップごとの所要時間を返す."""
+        timings = run_warmup(firestore_ping=False)
+
+        assert list(timings) == [
+            "import_app",
+            "import_sdks",
+            "firestore_client",
+            "vertex_ai",
+        ]
+        assert all(sec >= 0 for sec in timings.values())
+
+    def test_firestore_ping_reads_shared_client(self, *_mocks):
+        """空読み込みは共有クライアント経由で行う."""
+        db = MagicMock()
+        with patch("app.services.cache.get_firestore_client", return_value=db):
+            timings = run_warmup(firestore_ping=True)
+
+        assert "firestore_ping" in timings
+        db.collection.return_value.document.return_value.get.assert_called_once()
+
+    def test_failed_step_does_not_block_startup(
+        self, _import_app, _import_sdks, _create_client, init_vertex
+    ):
+        """失敗したステップはスキップして残りを続行する."""
+        init_vertex.side_effect = Exception("no credentials")
+
+        timings = run_warmup(firestore_ping=False)
+
+        assert "vertex_ai" not in timings
+        assert "firestore_client" in timings